@@ -11,28 +11,113 @@ interface MaintenanceCheckResult {
   end_time?: string
 }
 
+// メンテナンス状態のキャッシュ設定（isolate内で共有。環境変数で調整可能）
+// TTL内はキャッシュを返し、TTL切れから MAX_STALE までは古い値を返しつつバックグラウンドで更新する
+const CACHE_TTL_MS = Number(Deno.env.get('MAINTENANCE_CACHE_TTL_MS') ?? '10000')
+const CACHE_MAX_STALE_MS = Number(Deno.env.get('MAINTENANCE_CACHE_MAX_STALE_MS') ?? '60000')
+const FETCH_TIMEOUT_MS = Number(Deno.env.get('MAINTENANCE_FETCH_TIMEOUT_MS') ?? '2000')
+// 状態を取得できないときの扱い（closed: エラーとして弾く / open: 稼働中として通す）
+const FAIL_POLICY: 'open' | 'closed' = Deno.env.get('MAINTENANCE_FAIL_POLICY') === 'open' ? 'open' : 'closed'
+
+interface MaintenanceState {
+  is_maintenance: boolean
+  end_time: string | null
+}
+
+let cachedState: { state: MaintenanceState; fetchedAt: number } | null = null
+let pendingRefresh: Promise<MaintenanceState> | null = null
+
+/**
+ * maintenance_mode テーブルを取得（check-maintenance-mode Functionを経由せずPostgRESTを直接読む）
+ */
+async function fetchMaintenanceState(): Promise<MaintenanceState> {
+  const supabaseUrl = Deno.env.get('SUPABASE_URL') ?? ''
+  const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? ''
+
+  const response = await fetch(`${supabaseUrl}/rest/v1/maintenance_mode?select=is_maintenance,end_time`, {
+    headers: {
+      'apikey': serviceRoleKey,
+      'Authorization': `Bearer ${serviceRoleKey}`,
+      // .single() と同じく1行でなければエラーにする
+      'Accept': 'application/vnd.pgrst.object+json',
+    },
+    signal: AbortSignal.timeout(FETCH_TIMEOUT_MS),
+  })
+  if (!response.ok) {
+    throw new Error(`Failed to fetch maintenance_mode: ${response.status} ${await response.text()}`)
+  }
+
+  const row = await response.json()
+  return { is_maintenance: row.is_maintenance === true, end_time: row.end_time ?? null }
+}
+
+/**
+ * キャッシュを更新（同時に来たリクエストの取得は1回にまとめる）
+ */
+function refreshMaintenanceState(): Promise<MaintenanceState> {
+  if (!pendingRefresh) {
+    pendingRefresh = fetchMaintenanceState()
+      .then((state) => {
+        cachedState = { state, fetchedAt: Date.now() }
+        return state
+      })
+      .finally(() => {
+        pendingRefresh = null
+      })
+  }
+  return pendingRefresh
+}
+
+/**
+ * メンテナンス状態を取得（isolate内でキャッシュ）
+ * supabaseClient.from('maintenance_mode').select('is_maintenance, end_time').single() と同じ形で返す
+ * @returns data: メンテナンス状態、error: 取得できず FAIL_POLICY が closed の場合のエラー
+ */
+export async function getMaintenanceState(): Promise<{ data: MaintenanceState | null; error: Error | null }> {
+  if (cachedState) {
+    const age = Date.now() - cachedState.fetchedAt
+    if (age < CACHE_TTL_MS) {
+      return { data: cachedState.state, error: null }
+    }
+    if (age < CACHE_TTL_MS + CACHE_MAX_STALE_MS) {
+      // 古い値を返し、次のリクエストまでに更新しておく
+      refreshMaintenanceState().catch((error) => {
+        console.error('[Maintenance] ⚠️ メンテナンス状態の更新エラー:', error)
+      })
+      return { data: cachedState.state, error: null }
+    }
+  }
+
+  try {
+    return { data: await refreshMaintenanceState(), error: null }
+  } catch (error) {
+    console.error('[Maintenance] ❌ メンテナンス状態の取得エラー:', error)
+    if (FAIL_POLICY === 'open') {
+      return { data: { is_maintenance: false, end_time: null }, error: null }
+    }
+    return { data: null, error: error instanceof Error ? error : new Error(String(error)) }
+  }
+}
+
 /**
- * メンテナンスモードをチェック
+ * メンテナンスモードをチェック（isolate内でキャッシュ）
  * @param req リクエストオブジェクト（ヘッダーから管理者スキップフラグを取得）
  * @returns メンテナンスモードの状態
  */
-export async function checkMaintenanceMode(req: Request): Promise<MaintenanceCheckResult> {
+export async function getMaintenanceStatus(req: Request): Promise<MaintenanceCheckResult> {
   // 管理者スキップヘッダーがある場合はメンテナンスチェックをスキップ
   const skipMaintenance = req.headers.get('x-admin-skip-maintenance')
   if (skipMaintenance === 'true') {
     return { status: 'active' }
   }
 
-  const supabaseUrl = Deno.env.get('SUPABASE_URL') ?? ''
-  const supabaseAnonKey = Deno.env.get('SUPABASE_ANON_KEY') ?? ''
-
-  const checkResponse = await fetch(`${supabaseUrl}/functions/v1/check-maintenance-mode`, {
-    method: 'POST',
-    headers: {
-      'Content-Type': 'application/json',
-      'Authorization': `Bearer ${supabaseAnonKey}`,
-    },
-  })
-
-  return await checkResponse.json()
+  const { data: maintenanceState, error } = await getMaintenanceState()
+  if (error || !maintenanceState) {
+    return { status: 'error', message: 'システムエラーが発生しました。しばらくお待ちください' }
+  }
+  if (maintenanceState.is_maintenance) {
+    return { status: 'maintenance', end_time: maintenanceState.end_time || undefined }
+  }
+  return { status: 'active' }
 }
+
@@ -0,0 +1,204 @@
+/**
+ * _shared/maintenance.ts のキャッシュのテスト
+ * tool/maintenance_stub_server.py を起動して SUPABASE_URL に向け、PostgREST への問い合わせ回数を数える
+ *
+ * 実行:
+ *   deno test --allow-env --allow-net --allow-run --allow-read supabase/functions/_shared/maintenance_test.ts
+ */
+
+import { assert, assertEquals } from 'https://deno.land/std@0.192.0/testing/asserts.ts'
+
+declare var Deno: any;
+
+const STUB_SCRIPT = new URL('../../../tool/maintenance_stub_server.py', import.meta.url).pathname
+const TABLE_PATH = '/rest/v1/maintenance_mode'
+
+interface Stub {
+  url: string
+  request: (path: string, body?: unknown) => Promise<any>
+  fetches: () => Promise<number>
+  stop: () => Promise<void>
+}
+
+/**
+ * スタブサーバーを空いているポートで起動（標準出力の SUPABASE_URL= の行から URL を読む）
+ */
+async function startStub(): Promise<Stub> {
+  const child = new Deno.Command('python3', {
+    args: ['-u', STUB_SCRIPT, '--port', '0'],
+    stdout: 'piped',
+    stderr: 'inherit',
+  }).spawn()
+  const reader = child.stdout.pipeThrough(new TextDecoderStream()).getReader()
+  let output = ''
+  let match: RegExpMatchArray | null = null
+  while (!(match = output.match(/SUPABASE_URL=(\S+)\n/))) {
+    const { value, done } = await reader.read()
+    if (done) {
+      throw new Error(`スタブサーバーを起動できません: ${output}`)
+    }
+    output += value
+  }
+  const url = match[1]
+
+  const request = async (path: string, body?: unknown) => {
+    const response = await fetch(`${url}${path}`, body === undefined ? {} : {
+      method: 'POST',
+      body: JSON.stringify(body),
+    })
+    return await response.json()
+  }
+
+  return {
+    url,
+    request,
+    fetches: async () => (await request('/__stub/stats'))[TABLE_PATH] ?? 0,
+    stop: async () => {
+      child.kill('SIGTERM')
+      await reader.cancel()
+      await child.status
+    },
+  }
+}
+
+/**
+ * 環境変数を設定してから maintenance.ts を読み込み直す
+ * （設定はモジュールの読み込み時に読まれ、キャッシュもモジュールごとに持つため、クエリで別のモジュールにする）
+ */
+let loads = 0
+async function loadMaintenance(stub: Stub, env: Record<string, string>) {
+  await stub.request('/__stub/state', { is_maintenance: false, end_time: null, fail: false, delay_ms: 0 })
+  await stub.request('/__stub/reset', {})
+  Deno.env.set('SUPABASE_URL', stub.url)
+  Deno.env.set('SUPABASE_SERVICE_ROLE_KEY', 'service-role-key')
+  Deno.env.set('MAINTENANCE_FETCH_TIMEOUT_MS', '1000')
+  for (const name of ['MAINTENANCE_CACHE_TTL_MS', 'MAINTENANCE_CACHE_MAX_STALE_MS', 'MAINTENANCE_FAIL_POLICY']) {
+    Deno.env.delete(name)
+  }
+  for (const [name, value] of Object.entries(env)) {
+    Deno.env.set(name, value)
+  }
+  loads += 1
+  return await import(`./maintenance.ts?load=${loads}`)
+}
+
+function sleep(ms: number) {
+  return new Promise((resolve) => setTimeout(resolve, ms))
+}
+
+/**
+ * バックグラウンドの更新が問い合わせを終えるまで待つ
+ */
+async function waitForFetches(stub: Stub, expected: number) {
+  for (let i = 0; i < 50 && await stub.fetches() < expected; i++) {
+    await sleep(20)
+  }
+  // 問い合わせの応答がキャッシュに入るまで
+  await sleep(50)
+}
+
+function request(headers: Record<string, string> = {}) {
+  return new Request('http://localhost/functions/v1/test', { headers })
+}
+
+// AbortSignal.timeout のタイマーは問い合わせが終わっても残るため、非同期処理の検査は外す
+Deno.test({
+  name: 'maintenance.ts のキャッシュ',
+  sanitizeOps: false,
+  sanitizeResources: false,
+  fn: async (t: any) => {
+    const stub = await startStub()
+    try {
+      await t.step('TTL内は問い合わせずにキャッシュを返す', async () => {
+        const maintenance = await loadMaintenance(stub, {
+          MAINTENANCE_CACHE_TTL_MS: '300',
+          MAINTENANCE_CACHE_MAX_STALE_MS: '0',
+        })
+
+        // 同時に来たリクエストの取得は1回にまとめる
+        const results = await Promise.all([1, 2, 3].map(() => maintenance.getMaintenanceState()))
+        for (const { data, error } of results) {
+          assertEquals(error, null)
+          assertEquals(data, { is_maintenance: false, end_time: null })
+        }
+        assertEquals(await stub.fetches(), 1)
+
+        await stub.request('/__stub/state', { is_maintenance: true, end_time: '2025-01-01T09:00:00Z' })
+        assertEquals(await maintenance.getMaintenanceStatus(request()), { status: 'active' })
+        assertEquals(await stub.fetches(), 1)
+
+        // TTL切れ（MAX_STALE が 0 なら待って取り直す）
+        await sleep(350)
+        assertEquals(await maintenance.getMaintenanceStatus(request()), {
+          status: 'maintenance',
+          end_time: '2025-01-01T09:00:00Z',
+        })
+        assertEquals(await stub.fetches(), 2)
+      })
+
+      await t.step('TTL切れから MAX_STALE までは古い値を返してバックグラウンドで更新する', async () => {
+        const maintenance = await loadMaintenance(stub, {
+          MAINTENANCE_CACHE_TTL_MS: '100',
+          MAINTENANCE_CACHE_MAX_STALE_MS: '10000',
+        })
+        assertEquals((await maintenance.getMaintenanceState()).data?.is_maintenance, false)
+        await stub.request('/__stub/state', { is_maintenance: true })
+
+        await sleep(150)
+        assertEquals((await maintenance.getMaintenanceState()).data?.is_maintenance, false)
+        await waitForFetches(stub, 2)
+        assertEquals(await stub.fetches(), 2)
+
+        // 更新された値はTTL内なので問い合わせない
+        assertEquals((await maintenance.getMaintenanceState()).data?.is_maintenance, true)
+        assertEquals(await stub.fetches(), 2)
+
+        // 更新に失敗しても MAX_STALE までは古い値を返し続ける
+        await stub.request('/__stub/state', { fail: true })
+        await sleep(150)
+        assertEquals(await maintenance.getMaintenanceState(), {
+          data: { is_maintenance: true, end_time: null },
+          error: null,
+        })
+        await waitForFetches(stub, 3)
+        assertEquals((await maintenance.getMaintenanceState()).data?.is_maintenance, true)
+      })
+
+      await t.step('fail-closed: 取得できなければエラーを返す', async () => {
+        const maintenance = await loadMaintenance(stub, { MAINTENANCE_FAIL_POLICY: 'closed' })
+        await stub.request('/__stub/state', { fail: true })
+
+        const { data, error } = await maintenance.getMaintenanceState()
+        assertEquals(data, null)
+        assert(error instanceof Error)
+        assertEquals((await maintenance.getMaintenanceStatus(request())).status, 'error')
+
+        // 失敗はキャッシュしないので毎回問い合わせる
+        assertEquals(await stub.fetches(), 2)
+
+        // 管理者スキップは問い合わせない
+        const skipped = await maintenance.getMaintenanceStatus(request({ 'x-admin-skip-maintenance': 'true' }))
+        assertEquals(skipped, { status: 'active' })
+        assertEquals(await stub.fetches(), 2)
+      })
+
+      await t.step('fail-open: 取得できなければ稼働中として通す', async () => {
+        const maintenance = await loadMaintenance(stub, { MAINTENANCE_FAIL_POLICY: 'open' })
+        await stub.request('/__stub/state', { fail: true })
+
+        assertEquals(await maintenance.getMaintenanceState(), {
+          data: { is_maintenance: false, end_time: null },
+          error: null,
+        })
+        assertEquals(await maintenance.getMaintenanceStatus(request()), { status: 'active' })
+
+        // 復旧したら次の問い合わせで実際の状態を返す
+        await stub.request('/__stub/state', { fail: false, is_maintenance: true })
+        assertEquals((await maintenance.getMaintenanceStatus(request())).status, 'maintenance')
+        assertEquals(await stub.fetches(), 3)
+      })
+    } finally {
+      await stub.stop()
+    }
+  },
+})
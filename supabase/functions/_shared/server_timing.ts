@@ -0,0 +1,113 @@
+// Server-Timing計測共通処理
+// tool/update_edge_functions.py の server-timing ルールで各Functionのハンドラーを withServerTiming で包み、
+// ハンドラー内の await（メンテナンスチェック・req.json()・DBクエリ・署名付きURL生成など）を
+// serverTiming.measure で計測する（server-timing-remove ルールで元に戻せる）
+
+declare var Deno: any;
+
+// 構造化ログ（1リクエスト1行のJSON）を出力するか（tool/aggregate_server_timing.py で集計する）
+const LOG_ENABLED = Deno.env.get('SERVER_TIMING_LOG') === 'true'
+
+type Phase = { ms: number; count: number }
+
+/**
+ * 1リクエスト分の計測結果
+ * 同じ名前のフェーズは合計時間と回数にまとめる
+ */
+export class ServerTiming {
+  private readonly startedAt = performance.now()
+  private readonly phases = new Map<string, Phase>()
+
+  /**
+   * 処理の時間を計測する（PostgRESTのクエリビルダーのような thenable もそのまま await できる）
+   * @param name - フェーズ名（例: db.todos, maintenance, json）
+   * @param run - 計測する処理
+   */
+  async measure<T>(name: string, run: () => PromiseLike<T> | T): Promise<T> {
+    const start = performance.now()
+    try {
+      return await run()
+    } finally {
+      this.add(name, performance.now() - start)
+    }
+  }
+
+  add(name: string, ms: number) {
+    const phase = this.phases.get(name)
+    if (phase) {
+      phase.ms += ms
+      phase.count += 1
+    } else {
+      this.phases.set(name, { ms, count: 1 })
+    }
+  }
+
+  elapsed(): number {
+    return performance.now() - this.startedAt
+  }
+
+  /**
+   * Server-Timing ヘッダーの値（例: maintenance;dur=0.4, db.todos;dur=12.1;desc="x2", total;dur=15.3）
+   */
+  header(total: number): string {
+    const metrics = [...this.phases].map(([name, phase]) =>
+      `${name};dur=${phase.ms.toFixed(1)}` + (phase.count > 1 ? `;desc="x${phase.count}"` : '')
+    )
+    metrics.push(`total;dur=${total.toFixed(1)}`)
+    return metrics.join(', ')
+  }
+
+  toJSON(functionName: string, method: string, status: number, total: number) {
+    const phases: Record<string, Phase> = {}
+    for (const [name, phase] of this.phases) {
+      phases[name] = { ms: Math.round(phase.ms * 100) / 100, count: phase.count }
+    }
+    return {
+      type: 'server_timing',
+      function: functionName,
+      method,
+      status,
+      total_ms: Math.round(total * 100) / 100,
+      phases,
+    }
+  }
+}
+
+/**
+ * リクエストURLからFunction名を取得（/functions/v1/<name> でも /<name> でも最後の要素）
+ */
+function functionNameOf(req: Request): string {
+  const segments = new URL(req.url).pathname.split('/').filter(Boolean)
+  return segments[segments.length - 1] ?? 'unknown'
+}
+
+/**
+ * ハンドラーを包み、応答に Server-Timing ヘッダーを付ける
+ * 環境変数 SERVER_TIMING_LOG=true なら計測結果を1行のJSONでログに出力する
+ * @param handler - serverTiming を受け取るハンドラー
+ */
+export function withServerTiming(
+  handler: (req: Request, serverTiming: ServerTiming) => Promise<Response>
+): (req: Request) => Promise<Response> {
+  return async (req: Request): Promise<Response> => {
+    const serverTiming = new ServerTiming()
+    let status = 500
+    try {
+      let response = await handler(req, serverTiming)
+      status = response.status
+      const total = serverTiming.elapsed()
+      try {
+        response.headers.set('Server-Timing', serverTiming.header(total))
+      } catch (_) {
+        // fetch の応答などヘッダーが変更できない場合は作り直す
+        response = new Response(response.body, response)
+        response.headers.set('Server-Timing', serverTiming.header(total))
+      }
+      return response
+    } finally {
+      if (LOG_ENABLED) {
+        console.log(JSON.stringify(serverTiming.toJSON(functionNameOf(req), req.method, status, serverTiming.elapsed())))
+      }
+    }
+  }
+}
@@ -0,0 +1,57 @@
+// Storage共通処理
+
+import { SupabaseClient } from 'https://esm.sh/@supabase/supabase-js@2'
+
+type SignedUrlResult = {
+  data: { signedUrl: string } | null
+  error: Error | null
+}
+
+/**
+ * 署名付きURLの一括生成
+ * createSignedUrls で全パスの署名付きURLを1回のリクエストで生成し、
+ * パスから createSignedUrl と同じ形の結果（{ data: { signedUrl }, error }）を引く関数を返す
+ * （ループ内で1件ずつ createSignedUrl を呼ぶ代わりに、ループの前で呼ぶ）
+ *
+ * @param supabaseClient - Supabaseクライアント
+ * @param bucket - バケット名
+ * @param paths - オブジェクトのパス（null・空文字・重複は除く）
+ * @param expiresIn - 有効期限（秒）
+ * @returns パスを受け取り、署名付きURLの生成結果を返す関数
+ */
+export async function batchSignedUrls(
+  supabaseClient: SupabaseClient,
+  bucket: string,
+  paths: (string | null | undefined)[],
+  expiresIn: number
+): Promise<(path: string) => SignedUrlResult> {
+  const uniquePaths = [...new Set(paths.filter((path): path is string => !!path))]
+  const results = new Map<string, SignedUrlResult>()
+
+  if (uniquePaths.length > 0) {
+    const { data, error } = await supabaseClient
+      .storage
+      .from(bucket)
+      .createSignedUrls(uniquePaths, expiresIn)
+
+    if (error) {
+      // リクエスト自体の失敗は全パスの失敗として扱う
+      for (const path of uniquePaths) {
+        results.set(path, { data: null, error })
+      }
+    }
+
+    for (const item of data || []) {
+      if (!item.path) continue
+      results.set(
+        item.path,
+        item.error || !item.signedUrl
+          ? { data: null, error: new Error(item.error || 'Signed URL was not created') }
+          : { data: { signedUrl: item.signedUrl }, error: null }
+      )
+    }
+  }
+
+  return (path: string) =>
+    results.get(path) ?? { data: null, error: new Error(`Signed URL was not created: ${path}`) }
+}
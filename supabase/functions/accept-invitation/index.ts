@@ -4,7 +4,7 @@
 import { serve } from "https://deno.land/std@0.192.0/http/server.ts"
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
 import { corsHeaders } from '../_shared/cors.ts'
-import { checkMaintenanceMode } from '../_shared/maintenance.ts'
+import { getMaintenanceStatus } from '../_shared/maintenance.ts'
 
 declare var Deno: any;
 
@@ -48,7 +48,7 @@ serve(async (req) => {
     )
 
     // メンテナンスモードチェック
-    const checkResult = await checkMaintenanceMode(req)
+    const checkResult = await getMaintenanceStatus(req)
     if (checkResult.status === 'error' || checkResult.status === 'maintenance') {
       return new Response(
         JSON.stringify(checkResult),
@@ -1,7 +1,7 @@
 // グループメンバーロール変更 Edge Function
 import { serve } from "https://deno.land/std@0.192.0/http/server.ts"
 import { corsHeaders } from '../_shared/cors.ts'
-import { checkMaintenanceMode } from '../_shared/maintenance.ts'
+import { getMaintenanceStatus } from '../_shared/maintenance.ts'
 import { checkGroupMembership } from '../_shared/permission.ts'
 
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
@@ -42,7 +42,7 @@ serve(async (req) => {
     )
 
     // メンテナンスモードチェック
-    const checkResult = await checkMaintenanceMode(req)
+    const checkResult = await getMaintenanceStatus(req)
     if (checkResult.status === 'error' || checkResult.status === 'maintenance') {
       return new Response(
         JSON.stringify(checkResult),
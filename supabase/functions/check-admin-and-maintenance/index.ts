@@ -3,6 +3,7 @@
 import { serve } from "https://deno.land/std@0.192.0/http/server.ts"
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
 import { corsHeaders } from '../_shared/cors.ts'
+import { getMaintenanceState } from '../_shared/maintenance.ts'
 
 declare var Deno: any;
 
@@ -52,10 +53,7 @@ serve(async (req) => {
     const isAdmin = userData?.is_admin ?? false
 
     // メンテナンスモード取得
-    const { data: maintenanceData, error: maintenanceError } = await supabaseClient
-      .from('maintenance_mode')
-      .select('is_maintenance, end_time')
-      .single()
+    const { data: maintenanceData, error: maintenanceError } = await getMaintenanceState()
 
     if (maintenanceError) {
       console.error('[CheckAdminAndMaintenance] ❌ メンテナンスモード取得エラー:', maintenanceError)
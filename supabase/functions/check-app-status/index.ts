@@ -1,6 +1,7 @@
 import { serve } from 'https://deno.land/std@0.168.0/http/server.ts'
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
 import { corsHeaders } from '../_shared/cors.ts'
+import { getMaintenanceState } from '../_shared/maintenance.ts'
 
 interface CheckAppStatusRequest {
   current_version: string
@@ -51,10 +52,7 @@ serve(async (req) => {
     const { current_version, platform } = (await req.json()) as CheckAppStatusRequest
 
     // 1. メンテナンスモードチェック
-    const { data: maintenanceData, error: maintenanceError } = await supabaseClient
-      .from('maintenance_mode')
-      .select('is_maintenance, end_time')
-      .single()
+    const { data: maintenanceData, error: maintenanceError } = await getMaintenanceState()
 
     if (maintenanceError) {
       throw new Error(`メンテナンスモード取得エラー: ${maintenanceError.message}`)
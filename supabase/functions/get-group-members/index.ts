@@ -1,8 +1,9 @@
 // グループメンバー一覧取得 Edge Function
 import { serve } from "https://deno.land/std@0.192.0/http/server.ts"
 import { corsHeaders } from '../_shared/cors.ts'
-import { checkMaintenanceMode } from '../_shared/maintenance.ts'
+import { getMaintenanceStatus } from '../_shared/maintenance.ts'
 import { checkGroupMembership } from '../_shared/permission.ts'
+import { batchSignedUrls } from '../_shared/storage.ts'
 
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
 
@@ -43,7 +44,7 @@ serve(async (req) => {
     )
 
     // メンテナンスモードチェック
-    const checkResult = await checkMaintenanceMode(req)
+    const checkResult = await getMaintenanceStatus(req)
     if (checkResult.status === 'error' || checkResult.status === 'maintenance') {
       return new Response(
         JSON.stringify(checkResult),
@@ -156,15 +157,20 @@ serve(async (req) => {
       )
     }
 
+    // 署名付きURLを一括生成（'user-avatars'）
+    const signUserAvatars = await batchSignedUrls(
+      supabaseClient,
+      'user-avatars',
+      (members || []).map((member: any) => member.users?.avatar_url),
+      3600 // 有効期限1時間
+    )
+
     // レスポンス構築（各メンバーのSigned URL生成）
-    const membersList = await Promise.all((members || []).map(async (member: any) => {
+    const membersList = (members || []).map((member: any) => {
       // 署名付きURL生成（avatar_urlが存在する場合）
       let signedAvatarUrl: string | null = null
       if (member.users.avatar_url) {
-        const { data: signedUrlData, error: signedUrlError } = await supabaseClient
-          .storage
-          .from('user-avatars')
-          .createSignedUrl(member.users.avatar_url, 3600) // 有効期限1時間
+        const { data: signedUrlData, error: signedUrlError } = signUserAvatars(member.users.avatar_url)
 
         if (signedUrlError) {
           throw new Error(`Failed to create signed URL for user ${member.users.id}: ${signedUrlError.message}`)
@@ -189,17 +195,22 @@ serve(async (req) => {
         created_at: member.users.created_at,
         updated_at: member.users.updated_at
       }
-    }))
+    })
+
+    // 署名付きURLを一括生成（'user-avatars'）
+    const signInvitationUserAvatars = await batchSignedUrls(
+      supabaseClient,
+      'user-avatars',
+      (pendingInvitations || []).map((invitation: any) => invitation.users?.avatar_url),
+      3600 // 有効期限1時間
+    )
 
     // 承諾待ちユーザーのリスト構築
-    const pendingList = await Promise.all((pendingInvitations || []).map(async (invitation: any) => {
+    const pendingList = (pendingInvitations || []).map((invitation: any) => {
       // 署名付きURL生成（avatar_urlが存在する場合）
       let signedAvatarUrl: string | null = null
       if (invitation.users.avatar_url) {
-        const { data: signedUrlData, error: signedUrlError } = await supabaseClient
-          .storage
-          .from('user-avatars')
-          .createSignedUrl(invitation.users.avatar_url, 3600) // 有効期限1時間
+        const { data: signedUrlData, error: signedUrlError } = signInvitationUserAvatars(invitation.users.avatar_url)
 
         if (signedUrlError) {
           throw new Error(`Failed to create signed URL for user ${invitation.users.id}: ${signedUrlError.message}`)
@@ -224,7 +235,7 @@ serve(async (req) => {
         created_at: invitation.users.created_at,
         updated_at: invitation.users.updated_at
       }
-    }))
+    })
 
     // メンバーと承諾待ちユーザーを結合してソート
     // 順序: owner → member → pending
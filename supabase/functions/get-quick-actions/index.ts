@@ -1,7 +1,7 @@
 // クイックアクション一覧取得 Edge Function
 import { serve } from "https://deno.land/std@0.192.0/http/server.ts"
 import { corsHeaders } from '../_shared/cors.ts'
-import { checkMaintenanceMode } from '../_shared/maintenance.ts'
+import { getMaintenanceStatus } from '../_shared/maintenance.ts'
 import { checkGroupMembership } from '../_shared/permission.ts'
 
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
@@ -31,7 +31,7 @@ serve(async (req) => {
     )
 
     // メンテナンスモードチェック
-    const checkResult = await checkMaintenanceMode(req)
+    const checkResult = await getMaintenanceStatus(req)
     if (checkResult.status === 'error' || checkResult.status === 'maintenance') {
       return new Response(
         JSON.stringify(checkResult),
@@ -83,12 +83,15 @@ serve(async (req) => {
     // 各クイックアクションのテンプレート取得
     const actionsWithTemplates = []
 
+    // 'quick_action_templates' を一括取得（quick_action_id ごとにループ内で絞り込む）
+    const { data: allTemplates } = await supabaseClient
+      .from('quick_action_templates')
+      .select('*')
+      .in('quick_action_id', (quickActions || []).map((action: any) => action.id).filter((key) => key != null))
+      .order('display_order', { ascending: true })
+
     for (const action of quickActions || []) {
-      const { data: templates } = await supabaseClient
-        .from('quick_action_templates')
-        .select('*')
-        .eq('quick_action_id', action.id)
-        .order('display_order', { ascending: true })
+      const templates = (allTemplates || []).filter((row: any) => row.quick_action_id === action.id)
 
       actionsWithTemplates.push({
         ...action,
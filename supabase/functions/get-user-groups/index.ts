@@ -1,7 +1,8 @@
 // ユーザーの所属グループ一覧取得 Edge Function
 import { serve } from "https://deno.land/std@0.192.0/http/server.ts"
 import { corsHeaders } from '../_shared/cors.ts'
-import { checkMaintenanceMode } from '../_shared/maintenance.ts'
+import { getMaintenanceStatus } from '../_shared/maintenance.ts'
+import { batchSignedUrls } from '../_shared/storage.ts'
 
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
 
@@ -46,7 +47,7 @@ serve(async (req) => {
     )
 
     // メンテナンスモードチェック
-    const checkResult = await checkMaintenanceMode(req)
+    const checkResult = await getMaintenanceStatus(req)
     if (checkResult.status === 'error' || checkResult.status === 'maintenance') {
       return new Response(
         JSON.stringify(checkResult),
@@ -130,6 +131,14 @@ serve(async (req) => {
     // 各グループの情報を組み立て
     const groupsWithStats: GroupWithStats[] = []
 
+    // 署名付きURLを一括生成（'group-icons'）
+    const signGroupIcons = await batchSignedUrls(
+      supabaseClient,
+      'group-icons',
+      (groupMembers || []).map((member: any) => member.groups?.icon_url),
+      3600 // 有効期限1時間
+    )
+
     for (const member of groupMembers || []) {
       const group = member.groups as any
 
@@ -142,10 +151,7 @@ serve(async (req) => {
       // 署名付きURL生成（icon_urlが存在する場合）
       let signedIconUrl: string | null = null
       if (group.icon_url) {
-        const { data: signedUrlData, error: signedUrlError } = await supabaseClient
-          .storage
-          .from('group-icons')
-          .createSignedUrl(group.icon_url, 3600) // 有効期限1時間
+        const { data: signedUrlData, error: signedUrlError } = signGroupIcons(group.icon_url)
 
         if (signedUrlError) {
           throw new Error(`Failed to create signed URL: ${signedUrlError.message}`)
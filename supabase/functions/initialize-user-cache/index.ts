@@ -4,7 +4,8 @@
 import { serve } from "https://deno.land/std@0.192.0/http/server.ts"
 import { createClient } from 'https://esm.sh/@supabase/supabase-js@2'
 import { corsHeaders } from '../_shared/cors.ts'
-import { checkMaintenanceMode } from '../_shared/maintenance.ts'
+import { getMaintenanceStatus } from '../_shared/maintenance.ts'
+import { batchSignedUrls } from '../_shared/storage.ts'
 
 declare var Deno: any;
 
@@ -126,7 +127,7 @@ serve(async (req) => {
     )
 
     // メンテナンスモードチェック
-    const checkResult = await checkMaintenanceMode(req)
+    const checkResult = await getMaintenanceStatus(req)
     if (checkResult.status === 'error' || checkResult.status === 'maintenance') {
       return new Response(
         JSON.stringify(checkResult),
@@ -180,6 +181,14 @@ serve(async (req) => {
     const groupsWithStats: GroupWithStats[] = []
     const groupIds: string[] = []
 
+    // 署名付きURLを一括生成（'group-icons'）
+    const signGroupIcons = await batchSignedUrls(
+      supabaseClient,
+      'group-icons',
+      (groupMembers || []).map((member: any) => member.groups?.icon_url),
+      3600
+    )
+
     // グループ情報を整形
     for (const member of groupMembers || []) {
       const group = member.groups as any
@@ -205,10 +214,7 @@ serve(async (req) => {
       let signedIconUrl: string | null = null
       if (group.icon_url) {
         try {
-          const { data: signedUrlData, error: signedUrlError } = await supabaseClient
-            .storage
-            .from('group-icons')
-            .createSignedUrl(group.icon_url, 3600)
+          const { data: signedUrlData, error: signedUrlError } = signGroupIcons(group.icon_url)
 
           if (!signedUrlError && signedUrlData?.signedUrl) {
             signedIconUrl = signedUrlData.signedUrl
@@ -409,6 +415,22 @@ serve(async (req) => {
       invitationsMap.set(invitation.group_id, existing)
     }
 
+    // 全グループのメンバー・承諾待ちユーザーの署名付きURLを一括生成（'user-avatars'）
+    const [signUserAvatars, signInvitationUserAvatars] = await Promise.all([
+      batchSignedUrls(
+        supabaseClient,
+        'user-avatars',
+        (allMembers || []).map((member: any) => member.users?.avatar_url),
+        3600
+      ),
+      batchSignedUrls(
+        supabaseClient,
+        'user-avatars',
+        (allInvitations || []).map((invitation: any) => invitation.users?.avatar_url),
+        3600
+      ),
+    ])
+
     // 各グループのメンバー情報を組み立て
     const groupMembersData: { [groupId: string]: GroupMembersData } = {}
 
@@ -421,15 +443,12 @@ serve(async (req) => {
       const groupInfo = groupsWithStats.find(g => g.id === groupId)
       const ownerId = groupInfo?.owner_id || ''
 
-      // 各メンバーの署名付きURL生成
-      const membersList = await Promise.all(members.map(async (member: any) => {
+      // 各メンバーの署名付きURLを引く
+      const membersList = members.map((member: any) => {
         let signedAvatarUrl: string | null = null
         if (member.users.avatar_url) {
           try {
-            const { data: signedUrlData, error: signedUrlError } = await supabaseClient
-              .storage
-              .from('user-avatars')
-              .createSignedUrl(member.users.avatar_url, 3600)
+            const { data: signedUrlData, error: signedUrlError } = signUserAvatars(member.users.avatar_url)
 
             if (!signedUrlError && signedUrlData?.signedUrl) {
               signedAvatarUrl = signedUrlData.signedUrl
@@ -455,17 +474,14 @@ serve(async (req) => {
           created_at: member.users.created_at,
           updated_at: member.users.updated_at
         }
-      }))
+      })
 
       // 承諾待ちユーザーのリスト構築
-      const pendingList = await Promise.all(pendingInvitations.map(async (invitation: any) => {
+      const pendingList = pendingInvitations.map((invitation: any) => {
         let signedAvatarUrl: string | null = null
         if (invitation.users.avatar_url) {
           try {
-            const { data: signedUrlData, error: signedUrlError } = await supabaseClient
-              .storage
-              .from('user-avatars')
-              .createSignedUrl(invitation.users.avatar_url, 3600)
+            const { data: signedUrlData, error: signedUrlError } = signInvitationUserAvatars(invitation.users.avatar_url)
 
             if (!signedUrlError && signedUrlData?.signedUrl) {
               signedAvatarUrl = signedUrlData.signedUrl
@@ -491,7 +507,7 @@ serve(async (req) => {
           created_at: invitation.users.created_at,
           updated_at: invitation.users.updated_at
         }
-      }))
+      })
 
       // メンバーと承諾待ちユーザーを結合してソート
       // 順序: owner → member → pending
@@ -0,0 +1,762 @@
+#!/usr/bin/env python3
+"""
+インデックスアドバイザー
+database/ddl と database/migrations のSQLからスキーマ（テーブル・カラム・制約・インデックス）を組み立て、
+Edge Functions の supabase-js のクエリ（.from(...) から続く .eq / .in / .order などの連鎖）と突き合わせる
+
+- インデックスのない絞り込み・並び替えの組み合わせ（使えるインデックスがない / 一部の条件しか使えない）
+- 冗長なインデックス（同じ列の並び・他のインデックスの先頭部分）と、どのクエリからも使われないインデックス
+- 追加を提案する複合インデックス・部分インデックスを、そのまま適用できるマイグレーションSQLとして書き出す
+
+SQLは DDL → マイグレーション（ファイル名順）の順に適用した結果をスキーマとする
+Postgres の B-tree の使われ方（等価条件の列が先頭から連続し、その次の列で範囲条件・並び替え）を前提にした静的な推定で、
+実際の実行計画（テーブルの行数・統計情報）は見ない
+
+使い方:
+    python tool/advise_indexes.py
+    python tool/advise_indexes.py --table todos --table group_invitations -v    # 全てのクエリの形と使うインデックス
+    python tool/advise_indexes.py --sql database/migrations/20251220_add_suggested_indexes.sql
+    python tool/advise_indexes.py --json indexes.json
+"""
+import argparse
+import json
+import re
+import sys
+from datetime import date
+from pathlib import Path
+
+from codemod import FUNCTIONS_DIR, list_functions
+from sql_schema import (MAX_IDENTIFIER_LENGTH, Schema, normalize_predicate, predicate_terms, relative, schema_files,
+                        sql_literal)
+from ts_source import Source, is_identifier
+
+# 1行だけの設定テーブル（インデックスの有無が性能に影響しないため検査しない）
+SMALL_TABLES = {'maintenance_mode', 'app_versions'}
+
+# supabase-js のフィルター（メソッド → SQLの演算子）
+FILTER_OPERATORS = {
+    'eq': '=', 'neq': '<>', 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=', 'like': 'LIKE', 'ilike': 'ILIKE',
+    'is': 'IS', 'in': 'IN', 'contains': '@>', 'containedBy': '<@', 'overlaps': '&&', 'textSearch': '@@',
+}
+# B-tree の先頭から連続して使える条件
+EQUALITY_OPERATORS = {'eq', 'is', 'in'}
+# 等価条件の列の次の列で使える条件
+RANGE_OPERATORS = {'gt', 'gte', 'lt', 'lte'}
+OPERATIONS = {'select', 'insert', 'update', 'upsert', 'delete'}
+QUERY_METHODS = set(FILTER_OPERATORS) | OPERATIONS | {
+    'order', 'limit', 'range', 'single', 'maybeSingle', 'match', 'not', 'or', 'filter', 'returns', 'csv',
+    'abortSignal', 'throwOnError',
+}
+# select の埋め込み（alias:table!hint(...)）
+EMBED = re.compile(r"(?:(\w+)\s*:\s*)?(\w+)(?:\s*!\s*(\w+))?\s*\(")
+
+# リテラルでない値
+DYNAMIC = object()
+
+
+# ===================================
+# クエリ
+# ===================================
+
+class Filter:
+    def __init__(self, column, operator, value=DYNAMIC, conditional=False):
+        self.column = column
+        self.operator = operator
+        self.value = value
+        # if の中などで条件付きで加わるフィルター
+        self.conditional = conditional
+
+    @property
+    def is_constant(self):
+        return self.value is not DYNAMIC
+
+    def label(self):
+        if self.value is DYNAMIC:
+            value = ''
+        elif isinstance(self.value, str):
+            value = f", '{self.value}'"
+        else:
+            value = f", {json.dumps(self.value)}"
+        return f".{self.operator}('{self.column}'{value})" + ('?' if self.conditional else '')
+
+
+class Query:
+    """supabase-js の1つのクエリの形（テーブル・操作・フィルター・並び替え）"""
+
+    def __init__(self, function_name, path, line, table):
+        self.function_name = function_name
+        self.path = path
+        self.line = line
+        self.table = table
+        self.operation = None
+        self.filters = []
+        # [(列, 降順か, 条件付きか), ...]
+        self.orders = []
+        self.limited = False
+        self.has_or = False
+        self.head = False
+        # select の埋め込み [(テーブルまたは列, ヒント), ...]
+        self.embeds = []
+        # 埋め込みから導いたクエリなら、元のクエリのテーブル
+        self.embedded_from = None
+
+    def location(self):
+        return f"{self.path}:{self.line}"
+
+    def equality_columns(self, include_conditional=True):
+        return [f.column for f in self.filters
+                if f.operator in EQUALITY_OPERATORS and (include_conditional or not f.conditional)]
+
+    def range_columns(self):
+        return [f.column for f in self.filters if f.operator in RANGE_OPERATORS]
+
+    def multi_value_columns(self):
+        return {f.column for f in self.filters if f.operator == 'in'}
+
+    def conditional_columns(self):
+        return {f.column for f in self.filters if f.conditional}
+
+    def constants(self):
+        """リテラルとの等価条件 {列: 値}（条件付きのものは除く）"""
+        return {f.column: f.value for f in self.filters
+                if f.operator in ('eq', 'is') and f.is_constant and not f.conditional}
+
+    def not_null_columns(self):
+        """NULL でないことが条件から分かる列"""
+        columns = {f.column for f in self.filters if f.operator == 'notnull'}
+        columns |= {f.column for f in self.filters
+                    if f.operator in RANGE_OPERATORS | {'eq', 'in', 'like', 'ilike'} and f.value is not None}
+        return columns
+
+    @property
+    def indexable(self):
+        """インデックスで絞り込み・並び替えできる条件があるか"""
+        return bool(self.equality_columns() or self.range_columns() or self.orders)
+
+    @property
+    def is_full_scan(self):
+        """全件を読むクエリ（フィルター・件数制限のない select）"""
+        return (self.operation == 'select' and not self.filters and not self.has_or and not self.limited
+                and not self.embedded_from)
+
+    def shape(self):
+        parts = [f.label() for f in self.filters]
+        if self.has_or:
+            parts.append('.or(...)')
+        for column, descending, conditional in self.orders:
+            option = ', { ascending: false }' if descending else ''
+            parts.append(f".order('{column}'{option})" + ('?' if conditional else ''))
+        if self.limited:
+            parts.append('.limit()')
+        operation = '' if self.operation == 'select' else f".{self.operation}()"
+        via = f"（{self.embedded_from} の select に埋め込み）" if self.embedded_from else ''
+        return f"{self.table}{operation}: " + (' + '.join(parts) or '条件なし') + via
+
+    def key(self):
+        """同じ形のクエリをまとめるキー"""
+        return (self.table, self.operation, tuple(sorted((f.column, f.operator, repr(f.value) if f.is_constant
+                                                          else '?', f.conditional) for f in self.filters)),
+                tuple(self.orders), self.limited, self.embedded_from)
+
+    def to_dict(self):
+        return {
+            'function': self.function_name, 'path': self.path, 'line': self.line, 'table': self.table,
+            'operation': self.operation, 'shape': self.shape(),
+            'filters': [{'column': f.column, 'operator': f.operator, 'conditional': f.conditional,
+                         **({'value': f.value} if f.is_constant else {})} for f in self.filters],
+            'orders': [{'column': c, 'descending': d, 'conditional': o} for c, d, o in self.orders],
+            'limited': self.limited, 'embedded_from': self.embedded_from,
+        }
+
+
+def _literal(source, start, end):
+    """引数がリテラルならその値（文字列・数値・true/false/null）、そうでなければ DYNAMIC"""
+    if start != end:
+        return DYNAMIC
+    token = source.texts[start]
+    if token[:1] in ('"', "'") or (token.startswith('`') and '${' not in token):
+        return token[1:-1]
+    if token in ('true', 'false', 'null'):
+        return {'true': True, 'false': False, 'null': None}[token]
+    if re.fullmatch(r"\d+(\.\d+)?", token):
+        return float(token) if '.' in token else int(token)
+    return DYNAMIC
+
+
+def _string(source, start, end):
+    value = _literal(source, start, end)
+    return value if isinstance(value, str) else None
+
+
+class QueryExtractor:
+    """1ファイルから .from('table') で始まるクエリの連鎖を取り出す"""
+
+    def __init__(self, function_name, path, text):
+        self.function_name = function_name
+        self.path = path
+        self.source = Source(text)
+
+    def extract(self):
+        source = self.source
+        queries = []
+        for i, token in enumerate(source.texts):
+            if (token != 'from' or i < 2 or source.texts[i - 1] not in ('.', '?.') or i + 1 >= len(source)
+                    or source.texts[i + 1] != '(' or i + 1 not in source.match or source.texts[i - 2] == 'storage'):
+                continue
+            arguments = source.call_arguments(i + 1)
+            table = _string(source, *arguments[0]) if len(arguments) == 1 else None
+            if not table:
+                continue
+            query = Query(self.function_name, self.path, source.line(i), table)
+            end = self._walk(query, source.match[i + 1] + 1, False)
+            self._follow_variable(query, i, end)
+            queries.append(query)
+        return queries
+
+    def _walk(self, query, j, conditional):
+        """j から続く .method(...) の連鎖をクエリに加え、連鎖の次のトークンの位置を返す"""
+        source = self.source
+        while (j + 2 < len(source) and source.texts[j] in ('.', '?.') and source.texts[j + 1] in QUERY_METHODS
+               and source.texts[j + 2] == '(' and j + 2 in source.match):
+            self._apply(query, source.texts[j + 1], source.call_arguments(j + 2), conditional)
+            j = source.match[j + 2] + 1
+        return j
+
+    def _follow_variable(self, query, i, end):
+        """let query = client.from(...) の後に query = query.eq(...) のように続けて組み立てる形を辿る"""
+        source = self.source
+        k = i - 2
+        if k > 0 and source.texts[k - 1] == 'await':
+            k -= 1
+        if k < 2 or source.texts[k - 1] != '=' or not is_identifier(source.texts[k - 2]):
+            return
+        name = source.texts[k - 2]
+        body = source.function_at(i)
+        limit = body[1] if body else len(source)
+        m = end
+        while m < limit - 2:
+            if source.texts[m] == name and (m == 0 or source.texts[m - 1] not in ('.', '?.')):
+                if source.texts[m + 1] == '=' and source.texts[m + 2] != name:
+                    break
+                if source.texts[m + 1] in ('.', '?.') and source.texts[m + 2] in QUERY_METHODS:
+                    m = self._walk(query, m + 1, source.parent[m] != source.parent[k - 2])
+                    continue
+            m += 1
+
+    def _apply(self, query, method, arguments, conditional):
+        source = self.source
+        first = _string(source, *arguments[0]) if arguments else None
+        if method in OPERATIONS:
+            if method != 'select' or query.operation is None:
+                query.operation = method
+            if method == 'select':
+                if first:
+                    query.embeds = [(m.group(2).lower(), (m.group(3) or '').lower()) for m in EMBED.finditer(first)]
+                options = source.source(*arguments[1]) if len(arguments) > 1 else ''
+                query.head = bool(re.search(r"\bhead\s*:\s*true", options))
+        elif method in FILTER_OPERATORS and first:
+            value = _literal(source, *arguments[1]) if len(arguments) > 1 else DYNAMIC
+            query.filters.append(Filter(first.split('->')[0], method, value, conditional))
+        elif method == 'not' and first and len(arguments) == 3:
+            operator = _string(source, *arguments[1])
+            value = _literal(source, *arguments[2])
+            query.filters.append(Filter(first, 'notnull' if operator == 'is' and value is None else 'not',
+                                        value, conditional))
+        elif method == 'filter' and first and len(arguments) == 3:
+            operator = _string(source, *arguments[1])
+            if operator in FILTER_OPERATORS:
+                query.filters.append(Filter(first, operator, _literal(source, *arguments[2]), conditional))
+        elif method == 'match' and arguments and source.texts[arguments[0][0]] == '{':
+            opener = arguments[0][0]
+            for start, end in source.call_arguments(opener):
+                key = source.texts[start]
+                if start + 1 <= end and source.texts[start + 1] == ':':
+                    query.filters.append(Filter(key.strip('\'"'), 'eq', _literal(source, start + 2, end),
+                                                conditional))
+                elif start == end and is_identifier(key):
+                    query.filters.append(Filter(key, 'eq', DYNAMIC, conditional))
+        elif method == 'or':
+            query.has_or = True
+        elif method == 'order' and first:
+            options = source.source(*arguments[1]) if len(arguments) > 1 else ''
+            if not re.search(r"\b(foreignTable|referencedTable)\s*:", options):
+                descending = bool(re.search(r"\bascending\s*:\s*false\b", options))
+                query.orders.append((first, descending, conditional))
+        elif method in ('limit', 'range', 'single', 'maybeSingle'):
+            query.limited = True
+
+
+def embedded_queries(query, schema):
+    """select の埋め込みのうち子テーブル（外部キーで元のテーブルを参照する側）の読み取りをクエリにする"""
+    queries = []
+    for name, hint in query.embeds:
+        child = schema.tables.get(name)
+        if child is None:
+            continue
+        for column in child.columns.values():
+            if column.references and column.references[0] == query.table and hint in ('', column.name):
+                embedded = Query(query.function_name, query.path, query.line, name)
+                embedded.operation = 'select'
+                embedded.filters.append(Filter(column.name, 'in'))
+                embedded.embedded_from = query.table
+                queries.append(embedded)
+                break
+    return queries
+
+
+def scan_queries(functions_dir=FUNCTIONS_DIR, functions=None):
+    """各Functionの index.ts のクエリ"""
+    queries = []
+    for function_name in functions or list_functions(functions_dir):
+        path = Path(functions_dir) / function_name / 'index.ts'
+        if function_name.startswith('_') or not path.is_file():
+            continue
+        queries += QueryExtractor(function_name, relative(path), path.read_text(encoding='utf-8')).extract()
+    return queries
+
+
+# ===================================
+# 突き合わせ
+# ===================================
+
+class Coverage:
+    """1つのインデックスでクエリの条件をどこまで使えるか"""
+
+    def __init__(self, index, equality, range_used, order_used, missing, order_missing):
+        self.index = index
+        # 先頭から連続して使える等価条件の列
+        self.equality = equality
+        self.range_used = range_used
+        self.order_used = order_used
+        # インデックスで絞り込めずに残る等価・範囲条件の列
+        self.missing = missing
+        self.order_missing = order_missing
+
+    @property
+    def usable(self):
+        return bool(self.equality or self.range_used or self.order_used)
+
+    @property
+    def complete(self):
+        return not self.missing and not self.order_missing
+
+    @property
+    def score(self):
+        return (self.complete, len(self.equality), self.range_used or self.order_used, -len(self.index.columns))
+
+
+def predicate_implied(index, query):
+    """部分インデックスの条件がクエリの条件から必ず成り立つか"""
+    constants = query.constants()
+    not_null = query.not_null_columns()
+    for term in predicate_terms(index.where):
+        if term is None:
+            return False
+        column, operator, value = term
+        if operator == 'IS NOT' and value is None:
+            if column not in not_null:
+                return False
+        elif operator == 'IS NOT':
+            if column not in constants or constants[column] == value or constants[column] is None:
+                return False
+        elif column not in constants or constants[column] != value:
+            return False
+    return True
+
+
+def evaluate(index, query):
+    """インデックスがクエリに使えるなら Coverage、使えないなら None"""
+    if index.method != 'btree' or (index.where and not predicate_implied(index, query)):
+        return None
+    equality_columns = set(query.equality_columns())
+    fixed = {term[0] for term in predicate_terms(index.where) if term and term[1] != 'IS NOT'}
+    equality = []
+    for column, _ in index.columns:
+        if column not in equality_columns:
+            break
+        equality.append(column)
+    rest = index.columns[len(equality):]
+    range_columns = query.range_columns()
+    range_used = bool(rest) and rest[0][0] in range_columns
+    order_used = False
+    orders = [(column, descending) for column, descending, _ in query.orders if column not in equality_columns]
+    if orders and len(rest) >= len(orders) and not (query.multi_value_columns() & set(equality)):
+        directions = {rest[n][1] == descending for n, (column, descending) in enumerate(orders)}
+        order_used = [column for column, _ in rest[:len(orders)]] == [c for c, _ in orders] and len(directions) == 1
+    if index.unique and len(equality) == len(index.columns):
+        # 一意なキーを全て指定していれば1キーあたり1行に絞れるため、残りの条件・並び替えは問題にしない
+        return Coverage(index, equality, False, False, [], [])
+    # 条件付きのフィルターは、付かない場合に備えてインデックスに含めないこともあるため残っても問題にしない
+    optional = query.conditional_columns()
+    missing = sorted((equality_columns - set(equality) - fixed - optional)
+                     | {c for c in range_columns if not (range_used and rest[0][0] == c)} - optional)
+    order_missing = [c for c, _ in orders] if orders and not order_used and query.limited else []
+    if orders and not order_used and not query.limited:
+        # 件数制限がなければ並び替えは絞り込んだ後のソートで済むため、並び替えだけが残る場合は不足としない
+        order_missing = [c for c, _ in orders] if missing else []
+    return Coverage(index, equality, range_used, order_used, missing, order_missing)
+
+
+class Suggestion:
+    """追加を提案するインデックス（同じインデックスで済むクエリをまとめる）"""
+
+    def __init__(self, table, columns, where, queries):
+        self.table = table
+        self.columns = columns
+        self.where = where
+        self.queries = list(queries)
+        # このインデックスがあれば不要になる既存のインデックス
+        self.replaces = []
+        self.reason = ''
+
+    def name(self, taken=()):
+        parts = [self.table] + [re.sub(r'\W+', '_', column) for column, _ in self.columns]
+        for term in predicate_terms(self.where):
+            if term is None:
+                continue
+            column, operator, value = term
+            if value is None:
+                parts.append(f"{column}_{'not_null' if operator == 'IS NOT' else 'null'}")
+            elif value is True:
+                parts.append(column)
+            elif value is False:
+                parts.append(f"not_{column}")
+            else:
+                parts.append(column + '_' + re.sub(r'\W+', '_', str(value)))
+        base = ('idx_' + '_'.join(parts))[:MAX_IDENTIFIER_LENGTH]
+        name = base
+        n = 2
+        while name in taken:
+            name = f"{base[:MAX_IDENTIFIER_LENGTH - len(str(n)) - 1]}_{n}"
+            n += 1
+        return name
+
+    def statement(self, name, concurrently=False):
+        columns = ', '.join(f"{column} DESC" if descending else column for column, descending in self.columns)
+        where = f" WHERE {self.where}" if self.where else ''
+        option = 'CONCURRENTLY ' if concurrently else ''
+        return f"CREATE INDEX {option}IF NOT EXISTS {name} ON {self.table}({columns}){where};"
+
+    def covers(self, other):
+        """other の列がこの提案の先頭部分と同じで条件も同じなら、other はこの提案で済む"""
+        return (self.table == other.table and self.where == other.where
+                and self.columns[:len(other.columns)] == other.columns)
+
+
+def suggest(query):
+    """クエリの条件を全て使えるインデックスの列と部分インデックスの条件"""
+    constants = query.constants()
+    predicate = [f"{column} IS NULL" if value is None else f"{column} = {sql_literal(value)}"
+                 for column, value in sorted(constants.items())]
+    predicate += sorted(f"{f.column} IS NOT NULL" for f in query.filters if f.operator == 'notnull')
+    columns = []
+    optional = query.conditional_columns()
+    multi = query.multi_value_columns()
+    equality = [c for c in dict.fromkeys(query.equality_columns(include_conditional=False)) if c not in constants]
+    # 1件に絞れる列（*_id）を先に、IN の列は等価の列の後に
+    equality.sort(key=lambda c: (c in multi, not (c == 'id' or c.endswith('_id'))))
+    columns += [(column, False) for column in equality]
+    orders = [(c, d) for c, d, conditional in query.orders
+              if not conditional and c not in equality and c not in constants]
+    ranges = [c for c in query.range_columns() if c not in optional]
+    if orders and not (multi & set(equality)) and (query.limited or not ranges or ranges[0] == orders[0][0]):
+        columns += orders
+    elif ranges:
+        columns.append((ranges[0], False))
+    if not columns and constants:
+        # 定数の条件だけのクエリは、その列のインデックスを部分インデックスにする
+        column = sorted(constants)[0]
+        columns.append((column, False))
+    return columns, ' AND '.join(predicate) or None
+
+
+class Advice:
+    """スキーマとクエリの突き合わせの結果"""
+
+    def __init__(self, schema, queries, tables=None):
+        self.schema = schema
+        self.queries = [q for q in queries if q.table in schema.tables and q.table not in SMALL_TABLES
+                        and (not tables or q.table in tables)]
+        for query in list(self.queries):
+            self.queries += embedded_queries(query, schema)
+        self.tables = tables
+        # [(クエリ, 最も使えるインデックスの Coverage か None), ...]
+        self.coverages = []
+        self.uncovered = []
+        self.full_scans = []
+        self.redundant = []
+        self.unused = []
+        self.unindexed_foreign_keys = []
+        self.suggestions = []
+        self.unknown_tables = sorted({q.table for q in queries if q.table not in schema.tables})
+
+    def _in_scope(self, table):
+        return table not in SMALL_TABLES and (not self.tables or table in self.tables)
+
+    def analyze(self):
+        used = set()
+        for query in self.queries:
+            if query.operation in ('insert', 'upsert'):
+                continue
+            if query.is_full_scan:
+                self.full_scans.append(query)
+                continue
+            if not query.indexable:
+                continue
+            coverages = [c for c in (evaluate(index, query) for index in self.schema.indexes_on(query.table)) if c]
+            coverages = [c for c in coverages if c.usable]
+            used |= {c.index.name for c in coverages}
+            best = max(coverages, key=lambda c: c.score) if coverages else None
+            self.coverages.append((query, best))
+            if best is None or not best.complete:
+                self.uncovered.append((query, best))
+        self._find_redundant()
+        self._find_unused(used)
+        self._find_unindexed_foreign_keys()
+        self._build_suggestions()
+        return self
+
+    def _find_redundant(self):
+        for table in sorted(self.schema.tables):
+            if not self._in_scope(table):
+                continue
+            indexes = self.schema.indexes_on(table)
+            for index in indexes:
+                if index.unique or index.constraint or index.method != 'btree':
+                    continue
+                for other in indexes:
+                    if other is index or other.method != 'btree' or other.where != index.where:
+                        continue
+                    prefix = other.columns[:len(index.columns)]
+                    same = ([c for c, _ in prefix] == index.column_names
+                            and (len(index.columns) == 1 or prefix == index.columns))
+                    # 完全に同じ2つは後から定義した方だけを報告する
+                    if same and (len(other.columns) > len(index.columns) or other.unique
+                                 or list(self.schema.indexes).index(other.name)
+                                 < list(self.schema.indexes).index(index.name)):
+                        self.redundant.append((index, other))
+                        break
+
+    def _find_unused(self, used):
+        redundant = {index.name for index, _ in self.redundant}
+        foreign_keys = {(table, column) for table, column, _ in self.schema.foreign_keys()}
+        for index in sorted(self.schema.indexes.values(), key=lambda i: (i.table, i.name)):
+            if (index.name in used or index.name in redundant or index.unique or index.constraint
+                    or not self._in_scope(index.table) or (index.table, index.column_names[0]) in foreign_keys):
+                continue
+            # SQL関数・ポリシーで同じテーブルの列を参照している箇所（参考情報）
+            column = index.column_names[0]
+            references = [origin for statement, origin in self.schema.routines
+                          if re.search(rf"\b{re.escape(index.table)}\b", statement)
+                          and re.search(rf"\b{re.escape(column)}\b", statement)]
+            self.unused.append((index, references))
+
+    def _find_unindexed_foreign_keys(self):
+        for table, column, referenced in self.schema.foreign_keys():
+            if not self._in_scope(table):
+                continue
+            if not any(index.column_names[0] == column and not index.where and index.method == 'btree'
+                       for index in self.schema.indexes_on(table)):
+                self.unindexed_foreign_keys.append((table, column, referenced))
+
+    def _build_suggestions(self):
+        suggestions = []
+        for query, _ in self.uncovered:
+            columns, where = suggest(query)
+            if columns:
+                suggestions.append(Suggestion(query.table, columns, where and normalize_predicate(where), [query]))
+        for table, column, referenced in self.unindexed_foreign_keys:
+            suggestion = Suggestion(table, [(column, False)], None, [])
+            suggestion.reason = f"外部キー（{referenced} の削除・更新時に参照元を探す）"
+            suggestions.append(suggestion)
+
+        # 列の並びが他の提案の先頭部分と同じなら1つにまとめる
+        merged = []
+        for suggestion in sorted(suggestions, key=lambda s: (s.table, -len(s.columns))):
+            target = next((other for other in merged if other.covers(suggestion)), None)
+            if target is None:
+                merged.append(suggestion)
+                continue
+            target.queries += suggestion.queries
+            target.reason = target.reason or suggestion.reason
+
+        for suggestion in merged:
+            for index in self.schema.indexes_on(suggestion.table):
+                if (not index.unique and not index.constraint and index.where == suggestion.where
+                        and len(index.columns) < len(suggestion.columns) and index.method == 'btree'
+                        and suggestion.columns[:len(index.columns)] == index.columns):
+                    suggestion.replaces.append(index)
+        self.suggestions = sorted(merged, key=lambda s: (s.table, [c for c, _ in s.columns]))
+
+    @property
+    def has_findings(self):
+        return bool(self.uncovered or self.redundant or self.unused or self.unindexed_foreign_keys)
+
+    def migration(self, concurrently=False):
+        """提案をマイグレーションSQLにする"""
+        taken = set(self.schema.indexes)
+        lines = [
+            '-- インデックスの追加（tool/advise_indexes.py の提案）',
+            f"-- 作成日: {date.today().isoformat()}",
+        ]
+        if concurrently:
+            lines.append('-- CONCURRENTLY を使うため、トランザクションの外で1文ずつ実行すること')
+        for table in sorted({s.table for s in self.suggestions}):
+            lines += ['', '-- ===================================', f"-- {table}",
+                      '-- ===================================']
+            for suggestion in (s for s in self.suggestions if s.table == table):
+                name = suggestion.name(taken)
+                taken.add(name)
+                if suggestion.reason:
+                    lines.append(f"-- {suggestion.reason}")
+                for query in _unique_shapes(suggestion.queries):
+                    lines.append(f"-- {query.shape()}")
+                    lines.append(f"--   {', '.join(q.location() for q in suggestion.queries if q.key() == query.key())}")
+                lines.append(suggestion.statement(name, concurrently))
+                for index in suggestion.replaces:
+                    lines.append(f"-- {index.name} は {name} の先頭部分と同じため、適用後に削除できる")
+                    lines.append(f"-- DROP INDEX IF EXISTS {index.name};")
+                lines.append('')
+            lines.pop()
+
+        if self.redundant:
+            lines += ['', '-- ===================================', '-- 冗長なインデックス（確認のうえ削除）',
+                      '-- ===================================']
+            for index, other in self.redundant:
+                lines.append(f"-- {index.name}({', '.join(index.column_names)}) は "
+                             f"{other.name}({', '.join(other.column_names)}) {_covered_by(index, other)}")
+                lines.append(f"-- DROP INDEX IF EXISTS {index.name};")
+            lines.append('')
+        return '\n'.join(lines).rstrip('\n') + '\n'
+
+    def to_dict(self):
+        return {
+            'uncovered': [{**query.to_dict(), 'best_index': coverage.index.name if coverage else None,
+                           'missing': coverage.missing if coverage else None} for query, coverage in self.uncovered],
+            'full_scans': [query.to_dict() for query in self.full_scans],
+            'redundant': [{'index': index.to_dict(), 'covered_by': other.name} for index, other in self.redundant],
+            'unused': [{'index': index.to_dict(), 'sql_references': references} for index, references in self.unused],
+            'unindexed_foreign_keys': [{'table': t, 'column': c, 'references': r}
+                                       for t, c, r in self.unindexed_foreign_keys],
+            'suggestions': [{'table': s.table, 'columns': [c for c, _ in s.columns],
+                             'descending': [d for _, d in s.columns], 'where': s.where,
+                             'queries': [q.location() for q in s.queries], 'replaces': [i.name for i in s.replaces]}
+                            for s in self.suggestions],
+            'unknown_tables': self.unknown_tables,
+        }
+
+
+def _covered_by(index, other):
+    return 'と同じ列' if len(index.columns) == len(other.columns) else 'の先頭部分と同じ'
+
+
+def _unique_shapes(queries):
+    shapes = {}
+    for query in queries:
+        shapes.setdefault(query.key(), query)
+    return list(shapes.values())
+
+
+def print_coverages(advice):
+    shapes = {}
+    for query, coverage in advice.coverages:
+        shapes.setdefault(query.key(), []).append((query, coverage))
+    print('📋 クエリの形と使うインデックス')
+    for items in sorted(shapes.values(), key=lambda items: items[0][0].shape()):
+        query, coverage = items[0]
+        mark = '✅' if coverage and coverage.complete else '⚠️ '
+        print(f"  {mark} {query.shape()} → {coverage.index.name if coverage else 'なし'}（{len(items)}箇所）")
+    print()
+
+
+def print_advice(advice):
+    uncovered = {}
+    for query, coverage in advice.uncovered:
+        uncovered.setdefault(query.key(), []).append((query, coverage))
+    if uncovered:
+        print('🔍 インデックスで絞り込めない条件')
+        for items in uncovered.values():
+            query, coverage = items[0]
+            print(f"  {query.shape()}")
+            if coverage is None:
+                print('    → 使えるインデックスなし')
+            else:
+                missing = coverage.missing + [f"order({c})" for c in coverage.order_missing]
+                print(f"    → {coverage.index.name} で {', '.join(coverage.equality) or '並び替え'} まで。"
+                      f"残り: {', '.join(missing)}")
+            for query, _ in items:
+                print(f"      {query.location()}")
+    if advice.full_scans:
+        print('\n📚 フィルターのない全件取得（インデックスでは速くならない。必要な行だけに絞れないか確認）')
+        for query in advice.full_scans:
+            print(f"  {query.location()}: {query.shape()}")
+    if advice.redundant:
+        print('\n♻️  冗長なインデックス')
+        for index, other in advice.redundant:
+            print(f"  {index.name}({', '.join(index.column_names)}) は {other.definition()} {_covered_by(index, other)}"
+                  f"  [{index.origin}]")
+    if advice.unused:
+        print('\n💤 Edge Functionsのクエリから使われないインデックス')
+        for index, references in advice.unused:
+            note = f"（SQL関数・ポリシーで参照あり: {', '.join(references[:3])}）" if references else ''
+            print(f"  {index.definition()}{note}  [{index.origin}]")
+    if advice.unindexed_foreign_keys:
+        print('\n🔗 インデックスのない外部キー')
+        for table, column, referenced in advice.unindexed_foreign_keys:
+            print(f"  {table}.{column} → {referenced}")
+    if advice.suggestions:
+        print('\n💡 追加を提案するインデックス')
+        taken = set(advice.schema.indexes)
+        for suggestion in advice.suggestions:
+            name = suggestion.name(taken)
+            taken.add(name)
+            print(f"  {suggestion.statement(name)}")
+            for index in suggestion.replaces:
+                print(f"    （{index.name} は不要になる）")
+    if advice.unknown_tables:
+        print(f"\n⚠️  スキーマにないテーブル: {', '.join(advice.unknown_tables)}")
+
+    print(f"\nクエリ: {len(advice.queries)}件、インデックス: {len(advice.schema.indexes)}件"
+          f"（不足 {len(uncovered)}形、冗長 {len(advice.redundant)}件、未使用 {len(advice.unused)}件、"
+          f"外部キー {len(advice.unindexed_foreign_keys)}件、提案 {len(advice.suggestions)}件）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Edge Functionsのクエリとスキーマのインデックスの突き合わせ')
+    parser.add_argument('functions', nargs='*', help='対象のFunction名（省略時は全て）')
+    parser.add_argument('--table', action='append', help='対象のテーブル（複数指定可）')
+    parser.add_argument('--sql', help='提案のマイグレーションSQLの書き出し先')
+    parser.add_argument('--concurrently', action='store_true',
+                        help='CREATE INDEX CONCURRENTLY で書き出す（書き込みを止めずに作成する）')
+    parser.add_argument('--json', help='結果のJSONの書き出し先')
+    parser.add_argument('-v', '--verbose', action='store_true', help='全てのクエリの形と使うインデックスを表示する')
+    args = parser.parse_args(argv)
+
+    for function_name in args.functions:
+        if not (FUNCTIONS_DIR / function_name).is_dir():
+            raise ValueError(f"Functionがありません: {function_name}")
+    schema = Schema.load(schema_files())
+    for table in args.table or []:
+        if table not in schema.tables:
+            raise ValueError(f"テーブルがありません: {table}")
+    advice = Advice(schema, scan_queries(FUNCTIONS_DIR, args.functions or None), args.table).analyze()
+
+    if args.verbose:
+        print_coverages(advice)
+    print_advice(advice)
+    if args.sql:
+        Path(args.sql).write_text(advice.migration(args.concurrently), encoding='utf-8')
+        print(f"\n💾 マイグレーションSQL: {args.sql}")
+    if args.json:
+        Path(args.json).write_text(json.dumps(advice.to_dict(), indent=2, ensure_ascii=False) + "\n",
+                                   encoding='utf-8')
+        print(f"💾 JSON: {args.json}")
+    return 1 if advice.has_findings else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
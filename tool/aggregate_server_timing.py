@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Edge Functions の Server-Timing ログの集計
+tool/update_edge_functions.py の server-timing ルールで計測を挿入し、SERVER_TIMING_LOG=true で出力した
+1リクエスト1行のJSON（_shared/server_timing.ts）を、Function・フェーズごとの応答時間の内訳にまとめる
+
+    {"type":"server_timing","function":"get-user-groups","method":"POST","status":200,"total_ms":48.2,
+     "phases":{"maintenance":{"ms":0.4,"count":1},"db.group_members":{"ms":21.3,"count":2}}}
+
+- 入力は supabase functions serve の出力や、ダッシュボードからエクスポートしたログ
+  （行の途中に埋め込まれたJSONや、event_message などの文字列に入ったJSONも読む）
+- フェーズごとに、1リクエストあたりの回数・そのフェーズがあったリクエストでの p50 / p95・
+  全リクエストでの平均・合計時間に占める割合を出す
+- どのフェーズにも入らない時間（CPU処理・計測していない await）は「(その他)」にまとめる
+
+使い方:
+    SERVER_TIMING_LOG=true supabase functions serve 2>&1 | tee functions.log
+    python tool/aggregate_server_timing.py functions.log
+    python tool/aggregate_server_timing.py logs/*.json --function 'get-*' --json breakdown.json
+    cat functions.log | python tool/aggregate_server_timing.py -
+"""
+import argparse
+import json
+import sys
+from fnmatch import fnmatch
+from pathlib import Path
+
+from load_test import percentile
+
+LOG_TYPE = 'server_timing'
+MARKERS = ('{"type":"server_timing"', '{"type": "server_timing"')
+OTHER_PHASE = '(その他)'
+
+
+def _find_records(value):
+    """JSONの値の中から計測結果を探す（文字列に入ったJSONも調べる）"""
+    if isinstance(value, dict):
+        if value.get('type') == LOG_TYPE:
+            yield value
+            return
+        for item in value.values():
+            yield from _find_records(item)
+    elif isinstance(value, list):
+        for item in value:
+            yield from _find_records(item)
+    elif isinstance(value, str) and LOG_TYPE in value:
+        yield from parse_line(value)
+
+
+def parse_line(line):
+    """ログの1行から計測結果（dict）を取り出す"""
+    decoder = json.JSONDecoder()
+    for marker in MARKERS:
+        position = line.find(marker)
+        if position >= 0:
+            try:
+                record, _ = decoder.raw_decode(line, position)
+            except ValueError:
+                break
+            yield record
+            return
+    # JSONで書き出したログ（event_message などに文字列として入っている）
+    text = line.strip().rstrip(',')
+    if text[:1] in ('{', '['):
+        try:
+            yield from _find_records(json.loads(text))
+        except ValueError:
+            pass
+
+
+def read_records(paths):
+    """ファイル（'-' は標準入力）から計測結果を読む"""
+    for path in paths:
+        if path == '-':
+            lines = sys.stdin
+        else:
+            text = Path(path).read_text(encoding='utf-8', errors='replace')
+            stripped = text.lstrip()
+            # 全体が1つのJSON（配列）としてエクスポートされたログ
+            if stripped[:1] == '[':
+                try:
+                    yield from _find_records(json.loads(stripped))
+                    continue
+                except ValueError:
+                    pass
+            lines = text.splitlines()
+        for line in lines:
+            if LOG_TYPE in line:
+                yield from parse_line(line)
+
+
+class FunctionTimings:
+    """1つのFunctionの計測結果"""
+
+    def __init__(self, name):
+        self.name = name
+        self.totals = []
+        self.errors = 0
+        # フェーズ名 → [1リクエストでの合計時間（ミリ秒）]・合計回数
+        self.phases = {}
+        self.calls = {}
+        self.other = []
+
+    def add(self, record):
+        total = float(record.get('total_ms') or 0.0)
+        self.totals.append(total)
+        if int(record.get('status') or 0) >= 500:
+            self.errors += 1
+        measured = 0.0
+        for phase, value in (record.get('phases') or {}).items():
+            ms = float(value.get('ms') or 0.0)
+            self.phases.setdefault(phase, []).append(ms)
+            self.calls[phase] = self.calls.get(phase, 0) + int(value.get('count') or 1)
+            measured += ms
+        # 並行した計測が重なると合計を超えるため0で切る
+        self.other.append(max(total - measured, 0.0))
+
+    def summary(self):
+        requests = len(self.totals)
+        total_sum = sum(self.totals)
+        phases = []
+        for phase, values in list(self.phases.items()) + [(OTHER_PHASE, self.other)]:
+            values = sorted(values)
+            phase_sum = sum(values)
+            phases.append({
+                'phase': phase,
+                'requests': len(values),
+                'calls_per_request': (self.calls[phase] / requests) if phase in self.calls else None,
+                'p50_ms': percentile(values, 50),
+                'p95_ms': percentile(values, 95),
+                'mean_ms': phase_sum / requests,
+                'share': phase_sum / total_sum if total_sum else 0.0,
+            })
+        phases.sort(key=lambda item: (item['phase'] == OTHER_PHASE, -item['mean_ms']))
+        totals = sorted(self.totals)
+        return {
+            'requests': requests,
+            'error_rate': self.errors / requests,
+            'p50_ms': percentile(totals, 50),
+            'p95_ms': percentile(totals, 95),
+            'mean_ms': total_sum / requests,
+            'phases': phases,
+        }
+
+
+def aggregate(records, function_patterns=None):
+    """計測結果 → {Function名: FunctionTimings}"""
+    functions = {}
+    for record in records:
+        name = record.get('function') or 'unknown'
+        if function_patterns and not any(fnmatch(name, p) for p in function_patterns):
+            continue
+        if name not in functions:
+            functions[name] = FunctionTimings(name)
+        functions[name].add(record)
+    return functions
+
+
+def _ms(value):
+    return f"{value:>8.1f}" if value is not None else f"{'-':>8}"
+
+
+def print_report(summaries, top=None):
+    for name, stats in summaries.items():
+        print(f"\n📊 {name}（{stats['requests']:,}件、5xx {stats['error_rate']:.1%}）"
+              f" 合計 p50 {stats['p50_ms']:.1f}ms / p95 {stats['p95_ms']:.1f}ms / 平均 {stats['mean_ms']:.1f}ms")
+        print(f"  {'フェーズ':<36} {'回/件':>6} {'p50':>8} {'p95':>8} {'平均':>8} {'割合':>7}")
+        phases = stats['phases']
+        if top:
+            phases = [p for p in phases if p['phase'] != OTHER_PHASE][:top] + \
+                     [p for p in phases if p['phase'] == OTHER_PHASE]
+        for phase in phases:
+            calls = f"{phase['calls_per_request']:>6.2f}" if phase['calls_per_request'] is not None else f"{'':>6}"
+            print(f"  {phase['phase']:<36} {calls} {_ms(phase['p50_ms'])} {_ms(phase['p95_ms'])} "
+                  f"{_ms(phase['mean_ms'])} {phase['share']:>7.1%}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Edge Functions の Server-Timing ログの集計')
+    parser.add_argument('logs', nargs='+', help="ログファイル（'-' は標準入力）")
+    parser.add_argument('--function', action='append', help='対象のFunction名（globパターン。複数指定可）')
+    parser.add_argument('--sort', choices=['total', 'p95', 'requests', 'name'], default='total',
+                        help='Functionの並び順（total = 合計時間の多い順）')
+    parser.add_argument('--top', type=int, help='Functionごとに表示するフェーズの数')
+    parser.add_argument('--json', help='集計結果をJSONで保存するファイル')
+    args = parser.parse_args(argv)
+
+    functions = aggregate(read_records(args.logs), args.function)
+    if not functions:
+        print("⚠️ Server-Timing のログが見つかりません（SERVER_TIMING_LOG=true で出力したログを指定してください）")
+        return 1
+
+    summaries = {name: timings.summary() for name, timings in functions.items()}
+    sort_keys = {
+        'total': lambda item: -item[1]['mean_ms'] * item[1]['requests'],
+        'p95': lambda item: -item[1]['p95_ms'],
+        'requests': lambda item: -item[1]['requests'],
+        'name': lambda item: item[0],
+    }
+    summaries = dict(sorted(summaries.items(), key=sort_keys[args.sort]))
+    total = sum(stats['requests'] for stats in summaries.values())
+    print(f"🕒 Server-Timing: {len(summaries)}個のFunction、{total:,}リクエスト")
+    print_report(summaries, args.top)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'functions': summaries}, ensure_ascii=False, indent=2) + '\n',
+                                   encoding='utf-8')
+        print(f"\n💾 {args.json} に保存しました")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
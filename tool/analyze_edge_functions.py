@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Edge Functionsのimportグラフ・バンドル重量の分析
+各Functionの index.ts からimportを辿り（_shared のローカルモジュールと esm.sh / deno.land のリモートモジュール）、
+コールドスタート時に読み込むソースの量を集計する
+
+- リモートモジュールはローカルのDenoキャッシュ（$DENO_DIR、既定は ~/.cache/deno）から解決する
+  キャッシュにないものは「未解決」として件数だけ数える
+- Function間で重複しているコード（インラインの同じ処理）を検出する
+- 前回のJSONと比較して増減を表示する
+
+使い方:
+    python tool/analyze_edge_functions.py
+    python tool/analyze_edge_functions.py --json edge_functions.json --html edge_functions.html
+    python tool/analyze_edge_functions.py --diff edge_functions.json    # 前回の結果と比較
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import sys
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urljoin, urlsplit
+
+from codemod import FUNCTIONS_DIR, list_functions
+from token_match import TokenList
+
+# これ以上の大きさ（推移的なimportを含む）のリモートimportを重いimportとして報告する
+HEAVY_IMPORT_BYTES = 100 * 1024
+
+# 重複コードとみなす連続した行数（空行・コメント・import文・括弧だけの行を除く）
+DUPLICATE_WINDOW = 6
+
+# Denoキャッシュのメタデータ（Deno 2 以降はファイル末尾に埋め込まれる）
+INLINE_METADATA_MARKER = b'\n// denoCacheMetadata='
+
+
+def default_deno_dir():
+    if os.environ.get('DENO_DIR'):
+        return Path(os.environ['DENO_DIR'])
+    if sys.platform == 'darwin':
+        return Path.home() / 'Library' / 'Caches' / 'deno'
+    return Path(os.environ.get('XDG_CACHE_HOME', Path.home() / '.cache')) / 'deno'
+
+
+def parse_imports(source):
+    """import / export ... from / import() の指定子を出現順に返す（重複は除く）"""
+    tokens = TokenList(source).texts
+    specifiers = []
+    for i, token in enumerate(tokens[:-1]):
+        if token in ('from', 'import'):
+            target = tokens[i + 1]
+            if token == 'import' and target == '(' and i + 2 < len(tokens):
+                target = tokens[i + 2]
+            if target[:1] in ('"', "'") and len(target) > 1:
+                specifier = target[1:-1]
+                if specifier and specifier not in specifiers:
+                    specifiers.append(specifier)
+    return specifiers
+
+
+class DenoCache:
+    """Denoのリモートモジュールキャッシュ（deps/ または remote/ 以下、URLのパスのSHA-256がファイル名）"""
+
+    def __init__(self, deno_dir):
+        self.deno_dir = Path(deno_dir)
+
+    def _paths(self, url):
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        if parts.port:
+            host += f"_PORT{parts.port}"
+        path = parts.path + (f"?{parts.query}" if parts.query else '')
+        name = hashlib.sha256(path.encode('utf-8')).hexdigest()
+        for layout in ('remote', 'deps'):
+            yield self.deno_dir / layout / parts.scheme / host / name
+
+    def _read(self, url):
+        """(本文, ヘッダー) または None"""
+        for path in self._paths(url):
+            if not path.exists():
+                continue
+            data = path.read_bytes()
+            metadata_path = path.with_name(path.name + '.metadata.json')
+            if metadata_path.exists():
+                return data, json.loads(metadata_path.read_text(encoding='utf-8')).get('headers', {})
+            marker = data.rfind(INLINE_METADATA_MARKER)
+            if marker >= 0:
+                metadata = json.loads(data[marker + len(INLINE_METADATA_MARKER):].decode('utf-8'))
+                return data[:marker], metadata.get('headers', {})
+            return data, {}
+        return None
+
+    def lookup(self, url, max_redirects=10):
+        """リダイレクトを辿って (最終URL, 本文) を返す。キャッシュになければ None"""
+        for _ in range(max_redirects):
+            entry = self._read(url)
+            if entry is None:
+                return None
+            data, headers = entry
+            location = {k.lower(): v for k, v in headers.items()}.get('location')
+            if not location:
+                return url, data
+            url = urljoin(url, location)
+        return None
+
+
+class Module:
+    def __init__(self, key, kind, size=None, imports=(), resolved=True):
+        self.key = key
+        # 'function' / 'local' / 'remote'
+        self.kind = kind
+        self.size = size
+        self.imports = list(imports)
+        self.resolved = resolved
+
+
+class ModuleGraph:
+    """モジュールの読み込みとimportの解決（同じモジュールは1回だけ読む）"""
+
+    def __init__(self, functions_dir, cache):
+        self.functions_dir = Path(functions_dir)
+        self.cache = cache
+        self.modules = {}
+
+    def _resolve(self, specifier, base):
+        if specifier.startswith(('https://', 'http://')):
+            return specifier
+        if base.startswith(('https://', 'http://')):
+            return urljoin(base, specifier)
+        if specifier.startswith(('./', '../', '/')):
+            return os.path.normpath(os.path.join(os.path.dirname(base), specifier))
+        # npm: / node: / import map など（このツールでは辿らない）
+        return specifier
+
+    def load(self, key, kind='local'):
+        """モジュールを読み込み、importを再帰的に解決する。モジュールのキーを返す"""
+        if key in self.modules:
+            return key
+        if key.startswith(('https://', 'http://')):
+            found = self.cache.lookup(key)
+            if found is None:
+                self.modules[key] = Module(key, 'remote', resolved=False)
+                return key
+            # 相対指定はリダイレクト後のURLを基準に解決する
+            base, data = found
+            source = data.decode('utf-8', errors='replace')
+            module = Module(key, 'remote', len(data))
+        elif os.path.isabs(key) or key.startswith('.'):
+            path = Path(key)
+            if not path.exists():
+                self.modules[key] = Module(key, kind, resolved=False)
+                return key
+            base = key
+            source = path.read_text(encoding='utf-8')
+            module = Module(key, kind, path.stat().st_size)
+        else:
+            self.modules[key] = Module(key, 'external', resolved=False)
+            return key
+
+        self.modules[key] = module
+        for specifier in parse_imports(source):
+            module.imports.append(self.load(self._resolve(specifier, base)))
+        return key
+
+    def closure(self, key):
+        """key から推移的に読み込まれるモジュールのキー（key 自身を含む）"""
+        seen = set()
+        stack = [key]
+        while stack:
+            current = stack.pop()
+            if current in seen:
+                continue
+            seen.add(current)
+            stack.extend(self.modules[current].imports)
+        return seen
+
+
+def _normalized_lines(source):
+    """重複検出用の行（行番号, 正規化した行）"""
+    lines = []
+    in_block_comment = False
+    for number, line in enumerate(source.splitlines(), 1):
+        text = ' '.join(line.split())
+        if in_block_comment:
+            in_block_comment = '*/' not in text
+            continue
+        if text.startswith('/*'):
+            in_block_comment = '*/' not in text
+            continue
+        if not text or text.startswith(('//', '*', 'import ')) or text.strip('{}()[];,') == '':
+            continue
+        lines.append((number, text))
+    return lines
+
+
+def find_duplicates(sources, window=DUPLICATE_WINDOW):
+    """
+    Function間で同じ内容の連続した行を探す
+
+    Returns:
+        ({Function名: 重複している行数}, [{'lines', 'functions', 'preview'}, ...])
+    """
+    normalized = {name: _normalized_lines(source) for name, source in sources.items()}
+    owners = {}
+    for name, lines in normalized.items():
+        for i in range(len(lines) - window + 1):
+            digest = hash(tuple(text for _, text in lines[i:i + window]))
+            owners.setdefault(digest, set()).add(name)
+
+    duplicated_lines = {}
+    blocks = {}
+    for name, lines in normalized.items():
+        covered = [False] * len(lines)
+        for i in range(len(lines) - window + 1):
+            digest = hash(tuple(text for _, text in lines[i:i + window]))
+            if len(owners[digest]) > 1:
+                covered[i:i + window] = [True] * window
+        duplicated_lines[name] = sum(covered)
+
+        # 重複している行の連続した範囲をブロックとしてまとめる
+        i = 0
+        while i < len(lines):
+            if not covered[i]:
+                i += 1
+                continue
+            j = i
+            while j < len(lines) and covered[j]:
+                j += 1
+            texts = tuple(text for _, text in lines[i:j])
+            block = blocks.setdefault(texts, {'lines': len(texts), 'functions': [], 'preview': list(texts[:3])})
+            block['functions'].append(f"{name}:{lines[i][0]}")
+            i = j
+
+    repeated = [block for block in blocks.values() if len(block['functions']) > 1]
+    repeated.sort(key=lambda block: (-block['lines'] * len(block['functions']), block['preview']))
+    return duplicated_lines, repeated
+
+
+def _count_calls(source, name):
+    tokens = TokenList(source).texts
+    return sum(1 for i, token in enumerate(tokens[:-1]) if token == name and tokens[i + 1] == '(')
+
+
+def analyze(functions_dir=FUNCTIONS_DIR, deno_dir=None, heavy_bytes=HEAVY_IMPORT_BYTES):
+    """全Functionを分析して、JSONに書き出せる辞書を返す"""
+    functions_dir = Path(functions_dir)
+    cache = DenoCache(deno_dir or default_deno_dir())
+    graph = ModuleGraph(functions_dir, cache)
+
+    sources = {}
+    report = {}
+    for name in list_functions(functions_dir):
+        index_path = functions_dir / name / 'index.ts'
+        if name.startswith('_') or not index_path.exists():
+            continue
+        key = graph.load(str(index_path), 'function')
+        sources[name] = index_path.read_text(encoding='utf-8')
+
+        closure = graph.closure(key)
+        modules = [graph.modules[k] for k in closure]
+        local = [m for m in modules if m.kind == 'local']
+        remote = [m for m in modules if m.kind == 'remote']
+
+        remote_imports = []
+        for imported in graph.modules[key].imports:
+            module = graph.modules[imported]
+            if module.kind != 'remote':
+                continue
+            sub = [graph.modules[k] for k in graph.closure(imported)]
+            size = sum(m.size or 0 for m in sub) if module.resolved else None
+            remote_imports.append({
+                'url': imported,
+                'bytes': size,
+                'modules': len(sub),
+                'unresolved': sum(1 for m in sub if not m.resolved),
+            })
+
+        report[name] = {
+            'source_bytes': graph.modules[key].size,
+            'local_bytes': sum(m.size or 0 for m in local),
+            'remote_bytes': sum(m.size or 0 for m in remote),
+            'total_bytes': sum(m.size or 0 for m in modules),
+            'modules': len(modules),
+            'local_modules': sorted(os.path.relpath(m.key, functions_dir) for m in local),
+            'remote_imports': remote_imports,
+            'unresolved': sorted(m.key for m in modules if not m.resolved),
+            'heavy_imports': [r['url'] for r in remote_imports
+                              if r['bytes'] is None or r['bytes'] >= heavy_bytes],
+            'supabase_clients': _count_calls(sources[name], 'createClient'),
+        }
+
+    duplicated_lines, duplicates = find_duplicates(sources)
+    for name, lines in duplicated_lines.items():
+        report[name]['duplicated_lines'] = lines
+
+    importers = {}
+    for name in report:
+        for k in graph.closure(str(functions_dir / name / 'index.ts')):
+            importers[k] = importers.get(k, 0) + 1
+    shared_modules = {
+        (os.path.relpath(k, functions_dir) if graph.modules[k].kind == 'local' else k): {
+            'kind': graph.modules[k].kind,
+            'bytes': graph.modules[k].size,
+            'importers': count,
+            'resolved': graph.modules[k].resolved,
+        }
+        for k, count in importers.items() if graph.modules[k].kind != 'function'
+    }
+
+    return {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'deno_dir': str(cache.deno_dir),
+        'functions': report,
+        'modules': dict(sorted(shared_modules.items(), key=lambda item: -item[1]['importers'])),
+        'duplicates': duplicates,
+    }
+
+
+def diff_reports(previous, current):
+    """
+    前回の結果との差分
+
+    Returns:
+        [{'function', 'status', 'total_bytes', 'modules', 'duplicated_lines'}]（各値は (前回, 今回)）
+    """
+    changes = []
+    names = sorted(set(previous['functions']) | set(current['functions']))
+    for name in names:
+        old = previous['functions'].get(name)
+        new = current['functions'].get(name)
+        status = 'added' if old is None else 'removed' if new is None else 'changed'
+        fields = {f: ((old or {}).get(f), (new or {}).get(f))
+                  for f in ('total_bytes', 'modules', 'duplicated_lines', 'supabase_clients')}
+        if status == 'changed' and all(a == b for a, b in fields.values()):
+            continue
+        changes.append({'function': name, 'status': status, **fields})
+    return changes
+
+
+def _format_bytes(value):
+    if value is None:
+        return '?'
+    return f"{value / 1024:.1f}KB" if value >= 1024 else f"{value}B"
+
+
+def print_report(report, changes=None, top=15):
+    functions = report['functions']
+    ranked = sorted(functions.items(), key=lambda item: (-item[1]['total_bytes'], item[0]))
+    unresolved = {url for f in functions.values() for url in f['unresolved']}
+
+    print(f"📊 Edge Functions分析: {len(functions)}個（Denoキャッシュ: {report['deno_dir']}）")
+    if unresolved:
+        print(f"   ⚠️  キャッシュにないリモートモジュール: {len(unresolved)}個（サイズは集計に含まれません。"
+              f"deno cache で取得してください）")
+    print(f"\n   {'Function':<30} {'合計':>9} {'自身':>9} {'モジュール':>6} {'重複行':>6} {'client':>6}")
+    for name, f in ranked[:top]:
+        print(f"   {name:<30} {_format_bytes(f['total_bytes']):>9} {_format_bytes(f['source_bytes']):>9} "
+              f"{f['modules']:>6} {f['duplicated_lines']:>6} {f['supabase_clients']:>6}")
+
+    heavy = {}
+    for name, f in functions.items():
+        for url in f['heavy_imports']:
+            heavy.setdefault(url, []).append(name)
+    if heavy:
+        print("\n   重い（またはサイズ不明の）リモートimport:")
+        for url, names in sorted(heavy.items(), key=lambda item: -len(item[1])):
+            print(f"     {url}: {len(names)}個のFunction")
+
+    if report['duplicates']:
+        print("\n   重複コード（上位5件）:")
+        for block in report['duplicates'][:5]:
+            print(f"     {block['lines']}行 × {len(block['functions'])}箇所: {block['preview'][0]}")
+            print(f"       {', '.join(block['functions'][:5])}" + (' ...' if len(block['functions']) > 5 else ''))
+
+    if changes is not None:
+        print(f"\n   前回との差分: {len(changes)}件")
+        for change in changes:
+            old, new = change['total_bytes']
+            delta = f"{_format_bytes(old)} → {_format_bytes(new)}"
+            print(f"     {change['status']:<8} {change['function']:<30} {delta}  "
+                  f"モジュール {change['modules'][0]} → {change['modules'][1]}")
+
+
+def render_html(report, changes=None):
+    """自己完結したHTMLレポート"""
+    functions = report['functions']
+    ranked = sorted(functions.items(), key=lambda item: (-item[1]['total_bytes'], item[0]))
+    largest = max((f['total_bytes'] for f in functions.values()), default=0) or 1
+    e = html.escape
+
+    rows = []
+    for name, f in ranked:
+        width = f['total_bytes'] / largest * 100
+        rows.append(
+            f"<tr><td>{e(name)}</td>"
+            f"<td class='num'><div class='bar' style='width:{width:.1f}%'></div>{_format_bytes(f['total_bytes'])}</td>"
+            f"<td class='num'>{_format_bytes(f['source_bytes'])}</td>"
+            f"<td class='num'>{_format_bytes(f['local_bytes'])}</td>"
+            f"<td class='num'>{_format_bytes(f['remote_bytes'])}</td>"
+            f"<td class='num'>{f['modules']}</td><td class='num'>{f['duplicated_lines']}</td>"
+            f"<td class='num'>{f['supabase_clients']}</td>"
+            f"<td>{'<br>'.join(e(url) for url in f['heavy_imports'])}</td></tr>")
+
+    duplicate_rows = [
+        f"<tr><td class='num'>{block['lines']}</td><td>{e(', '.join(block['functions']))}</td>"
+        f"<td><pre>{e(chr(10).join(block['preview']))}</pre></td></tr>"
+        for block in report['duplicates'][:50]
+    ]
+
+    diff_section = ''
+    if changes is not None:
+        diff_rows = [
+            f"<tr><td>{e(c['status'])}</td><td>{e(c['function'])}</td>"
+            f"<td class='num'>{_format_bytes(c['total_bytes'][0])} → {_format_bytes(c['total_bytes'][1])}</td>"
+            f"<td class='num'>{c['modules'][0]} → {c['modules'][1]}</td>"
+            f"<td class='num'>{c['duplicated_lines'][0]} → {c['duplicated_lines'][1]}</td></tr>"
+            for c in changes
+        ]
+        diff_section = (
+            "<h2>前回との差分</h2><table><tr><th>状態</th><th>Function</th><th>合計</th>"
+            "<th>モジュール</th><th>重複行</th></tr>" + ''.join(diff_rows) + "</table>")
+
+    return f"""<!DOCTYPE html>
+<html lang="ja"><head><meta charset="utf-8"><title>Edge Functions分析</title>
+<style>
+body {{ font-family: sans-serif; margin: 24px; color: #222; }}
+table {{ border-collapse: collapse; margin-bottom: 32px; }}
+th, td {{ border: 1px solid #ddd; padding: 4px 8px; font-size: 13px; vertical-align: top; }}
+th {{ background: #f3f3f3; }}
+td.num {{ text-align: right; position: relative; white-space: nowrap; }}
+.bar {{ position: absolute; left: 0; top: 0; bottom: 0; background: #cfe3ff; z-index: -1; }}
+pre {{ margin: 0; font-size: 12px; }}
+</style></head><body>
+<h1>Edge Functions分析</h1>
+<p>生成日時: {e(report['generated_at'])} / Denoキャッシュ: {e(report['deno_dir'])}</p>
+{diff_section}
+<h2>Function別の読み込み量</h2>
+<table><tr><th>Function</th><th>合計</th><th>自身</th><th>ローカル</th><th>リモート</th>
+<th>モジュール</th><th>重複行</th><th>createClient</th><th>重いimport</th></tr>
+{''.join(rows)}
+</table>
+<h2>重複コード</h2>
+<table><tr><th>行数</th><th>箇所</th><th>先頭</th></tr>
+{''.join(duplicate_rows)}
+</table>
+</body></html>
+"""
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Edge Functionsのimportグラフ・バンドル重量の分析')
+    parser.add_argument('--functions-dir', default=str(FUNCTIONS_DIR), help='supabase/functions')
+    parser.add_argument('--deno-dir', help='Denoのキャッシュディレクトリ（省略時は $DENO_DIR / ~/.cache/deno）')
+    parser.add_argument('--json', help='結果のJSONの書き出し先')
+    parser.add_argument('--html', help='HTMLレポートの書き出し先')
+    parser.add_argument('--diff', help='比較する前回の結果（JSON）')
+    parser.add_argument('--heavy-kb', type=float, default=HEAVY_IMPORT_BYTES / 1024,
+                        help='重いimportとみなす大きさ（KB、推移的なimportを含む）')
+    parser.add_argument('--top', type=int, default=15, help='表示するFunctionの数')
+    args = parser.parse_args(argv)
+
+    report = analyze(args.functions_dir, args.deno_dir, int(args.heavy_kb * 1024))
+
+    changes = None
+    if args.diff:
+        with open(args.diff, encoding='utf-8') as f:
+            changes = diff_reports(json.load(f), report)
+
+    print_report(report, changes, args.top)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+        print(f"\n💾 JSON: {args.json}")
+    if args.html:
+        Path(args.html).write_text(render_html(report, changes), encoding='utf-8')
+        print(f"💾 HTML: {args.html}")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,828 @@
+#!/usr/bin/env python3
+"""
+error_logs のエクスポートの集計（エラーのシグネチャごとの件数・推移・画面・端末）
+log-error Function が書き込む error_logs テーブル（008_add_error_logs_table.sql）のエクスポートを1行ずつ読み、
+error_message と stack_trace を正規化したシグネチャにまとめる
+
+- 入力は CSV（ダッシュボード・psql の \\copy ... CSV HEADER）/ JSONL / COPY のテキスト形式（pg_dump のデータ部分も可）
+  （拡張子で判定、.gz も可。'-' は標準入力）
+- メッセージの UUID・数値・日時・URL・引用符で囲んだ値などは <uuid> / <n> などに置き換え、
+  スタックトレースは先頭の数フレーム（行番号・列番号を除く）をシグネチャに含める
+- シグネチャごとに件数・ユーザー数・最初と最後の発生日時・時間帯ごとの件数・画面名・端末の上位を出す
+- 読む行数によらずメモリは一定（画面名・端末・ユーザーは件数の多いものだけを保持する）
+- --checkpoint で集計結果と読んだ位置を保存し、次回は追記された行・新しいエクスポートの行だけを読む
+  （同じファイルは前回の位置から、別のファイルは前回までの最新の created_at より後の行から）
+
+使い方:
+    psql "$DATABASE_URL" -c "\\copy error_logs TO 'error_logs.csv' CSV HEADER"
+    python tool/analyze_error_logs.py error_logs.csv
+    python tool/analyze_error_logs.py error_logs.copy.gz --bucket hour --top 30
+    python tool/analyze_error_logs.py error_logs.copy --workers 8 --progress            # 大きなファイルを並列に読む
+    python tool/analyze_error_logs.py exports/*.jsonl --checkpoint .error_logs_checkpoint.json
+    python tool/analyze_error_logs.py --checkpoint .error_logs_checkpoint.json --signature 3fa2c1d09b7e
+    python tool/analyze_error_logs.py error_logs.csv --json signatures.json
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+
+from arg_types import JST
+from icon_cache import atomic_write
+from sql_schema import Schema, schema_files
+
+TABLE = 'error_logs'
+# 集計に使う列（COPY の列の順はDDLから読む）
+FIELDS = ('id', 'user_id', 'error_type', 'error_message', 'stack_trace', 'screen_name', 'device_info', 'created_at')
+
+CHECKPOINT_VERSION = 1
+BUCKETS = ('hour', 'day', 'week')
+DEFAULT_FRAMES = 3
+# シグネチャごとに保持する画面名・端末・ユーザーの数
+TOP_CAPACITY = 32
+USER_LIMIT = 1000
+# これを超えたシグネチャは「(その他)」にまとめる（正規化しきれない値でシグネチャが増え続けないように）
+DEFAULT_MAX_SIGNATURES = 20000
+OVERFLOW = '(その他)'
+MESSAGE_LIMIT = 300
+# 並列に読むときの1区間の大きさの下限（これより小さいファイルは1プロセスで読む）
+CHUNK_MIN_BYTES = 16 * 1024 * 1024
+# 重複除去用のIDを古いものから捨てる間隔（行数）
+TRIM_INTERVAL = 100_000
+SPARKS = '▁▂▃▄▅▆▇█'
+
+# メッセージの可変部分（上から順に置き換える。メッセージに目印の文字がなければそのパターンは試さない）
+NORMALIZERS = [
+    ('://', re.compile(r"\b[a-z][a-z0-9+.-]*://\S+", re.I), '<url>'),
+    ('-', re.compile(r"\b[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\b", re.I), '<uuid>'),
+    ('@', re.compile(r"\b[\w.+-]+@[\w-]+\.[\w.-]+\b"), '<email>'),
+    (':', re.compile(r"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}(?::?\d{2})?)?"), '<time>'),
+    ('0', re.compile(r"\b0x[0-9a-f]+\b", re.I), '<hex>'),
+    ('', re.compile(r"\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{12,}\b", re.I), '<hex>'),
+    ("'", re.compile(r"'[^'\n]{0,200}'"), '<str>'),
+    ('"', re.compile(r"\"[^\"\n]{0,200}\""), '<str>'),
+    # 数値（小数・IPアドレスのような . 区切りを含む）。単位（5020ms・12.5s・80%）は残す
+    ('', re.compile(r"(?<![\w.<])[-+]?\d+(?:\.\d+)*(?=(?:[a-z]{1,3}|%)?(?!\w))", re.I), '<n>'),
+]
+DIGIT = re.compile(r"\d")
+SPACES = re.compile(r"\s+")
+# Dart のスタックトレースの1フレーム（#0      Class.method (package:app/file.dart:12:5)）
+DART_FRAME = re.compile(r"^#\d+\s+(.+?)\s+\((.+?)(?::\d+)?(?::\d+)?\)$")
+# JavaScript（at fn (file.js:1:2) / at file.js:1:2）
+JS_FRAME = re.compile(r"^at\s+(?:(.+?)\s+\()?(.+?)(?::\d+)?(?::\d+)?\)?$")
+# シグネチャに含めないフレーム（非同期の区切り・ランタイムの内部）
+NOISE_FRAMES = ('<asynchronous suspension>', 'dart:async', 'dart:_', 'package:stack_trace/')
+
+
+# ===================================
+# 正規化
+# ===================================
+
+def normalize_message(message):
+    """エラーメッセージの可変部分を置き換える"""
+    text = message or ''
+    if DIGIT.search(text) or '"' in text or "'" in text:
+        for marker, pattern, placeholder in NORMALIZERS:
+            if marker in text:
+                text = pattern.sub(placeholder, text)
+    text = SPACES.sub(' ', text).strip()
+    return text[:MESSAGE_LIMIT]
+
+
+@lru_cache(maxsize=65536)
+def normalize_frames(stack_trace, frames):
+    """スタックトレースの先頭 frames 個のフレーム（関数名と場所、行番号・列番号は除く）"""
+    result = []
+    for line in (stack_trace or '').splitlines():
+        line = line.strip()
+        if not line or any(noise in line for noise in NOISE_FRAMES):
+            continue
+        match = DART_FRAME.match(line) or JS_FRAME.match(line)
+        if match:
+            function, location = match.group(1), match.group(2)
+            # file:///Users/.../lib/x.dart → lib/x.dart（ビルド環境のパスの違いをなくす）
+            location = re.sub(r"^file://.*?/(lib|test|bin)/", r"\1/", location)
+            frame = f"{function or '<anonymous>'} ({location})"
+        else:
+            frame = normalize_message(line)
+        result.append(frame)
+        if len(result) >= frames:
+            break
+    return tuple(result)
+
+
+@lru_cache(maxsize=65536)
+def _signature_id(error_type, normalized, stack):
+    key = '\n'.join((error_type or '', normalized) + stack)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=6).hexdigest()
+
+
+@lru_cache(maxsize=65536)
+def signature_of(error_type, message, stack_trace, frames):
+    """
+    (シグネチャID, 正規化したメッセージ, フレーム)
+    同じエラーは何度も来るため、メッセージ・スタックトレース・シグネチャのそれぞれで結果を使い回す
+    """
+    normalized = normalize_message(message)
+    stack = normalize_frames(stack_trace, frames)
+    return _signature_id(error_type, normalized, stack), normalized, stack
+
+
+@lru_cache(maxsize=4096)
+def _device_label_text(text):
+    try:
+        value = json.loads(text)
+    except ValueError:
+        return text[:60]
+    return device_label(value) if isinstance(value, dict) else str(value)[:60]
+
+
+def device_label(device_info):
+    """device_info（ErrorLogService._getDeviceInfo の JSON）→ 'ios 17.0 iPhone' / 'android 14 Pixel 7'"""
+    if device_info is None or device_info == '':
+        return '(なし)'
+    if isinstance(device_info, str):
+        return _device_label_text(device_info)
+    if not isinstance(device_info, dict):
+        return str(device_info)[:60]
+    version = device_info.get('systemVersion') or device_info.get('version')
+    parts = [device_info.get('platform'), version, device_info.get('model')]
+    return ' '.join(str(part) for part in parts if part not in (None, '')) or '(不明)'
+
+
+def parse_time(value):
+    """created_at → UTCの datetime（タイムゾーンのない値はUTCとみなす）"""
+    if isinstance(value, datetime):
+        moment = value
+    else:
+        text = str(value).strip()
+        if text.endswith('Z'):
+            text = text[:-1] + '+00:00'
+        moment = datetime.fromisoformat(text)
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+def bucket_of(moment, bucket, tz):
+    """時間帯の先頭（tz での時刻の文字列）"""
+    return _bucket_of(moment.replace(minute=0, second=0, microsecond=0), bucket, tz)
+
+
+@lru_cache(maxsize=4096)
+def _bucket_of(hour, bucket, tz):
+    local = hour.astimezone(tz)
+    if bucket == 'hour':
+        return local.strftime('%Y-%m-%d %H:00')
+    day = local.date()
+    if bucket == 'week':
+        day -= timedelta(days=day.weekday())
+    return day.isoformat()
+
+
+# ===================================
+# 入力
+# ===================================
+
+COPY_UNESCAPE = re.compile(r"\\(?:([0-7]{1,3})|x([0-9a-fA-F]{1,2})|(.))")
+COPY_CHARACTERS = {'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t', 'v': '\v'}
+COPY_HEADER = re.compile(r"^COPY\s+(?:[\w\"]+\.)?\"?error_logs\"?\s*\(([^)]*)\)\s+FROM\s+stdin", re.I)
+
+
+def _copy_unescape(match):
+    octal, hexadecimal, char = match.groups()
+    if octal:
+        return chr(int(octal, 8))
+    if hexadecimal:
+        return chr(int(hexadecimal, 16))
+    return COPY_CHARACTERS.get(char, char)
+
+
+def copy_field(value):
+    """COPY のテキスト形式の1項目 → 文字列（\\N は None）"""
+    if value == '\\N':
+        return None
+    return COPY_UNESCAPE.sub(_copy_unescape, value) if '\\' in value else value
+
+
+def table_columns():
+    """DDL（とマイグレーション）の error_logs の列の順"""
+    schema = Schema.load(schema_files())
+    if TABLE not in schema.tables:
+        raise ValueError(f"DDLにテーブルがありません: {TABLE}")
+    return list(schema.tables[TABLE].columns)
+
+
+def detect_format(path):
+    name = path.lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    if name.endswith(('.copy', '.tsv', '.txt', '.sql', '.dat')):
+        return 'copy'
+    raise ValueError(f"形式が分かりません（--format で指定してください）: {path}")
+
+
+def _indexes(columns, source):
+    missing = [field for field in ('error_message', 'created_at') if field not in columns]
+    if missing:
+        raise ValueError(f"{source} に必要な列がありません: {', '.join(missing)}")
+    return [columns.index(field) if field in columns else None for field in FIELDS]
+
+
+class ExportReader:
+    """
+    1つのエクスポートファイルを1行ずつ読み、FIELDS の順のタプルを返す
+
+    Args:
+        path: ファイル（'-' は標準入力）
+        fmt: 'csv' / 'jsonl' / 'copy'
+        columns: ヘッダーのない CSV・COPY の列の順（省略時はDDLの順）
+        offset: 前回読み終えた位置（バイト）。圧縮ファイル・標準入力では使えない
+        end: 読む範囲の終わり（バイト。並列に読むときの区間。この位置をまたぐ行までを読む）
+    """
+
+    def __init__(self, path, fmt, columns=None, offset=0, end=None):
+        self.path = path
+        self.format = fmt
+        self.columns = columns
+        self.seekable = path != '-' and not path.endswith('.gz')
+        self.offset = offset if self.seekable else 0
+        self.end = end if self.seekable else None
+        # 読み込んだ位置と、最後に返したレコードの終わりの位置（次回はここから読む）
+        self.consumed = self.offset
+        self.position = self.offset
+        self.header = None
+
+    def _lines(self, stream):
+        """改行で終わる行だけを読む（書き出し途中の最後の行は次回に回す）"""
+        for raw in stream:
+            if not raw.endswith(b'\n') or (self.end is not None and self.consumed >= self.end):
+                break
+            self.consumed += len(raw)
+            yield raw.decode('utf-8', errors='replace')
+
+    def __iter__(self):
+        if self.path == '-':
+            stream = sys.stdin.buffer
+        elif self.path.endswith('.gz'):
+            stream = gzip.open(self.path, 'rb')
+        else:
+            stream = open(self.path, 'rb')
+            stream.seek(self.offset)
+        try:
+            reader = {'csv': self._csv, 'jsonl': self._jsonl, 'copy': self._copy}[self.format]
+            for record in reader(self._lines(stream)):
+                # CSV の複数行にわたるレコードの途中で終わっていても、次回はレコードの先頭から読む
+                self.position = self.consumed
+                yield record
+        finally:
+            if stream is not sys.stdin.buffer:
+                stream.close()
+
+    def _csv(self, lines):
+        rows = csv.reader(lines)
+        columns = self.columns
+        if columns is None:
+            columns = next(rows, None)
+            if columns is None:
+                return
+            self.header = columns
+        indexes = _indexes(columns, self.path)
+        for row in rows:
+            if len(row) < len(columns):
+                continue
+            yield tuple(row[i] if i is not None and row[i] != '' else None for i in indexes)
+
+    def _jsonl(self, lines):
+        for line in lines:
+            line = line.strip().rstrip(',')
+            if not line or line in ('[', ']'):
+                continue
+            record = json.loads(line)
+            yield tuple(record.get(field) for field in FIELDS)
+
+    def _copy(self, lines):
+        columns = self.columns or table_columns()
+        indexes = _indexes(columns, self.path)
+        in_data = not any(self.path.lower().endswith(suffix) for suffix in ('.sql', '.sql.gz'))
+        for line in lines:
+            line = line.rstrip('\n')
+            if not in_data:
+                # pg_dump の出力: COPY error_logs (...) FROM stdin; 〜 \. の間だけを読む
+                header = COPY_HEADER.match(line)
+                if header:
+                    columns = [c.strip().strip('"') for c in header.group(1).split(',')]
+                    indexes = _indexes(columns, self.path)
+                    in_data = True
+                continue
+            if line == '\\.':
+                in_data = not self.path.lower().endswith(('.sql', '.sql.gz'))
+                continue
+            values = line.split('\t')
+            if len(values) != len(columns):
+                continue
+            yield tuple(copy_field(values[i]) if i is not None else None for i in indexes)
+
+
+def split_ranges(path, start, end, parts):
+    """ファイルの start〜end を、行の境目で parts 個ほどの区間 [(開始, 終了), ...] に分ける"""
+    step = max((end - start) // parts, 1)
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for k in range(1, parts):
+            f.seek(start + k * step)
+            f.readline()
+            position = f.tell()
+            if bounds[-1] < position < end:
+                bounds.append(position)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def file_identity(path):
+    """ファイルの同一性（大きさ・更新時刻・先頭4KBのハッシュ）"""
+    stat = Path(path).stat()
+    with open(path, 'rb') as f:
+        head = hashlib.sha256(f.read(4096)).hexdigest()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'head': head}
+
+
+# ===================================
+# 集計
+# ===================================
+
+class TopCounter:
+    """
+    件数の多い値だけを保持するカウンター（Space-Saving。capacity を超えると最少の値を入れ替える）
+    入れ替えた値の件数は多めに数えられる（誤差は入れ替え前の最少件数まで）
+    """
+
+    def __init__(self, capacity=TOP_CAPACITY, counts=None):
+        self.capacity = capacity
+        self.counts = dict(counts or {})
+
+    def add(self, key, count=1):
+        if key in self.counts or len(self.counts) < self.capacity:
+            self.counts[key] = self.counts.get(key, 0) + count
+            return
+        smallest = min(self.counts, key=self.counts.get)
+        self.counts[key] = self.counts.pop(smallest) + count
+
+    def most_common(self, n=None):
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:n]
+
+
+class Signature:
+    """1つのシグネチャの集計"""
+
+    def __init__(self, signature_id, error_type, message, frames):
+        self.id = signature_id
+        self.error_type = error_type
+        self.message = message
+        self.frames = list(frames)
+        self.count = 0
+        self.example = None
+        self.first_seen = None
+        self.last_seen = None
+        self.histogram = {}
+        self.screens = TopCounter()
+        self.devices = TopCounter()
+        self.users = set()
+        self.users_overflow = False
+
+    def add(self, row, moment, bucket):
+        _, user_id, _, message, _, screen_name, device_info, _ = row
+        self.count += 1
+        if self.example is None:
+            self.example = (message or '')[:MESSAGE_LIMIT]
+        if self.first_seen is None or moment < self.first_seen:
+            self.first_seen = moment
+        if self.last_seen is None or moment > self.last_seen:
+            self.last_seen = moment
+        self.histogram[bucket] = self.histogram.get(bucket, 0) + 1
+        self.screens.add(screen_name or '(なし)')
+        self.devices.add(device_label(device_info))
+        if user_id and not self.users_overflow:
+            self.users.add(user_id)
+            if len(self.users) > USER_LIMIT:
+                self.users = set()
+                self.users_overflow = True
+
+    def merge(self, other):
+        """別のプロセスで集計した同じシグネチャを足し合わせる"""
+        self.count += other.count
+        self.example = self.example or other.example
+        self.first_seen = min(filter(None, (self.first_seen, other.first_seen)), default=None)
+        self.last_seen = max(filter(None, (self.last_seen, other.last_seen)), default=None)
+        for bucket, count in other.histogram.items():
+            self.histogram[bucket] = self.histogram.get(bucket, 0) + count
+        for key, count in other.screens.counts.items():
+            self.screens.add(key, count)
+        for key, count in other.devices.counts.items():
+            self.devices.add(key, count)
+        self.users_overflow = self.users_overflow or other.users_overflow
+        self.users = set() if self.users_overflow else self.users | other.users
+        if len(self.users) > USER_LIMIT:
+            self.users = set()
+            self.users_overflow = True
+
+    @property
+    def user_count(self):
+        return f"{USER_LIMIT}+" if self.users_overflow else str(len(self.users))
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'error_type': self.error_type, 'message': self.message, 'frames': self.frames,
+            'count': self.count, 'example': self.example, 'first_seen': self.first_seen.isoformat(), 'last_seen': self.last_seen.isoformat(),
+            'histogram': dict(sorted(self.histogram.items())), 'screens': self.screens.counts,
+            'devices': self.devices.counts, 'users': sorted(self.users), 'users_overflow': self.users_overflow,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        signature = cls(data['id'], data['error_type'], data['message'], data['frames'])
+        signature.count = data['count']
+        signature.example = data['example']
+        signature.first_seen = parse_time(data['first_seen'])
+        signature.last_seen = parse_time(data['last_seen'])
+        signature.histogram = dict(data['histogram'])
+        signature.screens = TopCounter(counts=data['screens'])
+        signature.devices = TopCounter(counts=data['devices'])
+        signature.users = set(data['users'])
+        signature.users_overflow = data['users_overflow']
+        return signature
+
+
+class ErrorLogAnalytics:
+    """
+    error_logs の集計結果と、前回までに読んだ位置
+
+    Args:
+        bucket: 推移の時間帯（'hour' / 'day' / 'week'）
+        tz: 時間帯の区切りのタイムゾーン
+        frames: シグネチャに含めるスタックトレースのフレーム数
+        max_signatures: 保持するシグネチャの数の上限
+        lateness: 前回の最新の created_at より前でも読む時間（遅れて送信されたエラーログ用。ID で重複を除く）
+    """
+
+    def __init__(self, bucket='day', tz=JST, frames=DEFAULT_FRAMES, max_signatures=DEFAULT_MAX_SIGNATURES,
+                 lateness=timedelta(hours=1)):
+        self.bucket = bucket
+        self.tz = tz
+        self.frames = frames
+        self.max_signatures = max_signatures
+        self.lateness = lateness
+        self.signatures = {}
+        self.rows = 0
+        self.skipped = 0
+        self.duplicates = 0
+        # 読み終えたファイル {パス: {'offset', 'size', 'mtime_ns', 'head', 'columns'}}
+        self.files = {}
+        # 前回までの最新の created_at と、それから lateness 以内の行のID
+        self.watermark = None
+        self.recent_ids = {}
+
+    @property
+    def options(self):
+        return {'bucket': self.bucket, 'tz': self.tz, 'frames': self.frames,
+                'max_signatures': self.max_signatures, 'lateness': self.lateness}
+
+    @property
+    def settings(self):
+        return {'bucket': self.bucket, 'utc_offset': self.tz.utcoffset(None).total_seconds(),
+                'frames': self.frames}
+
+    def add(self, row, cutoff=None):
+        """1行を集計する（cutoff より前・読んだことのある行は数えない）"""
+        row_id, _, error_type, message, stack_trace, _, _, created_at = row
+        if message is None or created_at is None:
+            self.skipped += 1
+            return
+        try:
+            moment = parse_time(created_at)
+        except ValueError:
+            self.skipped += 1
+            return
+        if cutoff is not None and moment <= cutoff[0]:
+            if moment < cutoff[0] - self.lateness or row_id in cutoff[1]:
+                self.duplicates += 1
+                return
+        if self.watermark is None or moment > self.watermark:
+            self.watermark = moment
+        if row_id and (moment >= self.watermark - self.lateness):
+            self.recent_ids[row_id] = moment
+        signature_id, normalized, frames = signature_of(error_type, message, stack_trace, self.frames)
+        signature = self.signatures.get(signature_id)
+        if signature is None:
+            if len(self.signatures) >= self.max_signatures:
+                signature_id, normalized, frames = OVERFLOW, OVERFLOW, ()
+                signature = self.signatures.get(OVERFLOW)
+            if signature is None:
+                signature = Signature(signature_id, error_type, normalized, frames)
+                self.signatures[signature_id] = signature
+        signature.add(row, moment, bucket_of(moment, self.bucket, self.tz))
+        self.rows += 1
+
+    def merge(self, other):
+        """別のプロセスで集計した結果を足し合わせる"""
+        self.rows += other.rows
+        self.skipped += other.skipped
+        self.duplicates += other.duplicates
+        if other.watermark is not None and (self.watermark is None or other.watermark > self.watermark):
+            self.watermark = other.watermark
+        self.recent_ids.update(other.recent_ids)
+        for signature_id, signature in other.signatures.items():
+            if signature_id not in self.signatures and len(self.signatures) >= self.max_signatures:
+                signature_id = OVERFLOW
+                if OVERFLOW not in self.signatures:
+                    self.signatures[OVERFLOW] = Signature(OVERFLOW, signature.error_type, OVERFLOW, ())
+            if signature_id in self.signatures:
+                self.signatures[signature_id].merge(signature)
+            else:
+                self.signatures[signature_id] = signature
+        self._trim_recent_ids()
+
+    def _trim_recent_ids(self):
+        if self.watermark is None:
+            return
+        oldest = self.watermark - self.lateness
+        self.recent_ids = {row_id: moment for row_id, moment in self.recent_ids.items() if moment >= oldest}
+
+    def read(self, reader, cutoff, progress=False):
+        started = time.perf_counter()
+        for n, row in enumerate(reader, 1):
+            self.add(row, cutoff)
+            if n % TRIM_INTERVAL == 0:
+                self._trim_recent_ids()
+            if progress and n % 1_000_000 == 0:
+                rate = n / (time.perf_counter() - started)
+                print(f"  … {reader.path}: {n:,}行（{rate:,.0f}行/秒）", file=sys.stderr)
+        return reader.position
+
+    def consume(self, path, fmt=None, columns=None, progress=False, workers=1):
+        """
+        1ファイルを読む（前回と同じファイルなら続きから、別のファイルなら前回の最新の created_at より後から）
+        workers が2以上なら、1行1レコードの形式（COPY・JSONL）の圧縮していないファイルを区間に分けて並列に読む
+
+        Returns:
+            このファイルで集計した行数
+        """
+        fmt = fmt or detect_format(path)
+        key = path if path == '-' else str(Path(path).resolve())
+        previous = self.files.get(key)
+        offset = 0
+        identity = None
+        if path != '-':
+            identity = file_identity(path)
+            if (previous and identity['head'] == previous['head'] and identity['size'] >= previous['offset']
+                    and not path.endswith('.gz')):
+                offset = previous['offset']
+                columns = columns or previous.get('columns')
+        # 続きから読めないファイルは、前回までに集計した行を created_at とIDで除く
+        self._trim_recent_ids()
+        cutoff = (self.watermark, set(self.recent_ids)) if self.watermark is not None and offset == 0 else None
+        if offset and identity['size'] == offset:
+            return 0
+        before = self.rows
+        parallel = (workers > 1 and identity is not None and fmt in ('copy', 'jsonl') and not path.endswith('.gz')
+                    and not path.lower().endswith('.sql') and identity['size'] - offset >= 2 * CHUNK_MIN_BYTES)
+        if parallel:
+            if fmt == 'copy':
+                columns = columns or table_columns()
+            parts = min(workers * 4, (identity['size'] - offset) // CHUNK_MIN_BYTES)
+            tasks = [(path, fmt, columns, begin, end, self.options, cutoff)
+                     for begin, end in split_ranges(path, offset, identity['size'], parts)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for partial, position in executor.map(_consume_range, tasks):
+                    self.merge(partial)
+                    if progress:
+                        print(f"  … {path}: {position:,}バイトまで", file=sys.stderr)
+        else:
+            reader = ExportReader(path, fmt, columns, offset)
+            position = self.read(reader, cutoff, progress)
+            columns = reader.header or columns
+        if identity is not None:
+            self.files[key] = dict(identity, offset=position, columns=columns)
+        return self.rows - before
+
+    # --- チェックポイント ---
+
+    def save(self, path):
+        self._trim_recent_ids()
+        data = {
+            'version': CHECKPOINT_VERSION,
+            'settings': self.settings,
+            'saved_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'rows': self.rows, 'skipped': self.skipped, 'duplicates': self.duplicates,
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'recent_ids': {row_id: moment.isoformat() for row_id, moment in self.recent_ids.items()},
+            'files': self.files,
+            'signatures': [signature.to_dict() for signature in self.signatures.values()],
+        }
+        atomic_write(path, (json.dumps(data, ensure_ascii=False) + '\n').encode('utf-8'))
+
+    def load(self, path):
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+        if data.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} は別の版のチェックポイントです（--reset で作り直してください）")
+        if data['settings'] != self.settings:
+            raise ValueError(f"{path} は別の設定（{data['settings']}）で集計しています"
+                             "（同じ --bucket / --tz / --frames を指定するか、--reset で作り直してください）")
+        self.rows = data['rows']
+        self.skipped = data['skipped']
+        self.duplicates = data['duplicates']
+        self.watermark = parse_time(data['watermark']) if data['watermark'] else None
+        self.recent_ids = {row_id: parse_time(moment) for row_id, moment in data['recent_ids'].items()}
+        self.files = data['files']
+        self.signatures = {item['id']: Signature.from_dict(item) for item in data['signatures']}
+
+
+def _consume_range(task):
+    """ファイルの1区間を集計する（ProcessPoolExecutor 用）"""
+    path, fmt, columns, begin, end, options, cutoff = task
+    analytics = ErrorLogAnalytics(**options)
+    position = analytics.read(ExportReader(path, fmt, columns, begin, end), cutoff)
+    return analytics, position
+
+
+# ===================================
+# 表示
+# ===================================
+
+def sparkline(histogram, buckets):
+    values = [histogram.get(bucket, 0) for bucket in buckets]
+    peak = max(values) if values else 0
+    if not peak:
+        return ''
+    return ''.join(SPARKS[min(len(SPARKS) - 1, value * len(SPARKS) // (peak + 1))] if value else ' '
+                   for value in values)
+
+
+def recent_buckets(analytics, count):
+    """最新の時間帯から count 個の時間帯（古い順）"""
+    if analytics.watermark is None:
+        return []
+    step = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}[analytics.bucket]
+    buckets = []
+    moment = analytics.watermark
+    for _ in range(count):
+        buckets.append(bucket_of(moment, analytics.bucket, analytics.tz))
+        moment -= step
+    return buckets[::-1]
+
+
+def ranked(analytics, sort, buckets):
+    window = set(buckets)
+    recent = {s.id: sum(n for b, n in s.histogram.items() if b in window) for s in analytics.signatures.values()}
+    if sort == 'new':
+        signatures = sorted(analytics.signatures.values(), key=lambda s: (s.first_seen, s.count), reverse=True)
+    elif sort == 'recent':
+        signatures = sorted(analytics.signatures.values(), key=lambda s: (-recent[s.id], -s.count))
+    else:
+        signatures = sorted(analytics.signatures.values(), key=lambda s: -s.count)
+    return signatures, recent
+
+
+def print_report(analytics, top, sort, window, breakdown):
+    buckets = recent_buckets(analytics, window)
+    signatures, recent = ranked(analytics, sort, buckets)
+    new_since = buckets[0] if buckets else None
+    print(f"🧯 error_logs: {analytics.rows:,}行、{len(analytics.signatures):,}個のシグネチャ"
+          f"（スキップ {analytics.skipped:,}行、既読 {analytics.duplicates:,}行）")
+    if buckets:
+        print(f"   推移: {buckets[0]} 〜 {buckets[-1]}（{analytics.bucket}ごと、{len(buckets)}区間）")
+    for signature in signatures[:top]:
+        share = signature.count / analytics.rows if analytics.rows else 0.0
+        first = bucket_of(signature.first_seen, analytics.bucket, analytics.tz)
+        badge = ' 🆕' if new_since and first >= new_since else ''
+        print(f"\n[{signature.id}] {signature.count:,}件（{share:.1%}）直近 {recent[signature.id]:,}件 "
+              f"ユーザー {signature.user_count}人{badge}")
+        print(f"  {signature.error_type}: {signature.message}")
+        for frame in signature.frames:
+            print(f"    at {frame}")
+        print(f"  {first} 〜 {bucket_of(signature.last_seen, analytics.bucket, analytics.tz)}"
+              f"  |{sparkline(signature.histogram, buckets)}|")
+        for label, counter in (('画面', signature.screens), ('端末', signature.devices)):
+            items = ', '.join(f"{name} {count:,}" for name, count in counter.most_common(breakdown))
+            print(f"  {label}: {items}")
+    if len(signatures) > top:
+        rest = sum(signature.count for signature in signatures[top:])
+        print(f"\n…ほか {len(signatures) - top:,}個のシグネチャ（{rest:,}件）")
+
+
+def print_signature(analytics, signature_id):
+    matches = [s for s in analytics.signatures.values() if s.id.startswith(signature_id)]
+    if len(matches) != 1:
+        raise ValueError(f"シグネチャが{'見つかりません' if not matches else '複数あります'}: {signature_id}")
+    signature = matches[0]
+    print(f"[{signature.id}] {signature.error_type}: {signature.message}")
+    print(f"  件数 {signature.count:,} / ユーザー {signature.user_count}人 / "
+          f"{signature.first_seen.astimezone(analytics.tz):%Y-%m-%d %H:%M} 〜 {signature.last_seen.astimezone(analytics.tz):%Y-%m-%d %H:%M}")
+    print(f"  例: {signature.example}")
+    for frame in signature.frames:
+        print(f"    at {frame}")
+    peak = max(signature.histogram.values())
+    print(f"\n  {analytics.bucket}ごとの件数:")
+    for bucket, count in sorted(signature.histogram.items()):
+        print(f"  {bucket:<16} {count:>8,} {'█' * max(1, count * 40 // peak)}")
+    for label, counter in (('画面', signature.screens), ('端末', signature.devices)):
+        print(f"\n  {label}:")
+        for name, count in counter.most_common(10):
+            print(f"  {name:<40} {count:>8,} {count / signature.count:>7.1%}")
+
+
+def _timezone(value):
+    match = re.fullmatch(r"([+-])(\d{1,2})(?::?(\d{2}))?", value)
+    if value.upper() == 'UTC':
+        return timezone.utc
+    if value.upper() == 'JST':
+        return JST
+    if not match:
+        raise argparse.ArgumentTypeError(f"タイムゾーンは UTC / JST / +09:00 の形式で指定してください: {value}")
+    offset = timedelta(hours=int(match.group(2)), minutes=int(match.group(3) or 0))
+    return timezone(offset if match.group(1) == '+' else -offset)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='error_logs のエクスポートの集計')
+    parser.add_argument('exports', nargs='*', help="エクスポートファイル（CSV / JSONL / COPY、.gz も可。'-' は標準入力）")
+    parser.add_argument('--format', choices=['csv', 'jsonl', 'copy'], help='入力の形式（省略時は拡張子で判定）')
+    parser.add_argument('--columns', help='ヘッダーのない CSV・COPY の列の順（カンマ区切り。省略時はDDLの順）')
+    parser.add_argument('--checkpoint', help='集計結果と読んだ位置を保存するファイル（次回は続きから読む）')
+    parser.add_argument('--reset', action='store_true', help='チェックポイントを読まずに最初から集計する')
+    parser.add_argument('--bucket', choices=BUCKETS, default='day', help='推移の時間帯')
+    parser.add_argument('--tz', type=_timezone, default=JST, help='時間帯の区切りのタイムゾーン（既定: JST）')
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES, help='シグネチャに含めるフレーム数')
+    parser.add_argument('--lateness', type=float, default=1.0,
+                        help='前回の最新の created_at より前でも読む時間（時間。遅れて送信されたログ用）')
+    parser.add_argument('--max-signatures', type=int, default=DEFAULT_MAX_SIGNATURES, help='シグネチャの数の上限')
+    parser.add_argument('--sort', choices=['count', 'recent', 'new'], default='count',
+                        help='並び順（recent = 直近の件数、new = 最初の発生が新しい順）')
+    parser.add_argument('--window', type=int, default=14, help='推移と「直近」に使う時間帯の数')
+    parser.add_argument('--top', type=int, default=20, help='表示するシグネチャの数')
+    parser.add_argument('--breakdown', type=int, default=3, help='画面・端末を上位いくつまで表示するか')
+    parser.add_argument('--signature', help='1つのシグネチャの詳細を表示する（IDの先頭だけでも可）')
+    parser.add_argument('--json', help='集計結果をJSONで保存するファイル')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='並列に読むプロセス数（COPY・JSONL の圧縮していない大きなファイルのみ）')
+    parser.add_argument('--progress', action='store_true', help='100万行ごとに進み具合を表示する')
+    args = parser.parse_args(argv)
+
+    if not args.exports and not args.checkpoint:
+        parser.error('エクスポートファイルか --checkpoint を指定してください')
+    csv.field_size_limit(sys.maxsize)
+
+    analytics = ErrorLogAnalytics(args.bucket, args.tz, args.frames, args.max_signatures,
+                                  timedelta(hours=args.lateness))
+    if args.checkpoint and Path(args.checkpoint).exists() and not args.reset:
+        analytics.load(args.checkpoint)
+        print(f"📌 チェックポイント: {analytics.rows:,}行まで集計済み（{args.checkpoint}）")
+
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+    started = time.perf_counter()
+    read = 0
+    for path in args.exports:
+        added = analytics.consume(path, args.format, columns, args.progress, args.workers)
+        read += added
+        print(f"📥 {path}: {added:,}行")
+    if args.exports:
+        elapsed = time.perf_counter() - started
+        print(f"   {read:,}行を{elapsed:.1f}秒で集計（{read / elapsed if elapsed else 0:,.0f}行/秒）\n")
+
+    if args.checkpoint:
+        analytics.save(args.checkpoint)
+    if not analytics.rows:
+        print("⚠️ error_logs の行がありません")
+        return 1
+
+    if args.signature:
+        print_signature(analytics, args.signature)
+    else:
+        print_report(analytics, args.top, args.sort, args.window, args.breakdown)
+
+    if args.json:
+        data = {'rows': analytics.rows, 'bucket': analytics.bucket,
+                'signatures': [s.to_dict() for s in ranked(analytics, args.sort, [])[0]]}
+        Path(args.json).write_text(json.dumps(data, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        print(f"\n💾 {args.json} に保存しました")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
@@ -1,36 +1,157 @@
-from PIL import Image
+#!/usr/bin/env python3
+"""
+アイコンのアルファ値・色の分析
+1回の配列演算でアルファ値ヒストグラム（256段階）、色の統計、サンプルピクセル、
+複数閾値のバウンディングボックス、ハロー（白っぽい半透明の縁）の指標を求める
 
-def analyze_icon(input_path):
-    """アイコンのピクセル情報を分析"""
-    img = Image.open(input_path).convert('RGBA')
-    pixels = img.load()
-    width, height = img.size
+使い方:
+    python tool/analyze_icon.py [画像パス]
+    python tool/analyze_icon.py assets/icons/app_icon.png --json           # CI向けJSON出力
+    python tool/analyze_icon.py assets/icons/app_icon.png --max-halo 0     # ハローがあれば終了コード1
+"""
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from icon_io import alpha_bboxes, load_rgba
+
+DEFAULT_THRESHOLDS = (0, 10, 50)
+
+
+def _sample_pixels(arr, count):
+    """x, y の順に走査して最初に見つかる不透明でないピクセル（従来の分析と同じ順序）"""
+    samples = []
+    visible = arr[..., 3] > 0
+    for x in np.flatnonzero(visible.any(axis=0)):
+        for y in np.flatnonzero(visible[:, x])[:count - len(samples)]:
+            r, g, b, a = (int(v) for v in arr[y, x])
+            samples.append((int(x), int(y), r, g, b, a))
+        if len(samples) >= count:
+            break
+    return samples
+
+
+def _edge_mask(visible):
+    """不透明でないピクセルのうち、上下左右に完全透過のピクセルがあるもの"""
+    transparent = ~visible
+    near = np.zeros_like(visible)
+    near[1:] |= transparent[:-1]
+    near[:-1] |= transparent[1:]
+    near[:, 1:] |= transparent[:, :-1]
+    near[:, :-1] |= transparent[:, 1:]
+    return visible & near
+
+
+def icon_stats(arr, thresholds=DEFAULT_THRESHOLDS, sample_count=20):
+    """アイコンの分析結果を辞書で返す（JSONにそのまま書き出せる形式）"""
+    height, width = arr.shape[:2]
+    alpha = arr[..., 3]
+    histogram = np.bincount(alpha.ravel(), minlength=256)
 
-    alpha_distribution = {}
-    color_samples = []
+    visible = alpha > 0
+    semi = visible & (alpha < 255)
+    bright = arr[..., :3].min(axis=-1) > 200
+    edge = _edge_mask(visible)
 
-    for x in range(width):
-        for y in range(height):
-            r, g, b, a = pixels[x, y]
+    colors = {}
+    if visible.any():
+        rgb = arr[..., :3][visible]
+        for i, channel in enumerate('rgb'):
+            values = rgb[:, i]
+            colors[channel] = {
+                'min': int(values.min()),
+                'max': int(values.max()),
+                'mean': round(float(values.mean()), 2),
+            }
 
-            # アルファ値の分布を記録
-            alpha_key = f"{a // 50 * 50}-{min(a // 50 * 50 + 49, 255)}"
-            alpha_distribution[alpha_key] = alpha_distribution.get(alpha_key, 0) + 1
+    # 従来の50刻みのアルファ値分布（表示用）
+    distribution = {}
+    for start in range(0, 256, 50):
+        end = min(start + 49, 255)
+        count = int(histogram[start:end + 1].sum())
+        if count:
+            distribution[f"{start}-{end}"] = count
 
-            # サンプルピクセルを保存
-            if len(color_samples) < 20 and a > 0:
-                color_samples.append((x, y, r, g, b, a))
+    return {
+        'size': {'width': width, 'height': height},
+        'alpha_histogram': histogram.tolist(),
+        'alpha_distribution': distribution,
+        'pixels': {
+            'total': width * height,
+            'transparent': int(histogram[0]),
+            'opaque': int(histogram[255]),
+            'semi_transparent': int(histogram[1:255].sum()),
+        },
+        'colors': colors,
+        'bboxes': {str(t): box for t, box in alpha_bboxes(arr, thresholds).items()},
+        'halo': {
+            # clean_icon_edges で消える「白っぽい半透明」ピクセル
+            'semi_transparent_bright': int(np.count_nonzero(semi & (alpha < 250) & bright)),
+            # 透過部分に接する縁のうち、白っぽい半透明のもの
+            'bright_edge': int(np.count_nonzero(edge & semi & bright)),
+            'edge': int(np.count_nonzero(edge)),
+            'low_alpha': int(np.count_nonzero(visible & (alpha < 50))),
+        },
+        'samples': [
+            {'x': x, 'y': y, 'rgba': [r, g, b, a]} for x, y, r, g, b, a in _sample_pixels(arr, sample_count)
+        ],
+    }
+
+
+def analyze_icon(input_path, thresholds=DEFAULT_THRESHOLDS):
+    """アイコンのピクセル情報を分析"""
+    stats = icon_stats(load_rgba(input_path), thresholds)
+    width, height = stats['size']['width'], stats['size']['height']
 
     print(f"📊 アイコン分析結果: {input_path}")
     print(f"   画像サイズ: {width}x{height}")
     print(f"\n   アルファ値分布:")
-    for alpha_range in sorted(alpha_distribution.keys()):
-        count = alpha_distribution[alpha_range]
+    for alpha_range in sorted(stats['alpha_distribution'].keys()):
+        count = stats['alpha_distribution'][alpha_range]
         print(f"     {alpha_range}: {count:,}ピクセル")
 
     print(f"\n   サンプルピクセル（最初の20個）:")
-    for x, y, r, g, b, a in color_samples[:20]:
-        print(f"     ({x}, {y}): RGB({r}, {g}, {b}) Alpha={a}")
+    for sample in stats['samples'][:20]:
+        r, g, b, a = sample['rgba']
+        print(f"     ({sample['x']}, {sample['y']}): RGB({r}, {g}, {b}) Alpha={a}")
+
+    print(f"\n   バウンディングボックス:")
+    for threshold, box in stats['bboxes'].items():
+        print(f"     alpha > {threshold}: {box}")
+
+    halo = stats['halo']
+    print(f"\n   ハロー指標:")
+    print(f"     白っぽい半透明ピクセル: {halo['semi_transparent_bright']:,}")
+    print(f"     縁の白っぽい半透明ピクセル: {halo['bright_edge']:,} / 縁 {halo['edge']:,}")
+    print(f"     アルファ値50未満のピクセル: {halo['low_alpha']:,}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='アイコンのアルファ値・色の分析')
+    parser.add_argument('input', nargs='?', default='assets/icons/app_icon.png', help='画像パス')
+    parser.add_argument('--json', action='store_true', help='結果をJSONで出力')
+    parser.add_argument('--thresholds', default=','.join(map(str, DEFAULT_THRESHOLDS)),
+                        help='バウンディングボックスを求めるアルファ閾値（カンマ区切り）')
+    parser.add_argument('--max-halo', type=int,
+                        help='白っぽい半透明ピクセルがこの数を超えたら終了コード1（CI用）')
+    args = parser.parse_args(argv)
+
+    thresholds = [int(t) for t in args.thresholds.split(',')]
+    if args.json:
+        stats = icon_stats(load_rgba(args.input), thresholds)
+        print(json.dumps(stats, ensure_ascii=False))
+    else:
+        stats = analyze_icon(args.input, thresholds)
+
+    if args.max_halo is not None and stats['halo']['semi_transparent_bright'] > args.max_halo:
+        print(f"❌ ハローが基準を超えています: {stats['halo']['semi_transparent_bright']} > {args.max_halo}",
+              file=sys.stderr)
+        return 1
+    return 0
+
 
 if __name__ == '__main__':
-    analyze_icon('assets/icons/app_icon.png')
+    sys.exit(main())
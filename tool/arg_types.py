@@ -0,0 +1,30 @@
+"""
+コマンドライン引数の型（generate_dataset.py・benchmark_recurring_todos.py・simulate_recurring_todos.py などで共有）
+
+- parse_count: 1以上の件数（1e6 のような指定も受け付ける）
+- parse_now: ISO 8601 の日時（タイムゾーンの指定がなければJST）
+"""
+import argparse
+from datetime import datetime, timedelta, timezone
+
+JST = timezone(timedelta(hours=9))
+
+
+def parse_count(value):
+    # 1e6 のような指定も受け付ける
+    number = float(value)
+    if number < 1 or number != int(number):
+        raise argparse.ArgumentTypeError(f"1以上の整数を指定してください: {value}")
+    return int(number)
+
+
+def parse_now(value):
+    if isinstance(value, datetime):
+        now = value
+    else:
+        try:
+            now = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"日時の形式が正しくありません: {value}（例: 2025-12-15T09:00:00+09:00）") from None
+    # タイムゾーンの指定がなければJSTとみなす
+    return now if now.tzinfo else now.replace(tzinfo=JST)
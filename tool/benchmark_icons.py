@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+アイコン処理スクリプトのベンチマーク
+合成アイコン（暗い背景上の角丸四角形、アンチエイリアスされた縁）を各サイズで生成し、
+各スクリプトの公開関数を子プロセスで実行して、実行時間・ピークメモリ（RSS）・処理速度を測る
+
+使い方:
+    python tool/benchmark_icons.py                                  # 512 / 1024 / 4096 / 8192px
+    python tool/benchmark_icons.py --sizes 512,1024 --output bench.json
+    python tool/benchmark_icons.py --functions remove_antialiasing,analyze_icon --repeat 5
+
+    # 基準の結果と比較し、指定した割合より遅くなっていたら終了コード1（CI用）
+    python tool/benchmark_icons.py --sizes 1024 --compare bench.json --max-regression 10
+"""
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from png_stream import PngStripWriter
+
+TOOL_DIR = Path(__file__).parent
+
+DEFAULT_SIZES = (512, 1024, 4096, 8192)
+
+# 合成アイコンの色（app_icon_original.png に近い暗い背景）
+BACKGROUND = (10, 13, 22)
+FOREGROUND_TOP = (90, 170, 255)
+FOREGROUND_BOTTOM = (40, 90, 200)
+SYMBOL = (245, 245, 250)
+
+# 関数名 → (モジュール, 入力の種類, 追加の引数, 出力パスを取るか)
+#   入力の種類: 'opaque' = 暗い背景つき、'transparent' = 透過背景
+CASES = {
+    'fix_icon_properly': ('fix_icon_properly', 'opaque', (), True),
+    'process_icon_final': ('process_icon_final', 'opaque', (), True),
+    'remove_antialiasing': ('remove_antialiasing', 'opaque', (), True),
+    'clean_icon_edges': ('clean_icon_edges', 'transparent', (), True),
+    'change_background_color': ('change_icon_background', 'transparent', ((21, 24, 38, 255),), True),
+    'create_ios_icon': ('create_ios_icon', 'transparent', ((21, 24, 38, 255),), True),
+    'trim_transparent': ('trim_transparent', 'transparent', (), True),
+    'analyze_icon': ('analyze_icon', 'transparent', (), False),
+}
+
+STRIP_ROWS = 512
+
+
+def _rounded_rect_coverage(xs, ys, center, half, radius):
+    """角丸四角形の被覆率（符号付き距離から求めた、1ピクセル幅のアンチエイリアス）"""
+    qx = np.abs(xs - center[0]) - (half[0] - radius)
+    qy = np.abs(ys - center[1]) - (half[1] - radius)
+    outside = np.hypot(np.maximum(qx, 0), np.maximum(qy, 0))
+    distance = outside + np.minimum(np.maximum(qx, qy), 0) - radius
+    return np.clip(0.5 - distance, 0, 1)
+
+
+def synthetic_strip(size, y0, rows, transparent):
+    """合成アイコンの y0 行目から rows 行分のRGBA配列"""
+    ys, xs = np.mgrid[y0:y0 + rows, 0:size].astype(np.float32) + 0.5
+    center = (size / 2, size / 2)
+    body = _rounded_rect_coverage(xs, ys, center, (size * 0.4, size * 0.4), size * 0.12)
+    symbol = _rounded_rect_coverage(xs, ys, center, (size * 0.15, size * 0.15), size * 0.15)
+
+    t = (ys / size)[..., None]
+    color = np.array(FOREGROUND_TOP, np.float32) * (1 - t) + np.array(FOREGROUND_BOTTOM, np.float32) * t
+    color = color * (1 - symbol[..., None]) + np.array(SYMBOL, np.float32) * symbol[..., None]
+
+    strip = np.empty((rows, size, 4), dtype=np.uint8)
+    if transparent:
+        strip[..., :3] = np.rint(color)
+        strip[..., 3] = np.rint(body * 255)
+    else:
+        coverage = body[..., None]
+        strip[..., :3] = np.rint(np.array(BACKGROUND, np.float32) * (1 - coverage) + color * coverage)
+        strip[..., 3] = 255
+    return strip
+
+
+def make_synthetic_icon(path, size, transparent=False):
+    """合成アイコンをストリップ単位で生成して書き出す（8192pxでもメモリを使いすぎない）"""
+    writer = PngStripWriter(str(path), size, size, compress_level=1)
+    try:
+        for y in range(0, size, STRIP_ROWS):
+            writer.write(synthetic_strip(size, y, min(STRIP_ROWS, size - y), transparent))
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+
+
+def synthetic_inputs(work_dir, sizes):
+    """{(サイズ, 入力の種類): パス}。既に生成済みなら再利用する"""
+    inputs = {}
+    for size in sizes:
+        for kind in ('opaque', 'transparent'):
+            path = Path(work_dir) / f"synthetic_{kind}_{size}.png"
+            if not path.exists():
+                print(f"   🎨 合成アイコン生成: {path.name}")
+                make_synthetic_icon(path, size, transparent=kind == 'transparent')
+            inputs[size, kind] = path
+    return inputs
+
+
+def _peak_rss_mb():
+    # Linuxの ru_maxrss は exec 前（親プロセスからforkした時点）の値を引き継ぐため、
+    # このプロセス自身のピークである VmHWM を優先する
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # macOSではバイト単位、それ以外はKB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_child(name, input_path, output_path):
+    """子プロセス側: 1つの関数を1回実行し、結果をJSONで標準出力に書く"""
+    module_name, _, extra_args, has_output = CASES[name]
+    func = getattr(importlib.import_module(module_name), name)
+    args = (input_path, output_path) + extra_args if has_output else (input_path,)
+    baseline = _peak_rss_mb()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        func(*args)
+        wall_time = time.perf_counter() - start
+    print(json.dumps({'wall_time': wall_time, 'peak_rss_mb': _peak_rss_mb(), 'import_rss_mb': baseline}))
+
+
+def measure(name, input_path, work_dir, size, repeat, timeout):
+    """関数を repeat 回、毎回新しい子プロセスで実行する（最速の時間・最大のRSSを採用）"""
+    output_path = Path(work_dir) / f"out_{name}_{size}.png"
+    runs = []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), '--child', name, str(input_path), str(output_path)],
+            cwd=TOOL_DIR, capture_output=True, text=True, timeout=timeout)
+        if result.returncode != 0:
+            raise RuntimeError(f"{name} ({size}px) が失敗しました:\n{result.stderr.strip()}")
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    wall_time = min(run['wall_time'] for run in runs)
+    return {
+        'function': name,
+        'size': size,
+        'pixels': size * size,
+        'wall_time': round(wall_time, 4),
+        'peak_rss_mb': round(max(run['peak_rss_mb'] for run in runs), 1),
+        'import_rss_mb': round(max(run['import_rss_mb'] for run in runs), 1),
+        'pixels_per_sec': round(size * size / wall_time) if wall_time > 0 else None,
+        'runs': repeat,
+    }
+
+
+def environment():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pillow': Image.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, functions=None, repeat=3, work_dir=None, timeout=None):
+    """
+    ベンチマークを実行する
+
+    Args:
+        sizes: 合成アイコンのサイズ（px）
+        functions: 測る関数名（省略時は CASES の全て）
+        repeat: 各関数を実行する回数
+        work_dir: 合成アイコン・出力の置き場所（省略時は一時ディレクトリ）
+        timeout: 1回の実行のタイムアウト（秒）
+
+    Returns:
+        {'environment': {...}, 'results': [...]}
+    """
+    functions = list(functions or CASES)
+    unknown = [name for name in functions if name not in CASES]
+    if unknown:
+        raise ValueError(f"不明な関数です: {', '.join(unknown)}（{', '.join(CASES)}）")
+
+    with contextlib.ExitStack() as stack:
+        if work_dir is None:
+            work_dir = stack.enter_context(tempfile.TemporaryDirectory(prefix='icon-bench-'))
+        Path(work_dir).mkdir(parents=True, exist_ok=True)
+        print(f"📂 作業ディレクトリ: {work_dir}")
+        inputs = synthetic_inputs(work_dir, sizes)
+
+        results = []
+        print(f"\n   {'関数':<24} {'サイズ':>6} {'時間(秒)':>10} {'RSS(MB)':>9} {'Mpx/秒':>9}")
+        for size in sizes:
+            for name in functions:
+                kind = CASES[name][1]
+                result = measure(name, inputs[size, kind], work_dir, size, repeat, timeout)
+                results.append(result)
+                mpps = (result['pixels_per_sec'] or 0) / 1e6
+                print(f"   {name:<24} {size:>6} {result['wall_time']:>10.3f} "
+                      f"{result['peak_rss_mb']:>9.1f} {mpps:>9.1f}")
+
+    return {'environment': environment(), 'results': results}
+
+
+def compare_results(baseline, current, max_regression, max_rss_regression=None):
+    """
+    基準の結果と比較して表示する
+
+    Args:
+        max_regression: 実行時間がこの割合（%）より増えたら劣化とみなす
+        max_rss_regression: ピークRSSがこの割合（%）より増えたら劣化とみなす（None なら見ない）
+
+    Returns:
+        劣化した項目の説明のリスト
+    """
+    previous = {(r['function'], r['size']): r for r in baseline['results']}
+    regressions = []
+    print(f"\n📊 基準との比較（許容: 時間 +{max_regression}%"
+          + (f" / RSS +{max_rss_regression}%" if max_rss_regression is not None else "") + "）")
+    for result in current['results']:
+        key = (result['function'], result['size'])
+        if key not in previous:
+            print(f"   ➕ {key[0]} {key[1]}px: 基準なし")
+            continue
+        old = previous[key]
+        checks = [('時間', 'wall_time', max_regression)]
+        if max_rss_regression is not None:
+            checks.append(('RSS', 'peak_rss_mb', max_rss_regression))
+        for label, field, limit in checks:
+            change = (result[field] - old[field]) / old[field] * 100 if old[field] else 0
+            failed = change > limit
+            mark = '❌' if failed else '✅'
+            print(f"   {mark} {key[0]} {key[1]}px {label}: {old[field]} → {result[field]} ({change:+.1f}%)")
+            if failed:
+                regressions.append(f"{key[0]} {key[1]}px {label} {change:+.1f}%")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='アイコン処理スクリプトのベンチマーク')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='サイズ（カンマ区切り）')
+    parser.add_argument('--functions', help=f"測る関数（カンマ区切り。{', '.join(CASES)}）")
+    parser.add_argument('--repeat', type=int, default=3, help='各関数の実行回数（最速の時間を採用）')
+    parser.add_argument('--work-dir', help='合成アイコンの置き場所（指定すると再利用する）')
+    parser.add_argument('--timeout', type=float, help='1回の実行のタイムアウト（秒）')
+    parser.add_argument('--output', help='結果のJSONの書き出し先')
+    parser.add_argument('--compare', help='比較する基準の結果（JSON）')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='実行時間の許容増加率（%%）。超えたら終了コード1')
+    parser.add_argument('--max-rss-regression', type=float, help='ピークRSSの許容増加率（%%）')
+    parser.add_argument('--child', nargs=3, metavar=('FUNCTION', 'INPUT', 'OUTPUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        run_child(*args.child)
+        return 0
+
+    sizes = [int(s) for s in args.sizes.split(',')]
+    functions = args.functions.split(',') if args.functions else None
+    report = run_benchmarks(sizes, functions, args.repeat, args.work_dir, args.timeout)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+        print(f"\n💾 結果を保存: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_results(baseline, report, args.max_regression, args.max_rss_regression)
+        if regressions:
+            print(f"❌ 性能が劣化しています: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+        print("✅ 性能劣化なし")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError, RuntimeError, subprocess.TimeoutExpired) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
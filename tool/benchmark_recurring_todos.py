@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+定期TODO生成（cron の execute_recurring_todos()）のベンチマーク
+tool/generate_dataset.py で規模ごとにデータセットを作り、ローカルの Postgres に読み込んで
+execute_recurring_todos() の実行時間を測る（psql を使う）
+
+- スキーマは database/ddl から、生成対象のテーブルと error_logs の CREATE TABLE / INDEX・トリガー、
+  execute_recurring_todos / calculate_next_generation の定義だけを適用する
+  （RLSポリシー・pg_cron・auth スキーマなど Supabase 固有のものは使わない）
+- 関数は NOW() を基準に生成対象を選ぶため、読み込み後に next_generation_at を
+  データセットの基準時刻（--now）との差だけずらしてから測る
+- 1回ごとに BEGIN ... ROLLBACK の中で実行するので、何度でも同じ状態から測れる
+
+対象のデータベースの生成対象のテーブルは削除して作り直すため、--reset を付けたときだけ実行する
+（Supabase のローカル開発用DBではなく、測定用のデータベースを指定すること）
+
+使い方:
+    createdb recurring_bench
+    python tool/benchmark_recurring_todos.py --database-url postgresql://postgres@127.0.0.1/recurring_bench --reset
+    python tool/benchmark_recurring_todos.py --database-url ... --reset --rows 1e5,1e6,1e7 --repeat 5 --json bench.json
+    python tool/benchmark_recurring_todos.py --database-url ... --reset --rows 1e6 --peak-share 0.9 --overdue-share 0.05
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from arg_types import parse_count
+from generate_dataset import TABLES, DatasetConfig, add_config_arguments, config_options, generate, load_order
+from sql_schema import CREATE_INDEX, CREATE_TABLE, DDL_DIR, NAME, relative, split_statements
+
+DEFAULT_ROWS = (10 ** 5, 10 ** 6, 10 ** 7)
+
+# 生成対象のテーブルのほかに作るテーブル（execute_recurring_todos がエラー時に書き込む）
+EXTRA_TABLES = ('error_logs',)
+# 計測する関数とその中から呼ばれる関数
+FUNCTIONS = ('execute_recurring_todos', 'calculate_next_generation')
+
+CREATE_FUNCTION = re.compile(rf"CREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\s+{NAME}\s*\(", re.I)
+CREATE_TRIGGER = re.compile(rf"CREATE\s+(?:OR\s+REPLACE\s+)?TRIGGER\s+\w+\s+.*?\bON\s+{NAME}.*?"
+                            rf"\bEXECUTE\s+(?:FUNCTION|PROCEDURE)\s+{NAME}", re.I | re.S)
+CREATE_EXTENSION = re.compile(r"CREATE\s+EXTENSION\s+(?:IF\s+NOT\s+EXISTS\s+)?\"?([\w-]+)\"?", re.I)
+# Supabase にしかない拡張機能
+SUPABASE_EXTENSIONS = {'pg_cron', 'pg_net', 'pg_graphql', 'supabase_vault'}
+
+# 1回分の計測（BEGIN ... ROLLBACK）。結果は「項目\t値」の行で返す
+MEASURE_SQL = """\
+SET client_min_messages = warning;
+BEGIN;
+SELECT 'due', count(*) FROM recurring_todos WHERE is_active = true AND next_generation_at <= now();
+SELECT 'start', extract(epoch FROM clock_timestamp());
+SELECT execute_recurring_todos();
+SELECT 'end', extract(epoch FROM clock_timestamp());
+SELECT 'generated', count(*) FROM todos WHERE created_at = now();
+SELECT 'assigned', count(*) FROM todo_assignments WHERE assigned_at = now();
+SELECT 'errors', count(*) FROM error_logs WHERE error_type = 'recurring_todo_generation_error' AND created_at = now();
+ROLLBACK;
+"""
+
+
+def benchmark_schema_sql(paths=None):
+    """
+    計測用のスキーマを作るSQL（生成対象のテーブルを削除して作り直す）
+    DDLを順に見て、対象のテーブルの定義・インデックス・トリガーと、計測する関数の最後の定義を取り出す
+    """
+    tables = set(TABLES) | set(EXTRA_TABLES)
+    statements = []
+    triggers = []
+    functions = {}
+    for path in paths or sorted(DDL_DIR.glob('*.sql')):
+        text = Path(path).read_text(encoding='utf-8')
+        for statement, line in split_statements(text):
+            origin = f"-- {relative(path)}:{line}"
+            m = CREATE_EXTENSION.match(statement)
+            if m:
+                if m.group(1).lower() not in SUPABASE_EXTENSIONS:
+                    statements.append(f"{origin}\n{statement};")
+                continue
+            m = CREATE_TABLE.match(statement) or CREATE_INDEX.match(statement)
+            if m:
+                table = (m.group(2) if m.re is CREATE_TABLE else m.group(4)).lower()
+                if table in tables:
+                    statements.append(f"{origin}\n{statement};")
+                continue
+            m = CREATE_TRIGGER.match(statement)
+            if m:
+                if m.group(1).lower() in tables:
+                    triggers.append((m.group(2).lower(), f"{origin}\n{statement};"))
+                continue
+            m = CREATE_FUNCTION.match(statement)
+            if m:
+                functions[m.group(1).lower()] = f"{origin}\n{statement};"
+    missing = [name for name in FUNCTIONS if name not in functions]
+    if missing:
+        raise ValueError(f"DDLに関数の定義がありません: {', '.join(missing)}")
+    trigger_functions = [name for name, _ in triggers if name not in FUNCTIONS]
+    for name in trigger_functions:
+        if name not in functions:
+            raise ValueError(f"DDLにトリガー関数の定義がありません: {name}")
+
+    drop = ', '.join(reversed(list(TABLES) + list(EXTRA_TABLES)))
+    parts = [
+        '-- tool/benchmark_recurring_todos.py が生成した計測用スキーマ',
+        'SET client_min_messages = warning;',
+        f"DROP TABLE IF EXISTS {drop} CASCADE;",
+        *statements,
+        *(functions[name] for name in dict.fromkeys(trigger_functions + list(FUNCTIONS))),
+        *(sql for _, sql in triggers),
+    ]
+    return '\n\n'.join(parts) + '\n'
+
+
+class Psql:
+    """psql の呼び出し（エラーで止め、~/.psqlrc は読まない）"""
+
+    def __init__(self, database_url):
+        self.executable = shutil.which('psql')
+        if not self.executable:
+            raise ValueError("psql が見つかりません（PostgreSQL のクライアントをインストールしてください）")
+        self.database_url = database_url
+
+    def run(self, sql=None, file=None):
+        command = [self.executable, self.database_url, '-X', '-q', '-A', '-t', '-F', '\t', '-v', 'ON_ERROR_STOP=1']
+        command += ['-f', str(file)] if file else ['-c', sql]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise ValueError(f"psql が失敗しました: {result.stderr.strip()}")
+        return result.stdout
+
+    def values(self, sql):
+        """「項目\t値」の行を {項目: 値} にする"""
+        values = {}
+        for line in self.run(sql=sql).splitlines():
+            key, sep, value = line.partition('\t')
+            if sep:
+                values[key] = value
+        return values
+
+    def scalar(self, sql):
+        return self.run(sql=sql).strip()
+
+
+def prepare(psql, schema_sql, manifest, data_dir):
+    """スキーマを作り直してデータを読み込み、next_generation_at を現在時刻に合わせる"""
+    with tempfile.NamedTemporaryFile('w', suffix='.sql', encoding='utf-8', delete=False) as f:
+        f.write(schema_sql)
+    try:
+        psql.run(file=f.name)
+    finally:
+        os.unlink(f.name)
+    psql.run(file=Path(data_dir) / 'load.sql')
+    base = manifest['config']['now']
+    psql.run(sql=f"UPDATE recurring_todos SET next_generation_at = next_generation_at + (now() - '{base}'::timestamptz)")
+    psql.run(sql='VACUUM ANALYZE recurring_todos')
+
+
+def measure(psql, repeat):
+    """execute_recurring_todos() を repeat 回測る → [{seconds, due, generated, assigned, errors}, ...]"""
+    runs = []
+    for _ in range(repeat):
+        values = psql.values(MEASURE_SQL)
+        try:
+            runs.append({
+                'seconds': float(values['end']) - float(values['start']),
+                'due': int(values['due']),
+                'generated': int(values['generated']),
+                'assigned': int(values['assigned']),
+                'errors': int(values['errors']),
+            })
+        except (KeyError, ValueError):
+            raise ValueError(f"計測結果を読み取れません: {values}") from None
+        # ROLLBACK で残った不要な行を片付けて、次の回を同じ条件にする
+        psql.run(sql='VACUUM todos, todo_assignments, recurring_todos, error_logs')
+    return runs
+
+
+def summarize(rows, manifest, runs):
+    seconds = [run['seconds'] for run in runs]
+    due = runs[0]['due']
+    return {
+        'target_rows': rows,
+        'total_rows': manifest['total_rows'],
+        'rows': manifest['rows'],
+        'config': manifest['config'],
+        'due': due,
+        'generated': runs[0]['generated'],
+        'assigned': runs[0]['assigned'],
+        'errors': runs[0]['errors'],
+        'min_seconds': min(seconds),
+        'median_seconds': statistics.median(seconds),
+        'max_seconds': max(seconds),
+        'ms_per_due': statistics.median(seconds) * 1000 / due if due else None,
+        'runs': runs,
+    }
+
+
+def print_result(result):
+    per_due = f"{result['ms_per_due']:.3f}ms/件" if result['ms_per_due'] is not None else '-'
+    print(f"   {result['total_rows']:>12,}行  生成対象 {result['due']:>9,}件  "
+          f"中央値 {result['median_seconds']:>9.3f}s（最小 {result['min_seconds']:.3f}s / "
+          f"最大 {result['max_seconds']:.3f}s）  {per_due}")
+    print(f"   {'':>12}    作成TODO {result['generated']:,}件 / 担当者 {result['assigned']:,}件 / "
+          f"エラー {result['errors']:,}件")
+
+
+def _rows_list(value):
+    return [parse_count(item) for item in value.split(',') if item.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='execute_recurring_todos() のベンチマーク')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'),
+                        help='測定用のデータベース（既定: 環境変数 DATABASE_URL）')
+    parser.add_argument('--reset', action='store_true', help='生成対象のテーブルを削除して作り直すことを許可する')
+    parser.add_argument('--rows', type=_rows_list, default=list(DEFAULT_ROWS),
+                        help='データセットの行数（カンマ区切り。既定: 1e5,1e6,1e7）')
+    parser.add_argument('--repeat', type=int, default=3, help='規模ごとの計測回数')
+    parser.add_argument('--data-dir', help='データセットの出力先（既定: 一時ディレクトリ。指定すると残す）')
+    parser.add_argument('--schema-sql', help='適用するスキーマのSQLを書き出すだけで終了する')
+    parser.add_argument('--json', help='結果をJSONで保存')
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    schema_sql = benchmark_schema_sql()
+    if args.schema_sql:
+        Path(args.schema_sql).write_text(schema_sql, encoding='utf-8')
+        print(f"💾 計測用スキーマ: {args.schema_sql}")
+        return 0
+    if not args.database_url:
+        parser.error('--database-url か環境変数 DATABASE_URL を指定してください')
+    if not args.reset:
+        parser.error(f"対象のデータベースの {', '.join(load_order())} を削除して作り直します。"
+                     "測定用のデータベースであることを確かめて --reset を付けてください")
+    if args.repeat < 1:
+        parser.error('--repeat は1以上にしてください')
+
+    psql = Psql(args.database_url)
+    print(f"🐘 {psql.scalar('SHOW server_version')}")
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for rows in args.rows:
+            data_dir = Path(args.data_dir or temp_dir) / f"rows_{rows}"
+            config = DatasetConfig.for_rows(rows, **config_options(args))
+            print(f"🧪 {rows:,}行: データセットを生成中（ユーザー {config.users:,}人）")
+            manifest = generate(config, data_dir, progress=True)
+            print("   読み込み中...")
+            prepare(psql, schema_sql, manifest, data_dir)
+            print(f"   計測中（{args.repeat}回）...")
+            result = summarize(rows, manifest, measure(psql, args.repeat))
+            print_result(result)
+            results.append(result)
+            if not args.data_dir:
+                shutil.rmtree(data_dir)
+
+    if args.json:
+        report = {'created_at': datetime.now().isoformat(timespec='seconds'),
+                  'server_version': psql.scalar('SHOW server_version'), 'results': results}
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        print(f"💾 {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,384 @@
+"""
+Edge Functions用のコードモッド（一括書き換え）エンジン
+書き換えを Rule（マッチ・置換・追加するimport・適用範囲）として宣言し、
+全Functionのファイルを1回ずつ読み、該当する全ルールをまとめて適用する
+
+- マッチはまず全ルールのアンカー文字列を1回の走査で探し（token_match.KeywordSet）、
+  アンカーが見つかった位置だけを空白を無視したトークン列で比較する
+- 全ルールのマッチは元の内容に対して求め、1回の置換でまとめて反映する
+  （重なったマッチは先に並んだルールを優先する）
+- ファイル単位でプロセスプールに分けて並列に処理する
+- dry_run=True ならファイルを書き換えず、unified diff を返す
+- CodemodManifest を渡すと、前回から「ファイル」も「ルールの集合」も変わっていないファイルは
+  開かずにスキップする（ファイルの更新時刻・サイズ、一致しなければ内容のハッシュで判定）
+"""
+import difflib
+import hashlib
+import inspect
+import json
+import os
+import re
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+
+from icon_cache import atomic_write, bytes_hash
+from token_match import KeywordSet, TokenList, TokenPattern, expand
+
+# プロジェクトルート
+PROJECT_ROOT = Path(__file__).parent.parent
+FUNCTIONS_DIR = PROJECT_ROOT / "supabase" / "functions"
+MANIFEST_PATH = PROJECT_ROOT / "supabase" / ".codemod_manifest.json"
+
+# ルールの集合のバージョンに含めるエンジンのソース
+ENGINE_SOURCES = [Path(__file__), Path(__file__).parent / "token_match.py"]
+
+# 先頭から連続するimport文（import文を追加する位置の目印）
+IMPORT_BLOCK_PATTERN = re.compile(r"(import .+ from .+\n)+")
+
+
+class Scope:
+    """
+    ルールの適用範囲
+
+    Args:
+        functions: 対象のFunction名（globパターン）。既定では _shared など '_' で始まるものを除く全て
+        exclude: 除外するFunction名（globパターン）
+        files: Functionディレクトリ内の対象ファイル（globパターン）
+    """
+
+    def __init__(self, functions=('[!_]*',), exclude=(), files=('index.ts',)):
+        self.functions = tuple(functions)
+        self.exclude = tuple(exclude)
+        self.files = tuple(files)
+
+    def matches_function(self, function_name):
+        return (any(fnmatch(function_name, p) for p in self.functions)
+                and not any(fnmatch(function_name, p) for p in self.exclude))
+
+    def matches(self, function_name, file_name):
+        return self.matches_function(function_name) and any(fnmatch(file_name, p) for p in self.files)
+
+
+class Rule:
+    """
+    1つの書き換えルール
+
+    Args:
+        name: ルール名（--rule での指定・結果表示に使う）
+        match: マッチさせるコード片（TokenPattern に変換。空白の違いは無視する）、
+               TokenPattern、またはコンパイル済みの正規表現
+        replacement: 置換文字列、または置換文字列を返す関数
+                     （コード片なら {プレースホルダ: トークン}、正規表現ならマッチオブジェクトを受け取る。
+                      並列処理のため、関数はモジュールのトップレベルに定義する）
+        imports: ルールが適用されたファイルに追加するimport文（既にあれば追加しない）
+        scope: 適用範囲（省略時は全Functionの index.ts）
+        anchors: このうちどれかを含むファイルだけを調べる（コード片なら省略可。
+                 正規表現で省略すると全ファイルを調べる）
+        description: 説明
+    """
+
+    def __init__(self, name, match, replacement, imports=(), scope=None, anchors=None, description=''):
+        self.name = name
+        self.match = TokenPattern(match) if isinstance(match, str) else match
+        self.replacement = replacement
+        self.imports = list(imports)
+        self.scope = scope or Scope()
+        if anchors is None and isinstance(self.match, TokenPattern):
+            anchors = [self.match.anchor]
+        self.anchors = list(anchors or [])
+        self.description = description
+
+    def fingerprint(self):
+        """ルールの定義を表す値（置換関数はソースコードで表す）"""
+        if isinstance(self.match, TokenPattern):
+            match = ['tokens', self.match.snippet, self.match.anchor]
+        else:
+            match = ['regex', self.match.pattern, self.match.flags]
+        replacement = inspect.getsource(self.replacement) if callable(self.replacement) else self.replacement
+        scope = [self.scope.functions, self.scope.exclude, self.scope.files]
+        return [self.name, match, replacement, self.imports, scope, self.anchors]
+
+    def edits(self, content, tokens, hits):
+        """
+        置換箇所を (開始位置, 終了位置, 置換後の文字列) のリストで返す
+
+        Args:
+            content: ファイルの内容
+            tokens: TokenList を返す関数（トークン化はファイルごとに1回だけ行う）
+            hits: KeywordSet.find の結果
+        """
+        if isinstance(self.match, TokenPattern):
+            found = self.match.find(tokens(), hits.get(self.match.anchor, []))
+            return [(start, end, expand(self.replacement, captures)) for start, end, captures in found]
+        return [(m.start(), m.end(), self.replacement(m) if callable(self.replacement) else m.expand(self.replacement))
+                for m in self.match.finditer(content)]
+
+
+class FileResult:
+    """1ファイル分の処理結果"""
+
+    def __init__(self, function_name, path, original=None, content=None, applied=None, error=None,
+                 skipped=False):
+        self.function_name = function_name
+        self.path = path
+        self.original = original
+        self.content = content
+        # {ルール名: 置換した箇所の数}
+        self.applied = applied or {}
+        self.error = error
+        # マニフェストにより開かずにスキップした
+        self.skipped = skipped
+
+    @property
+    def changed(self):
+        return self.error is None and not self.skipped and self.content != self.original
+
+    def diff(self):
+        """変更内容の unified diff"""
+        relative = os.path.relpath(self.path, PROJECT_ROOT)
+        return ''.join(difflib.unified_diff(
+            self.original.splitlines(keepends=True), self.content.splitlines(keepends=True),
+            fromfile=f"a/{relative}", tofile=f"b/{relative}"))
+
+
+def inject_imports(content, imports):
+    """足りないimport文を先頭のimport文のまとまりの直後（なければファイル先頭）に追加する"""
+    missing = [line for line in imports if line not in content]
+    if not missing:
+        return content
+    addition = ''.join(line + "\n" for line in missing)
+    import_match = IMPORT_BLOCK_PATTERN.search(content)
+    position = import_match.end() if import_match else 0
+    return content[:position] + addition + content[position:]
+
+
+class RuleSet:
+    """ルールの集合（全ルールのアンカーを1つの KeywordSet にまとめる）"""
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.keywords = KeywordSet(anchor for rule in self.rules for anchor in rule.anchors)
+        # アンカー → そのアンカーを持つルールの番号（アンカーが出現しないルールは範囲の判定もしない）
+        self.by_anchor = {}
+        for i, rule in enumerate(self.rules):
+            for anchor in rule.anchors:
+                self.by_anchor.setdefault(anchor, set()).add(i)
+        self.unanchored = {i for i, rule in enumerate(self.rules) if not rule.anchors}
+        self._version = None
+
+    @property
+    def version(self):
+        """ルールの定義とエンジンのソースから求めたバージョン（変われば全ファイルを処理し直す）"""
+        if self._version is None:
+            digest = hashlib.sha256()
+            digest.update(json.dumps([rule.fingerprint() for rule in self.rules],
+                                     ensure_ascii=False, default=str).encode('utf-8'))
+            for path in ENGINE_SOURCES:
+                digest.update(path.read_bytes())
+            self._version = digest.hexdigest()[:16]
+        return self._version
+
+    def apply(self, content, function_name, file_name):
+        """
+        ファイルの内容に範囲内の全ルールを適用する
+
+        Returns:
+            (書き換え後の内容, {ルール名: 置換した箇所の数})
+        """
+        hits = self.keywords.find(content)
+        candidates = set(self.unanchored)
+        for anchor in hits:
+            candidates |= self.by_anchor[anchor]
+        rules = [self.rules[i] for i in sorted(candidates)
+                 if self.rules[i].scope.matches(function_name, file_name)]
+        if not rules:
+            return content, {}
+        token_cache = []
+
+        def tokens():
+            if not token_cache:
+                token_cache.append(TokenList(content))
+            return token_cache[0]
+
+        accepted = []
+        applied = {}
+        imports = []
+        for rule in rules:
+            count = 0
+            for edit in rule.edits(content, tokens, hits):
+                if any(edit[0] < end and start < edit[1] for start, end, _ in accepted):
+                    continue
+                accepted.append(edit)
+                count += 1
+            if count:
+                applied[rule.name] = count
+                imports.extend(line for line in rule.imports if line not in imports)
+
+        if accepted:
+            pieces = []
+            position = 0
+            for start, end, text in sorted(accepted):
+                pieces.append(content[position:start])
+                pieces.append(text)
+                position = end
+            pieces.append(content[position:])
+            content = ''.join(pieces)
+        if imports:
+            content = inject_imports(content, imports)
+        return content, applied
+
+
+def apply_rules(content, function_name, file_name, rules):
+    """
+    ファイルの内容に範囲内の全ルールを適用する
+
+    Returns:
+        (書き換え後の内容, {ルール名: 置換した箇所の数})
+    """
+    rule_set = rules if isinstance(rules, RuleSet) else RuleSet(rules)
+    return rule_set.apply(content, function_name, file_name)
+
+
+def process_file(task):
+    """1ファイルを処理する（ワーカープロセスで実行）"""
+    function_name, path, rule_set, dry_run = task
+    try:
+        original = Path(path).read_text(encoding='utf-8')
+        content, applied = rule_set.apply(original, function_name, Path(path).name)
+        if content != original and not dry_run:
+            Path(path).write_text(content, encoding='utf-8')
+        return FileResult(function_name, path, original, content, applied)
+    except (OSError, UnicodeDecodeError, re.error) as e:
+        return FileResult(function_name, path, error=str(e))
+
+
+class CodemodManifest:
+    """
+    ファイルごとの前回の結果（更新時刻・サイズ・内容のハッシュ・ルールの集合のバージョン）
+
+    記録するのは「ルールを適用しても変更のない状態」になったファイルだけ
+    （--dry-run で変更が見つかったファイルやエラーのファイルは毎回処理する）
+    """
+
+    def __init__(self, path=MANIFEST_PATH):
+        self.path = Path(path)
+        self.files = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == 1:
+                self.files = data['files']
+
+    def _key(self, path):
+        return os.path.relpath(path, PROJECT_ROOT)
+
+    def is_fresh(self, path, rules_version, stat=None):
+        """前回の結果が使えるなら True（更新時刻・サイズが一致すればファイルは開かない）"""
+        entry = self.files.get(self._key(path))
+        if entry is None or entry['rules'] != rules_version:
+            return False
+        stat = stat or os.stat(path)
+        if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return True
+        # 更新時刻だけ変わった（チェックアウトし直した等）場合は内容で判定する
+        if entry['size'] != stat.st_size or entry['sha256'] != bytes_hash(Path(path).read_bytes()):
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    def record(self, path, rules_version):
+        """ルールを適用しても変更のない状態のファイルとして記録する"""
+        digest = bytes_hash(Path(path).read_bytes())
+        stat = os.stat(path)
+        self.files[self._key(path)] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'rules': rules_version,
+        }
+
+    def forget(self, path):
+        self.files.pop(self._key(path), None)
+
+    def save(self):
+        atomic_write(self.path, (json.dumps({'version': 1, 'files': self.files}, indent=2, sort_keys=True,
+                                            ensure_ascii=False) + "\n").encode('utf-8'))
+
+
+def changed_functions(rev, functions_dir=FUNCTIONS_DIR):
+    """git の rev 以降に変更された（未コミット・未追跡を含む）ファイルがあるFunction名"""
+    functions_dir = Path(functions_dir).resolve()
+    commands = [
+        ['git', 'diff', '--name-only', '--relative', rev, '--', '.'],
+        ['git', 'ls-files', '--others', '--exclude-standard', '--', '.'],
+    ]
+    names = set()
+    for command in commands:
+        result = subprocess.run(command, cwd=functions_dir, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise ValueError(f"git コマンドが失敗しました: {' '.join(command)}\n{result.stderr.strip()}")
+        names.update(line.split('/', 1)[0] for line in result.stdout.splitlines() if '/' in line)
+    return sorted(names)
+
+
+def list_functions(functions_dir=FUNCTIONS_DIR):
+    """Functionのディレクトリ名（_shared も含む）"""
+    return sorted(d.name for d in Path(functions_dir).iterdir() if d.is_dir())
+
+
+def collect_targets(rules, functions_dir=FUNCTIONS_DIR, functions=None):
+    """いずれかのルールの範囲に入るファイルを (Function名, パス) で列挙する"""
+    targets = []
+    for function_name in functions or list_functions(functions_dir):
+        directory = Path(functions_dir) / function_name
+        if not directory.is_dir():
+            continue
+        for path in sorted(p for p in directory.iterdir() if p.is_file()):
+            if any(rule.scope.matches(function_name, path.name) for rule in rules):
+                targets.append((function_name, str(path)))
+    return targets
+
+
+def run_codemod(rules, functions_dir=FUNCTIONS_DIR, functions=None, dry_run=False, workers=None,
+                manifest=None):
+    """
+    ルールを全対象ファイルに適用する
+
+    Args:
+        rules: Rule のリスト（この順に適用する）
+        functions_dir: supabase/functions
+        functions: 対象のFunction名（省略時は全て。各ルールの範囲でさらに絞られる）
+        dry_run: True ならファイルを書き換えない
+        workers: プロセス数（1ならプロセスプールを使わずに処理する）
+        manifest: CodemodManifest。前回から変わっていないファイルをスキップし、結果を記録する
+                  （保存は呼び出し側で manifest.save() する）
+
+    Returns:
+        FileResult のリスト（対象ファイルの順。スキップしたファイルは skipped=True）
+    """
+    rule_set = RuleSet(rules)
+    targets = collect_targets(rules, functions_dir, functions)
+    results = {}
+    tasks = []
+    for name, path in targets:
+        if manifest is not None and manifest.is_fresh(path, rule_set.version):
+            results[path] = FileResult(name, path, skipped=True)
+        else:
+            tasks.append((name, path, rule_set, dry_run))
+
+    if workers == 1 or len(tasks) <= 1:
+        processed = [process_file(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            processed = list(executor.map(process_file, tasks, chunksize=4))
+
+    for result in processed:
+        results[result.path] = result
+        if manifest is None:
+            continue
+        if result.error or (dry_run and result.changed):
+            manifest.forget(result.path)
+        else:
+            manifest.record(result.path, rule_set.version)
+    return [results[path] for _, path in targets]
@@ -0,0 +1,830 @@
+#!/usr/bin/env python3
+"""
+Edge Functionsの select の過剰取得の検出
+supabase-js のクエリ（.from(...).select(...)）が返す列を database/ddl・database/migrations のスキーマから求め、
+同じ index.ts の中で結果の行から実際に読んでいるプロパティと突き合わせる
+
+- select('*') / select() は全列、埋め込み（alias:table(...) / 外部キー列(...)）は埋め込み先の列として数える
+- 結果の行の追跡: 分割代入（{ data: rows }）→ for...of / map / filter / find などのコールバックの引数 →
+  row.col / row['col'] / 分割代入 / 埋め込みの中（row.users.display_name）
+- 行をそのまま応答・関数の引数・スプレッド（...row）に渡している場合は、全列を使っているものとして扱う
+  （クライアントが読む列は分からないため。宣言した応答の型にない列は参考として表示する）
+- スキーマのテーブルにない列はエラーとして報告し、バイト数の見積もり・絞り込んだ select からは除く
+  （PostgREST はクエリ全体をエラーにするため）
+- 読んでいない列は1行あたりのバイト数（Postgres の列の大きさ・JSONでの大きさ）を列の型から見積もる
+- 読んでいる列だけに絞り込む select の書き換えを codemod.py の Rule として提示する（--fix）
+
+使い方:
+    python tool/detect_overfetch.py                                # 全Functionを検査
+    python tool/detect_overfetch.py get-quick-actions check-app-status -v
+    python tool/detect_overfetch.py --json overfetch.json
+    python tool/detect_overfetch.py --fix --dry-run                # 書き換えの差分を表示
+    python tool/detect_overfetch.py --fix --dry-run --patch narrow_selects.diff
+    python tool/detect_overfetch.py --fix get-group-members        # select を書き換える
+
+終了コード: 0 = 過剰取得なし / 1 = 過剰取得・スキーマにない列あり（--fix では update_edge_functions.py と同じ）
+"""
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from advise_indexes import QUERY_METHODS
+from codemod import FUNCTIONS_DIR, Rule, Scope, list_functions, run_codemod
+from sql_schema import Schema, relative, schema_files
+from ts_source import Source, is_identifier
+
+# 列の型 → (Postgres での1行あたりのバイト数, JSONでの値のバイト数)
+TYPE_BYTES = {
+    'uuid': (16, 38), 'text': (24, 26), 'varchar': (24, 26), 'timestamptz': (8, 34),
+    'timestamp with time zone': (8, 34), 'timestamp': (8, 28), 'date': (4, 12), 'time': (8, 10),
+    'boolean': (1, 5), 'integer': (4, 4), 'bigint': (8, 8), 'smallint': (2, 2), 'jsonb': (64, 64),
+    'integer[]': (32, 12), 'uuid[]': (48, 80),
+}
+DEFAULT_TYPE_BYTES = (16, 20)
+
+# コールバックで要素を受け取る配列メソッド（要素を受け取る引数の位置）
+CALLBACK_METHODS = {
+    'map': (0,), 'flatMap': (0,), 'forEach': (0,), 'filter': (0,), 'find': (0,), 'findLast': (0,),
+    'findIndex': (0,), 'some': (0,), 'every': (0,), 'sort': (0, 1), 'toSorted': (0, 1), 'reduce': (1,),
+}
+# 元の行（の一部）を返す配列メソッド
+ROW_METHODS = {'filter', 'find', 'findLast', 'sort', 'toSorted', 'slice', 'reverse', 'at'}
+# 行の列を読まないプロパティ・メソッド
+NEUTRAL_MEMBERS = {'length', 'includes', 'indexOf'}
+# 値の真偽・比較だけに使う演算子
+CONDITION_OPERATORS = {'&&', '?', '===', '!==', '==', '!='}
+
+# select の項目（alias:column::type / alias:table!hint(...)）
+SELECT_COLUMN = re.compile(r"(?:(\w+)\s*:\s*)?(\w+)(?:\s*::\s*\w+)?$")
+SELECT_EMBED = re.compile(r"(?:(\w+)\s*:\s*)?(\w+)((?:\s*!\s*\w+)*)\s*\(", re.S)
+
+
+def column_bytes(column):
+    """列の (Postgres のバイト数, JSONのバイト数)（JSONはキー名・引用符・区切りを含む）"""
+    type_name = ' '.join(column.type_name.lower().split()) if column else ''
+    db, payload = TYPE_BYTES.get(re.sub(r"\(.*\)", '', type_name), DEFAULT_TYPE_BYTES)
+    return db, payload + len(column.name if column else '') + 4
+
+
+# ===================================
+# select の解析
+# ===================================
+
+class SelectItem:
+    """
+    select の1項目
+
+    Args:
+        kind: 'star' / 'column' / 'embed' / 'other'（キャスト以外の式・JSONパスなど）
+        key: 結果の行のプロパティ名（別名があれば別名）
+        name: 列名・埋め込みの名前
+        start, end: select の文字列の中の位置
+        inner: 埋め込みの括弧の中の位置 (開始, 終了)
+    """
+
+    def __init__(self, kind, key, name, start, end, hints='', inner=None, items=None):
+        self.kind = kind
+        self.key = key
+        self.name = name
+        self.start = start
+        self.end = end
+        self.hints = hints
+        self.inner = inner
+        self.items = items or []
+
+    @property
+    def is_inner_join(self):
+        """!inner の埋め込み（親の行の絞り込みを兼ねるため外せない）"""
+        return 'inner' in re.findall(r"\w+", self.hints)
+
+
+def _split_select(text, start, end):
+    """text[start:end] を括弧の外のカンマで分け、前後の空白を除いた (開始, 終了) を返す"""
+    parts = []
+    depth = 0
+    begin = start
+    for i in range(start, end + 1):
+        char = text[i] if i < end else ','
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            piece = text[begin:i]
+            if piece.strip():
+                left = begin + len(piece) - len(piece.lstrip())
+                parts.append((left, left + len(piece.strip())))
+            begin = i + 1
+    return parts
+
+
+def parse_select(text, start=0, end=None):
+    """select の文字列 → SelectItem のリスト"""
+    end = len(text) if end is None else end
+    items = []
+    for item_start, item_end in _split_select(text, start, end):
+        item = text[item_start:item_end]
+        embed = SELECT_EMBED.match(item)
+        if item == '*':
+            items.append(SelectItem('star', None, None, item_start, item_end))
+        elif embed and item.endswith(')'):
+            alias, name, hints = embed.group(1), embed.group(2), embed.group(3)
+            inner = (item_start + embed.end(), item_end - 1)
+            items.append(SelectItem('embed', alias or name, name, item_start, item_end, hints, inner,
+                                    parse_select(text, *inner)))
+        else:
+            column = SELECT_COLUMN.match(item)
+            if column:
+                items.append(SelectItem('column', column.group(1) or column.group(2), column.group(2),
+                                        item_start, item_end))
+            else:
+                items.append(SelectItem('other', None, None, item_start, item_end))
+    return items
+
+
+class SelectNode:
+    """select（または埋め込み）が返す行の形（テーブル・列・埋め込み）"""
+
+    def __init__(self, table, items, schema):
+        self.table = schema.tables.get(table) if table else None
+        self.table_name = table
+        self.items = items
+        self.children = {}
+        for item in items:
+            if item.kind == 'embed':
+                self.children[item.key] = SelectNode(self._embed_table(item, schema), item.items, schema)
+
+    def _embed_table(self, item, schema):
+        """埋め込み先のテーブル（テーブル名、または外部キーの列名 users:user_id(...)）"""
+        if item.name in schema.tables:
+            return item.name
+        column = self.table.columns.get(item.name) if self.table else None
+        if column and column.references:
+            return column.references[0]
+        hints = re.findall(r"\w+", item.hints)
+        for hint in hints:
+            if hint in schema.tables:
+                return hint
+        return None
+
+    def is_unknown(self, item):
+        """テーブルが分かっているのに、その列がスキーマにない項目"""
+        return item.kind == 'column' and self.table is not None and item.name not in self.table.columns
+
+    def columns(self):
+        """{プロパティ名: (列名, Column または None)}（スキーマにない列は除く）"""
+        columns = {}
+        for item in self.items:
+            if item.kind == 'star' and self.table:
+                for name, column in self.table.columns.items():
+                    columns.setdefault(name, (name, column))
+            elif item.kind == 'column' and not self.is_unknown(item):
+                column = self.table.columns.get(item.name) if self.table else None
+                columns[item.key] = (item.name, column)
+        return columns
+
+    def unknown_columns(self, prefix=''):
+        """スキーマにない列 [(select の中のパス, テーブル名), ...]（埋め込みの中も含む）"""
+        unknown = []
+        for item in self.items:
+            if self.is_unknown(item):
+                unknown.append((prefix + item.name, self.table_name))
+            elif item.kind == 'embed':
+                unknown += self.children[item.key].unknown_columns(f"{prefix}{item.key}.")
+        return unknown
+
+    @property
+    def has_star(self):
+        return any(item.kind == 'star' for item in self.items)
+
+
+# ===================================
+# 結果の行の使われ方
+# ===================================
+
+class Usage:
+    """1つの select（または埋め込み）の行から読んだプロパティ"""
+
+    def __init__(self):
+        self.keys = set()
+        self.children = {}
+        # 行をそのまま渡している箇所 [(行番号, 説明), ...]（1つでもあれば全列を使っているものとする）
+        self.escapes = []
+        # 行を展開した先の宣言の型のプロパティ
+        self.declared = {}
+
+    def child(self, key):
+        if key not in self.children:
+            self.children[key] = Usage()
+        return self.children[key]
+
+    def escape(self, line, reason):
+        if (line, reason) not in self.escapes:
+            self.escapes.append((line, reason))
+
+
+class SelectFinding:
+    """1つの select の検査結果"""
+
+    def __init__(self, function_name, path, line, table, select, single):
+        self.function_name = function_name
+        self.path = path
+        self.line = line
+        self.table = table
+        self.select = select
+        self.single = single
+        # [(プロパティのパス, Column または None), ...]
+        self.unused = []
+        # スキーマにない列 [(パス, テーブル名), ...]
+        self.unknown = []
+        self.returned = 0
+        self.escapes = []
+        self.undeclared = {}
+        self.untracked = None
+        self.narrowed = None
+        self.rule = None
+
+    @property
+    def db_bytes(self):
+        return sum(column_bytes(column)[0] for _, column in self.unused)
+
+    @property
+    def json_bytes(self):
+        return sum(column_bytes(column)[1] for _, column in self.unused)
+
+    def location(self):
+        return f"{relative(self.path)}:{self.line}"
+
+    def to_dict(self):
+        return {
+            'function': self.function_name, 'location': self.location(), 'table': self.table,
+            'select': self.select, 'single': self.single, 'returned_columns': self.returned,
+            'unused_columns': [name for name, _ in self.unused],
+            'unknown_columns': [name for name, _ in self.unknown],
+            'unused_bytes_per_row': {'postgres': self.db_bytes, 'json': self.json_bytes},
+            'escapes': [{'line': line, 'reason': reason} for line, reason in self.escapes],
+            'undeclared_columns': self.undeclared, 'untracked': self.untracked, 'narrowed_select': self.narrowed,
+        }
+
+
+class OverfetchAnalyzer:
+    """1ファイルの select と、その結果の行の使われ方"""
+
+    def __init__(self, function_name, path, text, schema):
+        self.function_name = function_name
+        self.path = path
+        self.text = text
+        self.schema = schema
+        self.source = Source(text)
+        self.interfaces = self._interfaces()
+        self.findings = []
+
+    # --- 宣言 ---
+
+    def _interfaces(self):
+        """{interface名: [プロパティ名]}（入れ子の型の中のプロパティは除く）"""
+        s = self.source
+        interfaces = {}
+        for i, token in enumerate(s.texts[:-2]):
+            if token != 'interface' or not is_identifier(s.texts[i + 1]):
+                continue
+            k = i + 2
+            while k < len(s) and s.texts[k] != '{':
+                k += 1
+            if k not in s.match:
+                continue
+            fields = []
+            for j in range(k + 1, s.match[k]):
+                if s.parent[j] != k or not is_identifier(s.texts[j]):
+                    continue
+                if s.texts[j + 1] == ':' or (s.texts[j + 1] == '?' and s.texts[j + 2] == ':'):
+                    fields.append(s.texts[j])
+            interfaces[s.texts[i + 1]] = fields
+        return interfaces
+
+    def _declared_type(self, i):
+        """展開（...row）のトークン i を含む宣言（const name: Type = ...）の型の interface のプロパティ"""
+        s = self.source
+        # 宣言の値のオブジェクト（= { ...row } / => ({ ...row })）の直下の展開だけを見る
+        opener = s.parent[i]
+        if opener is None or s.texts[opener] != '{' or not (
+                s.texts[opener - 1] == '=' or s.texts[opener - 2:opener] == ['=>', '(']):
+            return None, None
+        statement = s.statement_at(i)
+        if not statement:
+            return None, None
+        start, end = statement
+        if s.texts[start] not in ('const', 'let', 'var') or start + 3 > end or s.texts[start + 2] != ':':
+            return None, None
+        k = start + 3
+        while k <= end and s.texts[k] != '=':
+            if s.texts[k] in self.interfaces:
+                return s.texts[k], self.interfaces[s.texts[k]]
+            k += 1
+        return None, None
+
+    # --- クエリ ---
+
+    def analyze(self):
+        s = self.source
+        for i, token in enumerate(s.texts):
+            if (token != 'from' or i < 2 or s.texts[i - 1] not in ('.', '?.') or i + 1 >= len(s)
+                    or s.texts[i + 1] != '(' or i + 1 not in s.match or s.texts[i - 2] == 'storage'):
+                continue
+            arguments = s.call_arguments(i + 1)
+            if len(arguments) != 1 or arguments[0][0] != arguments[0][1] or s.texts[arguments[0][0]][:1] not in "'\"":
+                continue
+            finding = self._query(i, s.texts[arguments[0][0]][1:-1])
+            if finding:
+                self.findings.append(finding)
+        return self.findings
+
+    def _chain(self, i):
+        """.from( から続くメソッドの連鎖 → (select の ( の位置, 1件取得か, head指定か, 連鎖の最後)"""
+        s = self.source
+        j = s.match[i + 1] + 1
+        select = None
+        single = head = False
+        while (j + 2 < len(s) and s.texts[j] in ('.', '?.') and s.texts[j + 1] in QUERY_METHODS
+               and s.texts[j + 2] == '(' and j + 2 in s.match):
+            method = s.texts[j + 1]
+            if method == 'select':
+                select = j + 2
+                arguments = s.call_arguments(j + 2)
+                head = len(arguments) > 1 and bool(re.search(r"\bhead\s*:\s*true", s.source(*arguments[1])))
+            elif method in ('single', 'maybeSingle'):
+                single = True
+            j = s.match[j + 2] + 1
+        return select, single, head, j - 1
+
+    def _query(self, i, table):
+        s = self.source
+        select, single, head, chain_end = self._chain(i)
+        if select is None or head:
+            return None
+        arguments = s.call_arguments(select)
+        if not arguments:
+            text, literal = '*', None
+        else:
+            literal = arguments[0][0]
+            token = s.texts[literal]
+            if arguments[0][0] != arguments[0][1] or token[:1] not in "'\"`" or '${' in token:
+                return None
+            text = token[1:-1]
+        node = SelectNode(table, parse_select(text), self.schema)
+        finding = SelectFinding(self.function_name, self.path, s.line(i), table, ' '.join(text.split()), single)
+        finding.unknown = node.unknown_columns()
+        usage = Usage()
+        if not self._bind_result(i, chain_end, usage):
+            finding.untracked = 'クエリの結果の使われ方を追跡できません'
+            return finding
+        self._evaluate(node, usage, finding, '')
+        if finding.unused:
+            narrowed = self._narrow(text, node, usage)
+            if narrowed == text:
+                # 行があるかどうかだけを見る select('id') など、これ以上絞れない
+                finding.unused = []
+            elif narrowed is not None:
+                finding.narrowed = ' '.join(narrowed.split())
+                finding.rule = self._rule(i, select, literal, narrowed)
+        return finding
+
+    # --- 結果の変数 ---
+
+    def _bind_result(self, i, chain_end, usage):
+        """クエリの結果（{ data } の分割代入・結果の変数）を usage に結び付ける。追跡できなければ False"""
+        s = self.source
+        k = i - 2
+        while k > 0 and s.texts[k - 1] in ('.', '?.'):
+            k -= 2
+        if k > 0 and s.texts[k - 1] == 'await':
+            k -= 1
+        body = s.function_at(i)
+        limit = body[1] if body else len(s)
+        if k < 2 or s.texts[k - 1] != '=':
+            # 結果を使わない（insert(...).select() のエラーだけを見るなど）
+            return s.texts[k - 1] in ('{', ';') or s.newline_between(k - 1, k) if k > 0 else True
+        target = k - 2
+        if s.texts[target] == '}' and target in s.match:
+            return self._bind_destructured(s.match[target], target, chain_end, limit, usage)
+        if not is_identifier(s.texts[target]) or s.texts[target - 1] not in ('const', 'let', 'var'):
+            return False
+        name = s.texts[target]
+        if s.texts[k] == 'await':
+            # const result = await ...（result.data が行）
+            for j in self._references(name, chain_end + 1, limit):
+                if j + 2 < len(s) and s.texts[j + 1] in ('.', '?.') and s.texts[j + 2] == 'data':
+                    self._use(j, j + 2, usage)
+                elif j + 2 < len(s) and s.texts[j + 1] in ('.', '?.'):
+                    continue
+                else:
+                    usage.escape(s.line(j), f"クエリの結果 {name} を渡している")
+            return True
+        # let query = client.from(...) を後で await する
+        bound = False
+        for j in self._references(name, chain_end + 1, limit):
+            if s.texts[j - 1] == 'await' and s.texts[j - 2] == '=' and s.texts[j - 3] == '}' and j - 3 in s.match:
+                bound |= self._bind_destructured(s.match[j - 3], j - 3, j, limit, usage)
+        return bound
+
+    def _bind_destructured(self, opener, closer, after, limit, usage):
+        """{ data: rows, error } = ... の rows を usage に結び付ける"""
+        s = self.source
+        for j in range(opener + 1, closer):
+            if s.parent[j] != opener or s.texts[j] != 'data':
+                continue
+            if s.texts[j + 1] == ':' and is_identifier(s.texts[j + 2]):
+                self._bind(s.texts[j + 2], after + 1, limit, usage)
+            elif s.texts[j + 1] in (',', '}'):
+                self._bind('data', after + 1, limit, usage)
+            else:
+                return False
+        return True
+
+    def _references(self, name, start, end):
+        s = self.source
+        for j in range(start, min(end + 1, len(s))):
+            if s.texts[j] != name or (j > 0 and s.texts[j - 1] in ('.', '?.')):
+                continue
+            # オブジェクトリテラルのキー（{ name: ... }）
+            if j + 1 < len(s) and s.texts[j + 1] == ':' and s.parent[j] is not None \
+                    and s.texts[s.parent[j]] == '{' and s.texts[j - 1] in ('{', ','):
+                continue
+            yield j
+
+    def _bind(self, name, start, end, usage):
+        for j in self._references(name, start, end):
+            self._use(j, j, usage)
+
+    def _bind_pattern(self, start, end, scope, usage):
+        """宣言・引数のパターン（識別子 / { a, b: c }）を usage に結び付ける"""
+        s = self.source
+        if is_identifier(s.texts[start]):
+            self._bind(s.texts[start], start + 1, scope[1], usage)
+        elif s.texts[start] == '{' and start in s.match:
+            self._destructure(start, usage)
+        else:
+            usage.escape(s.line(start), '行を分割代入している')
+
+    def _destructure(self, opener, usage):
+        s = self.source
+        for j in range(opener + 1, s.match[opener]):
+            if s.parent[j] != opener:
+                continue
+            if s.texts[j] == '...':
+                usage.escape(s.line(j), '残りのプロパティを ... で受け取っている')
+            elif is_identifier(s.texts[j]) and s.texts[j - 1] in ('{', ','):
+                usage.keys.add(s.texts[j])
+                if s.texts[j + 1] == ':' and s.texts[j + 2] == '{':
+                    usage.child(s.texts[j]).escape(s.line(j), '入れ子の分割代入')
+
+    # --- 値の使われ方 ---
+
+    def _use(self, start, end, usage, depth=0):
+        """トークン start〜end の式の値が usage の行（または行の配列）であるとき、その使われ方を記録する"""
+        s = self.source
+        line = s.line(start)
+        if depth > 30:
+            usage.escape(line, '追跡が深すぎる')
+            return
+        k = end + 1
+        # 非nullアサーション（rows!.map）
+        while k < len(s) and s.texts[k] == '!' and not s.newline_between(k - 1, k):
+            k += 1
+        token = s.texts[k] if k < len(s) else ''
+        if token in ('.', '?.') and k + 1 < len(s):
+            member = s.texts[k + 1]
+            if k + 2 < len(s) and s.texts[k + 2] == '(' and (member in CALLBACK_METHODS or member in ROW_METHODS):
+                self._array_method(start, member, k + 2, usage, depth)
+            elif member not in NEUTRAL_MEMBERS:
+                usage.keys.add(member)
+                self._use(start, k + 1, usage.child(member), depth + 1)
+            return
+        if token == '[' and k in s.match:
+            close = s.match[k]
+            key = s.texts[k + 1] if close == k + 2 else ''
+            if key[:1] in ("'", '"'):
+                usage.keys.add(key[1:-1])
+                self._use(start, close, usage.child(key[1:-1]), depth + 1)
+            else:
+                # rows[0] は同じ形の行
+                self._use(start, close, usage, depth + 1)
+            return
+
+        previous = s.texts[start - 1] if start > 0 else ''
+        opener = s.parent[start]
+        grouped = (opener is not None and s.texts[opener] == '(' and opener + 1 == start
+                   and not (opener > 0 and (is_identifier(s.texts[opener - 1])
+                                            or s.texts[opener - 1] in (')', ']', 'if', 'while'))))
+        if token in ('||', '??') and s.texts[k + 1:k + 3] == ['[', ']']:
+            # rows || [] は同じ行の配列
+            if grouped and s.match.get(opener) == k + 3:
+                self._use(opener, k + 3, usage, depth + 1)
+            else:
+                self._use(start, k + 2, usage, depth + 1)
+            return
+        if token == 'as':
+            # (row as any).col / const group = member.groups as any
+            if grouped:
+                self._use(opener, s.match[opener], usage, depth + 1)
+            elif k + 1 < len(s) and is_identifier(s.texts[k + 1]):
+                self._use(start, k + 1, usage, depth + 1)
+            else:
+                usage.escape(line, f"{s.source(start, end)} を型を変換して渡している")
+            return
+        if grouped and s.match.get(opener) == k:
+            self._use(opener, k, usage, depth + 1)
+            return
+        if (opener is not None and opener + 1 == start and s.match.get(opener) == k
+                and opener > 0 and s.texts[opener - 1] in ('if', 'while')):
+            # if (row) は行があるかどうかだけを見ている
+            return
+
+        if previous == '...':
+            usage.escape(line, f"...{s.source(start, end)} で展開している")
+            name, fields = self._declared_type(start - 1)
+            if name:
+                usage.declared[name] = fields
+            return
+        if previous == 'of' and opener is not None and s.match.get(opener) == k and s.texts[opener - 1] == 'for':
+            self._for_of(opener, start - 2, usage)
+            return
+        if previous == '=' and start >= 3 and s.texts[start - 3] in ('const', 'let', 'var') \
+                and (k >= len(s) or token in (';', ')', '}') or s.newline_between(end, k)):
+            target = start - 2
+            if is_identifier(s.texts[target]):
+                body = s.function_at(start)
+                self._bind(s.texts[target], k, body[1] if body else len(s), usage)
+                return
+        if previous == '=' and s.texts[start - 2] == '}' and start - 2 in s.match:
+            self._destructure(s.match[start - 2], usage)
+            return
+        if previous in ('!', 'typeof') or token in CONDITION_OPERATORS or self._in_condition(start):
+            return
+        usage.escape(line, f"{s.source(start, end)} を{'返している' if previous == 'return' else '渡している'}")
+
+    def _in_condition(self, i):
+        """トークン i が if / while の条件部・三項演算子の条件の中か"""
+        s = self.source
+        opener = s.parent[i]
+        while opener is not None:
+            if s.texts[opener] == '(' and opener > 0 and s.texts[opener - 1] in ('if', 'while'):
+                return True
+            if s.texts[opener] in ('{', '['):
+                return False
+            opener = s.parent[opener]
+        return False
+
+    def _for_of(self, opener, pattern_end, usage):
+        """for (const row of rows) の row を結び付ける"""
+        s = self.source
+        close = s.match[opener]
+        body_start = close + 1
+        if body_start >= len(s):
+            return
+        body_end = s.match[body_start] if s.texts[body_start] == '{' and body_start in s.match \
+            else s.statement_end(body_start, s.limit(body_start))
+        pattern_start = opener + 2
+        if s.texts[pattern_end] == '}' and pattern_end in s.match:
+            pattern_start = s.match[pattern_end]
+        self._bind_pattern(pattern_start, pattern_end, (body_start, body_end), usage)
+
+    def _array_method(self, start, method, paren, usage, depth):
+        """rows.map((row) => ...) などのコールバックの引数を行として結び付ける"""
+        s = self.source
+        line = s.line(paren)
+        arguments = s.call_arguments(paren)
+        positions = CALLBACK_METHODS.get(method, ())
+        if positions:
+            callback = self._callback(arguments[0]) if arguments else None
+            if callback is None:
+                usage.escape(line, f".{method}() に関数を渡している")
+            else:
+                params, body = callback
+                for position in positions:
+                    if position < len(params):
+                        self._bind_pattern(params[position][0], params[position][1], body, usage)
+        if method in ROW_METHODS:
+            self._use(start, s.match[paren], usage, depth + 1)
+
+    def _callback(self, argument):
+        """インラインのアロー関数 → ([(引数の開始, 終了), ...], 本体の (開始, 終了))"""
+        s = self.source
+        start, end = argument
+        if s.texts[start] == 'async':
+            start += 1
+        if s.texts[start] == '(' and start in s.match:
+            params = s.call_arguments(start)
+            arrow = s.match[start] + 1
+        elif is_identifier(s.texts[start]):
+            params = [(start, start)]
+            arrow = start + 1
+        else:
+            return None
+        # 戻り値の型注釈を飛ばす
+        while arrow <= end and s.texts[arrow] != '=>':
+            arrow += 1
+        if arrow > end:
+            return None
+        # 引数の型注釈（row: any）を除く
+        params = [(p_start, p_start if is_identifier(s.texts[p_start]) else s.match.get(p_start, p_end))
+                  for p_start, p_end in params]
+        body_start = arrow + 1
+        body_end = s.match[body_start] if s.texts[body_start] == '{' and body_start in s.match else end
+        return params, (body_start, body_end)
+
+    # --- 判定と書き換え ---
+
+    def _evaluate(self, node, usage, finding, prefix):
+        if usage.escapes:
+            finding.escapes += [(line, f"{prefix}{reason}") for line, reason in usage.escapes]
+            for name, fields in usage.declared.items():
+                extra = [key for key in node.columns() if key not in fields]
+                if extra:
+                    finding.undeclared[f"{prefix}{name}"] = extra
+            finding.returned += len(node.columns())
+            return
+        columns = node.columns()
+        finding.returned += len(columns)
+        for key, (_, column) in columns.items():
+            if key not in usage.keys:
+                finding.unused.append((prefix + key, column))
+        for item in node.items:
+            if item.kind != 'embed':
+                continue
+            child = node.children[item.key]
+            if item.key in usage.keys or item.is_inner_join:
+                self._evaluate(child, usage.child(item.key), finding, f"{prefix}{item.key}.")
+            else:
+                for key, (_, column) in child.columns().items():
+                    finding.unused.append((f"{prefix}{item.key}.{key}", column))
+                finding.returned += len(child.columns())
+
+    def _narrow(self, text, node, usage, start=0, end=None):
+        """読んでいる列だけにした select の文字列（書き換えられなければ None）"""
+        end = len(text) if end is None else end
+        items = node.items
+        if not items:
+            return None
+        kept = []
+        for item in items:
+            if item.kind == 'star':
+                # * の列のうち、明示した列と重ならない読んでいる列（テーブルの列の順）
+                explicit = {i.key for i in items if i.kind == 'column'}
+                kept += [name for name in (node.table.columns if node.table else [])
+                         if name in usage.keys and name not in explicit]
+            elif item.kind == 'column':
+                if item.key in usage.keys and not node.is_unknown(item):
+                    kept.append(text[item.start:item.end])
+            elif item.kind == 'embed':
+                child_usage = usage.child(item.key)
+                if item.key not in usage.keys and not item.is_inner_join:
+                    continue
+                inner = text[item.inner[0]:item.inner[1]]
+                if not child_usage.escapes:
+                    inner = self._narrow(text, node.children[item.key], child_usage, *item.inner)
+                    if inner is None:
+                        return None
+                kept.append(text[item.start:item.inner[0]] + inner + text[item.inner[1]:item.end])
+            else:
+                kept.append(text[item.start:item.end])
+        if not kept:
+            # 行があるかどうかだけを見ている場合も1列は返す
+            columns = node.columns()
+            first = 'id' if 'id' in columns else next(iter(columns), None)
+            if first is None:
+                return None
+            kept = [first]
+        separator = text[items[0].end:items[1].start] if len(items) > 1 else ', '
+        if '\n' not in separator and '\n' in text[start:end]:
+            indent = re.search(r"\n([ \t]*)\S", text[start:end])
+            separator = ',\n' + (indent.group(1) if indent else '')
+        return text[start:items[0].start] + separator.join(kept) + text[items[-1].end:end]
+
+    def _rule(self, i, select, literal, narrowed):
+        s = self.source
+        statement = s.statement_at(i)
+        begin = s.starts[statement[0]] if statement else s.starts[i]
+        close = s.match[select]
+        original = self.text[begin:s.ends[close]]
+        if literal is None:
+            replacement = self.text[begin:s.starts[close]] + f"'{narrowed}'" + ')'
+        else:
+            quote = s.texts[literal][0]
+            if '\n' in narrowed and quote != '`':
+                quote = '`'
+            replacement = (self.text[begin:s.starts[literal]] + quote + narrowed + quote
+                           + self.text[s.ends[literal]:s.ends[close]])
+        line = s.line(i)
+        return Rule(f"narrow-select@{self.function_name}:{line}", original, replacement,
+                    scope=Scope(functions=[self.function_name], files=[Path(self.path).name]),
+                    description=f"{Path(self.path).name}:{line} の {s.texts[i + 2][1:-1]} の select を読んでいる列に絞る")
+
+
+def scan(functions_dir=FUNCTIONS_DIR, functions=None, schema=None):
+    """各Functionの index.ts の select を検査し、SelectFinding のリストを返す"""
+    schema = schema or Schema.load(schema_files())
+    findings = []
+    for function_name in functions or list_functions(functions_dir):
+        path = Path(functions_dir) / function_name / 'index.ts'
+        if function_name.startswith('_'):
+            continue
+        if not path.is_file():
+            raise ValueError(f"Functionがありません: {function_name}")
+        analyzer = OverfetchAnalyzer(function_name, str(path), path.read_text(encoding='utf-8'), schema)
+        findings += analyzer.analyze()
+    return findings
+
+
+def _format_bytes(value):
+    return f"{value:,}B"
+
+
+def print_findings(findings, verbose=False):
+    wasteful = [f for f in findings if f.unused]
+    by_function = {}
+    for finding in wasteful:
+        by_function.setdefault(finding.function_name, []).append(finding)
+    for finding in findings:
+        if not (finding.unused or finding.unknown) and not (verbose and (finding.escapes or finding.untracked)):
+            continue
+        rows = '1件' if finding.single else '複数行'
+        print(f"{finding.location()}: {finding.table} .select('{finding.select}')（{rows}）")
+        if finding.unknown:
+            names = ', '.join(f"{name}（{table}）" for name, table in finding.unknown)
+            print(f"    ❌ スキーマにない列: {names}")
+        if finding.unused:
+            names = ', '.join(name for name, _ in finding.unused)
+            print(f"    🗑️  読んでいない列 {len(finding.unused)}/{finding.returned}: {names}")
+            print(f"       1行あたり Postgres 約{_format_bytes(finding.db_bytes)} / "
+                  f"JSON 約{_format_bytes(finding.json_bytes)}")
+        if finding.narrowed:
+            print(f"    → .select('{finding.narrowed}') [--fix]")
+        if finding.escapes:
+            line, reason = finding.escapes[0]
+            more = f" ほか{len(finding.escapes) - 1}箇所" if len(finding.escapes) > 1 else ''
+            print(f"    ℹ️  行をそのまま使っているため全列を使用とみなす（{line}行目: {reason}{more}）")
+        for name, extra in finding.undeclared.items():
+            print(f"    ℹ️  応答の型 {name} にない列: {', '.join(extra)}（クライアントが読んでいなければ外せる）")
+        if finding.untracked:
+            print(f"    ℹ️  {finding.untracked}")
+
+    if by_function:
+        print(f"\n{'Function':<32} {'select':>6} {'列':>5} {'Postgres':>10} {'JSON':>8}  （読んでいない列・1行あたり）")
+        ranked = sorted(by_function.items(), key=lambda item: -sum(f.json_bytes for f in item[1]))
+        for name, items in ranked:
+            print(f"{name:<32} {len(items):>6} {sum(len(f.unused) for f in items):>5} "
+                  f"{_format_bytes(sum(f.db_bytes for f in items)):>10} "
+                  f"{_format_bytes(sum(f.json_bytes for f in items)):>8}")
+    fixable = sum(1 for f in findings if f.rule)
+    unknown = sum(len(f.unknown) for f in findings)
+    print(f"\n検査: {len(findings)}個の select、過剰取得 {len(wasteful)}件（うち書き換え可能 {fixable}件）"
+          + (f"、スキーマにない列 {unknown}件" if unknown else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Edge Functionsの select の過剰取得の検出")
+    parser.add_argument('functions', nargs='*', help='対象のFunction名（省略時は全て）')
+    parser.add_argument('-v', '--verbose', action='store_true', help='判定しなかった select も表示する')
+    parser.add_argument('--json', help='検査結果のJSONの書き出し先')
+    parser.add_argument('--fix', action='store_true', help='select を読んでいる列だけに書き換える')
+    parser.add_argument('--dry-run', action='store_true', help='--fix で書き換えずに unified diff を表示する')
+    parser.add_argument('--patch', help='--fix --dry-run の unified diff を保存するファイル')
+    args = parser.parse_args(argv)
+
+    findings = scan(FUNCTIONS_DIR, args.functions or None)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps([f.to_dict() for f in findings], indent=2, ensure_ascii=False) + "\n",
+                                   encoding='utf-8')
+
+    if args.fix:
+        from update_edge_functions import report
+
+        rules = [finding.rule for finding in findings if finding.rule]
+        if not rules:
+            print('書き換えられる select はありません')
+            return 0
+        print(f"書き換え: {len(rules)}箇所\n")
+        results = run_codemod(rules, FUNCTIONS_DIR, sorted({f.function_name for f in findings}), args.dry_run,
+                              workers=1)
+        if args.patch:
+            Path(args.patch).write_text(''.join(result.diff() for result in results if result.changed),
+                                        encoding='utf-8')
+            print(f"💾 パッチ: {args.patch}")
+        return report(results, args.dry_run)
+
+    print_findings(findings, args.verbose)
+    if args.json:
+        print(f"\n💾 JSON: {args.json}")
+    return 1 if any(f.unused or f.unknown for f in findings) else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
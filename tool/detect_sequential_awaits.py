@@ -0,0 +1,764 @@
+#!/usr/bin/env python3
+"""
+Edge Functionsの逐次await・N+1パターンの検出
+TypeScriptをトークン列（token_match.TokenList）で読み、往復が直列に積み重なる箇所を file:line で報告する
+
+- await-in-loop: for / while ループ内の await（1要素ごとに1往復。クエリ結果のループは N+1）
+- request-per-item: map(async ...) などで要素ごとに発行するクエリ・署名付きURL生成（並列だがリクエストはN回）
+- sequential-awaits: 互いに依存しない読み取りの await が続いている箇所
+
+安全に書き換えられる箇所は codemod.py の Rule として書き換えを提示する（--fix）
+- signed-urls: ループ内の createSignedUrl → ループの前で _shared/storage.ts の batchSignedUrls（createSignedUrls）
+- in-query: ループ内の .eq(列, 要素の値) の取得 → ループの前で .in(列, 全要素の値) で一括取得し、ループ内では filter
+- promise-all: 連続した独立な読み取り → Promise.all（間のエラーチェックは Promise.all の後に並べる）
+
+使い方:
+    python tool/detect_sequential_awaits.py                       # 全Functionを検査
+    python tool/detect_sequential_awaits.py get-user-groups --json awaits.json
+    python tool/detect_sequential_awaits.py --fix --dry-run       # 書き換えの差分を表示
+    python tool/detect_sequential_awaits.py --fix --kind signed-urls get-user-groups
+
+終了コード: 0 = 検出なし / 1 = 検出あり（--fix では update_edge_functions.py と同じ）
+"""
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from codemod import FUNCTIONS_DIR, PROJECT_ROOT, Rule, Scope, list_functions, run_codemod
+from token_match import HOLE_PATTERN, TokenList
+from ts_source import IDENTIFIER, OPENERS, Source, is_identifier
+
+# 書き換えの種類
+FIX_KINDS = ['signed-urls', 'in-query', 'promise-all']
+
+STORAGE_HELPER = 'batchSignedUrls'
+
+# 要素ごとのコールバックとして async 関数を受け取る配列メソッド
+CALLBACK_METHODS = {'map', 'flatMap', 'forEach', 'filter'}
+
+# 読み取りクエリとみなさないメソッド
+WRITE_METHODS = {'insert', 'update', 'upsert', 'delete'}
+# .in() に書き換えられるクエリのメソッド（件数・1件取得・ページングは対象外）
+BATCHABLE_METHODS = {'eq', 'neq', 'is', 'in', 'gt', 'gte', 'lt', 'lte', 'like', 'ilike', 'order', 'contains'}
+
+
+class Call:
+    """await している呼び出しの種類"""
+
+    def __init__(self, source, start, end):
+        texts = source.texts[start:end + 1]
+        # 引数の中（コールバックなど）は見ず、式の最上位のメソッド呼び出しの連鎖で判定する
+        methods = []
+        j = start
+        while j < end:
+            if source.texts[j] in ('.', '?.'):
+                methods.append(source.texts[j + 1])
+            elif source.texts[j] in OPENERS and j in source.match and source.texts[j - 1] not in ('from', 'rpc'):
+                j = source.match[j]
+            j += 1
+        self.kind = 'call'
+        self.target = ''
+        if 'createSignedUrl' in methods:
+            self.kind = 'signed-url'
+        elif 'storage' in methods:
+            self.kind = 'storage'
+        elif 'from' in methods:
+            self.kind = 'write' if WRITE_METHODS & set(methods) else 'read'
+        elif 'rpc' in methods:
+            self.kind = 'rpc'
+        elif texts[:3] == ['Promise', '.', 'all']:
+            self.kind = 'promise-all'
+        elif texts[0] == 'fetch':
+            self.kind = 'fetch'
+        for j in range(len(texts) - 3):
+            if texts[j] in ('from', 'rpc') and texts[j + 1] == '(' and texts[j + 2][:1] in ("'", '"', '`'):
+                self.target = texts[j + 2]
+                break
+        self.counts = self.kind == 'read' and 'count' in texts
+        self.methods = methods
+        self.label = self._label(texts)
+
+    def _label(self, texts):
+        if self.kind == 'signed-url':
+            return f"storage.from({self.target}).createSignedUrl" if self.target else 'createSignedUrl'
+        if self.kind in ('read', 'write'):
+            verb = next((m for m in self.methods if m in WRITE_METHODS or m == 'select'), '')
+            return f"from({self.target})" + (f".{verb}" if verb else '')
+        if self.kind == 'rpc':
+            return f"rpc({self.target})"
+        callee = []
+        for token in texts:
+            if token == '(':
+                break
+            callee.append(token)
+        return ''.join(callee) + '(...)'
+
+    @property
+    def is_read(self):
+        return self.kind in ('read', 'signed-url')
+
+
+class AwaitDecl:
+    """const パターン = await 式 の文"""
+
+    def __init__(self, source, statement):
+        self.start, self.end = statement
+        texts = source.texts
+        self.keyword = texts[self.start]
+        j = self.start + 1
+        while j <= self.end and texts[j] != '=':
+            j = source.match[j] if texts[j] in OPENERS and j in source.match else j
+            j += 1
+        self.equals = j
+        self.expression = (j + 2, self.end - 1 if texts[self.end] == ';' else self.end)
+        self.names = source.pattern_names(self.start + 1, j - 1)
+        self.references = source.references(*self.expression)
+        # 型注釈のある宣言は Promise.all の分割代入に書き換えない
+        self.annotated = any(texts[k] == ':' and source.parent[k] == source.parent[self.start]
+                             for k in range(self.start + 1, j))
+        self.call = Call(source, *self.expression)
+
+    @classmethod
+    def parse(cls, source, statement):
+        """文が await の結果だけを代入する宣言なら AwaitDecl（でなければ None）"""
+        start, end = statement
+        texts = source.texts
+        if texts[start] not in ('const', 'let', 'var'):
+            return None
+        j = start + 1
+        while j < end and texts[j] != '=':
+            j = source.match[j] if texts[j] in OPENERS and j in source.match else j
+            j += 1
+        if j >= end or texts[j + 1] != 'await' or j + 2 > end:
+            return None
+        last = end - 1 if texts[end] == ';' else end
+        if source.expression_end(j + 2, end + 1) != last:
+            return None
+        return cls(source, statement)
+
+
+class Loop:
+    """ループ（for / while / do）または要素ごとの async コールバック"""
+
+    def __init__(self, source, token, body, serial, variable=None, iterable=None, statement=None):
+        self.token = token
+        self.body = body
+        self.serial = serial
+        self.variable = variable
+        self.iterable = iterable
+        self.statement = statement or source.statement_at(token)
+        # ループ内の await のうち、このループの反復ごとに実行されるもの（入れ子の関数内は除く）
+        self.function = source.function_at(token) if serial else source.function_at(body[0])
+        self.root = None
+        if iterable:
+            names = [t for t in source.texts[iterable[0]:iterable[1] + 1] if is_identifier(t)]
+            self.root = names[0] if names else None
+        self.aliases = self._aliases(source) if variable else {}
+        self.locals = (source.declared_names(*body) | {variable} | set(self.aliases)) if variable else set()
+
+    def _aliases(self, source):
+        """本体直下の const A = 変数.p.q（as 型）を {A: [p, q]} で返す"""
+        opener = self.body[0] if source.texts[self.body[0]] == '{' else None
+        statements = source.statements.get(opener, []) if opener is not None else []
+        aliases = {}
+        for start, end in statements:
+            texts = source.texts[start:end + 1]
+            if texts[0] != 'const' or len(texts) < 4 or texts[2] != '=' or not is_identifier(texts[1]):
+                continue
+            chain = texts[3:texts.index('as')] if 'as' in texts else texts[3:]
+            path = _member_path(chain)
+            if path and path[0] == self.variable:
+                aliases[texts[1]] = path[1:]
+        return aliases
+
+    def accessor(self, source, start, end):
+        """式（トークン start〜end）をループ変数からのアクセス式で表す（表せなければ None）"""
+        path = _member_path(source.texts[start:end + 1])
+        if not path:
+            return None
+        if path[0] == self.variable:
+            chain = path[1:]
+        elif path[0] in self.aliases:
+            chain = self.aliases[path[0]] + path[1:]
+        else:
+            return None
+        if not chain:
+            return self.variable
+        return self.variable + '.' + chain[0] + ''.join('?.' + p for p in chain[1:])
+
+    def iterable_expression(self, source):
+        """map を続けられる形のイテラブルの式"""
+        start, end = self.iterable
+        text = source.source(start, end)
+        if start == end or (source.texts[start] == '(' and source.match.get(start) == end):
+            return text
+        return f"({text})"
+
+    def mapped(self, source, accessor):
+        return f"{self.iterable_expression(source)}.map(({self.variable}: any) => {accessor})"
+
+
+def _member_path(tokens):
+    """a.b?.c のトークン列なら ['a', 'b', 'c']"""
+    if not tokens or len(tokens) % 2 == 0 or not is_identifier(tokens[0]):
+        return None
+    path = [tokens[0]]
+    for j in range(1, len(tokens), 2):
+        if tokens[j] not in ('.', '?.') or not IDENTIFIER.match(tokens[j + 1]):
+            return None
+        path.append(tokens[j + 1])
+    return path
+
+
+class Finding:
+    """検出した1箇所"""
+
+    def __init__(self, function_name, path, line, column, kind, message, suggestion, fix=None):
+        self.function_name = function_name
+        self.path = path
+        self.line = line
+        self.column = column
+        self.kind = kind
+        self.message = message
+        self.suggestion = suggestion
+        self.fix = fix
+
+    def location(self):
+        try:
+            path = Path(self.path).relative_to(PROJECT_ROOT)
+        except ValueError:
+            path = self.path
+        return f"{path}:{self.line}:{self.column}"
+
+    def to_dict(self):
+        return {
+            'function': self.function_name,
+            'location': self.location(),
+            'kind': self.kind,
+            'message': self.message,
+            'suggestion': self.suggestion,
+            'fix': self.fix,
+        }
+
+
+class Rewrite:
+    """1つの文（ループなど）の範囲に対する書き換え（挿入・置換）"""
+
+    def __init__(self, kind, span):
+        self.kinds = [kind]
+        self.span = span
+        self.edits = []
+        self.imports = []
+
+    def overlaps(self, other):
+        return self.span[0] < other.span[1] and other.span[0] < self.span[1]
+
+    def merge(self, other):
+        self.span = (min(self.span[0], other.span[0]), max(self.span[1], other.span[1]))
+        self.kinds.extend(k for k in other.kinds if k not in self.kinds)
+        self.edits.extend(other.edits)
+        self.imports.extend(line for line in other.imports if line not in self.imports)
+
+    def apply(self, text):
+        """(元のソース, 書き換え後のソース)"""
+        start, end = self.span
+        return text[start:end], _splice(text, start, end, self.edits)
+
+
+def _unique_name(text, base, taken):
+    name = base
+    number = 2
+    while name in taken or re.search(rf'\b{re.escape(name)}\b', text):
+        name = f"{base}{number}"
+        number += 1
+    taken.add(name)
+    return name
+
+
+def _camel(words):
+    parts = [p for p in re.split(r'[^0-9A-Za-z]+', words) if p]
+    return ''.join(p[:1].upper() + p[1:] for p in parts)
+
+
+def _splice(text, begin, end, edits):
+    """text[begin:end] に (開始, 終了, 置換後) の編集を適用した文字列"""
+    pieces = []
+    position = begin
+    for edit_start, edit_end, replacement in sorted(edits):
+        pieces.append(text[position:edit_start])
+        pieces.append(replacement)
+        position = edit_end
+    pieces.append(text[position:end])
+    return ''.join(pieces)
+
+
+class Analyzer:
+    """1ファイルの検出と書き換えの生成"""
+
+    def __init__(self, function_name, path, text):
+        self.function_name = function_name
+        self.path = path
+        self.text = text
+        self.source = Source(text)
+        self.findings = []
+        self.rewrites = []
+        self.taken = set()
+        self.signers = {}
+        self.loops = self._loops()
+        # await の結果を束縛した名前（これを回すループはクエリ結果のループ）
+        self.query_results = set()
+        for statements in self.source.statements.values():
+            for statement in statements:
+                decl = AwaitDecl.parse(self.source, statement)
+                if decl and decl.call.kind in ('read', 'rpc'):
+                    self.query_results.update(decl.names)
+
+    def _loops(self):
+        source = self.source
+        texts = source.texts
+        loops = []
+        for i, token in enumerate(texts):
+            k = i + 1
+            if k >= len(source):
+                break
+            if token in ('for', 'while') and (texts[k] == '(' or (texts[k] == 'await' and token == 'for')):
+                if texts[k] == 'await':
+                    k += 1
+                if k not in source.match or not source._is_header(k):
+                    continue
+                header_end = source.match[k]
+                body_start = header_end + 1
+                if body_start >= len(source):
+                    continue
+                if texts[body_start] == '{' and body_start in source.match:
+                    body = (body_start, source.match[body_start])
+                else:
+                    body = (body_start, source.statement_end(body_start, source.limit(body_start)))
+                variable = iterable = None
+                if (token == 'for' and texts[k + 1] in ('const', 'let') and is_identifier(texts[k + 2])
+                        and texts[k + 3] == 'of'):
+                    # let は本体で再代入されうるので書き換えの対象にしない
+                    variable = texts[k + 2] if texts[k + 1] == 'const' else None
+                    iterable = (k + 4, header_end - 1)
+                loops.append(Loop(source, i, body, True, variable, iterable))
+            elif token == 'do' and texts[k] == '{' and k in source.match:
+                loops.append(Loop(source, i, (k, source.match[k]), True))
+            elif (token in CALLBACK_METHODS and i >= 2 and texts[i - 1] in ('.', '?.') and texts[k] == '('
+                  and k + 1 < len(source) and texts[k + 1] == 'async' and k in source.match):
+                body = next((b for b in source.functions if k < b[0] < source.match[k]), None)
+                if body is None:
+                    continue
+                parameter = texts[k + 3] if texts[k + 2] == '(' else texts[k + 2]
+                receiver = (source.chain_start(i - 2), i - 2)
+                loops.append(Loop(source, i, body, False, parameter if is_identifier(parameter) else None,
+                                  receiver))
+        return loops
+
+    def _loop_of(self, index):
+        """await（トークン index）を反復ごとに実行する最も内側のループ"""
+        function = self.source.function_at(index)
+        found = None
+        for loop in self.loops:
+            if loop.body[0] <= index <= loop.body[1] and loop.function == function:
+                if found is None or loop.body[0] > found.body[0]:
+                    found = loop
+        return found
+
+    def add(self, index, kind, message, suggestion, fix=None):
+        self.findings.append(Finding(self.function_name, self.path, self.source.line(index),
+                                     self.source.column(index), kind, message, suggestion, fix))
+
+    def add_rewrite(self, rewrite):
+        """書き換えを登録する（重なる書き換えがあれば、ループの前への移動同士はまとめ、それ以外は登録しない）"""
+        for other in self.rewrites:
+            if other.overlaps(rewrite):
+                if 'promise-all' in other.kinds + rewrite.kinds:
+                    return False
+                other.merge(rewrite)
+                return True
+        self.rewrites.append(rewrite)
+        return True
+
+    def analyze(self):
+        source = self.source
+        for index, token in enumerate(source.texts):
+            if token != 'await' or index + 1 >= len(source):
+                continue
+            loop = self._loop_of(index)
+            if loop is None:
+                continue
+            end = source.expression_end(index + 1)
+            call = Call(source, index + 1, end)
+            if loop.serial:
+                self._await_in_loop(loop, index, end, call)
+            elif call.kind in ('read', 'write', 'signed-url', 'storage', 'rpc'):
+                self._request_per_item(loop, index, end, call)
+        for opener in source.statements:
+            self._sequential_awaits(source.statements[opener])
+        self.findings.sort(key=lambda f: (f.line, f.column))
+        return self.findings
+
+    def _loop_description(self, loop):
+        source = self.source
+        keyword = source.texts[loop.token]
+        if loop.iterable and keyword == 'for':
+            description = f"for ... of {source.source(*loop.iterable)}"
+        elif loop.iterable:
+            description = f"{source.source(*loop.iterable)}.{keyword}(async ...)"
+        else:
+            description = keyword
+        if loop.root in self.query_results:
+            description += '、クエリ結果のループ'
+        return f"{description}、{source.line(loop.token)}行目"
+
+    def _await_in_loop(self, loop, index, end, call):
+        fix = None
+        if call.kind == 'signed-url':
+            fix = self._fix_signed_url(loop, index, end)
+            suggestion = 'ループの前で createSignedUrls により一括生成できます'
+        elif call.kind == 'read' and not loop.iterable:
+            suggestion = '反復ごとに1往復します。条件をまとめた1回のクエリにできないか確認してください'
+        elif call.kind == 'read' and not call.counts:
+            fix = self._fix_in_query(loop, index)
+            suggestion = 'ループの前で .in() により一括取得し、ループ内で絞り込めます'
+        elif call.kind == 'read':
+            suggestion = '件数は .in() で一括取得して Map で数えるか、集計をRPCにまとめられます'
+        elif call.kind == 'write':
+            suggestion = '配列を渡す一括 insert / upsert、または .in() による一括更新にまとめられます'
+        else:
+            suggestion = '要素間で依存がなければ Promise.all で並列化できます'
+        self.add(index, 'await-in-loop', f"ループ内の await: {call.label}（{self._loop_description(loop)}）",
+                 suggestion, fix)
+
+    def _request_per_item(self, loop, index, end, call):
+        fix = None
+        if call.kind == 'signed-url':
+            fix = self._fix_signed_url(loop, index, end)
+            suggestion = 'コールバックの前で createSignedUrls により一括生成できます'
+        elif call.kind == 'read':
+            suggestion = 'コールバックの前で .in() により一括取得できます'
+        else:
+            suggestion = '配列をまとめて渡す1回のリクエストにまとめられます'
+        self.add(index, 'request-per-item', f"要素ごとのリクエスト: {call.label}（{self._loop_description(loop)}）",
+                 suggestion, fix)
+
+    def _loop_span(self, loop):
+        """書き換えの範囲（ループを含む文と直前のコメント行。前に挿入する行はコメントの前に置く）"""
+        start, end = loop.statement
+        text = self.text
+        begin = self.source.starts[start]
+        line_start = self.source.line_start(start)
+        while line_start > 0:
+            previous = text.rfind('\n', 0, line_start - 1) + 1
+            line = text[previous:line_start - 1]
+            if not line.strip().startswith('//'):
+                break
+            begin = previous + len(line) - len(line.lstrip())
+            line_start = previous
+        return start, begin, self.source.ends[end]
+
+    def _storage_import(self):
+        path = './storage.ts' if self.function_name == '_shared' else '../_shared/storage.ts'
+        return f"import {{ {STORAGE_HELPER} }} from '{path}'"
+
+    def _fix_signed_url(self, loop, index, end):
+        """await client.storage.from(bucket).createSignedUrl(path, ttl) → ループの前で一括生成"""
+        source = self.source
+        texts = source.texts
+        start = index + 1
+        if not loop.variable or not loop.iterable:
+            return None
+        if texts[start + 1:start + 10] != ['.', 'storage', '.', 'from', '(', texts[start + 6], ')', '.',
+                                           'createSignedUrl']:
+            return None
+        opener = start + 10
+        if not is_identifier(texts[start]) or texts[opener] != '(' or source.match.get(opener) != end:
+            return None
+        arguments = source.call_arguments(opener)
+        if len(arguments) != 2:
+            return None
+        accessor = loop.accessor(source, *arguments[0])
+        if accessor is None or source.references(*arguments[1]) & loop.locals:
+            return None
+        client, bucket = texts[start], texts[start + 6]
+        ttl = source.source(*arguments[1])
+        statement_start, span_start, span_end = self._loop_span(loop)
+        # 同じループで同じバケット・パス・有効期限なら生成した関数を共有する
+        key = (client, bucket, accessor, ttl, statement_start)
+        rewrite = Rewrite('signed-urls', (span_start, span_end))
+        signers = self.signers
+        if key not in signers:
+            name = 'sign' + _camel(bucket.strip('\'"`'))
+            if name in self.taken or re.search(rf'\b{name}\b', self.text):
+                name = 'sign' + _camel(loop.variable) + _camel(bucket.strip('\'"`'))
+            signers[key] = _unique_name(self.text, name, self.taken)
+            indent = source.indent(statement_start)
+            arguments_text = ''.join(f"{indent}  {argument},\n" for argument in
+                                     (client, bucket, loop.mapped(source, accessor), ttl))
+            rewrite.edits.append((span_start, span_start,
+                                  f"// 署名付きURLを一括生成（{bucket}）\n"
+                                  f"{indent}const {signers[key]} = await {STORAGE_HELPER}(\n"
+                                  f"{arguments_text[:-2]}\n{indent})\n\n{indent}"))
+        rewrite.edits.append((source.starts[index], source.ends[end],
+                              f"{signers[key]}({source.source(*arguments[0])})"))
+        rewrite.imports.append(self._storage_import())
+        return self._register(rewrite)
+
+    def _fix_in_query(self, loop, index):
+        """const { data: X } = await client.from(t).select(s).eq(列, 要素の値) → ループの前で .in() で一括取得"""
+        source = self.source
+        texts = source.texts
+        if not loop.variable or not loop.iterable:
+            return None
+        statement = source.statement_at(index)
+        decl = AwaitDecl.parse(source, statement) if statement else None
+        if decl is None or decl.equals + 1 != index or decl.keyword != 'const':
+            return None
+        pattern = texts[decl.start + 1:decl.equals]
+        if pattern[:4] != ['{', 'data', ':', pattern[3]] or not is_identifier(pattern[3]):
+            return None
+        if pattern[4:] == ['}']:
+            error_name = None
+        elif pattern[4:8] == [',', 'error', ':', pattern[7]] and pattern[8:] == ['}']:
+            error_name = pattern[7]
+        else:
+            return None
+        data_name = pattern[3]
+
+        # client . from ( 't' ) . select ( 's' ) . method ( ... ) ...
+        start, end = decl.expression
+        if not is_identifier(texts[start]) or texts[start + 1:start + 4] != ['.', 'from', '(']:
+            return None
+        j = start + 1
+        calls = []
+        while j <= end:
+            if texts[j] != '.' or j + 2 > end or texts[j + 2] != '(' or j + 2 not in source.match:
+                return None
+            calls.append((texts[j + 1], j, j + 2, source.match[j + 2]))
+            j = source.match[j + 2] + 1
+        if j != end + 1 or len(calls) < 3 or calls[1][0] != 'select':
+            return None
+        select_arguments = source.call_arguments(calls[1][2])
+        if len(select_arguments) != 1 or select_arguments[0][0] != select_arguments[0][1]:
+            return None
+        columns = texts[select_arguments[0][0]]
+        key_call = None
+        for name, dot, opener, close in calls[2:]:
+            if name not in BATCHABLE_METHODS:
+                return None
+            arguments = source.call_arguments(opener)
+            if name == 'eq' and len(arguments) == 2 and loop.accessor(source, *arguments[1]):
+                if key_call is not None:
+                    return None
+                key_call = (dot, close, arguments)
+            elif any(source.references(*argument) & loop.locals for argument in arguments):
+                return None
+        if key_call is None:
+            return None
+        dot, close, arguments = key_call
+        column_token = texts[arguments[0][0]]
+        if arguments[0][0] != arguments[0][1] or column_token[:1] not in ("'", '"'):
+            return None
+        column = column_token[1:-1]
+        selected = columns[1:-1]
+        if selected.strip() != '*' and not re.search(rf'(^|[\s,]){re.escape(column)}($|[\s,])', selected):
+            return None
+
+        statement_start, span_start, span_end = self._loop_span(loop)
+        indent = source.indent(statement_start)
+        all_name = _unique_name(self.text, 'all' + _camel(data_name), self.taken)
+        all_error = _unique_name(self.text, all_name + 'Error', self.taken) if error_name else None
+        keys = f"{loop.mapped(source, loop.accessor(source, *arguments[1]))}.filter((key) => key != null)"
+        begin = source.starts[start]
+        query = _splice(self.text, begin, source.ends[end],
+                        [(source.starts[dot], source.ends[close], f".in({column_token}, {keys})")]
+                        + source.reindent(begin, source.ends[end], len(indent) - len(source.indent(decl.start))))
+        binding = f"{{ data: {all_name}, error: {all_error} }}" if error_name else f"{{ data: {all_name} }}"
+        rewrite = Rewrite('in-query', (span_start, span_end))
+        rewrite.edits.append((span_start, span_start,
+                              f"// {texts[start + 4]} を一括取得（{column} ごとにループ内で絞り込む）\n"
+                              f"{indent}const {binding} = await {query}\n\n{indent}"))
+        key_text = source.source(*arguments[1])
+        replacement = f"const {data_name} = ({all_name} || []).filter((row: any) => row.{column} === {key_text})"
+        if error_name:
+            replacement += f"\n{source.indent(decl.start)}const {error_name} = {all_error}"
+        rewrite.edits.append((source.starts[decl.start], source.ends[decl.end], replacement))
+        return self._register(rewrite)
+
+    def _sequential_awaits(self, statements):
+        """ブロック直下で互いに依存しない読み取りの await が続く箇所"""
+        source = self.source
+        run = []
+        gaps = []
+        pending = []
+        bound = set()
+
+        def close():
+            if len(run) >= 2:
+                self._report_run(list(run), list(gaps))
+
+        for statement in statements:
+            decl = AwaitDecl.parse(source, statement)
+            if decl is None:
+                start, end = statement
+                # await を含まない if 文（エラーチェック）は並列化の妨げにならない
+                if run and source.texts[start] == 'if' and 'await' not in source.texts[start:end + 1]:
+                    pending.append(statement)
+                    bound |= source.references(start, end)
+                    continue
+                close()
+                run, gaps, pending, bound = [], [], [], set()
+                continue
+            if run and decl.call.is_read and not (decl.references & bound):
+                run.append(decl)
+                gaps.extend(pending)
+                pending = []
+            else:
+                close()
+                run, gaps, pending = ([decl], [], []) if decl.call.is_read else ([], [], [])
+                bound = set()
+            bound |= set(decl.names)
+        close()
+
+    def _report_run(self, run, gaps):
+        source = self.source
+        lines = ', '.join(str(source.line(decl.start)) for decl in run)
+        fix = self._fix_promise_all(run, gaps)
+        self.add(run[0].start, 'sequential-awaits',
+                 f"互いに依存しない await が{len(run)}個続いています（{lines}行目: "
+                 f"{', '.join(decl.call.label for decl in run)}）",
+                 'Promise.all でまとめて待てます' + ('（間のエラーチェックは後に並べる）' if gaps else ''), fix)
+
+    def _fix_promise_all(self, run, gaps):
+        source = self.source
+        text = self.text
+        if any(decl.annotated or decl.keyword != run[0].keyword for decl in run):
+            return None
+        statements = sorted([(decl.start, decl.end, decl) for decl in run] + [(s, e, None) for s, e in gaps])
+        # 文の後ろの同じ行にコメントがあると移動できない
+        for _, end, _ in statements:
+            rest = text[source.ends[end]:]
+            if rest.split('\n', 1)[0].strip():
+                return None
+        indent = source.indent(run[0].start)
+        elements = []
+        checks = []
+        previous_end = None
+        for start, end, decl in statements:
+            leading = ''
+            if previous_end is not None:
+                gap = text[source.ends[previous_end]:source.starts[start]]
+                comments = [line.strip() for line in gap.split('\n') if line.strip()]
+                leading = ''.join(f"{indent}  {comment}\n" if decl else f"{indent}{comment}\n"
+                                  for comment in comments)
+            previous_end = end
+            if decl is None:
+                checks.append(leading + indent + source.source(start, end))
+                continue
+            begin, end = source.starts[decl.expression[0]], source.ends[decl.expression[1]]
+            expression = _splice(text, begin, end, source.reindent(begin, end, 2))
+            elements.append(leading + indent + '  ' + expression + ',')
+        patterns = ', '.join(text[source.starts[decl.start + 1]:source.ends[decl.equals - 1]] for decl in run)
+        if len(indent) + len(patterns) > 80:
+            patterns = '\n' + ''.join(f"{indent}  {text[source.starts[decl.start + 1]:source.ends[decl.equals - 1]]},\n"
+                                      for decl in run) + indent
+        replacement = (f"{run[0].keyword} [{patterns}] = await Promise.all([\n" + '\n'.join(elements)
+                       + f"\n{indent}])")
+        if checks:
+            replacement += '\n\n' + '\n\n'.join(checks)
+        rewrite = Rewrite('promise-all', (source.starts[run[0].start], source.ends[statements[-1][1]]))
+        rewrite.edits.append((*rewrite.span, replacement))
+        return self._register(rewrite)
+
+    def _register(self, rewrite):
+        """書き換えを登録し、適用する Rule の名前を返す（安全に表せなければ None）"""
+        original, _ = rewrite.apply(self.text)
+        if any(HOLE_PATTERN.fullmatch(token) for token in TokenList(original).texts):
+            return None
+        return rewrite.kinds[0] if self.add_rewrite(rewrite) else None
+
+    def rules(self, kinds=None):
+        """書き換えを codemod.py の Rule として返す（kinds で種類を絞る）"""
+        rules = []
+        scope = Scope(functions=[self.function_name], files=[Path(self.path).name])
+        for rewrite in self.rewrites:
+            if kinds and not set(rewrite.kinds) <= set(kinds):
+                continue
+            original, replacement = rewrite.apply(self.text)
+            line = self.text.count('\n', 0, rewrite.span[0]) + 1
+            rules.append(Rule(f"{'+'.join(rewrite.kinds)}@{self.function_name}:{line}", original, replacement,
+                              imports=rewrite.imports, scope=scope,
+                              description=f"{Path(self.path).name}:{line} の {'・'.join(rewrite.kinds)}"))
+        return rules
+
+
+def scan(functions_dir=FUNCTIONS_DIR, functions=None):
+    """対象Functionの .ts ファイルを検査し、Analyzer のリストを返す（_shared も含む）"""
+    analyzers = []
+    for function_name in functions or list_functions(functions_dir):
+        directory = Path(functions_dir) / function_name
+        if not directory.is_dir():
+            raise ValueError(f"Functionがありません: {function_name}")
+        for path in sorted(directory.glob('*.ts')):
+            analyzer = Analyzer(function_name, str(path), path.read_text(encoding='utf-8'))
+            analyzer.analyze()
+            analyzers.append(analyzer)
+    return analyzers
+
+
+def print_findings(findings):
+    labels = {'await-in-loop': '🔁', 'request-per-item': '📨', 'sequential-awaits': '⏱️ '}
+    for finding in findings:
+        fix = f" [--fix: {finding.fix}]" if finding.fix else ''
+        print(f"{finding.location()}: {labels[finding.kind]} {finding.message}")
+        print(f"    → {finding.suggestion}{fix}")
+    counts = {}
+    for finding in findings:
+        counts[finding.kind] = counts.get(finding.kind, 0) + 1
+    fixable = sum(1 for finding in findings if finding.fix)
+    summary = '、'.join(f"{kind} {count}件" for kind, count in sorted(counts.items()))
+    print(f"\n検出: {len(findings)}件" + (f"（{summary}。うち書き換え可能 {fixable}件）" if findings else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Edge Functionsの逐次await・N+1パターンの検出')
+    parser.add_argument('functions', nargs='*', help='対象のFunction名（省略時は _shared を含む全て）')
+    parser.add_argument('--json', help='検出結果のJSONの書き出し先')
+    parser.add_argument('--fix', action='store_true', help='安全に書き換えられる箇所を書き換える')
+    parser.add_argument('--kind', action='append', choices=FIX_KINDS, help='--fix で適用する書き換えの種類（複数指定可）')
+    parser.add_argument('--dry-run', action='store_true', help='--fix で書き換えずに unified diff を表示する')
+    args = parser.parse_args(argv)
+
+    analyzers = scan(FUNCTIONS_DIR, args.functions or None)
+    findings = [finding for analyzer in analyzers for finding in analyzer.findings]
+
+    if args.json:
+        Path(args.json).write_text(json.dumps([f.to_dict() for f in findings], indent=2, ensure_ascii=False) + "\n",
+                                   encoding='utf-8')
+
+    if args.fix:
+        from update_edge_functions import report
+
+        rules = [rule for analyzer in analyzers for rule in analyzer.rules(args.kind)]
+        if not rules:
+            print('書き換えられる箇所はありません')
+            return 0
+        print(f"書き換え: {len(rules)}箇所\n")
+        results = run_codemod(rules, FUNCTIONS_DIR, sorted({a.function_name for a in analyzers}), args.dry_run,
+                              workers=1)
+        return report(results, args.dry_run)
+
+    print_findings(findings)
+    if args.json:
+        print(f"\n💾 JSON: {args.json}")
+    return 1 if findings else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Edge Functions のスタブサーバー（負荷試験をオフラインで行うための応答の再生）
+tool/load_test.py --record で記録した応答（ステータス・本文・応答時間）を、遅延を加えて返す
+
+- POST /functions/v1/<Function名>   記録した応答（記録がなければ {"success": true}）
+- GET  /__stub/state                現在の設定
+- POST /__stub/state                設定の変更（{"latency_ms": 20, "jitter": 0.3, "error_rate": 0.01}）
+- GET  /__stub/stats                Functionごとのリクエスト数
+- POST /__stub/reset                リクエスト数のリセット
+  （/__stub/* は tool/stub_server.py の共通部分）
+
+遅延は記録した応答時間（記録がなければ latency_ms）に、対数正規分布のばらつき（jitter = σ）を掛けたもの
+
+使い方:
+    python tool/edge_function_stub_server.py                                   # http://127.0.0.1:54330
+    python tool/edge_function_stub_server.py --recordings recordings.json --jitter 0.5
+    python tool/edge_function_stub_server.py --latency-ms 50 --error-rate 0.02
+
+    python tool/load_test.py --base-url http://127.0.0.1:54330/functions/v1
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from stub_server import StubHandler, StubServer
+
+DEFAULT_PORT = 54330
+FUNCTIONS_PREFIX = '/functions/v1/'
+
+DEFAULT_LATENCY_MS = 20.0
+DEFAULT_JITTER = 0.3
+
+# Edge Functions と同じ CORS ヘッダー（supabase/functions/_shared/cors.ts）
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type, x-admin-skip-maintenance',
+}
+
+
+def load_recordings(path):
+    """記録ファイル → {Function名: {'status', 'body', 'latency_ms'}}"""
+    data = json.loads(Path(path).read_text(encoding='utf-8'))
+    functions = data.get('functions')
+    if not isinstance(functions, dict):
+        raise ValueError(f"{path} は応答の記録ではありません（functions がありません）")
+    return functions
+
+
+def save_recordings(path, functions, base_url):
+    data = {'recorded_at': datetime.now().isoformat(timespec='seconds'), 'base_url': base_url,
+            'functions': functions}
+    Path(path).write_text(json.dumps(data, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+
+
+class _Handler(StubHandler):
+    # keep-alive（負荷試験のクライアントは接続を使い回す）
+    protocol_version = 'HTTP/1.1'
+    # ヘッダーと本文を別々に送るため、Nagle アルゴリズムで本文が遅れないようにする
+    disable_nagle_algorithm = True
+    extra_headers = CORS_HEADERS
+
+    def do_OPTIONS(self):
+        self._read_body()
+        self.send_response(200)
+        for key, value in CORS_HEADERS.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def endpoint(self, method, path, body):
+        stub = self.server.stub
+        if not path.startswith(FUNCTIONS_PREFIX):
+            return super().endpoint(method, path, body)
+        name = path[len(FUNCTIONS_PREFIX):].strip('/')
+        stub.count(name)
+        delay, status, body = stub.respond(name)
+        if delay > 0:
+            time.sleep(delay)
+        return self._send(status, body)
+
+
+class EdgeFunctionStub(StubServer):
+    """
+    記録した応答を返すHTTPサーバー（別スレッドで動かす）
+
+    Args:
+        recordings: {Function名: {'status', 'body', 'latency_ms'}}
+        port: 待ち受けポート（0なら空いているポート）
+        latency_ms: 記録がないFunctionの応答時間（ミリ秒）
+        jitter: 応答時間のばらつき（対数正規分布のσ。0なら一定）
+        error_rate: 500 を返す割合
+        seed: 乱数のシード
+    """
+
+    handler_class = _Handler
+
+    def __init__(self, recordings=None, port=DEFAULT_PORT, host='127.0.0.1', latency_ms=DEFAULT_LATENCY_MS,
+                 jitter=DEFAULT_JITTER, error_rate=0.0, seed=None):
+        super().__init__({'latency_ms': latency_ms, 'jitter': jitter, 'error_rate': error_rate}, port, host)
+        self.recordings = recordings or {}
+        self.random = random.Random(seed)
+
+    @property
+    def functions_url(self):
+        return self.url + FUNCTIONS_PREFIX.rstrip('/')
+
+    def respond(self, name):
+        """Function名 → (遅延（秒）, ステータス, 本文)"""
+        recording = self.recordings.get(name)
+        with self.lock:
+            state = dict(self.state)
+            noise = self.random.lognormvariate(0, state['jitter']) if state['jitter'] else 1.0
+            failed = self.random.random() < state['error_rate']
+        latency_ms = recording.get('latency_ms', state['latency_ms']) if recording else state['latency_ms']
+        delay = latency_ms * noise / 1000
+        if failed:
+            return delay, 500, {'success': False, 'error': 'stub failure'}
+        if recording:
+            return delay, recording.get('status', 200), recording.get('body')
+        return delay, 200, {'success': True}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Edge Functions のスタブサーバー')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けアドレス')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='待ち受けポート')
+    parser.add_argument('--recordings', help='tool/load_test.py --record で記録した応答')
+    parser.add_argument('--latency-ms', type=float, default=DEFAULT_LATENCY_MS, help='記録がないときの応答時間（ミリ秒）')
+    parser.add_argument('--jitter', type=float, default=DEFAULT_JITTER, help='応答時間のばらつき（対数正規分布のσ）')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='500 を返す割合')
+    parser.add_argument('--seed', type=int, help='乱数のシード')
+    args = parser.parse_args(argv)
+
+    recordings = load_recordings(args.recordings) if args.recordings else {}
+    stub = EdgeFunctionStub(recordings, args.port, args.host, args.latency_ms, args.jitter, args.error_rate,
+                            args.seed)
+    print(f"🧪 Edge Functions のスタブサーバー: {stub.functions_url}（記録 {len(recordings)}件、Ctrl+C で終了）")
+    stub.serve()
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,131 @@
+"""
+背景領域の連結成分抽出（Flood Fill共通処理）
+「背景かどうか」のboolマスクを行ごとのラン（連続区間）に分解し、
+ラン単位の幅優先探索でシード（四隅・外周）に連結した領域を求める
+
+ピクセル単位のキューや visited 配列を持たないため計算量はラン数に比例し、
+8K四方の画像でもメモリは入力マスク程度に収まる
+"""
+from collections import deque
+
+import numpy as np
+
+
+def dark_mask(arr, threshold):
+    """RGBすべてが閾値以下の暗いピクセルのマスク"""
+    return arr[..., :3].max(axis=-1) <= threshold
+
+
+def mask_runs(mask):
+    """マスクを行ごとのラン (starts, ends) のリストに変換（ends は排他的）"""
+    height, width = mask.shape
+    padded = np.zeros((height, width + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    rows, cols = np.nonzero(np.diff(padded, axis=1))
+    bounds = np.searchsorted(rows, np.arange(height + 1))
+    runs = []
+    for y in range(height):
+        edges = cols[bounds[y]:bounds[y + 1]]
+        runs.append((edges[0::2], edges[1::2]))
+    return runs
+
+
+def _seed_runs(runs, width, seeds):
+    """シード位置を含むランの (行, ラン番号) を列挙"""
+    height = len(runs)
+    if seeds == 'corners':
+        points = [(0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)]
+    elif seeds == 'border':
+        for y in (0, height - 1):
+            for i in range(len(runs[y][0])):
+                yield y, i
+        points = [(x, y) for y in range(height) for x in (0, width - 1)]
+    else:
+        points = seeds
+
+    for x, y in points:
+        starts, ends = runs[y]
+        i = np.searchsorted(starts, x, side='right') - 1
+        if i >= 0 and ends[i] > x:
+            yield y, int(i)
+
+
+def select_runs(runs, width, seeds='corners', connectivity=4):
+    """
+    シードに連結したランだけを抽出する
+
+    Args:
+        runs: mask_runs() の結果
+        width: 画像の幅
+        seeds: 'corners'（四隅）、'border'（外周すべて）、または (x, y) のリスト
+        connectivity: 4 または 8
+
+    Returns:
+        runs と同じ形式の、選択されたランだけのリスト
+    """
+    if connectivity not in (4, 8):
+        raise ValueError(f"connectivity は 4 か 8 を指定してください: {connectivity}")
+    reach = 0 if connectivity == 4 else 1
+    height = len(runs)
+    selected = [np.zeros(len(starts), dtype=bool) for starts, _ in runs]
+
+    queue = deque()
+    for y, i in _seed_runs(runs, width, seeds):
+        if not selected[y][i]:
+            selected[y][i] = True
+            queue.append((y, i))
+
+    while queue:
+        y, i = queue.popleft()
+        start, end = runs[y][0][i], runs[y][1][i]
+        for ny in (y - 1, y + 1):
+            if not 0 <= ny < height:
+                continue
+            starts, ends = runs[ny]
+            # 区間 [start - reach, end + reach) と重なるランが隣接ラン
+            lo = np.searchsorted(ends, start - reach, side='right')
+            hi = np.searchsorted(starts, end + reach, side='left')
+            for j in range(lo, hi):
+                if not selected[ny][j]:
+                    selected[ny][j] = True
+                    queue.append((ny, j))
+
+    return [(starts[flags], ends[flags]) for (starts, ends), flags in zip(runs, selected)]
+
+
+def runs_to_mask(runs, width):
+    """ランのリストをboolマスクに戻す"""
+    # ランの開始に+1、終了に-1を置いて行方向に累積和をとる
+    marks = np.zeros((len(runs), width + 1), dtype=np.int8)
+    for y, (starts, ends) in enumerate(runs):
+        marks[y, starts] = 1
+        marks[y, ends] = -1
+    return np.cumsum(marks[:, :width], axis=1, dtype=np.int8) > 0
+
+
+def connected_region(mask, seeds='corners', connectivity=4):
+    """マスクのうちシードに連結した領域だけのマスクを返す"""
+    width = mask.shape[1]
+    return runs_to_mask(select_runs(mask_runs(mask), width, seeds, connectivity), width)
+
+
+def remove_dark_background(arr, threshold=30, seeds='corners', connectivity=4, keep_rgb=False):
+    """
+    シードに連結した暗い背景を透過にする（配列を直接書き換える）
+
+    Args:
+        arr: RGBA配列
+        threshold: RGBすべてがこの値以下なら背景とみなす
+        seeds: select_runs() と同じ
+        connectivity: 4 または 8
+        keep_rgb: True ならRGBを残してアルファだけ0にする
+
+    Returns:
+        透過にしたピクセル数
+    """
+    region = connected_region(dark_mask(arr, threshold), seeds, connectivity)
+    if keep_rgb:
+        arr[..., 3][region] = 0
+    else:
+        arr[region] = 0
+    return int(np.count_nonzero(region))
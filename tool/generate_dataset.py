@@ -0,0 +1,628 @@
+#!/usr/bin/env python3
+"""
+負荷試験用の合成データセット生成
+database/ddl のテーブル定義（列・外部キー）を読み、参照整合性のとれたデータを COPY 形式（テキスト）のファイルに書き出す
+
+- users / groups / group_members / todos / todo_assignments / todo_comments /
+  recurring_todos / recurring_todo_assignments / group_invitations
+- IDは（テーブル, 連番）から決まるUUIDにし、親の行を覚えずに子の行から参照する
+  グループ単位で1回だけ走査して全てのファイルへ同時に書くため、メモリ使用量は行数によらない（グループの人数程度）
+- グループの人数・TODO数などは分布で指定する（zipf:ALPHA:MAX でロングテール）
+- 定期TODOの生成時刻は --peak-time（既定 09:00 JST）に --peak-share の割合で集中させる
+  next_generation_at は calculate_next_generation と同じ考え方で --now 以降の最初の生成時刻にし、
+  --now が生成時刻ちょうどなら、その時刻の定期TODOがまとめて生成対象になる（cron の1回分の負荷）
+
+出力先には <テーブル>.copy と、読み込み用の load.sql（psql の \\copy）、行数などを記録した manifest.json を書く
+
+使い方:
+    python tool/generate_dataset.py --users 10000 --out /tmp/dataset
+    python tool/generate_dataset.py --rows 1e6 --out /tmp/dataset --group-size zipf:1.6:2000 --peak-share 0.8
+    psql "$DATABASE_URL" -f /tmp/dataset/load.sql
+
+    # 読み込みと execute_recurring_todos() の計測は tool/benchmark_recurring_todos.py
+"""
+import argparse
+import bisect
+import itertools
+import json
+import math
+import random
+import sys
+from contextlib import ExitStack
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+from arg_types import JST, parse_count, parse_now
+from sql_schema import DDL_DIR, Schema
+
+# 生成するテーブル（外部キーの参照先が先）
+TABLES = (
+    'users', 'groups', 'group_members', 'todos', 'todo_assignments', 'todo_comments',
+    'recurring_todos', 'recurring_todo_assignments', 'group_invitations',
+)
+
+# テーブルごとに書き出す列（行のタプルの並び。DDLにない列があればエラー、ここにない列は DEFAULT で埋まる）
+FIELDS = {
+    'users': ('id', 'device_id', 'display_name', 'display_id', 'avatar_url', 'notification_deadline',
+              'notification_new_todo', 'notification_assigned', 'is_admin', 'is_ad_free', 'created_at',
+              'last_accessed_at', 'updated_at'),
+    'groups': ('id', 'name', 'description', 'icon_url', 'category', 'owner_id', 'created_at', 'updated_at'),
+    'group_members': ('id', 'group_id', 'user_id', 'role', 'display_order', 'joined_at'),
+    'todos': ('id', 'group_id', 'title', 'description', 'deadline', 'is_completed', 'completed_at', 'created_by',
+              'created_at', 'updated_at'),
+    'todo_assignments': ('id', 'todo_id', 'user_id', 'assigned_at'),
+    'todo_comments': ('id', 'todo_id', 'user_id', 'content', 'created_at', 'updated_at'),
+    'recurring_todos': ('id', 'group_id', 'title', 'description', 'recurrence_pattern', 'recurrence_days',
+                        'generation_time', 'next_generation_at', 'deadline_days_after', 'is_active', 'created_by',
+                        'created_at', 'updated_at'),
+    'recurring_todo_assignments': ('id', 'recurring_todo_id', 'user_id', 'assigned_at'),
+    'group_invitations': ('id', 'group_id', 'inviter_id', 'invited_user_id', 'invited_role', 'status', 'invited_at',
+                          'responded_at'),
+}
+
+DEFAULT_NOW = '2025-12-15T09:00:00+09:00'
+DEFAULT_SEED = 20251215
+
+# 既定の分布（人数はロングテール。平均はおおよそ グループ4人・TODO20件）
+DEFAULT_GROUP_SIZE = 'zipf:2.0:500'
+DEFAULT_TODOS_PER_GROUP = 'zipf:1.6:2000'
+DEFAULT_PERSONAL_TODOS = 'geometric:2'
+DEFAULT_ASSIGNEES = 'uniform:0:2'
+DEFAULT_COMMENTS = 'geometric:0.5'
+DEFAULT_RECURRING_PER_GROUP = 'geometric:0.8'
+DEFAULT_INVITATIONS_PER_GROUP = 'geometric:0.3'
+
+CATEGORIES = ('shopping', 'housework', 'work', 'hobby', 'other', 'none')
+TODO_TITLES = ('牛乳を買う', 'ゴミ出し', '洗濯物を取り込む', '資料を作成する', '会議の準備', '部屋の掃除',
+               '振込を確認する', '食材の買い出し', '植物に水やり', '週報を提出する', '予約の電話', '本を返却する')
+COMMENTS = ('了解です', '終わりました！', '明日やります', 'ありがとう', '少し遅れます', '買ってきました')
+# 定期TODOのパターンの割合
+RECURRENCE_WEIGHTS = (('daily', 0.5), ('weekly', 0.35), ('monthly', 0.15))
+# 招待の状態の割合
+INVITATION_WEIGHTS = (('pending', 0.5), ('accepted', 0.3), ('rejected', 0.2))
+
+# COPY のテキスト形式でエスケープが必要な文字
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+# display_id（英数字8文字）を連番から作るための乗数（36**8 と互いに素なので重複しない）
+DISPLAY_ID_ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+DISPLAY_ID_MULTIPLIER = 1_000_000_007
+
+
+class Distribution:
+    """
+    0以上の整数の分布
+
+    Args:
+        spec: 'zipf:ALPHA:MAX'（1〜MAX、ロングテール）/ 'uniform:MIN:MAX' / 'fixed:N' / 'geometric:MEAN'（0〜）
+    """
+
+    def __init__(self, spec):
+        self.spec = spec
+        kind, _, rest = spec.partition(':')
+        params = rest.split(':') if rest else []
+        try:
+            if kind == 'zipf' and len(params) == 2:
+                alpha, maximum = float(params[0]), int(params[1])
+                if maximum < 1:
+                    raise ValueError
+                weights = [k ** -alpha for k in range(1, maximum + 1)]
+                self.cumulative = list(itertools.accumulate(weights))
+                self._mean = sum(k * w for k, w in enumerate(weights, 1)) / self.cumulative[-1]
+            elif kind == 'uniform' and len(params) == 2:
+                self.low, self.high = int(params[0]), int(params[1])
+                if not 0 <= self.low <= self.high:
+                    raise ValueError
+                self._mean = (self.low + self.high) / 2
+            elif kind == 'fixed' and len(params) == 1:
+                self.value = int(params[0])
+                if self.value < 0:
+                    raise ValueError
+                self._mean = self.value
+            elif kind == 'geometric' and len(params) == 1:
+                self._mean = float(params[0])
+                if self._mean < 0:
+                    raise ValueError
+                self.log_q = math.log(self._mean / (self._mean + 1)) if self._mean else None
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError(f"分布の指定が正しくありません: {spec}"
+                             "（zipf:ALPHA:MAX / uniform:MIN:MAX / fixed:N / geometric:MEAN）") from None
+        self.kind = kind
+
+    def sample(self, rng):
+        if self.kind == 'zipf':
+            return bisect.bisect_left(self.cumulative, rng.random() * self.cumulative[-1]) + 1
+        if self.kind == 'uniform':
+            return rng.randint(self.low, self.high)
+        if self.kind == 'fixed':
+            return self.value
+        if self.log_q is None:
+            return 0
+        return int(math.log(1.0 - rng.random()) / self.log_q)
+
+    def mean(self):
+        return self._mean
+
+    def __str__(self):
+        return self.spec
+
+
+class DatasetConfig:
+    """
+    データセットの規模と偏り
+
+    Args:
+        users: ユーザー数
+        groups_per_user: ユーザー1人あたりのグループ数（グループ数 = users × groups_per_user）
+        now: 基準時刻（created_at などはこれより前、next_generation_at はこれ以降）
+        peak_time: 定期TODOの生成時刻が集中する時刻（JST）
+        peak_share: 生成時刻が peak_time の定期TODOの割合（残りは 06:00〜22:45 の15分刻み）
+        overdue_share: next_generation_at が過去になっている（cron が止まっていた）定期TODOの割合
+        departed_share: 定期TODOの担当者がグループを抜けている割合（execute_recurring_todos のフォールバック）
+    """
+
+    def __init__(self, users, groups_per_user=0.6, seed=DEFAULT_SEED, now=DEFAULT_NOW, history_days=365,
+                 group_size=DEFAULT_GROUP_SIZE, todos_per_group=DEFAULT_TODOS_PER_GROUP,
+                 personal_todos=DEFAULT_PERSONAL_TODOS, assignees=DEFAULT_ASSIGNEES, comments=DEFAULT_COMMENTS,
+                 recurring_per_group=DEFAULT_RECURRING_PER_GROUP,
+                 invitations_per_group=DEFAULT_INVITATIONS_PER_GROUP, completed_share=0.6, peak_time='09:00',
+                 peak_share=0.6, inactive_share=0.1, overdue_share=0.0, departed_share=0.05):
+        if users < 1:
+            raise ValueError("ユーザー数は1以上にしてください")
+        for name, share in (('completed_share', completed_share), ('peak_share', peak_share),
+                            ('inactive_share', inactive_share), ('overdue_share', overdue_share),
+                            ('departed_share', departed_share)):
+            if not 0 <= share <= 1:
+                raise ValueError(f"{name} は 0〜1 で指定してください: {share}")
+        self.users = int(users)
+        self.groups = max(1, round(users * groups_per_user))
+        self.groups_per_user = groups_per_user
+        self.seed = seed
+        self.now = parse_now(now)
+        self.history = timedelta(days=history_days)
+        self.group_size = _distribution(group_size)
+        self.todos_per_group = _distribution(todos_per_group)
+        self.personal_todos = _distribution(personal_todos)
+        self.assignees = _distribution(assignees)
+        self.comments = _distribution(comments)
+        self.recurring_per_group = _distribution(recurring_per_group)
+        self.invitations_per_group = _distribution(invitations_per_group)
+        self.completed_share = completed_share
+        self.peak_time = time.fromisoformat(peak_time)
+        self.peak_share = peak_share
+        self.inactive_share = inactive_share
+        self.overdue_share = overdue_share
+        self.departed_share = departed_share
+
+    @classmethod
+    def for_rows(cls, rows, **options):
+        """全テーブルの合計がおおよそ rows 行になるユーザー数の設定"""
+        probe = cls(1, **options)
+        return cls(max(1, round(rows / probe.expected_rows_per_user())), **options)
+
+    def expected_rows_per_user(self):
+        """ユーザー1人あたりの行数の期待値（分布の平均から。人数による上限は無視する）"""
+        todos = self.todos_per_group.mean()
+        recurring = self.recurring_per_group.mean()
+        per_group = (1 + self.group_size.mean() + todos * (1 + self.assignees.mean() + self.comments.mean())
+                     + recurring * (1 + self.assignees.mean()) + self.invitations_per_group.mean())
+        return 1 + self.personal_todos.mean() * 1.5 + self.groups_per_user * per_group
+
+    def to_dict(self):
+        return {
+            'users': self.users, 'groups': self.groups, 'seed': self.seed, 'now': self.now.isoformat(),
+            'history_days': self.history.days, 'group_size': str(self.group_size),
+            'todos_per_group': str(self.todos_per_group), 'personal_todos': str(self.personal_todos),
+            'assignees': str(self.assignees), 'comments': str(self.comments),
+            'recurring_per_group': str(self.recurring_per_group),
+            'invitations_per_group': str(self.invitations_per_group), 'completed_share': self.completed_share,
+            'peak_time': self.peak_time.isoformat('minutes'), 'peak_share': self.peak_share,
+            'inactive_share': self.inactive_share, 'overdue_share': self.overdue_share,
+            'departed_share': self.departed_share,
+        }
+
+
+def _distribution(value):
+    return value if isinstance(value, Distribution) else Distribution(value)
+
+
+# ===================================
+# 値の作成
+# ===================================
+
+def uuid_for(table, n):
+    """（テーブル, 連番）から決まるUUID（バージョン4の形式）"""
+    return f"{TABLES.index(table) + 1:08x}-0000-4000-8000-{n:012x}"
+
+
+def display_id(n):
+    """連番から重複しない8文字の表示用ID"""
+    value = (n * DISPLAY_ID_MULTIPLIER) % 36 ** 8
+    chars = []
+    for _ in range(8):
+        value, digit = divmod(value, 36)
+        chars.append(DISPLAY_ID_ALPHABET[digit])
+    return ''.join(chars)
+
+
+def copy_value(value):
+    """COPY のテキスト形式の1項目"""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(' ')
+    if isinstance(value, (list, tuple)):
+        return '{' + ','.join(str(item) for item in value) + '}'
+    if isinstance(value, str):
+        return value.translate(COPY_ESCAPES)
+    return str(value)
+
+
+def next_generation(pattern, days, generation_time, base):
+    """
+    base 以降で最初の生成時刻（JSTの generation_time）
+    base ちょうどの生成時刻も含める（cron がその時刻にまだ実行されていない状態）
+    """
+    base_jst = base.astimezone(JST)
+    for offset in range(62):
+        day = base_jst.date() + timedelta(days=offset)
+        if pattern == 'weekly' and (day.weekday() + 1) % 7 not in days:
+            continue
+        if pattern == 'monthly' and not _matches_month_day(day, days):
+            continue
+        candidate = datetime.combine(day, generation_time, JST)
+        if candidate >= base_jst:
+            return candidate
+    raise ValueError(f"次回生成日時が見つかりません: {pattern} {days}")
+
+
+def _matches_month_day(day, days):
+    last = (date(day.year + day.month // 12, day.month % 12 + 1, 1) - timedelta(days=1)).day
+    return day.day in days or (-1 in days and day.day == last)
+
+
+# ===================================
+# 書き出し
+# ===================================
+
+class CopyWriter:
+    """1テーブル分の COPY 形式のファイル"""
+
+    def __init__(self, path, table, columns):
+        self.path = Path(path)
+        self.table = table
+        self.columns = columns
+        self.rows = 0
+        self.file = open(self.path, 'w', encoding='utf-8', newline='\n')
+
+    def write(self, row):
+        self.file.write('\t'.join(copy_value(value) for value in row))
+        self.file.write('\n')
+        self.rows += 1
+
+    def close(self):
+        self.file.close()
+
+
+def table_columns(schema_paths=None):
+    """
+    DDLから生成対象のテーブルの列を読み、書き出す列を確かめる
+    → {テーブル: DDLの列名の一覧}
+    """
+    schema = Schema.load(schema_paths or sorted(DDL_DIR.glob('*.sql')))
+    columns = {}
+    for table in TABLES:
+        if table not in schema.tables:
+            raise ValueError(f"DDLにテーブルがありません: {table}")
+        defined = schema.tables[table].columns
+        unknown = [column for column in FIELDS[table] if column not in defined]
+        if unknown:
+            raise ValueError(f"DDLの {table} にない列です: {', '.join(unknown)}")
+        for column in FIELDS[table]:
+            reference = defined[column].references
+            if reference and reference[0] not in TABLES:
+                raise ValueError(f"{table}.{column} の参照先 {reference[0]} は生成対象ではありません")
+        columns[table] = list(defined)
+    return columns
+
+
+def load_order(schema_paths=None):
+    """外部キーの参照先が先になる読み込み順"""
+    schema = Schema.load(schema_paths or sorted(DDL_DIR.glob('*.sql')))
+    order = []
+    pending = list(TABLES)
+    while pending:
+        for table in pending:
+            parents = {column.references[0] for column in schema.tables[table].columns.values()
+                       if column.references and column.references[0] != table}
+            if parents & set(pending):
+                continue
+            order.append(table)
+            pending.remove(table)
+            break
+        else:
+            raise ValueError(f"外部キーが循環しています: {', '.join(pending)}")
+    return order
+
+
+class DatasetGenerator:
+    """
+    設定に従って全テーブルの行を一度に書き出す
+
+    Args:
+        config: DatasetConfig
+        progress: 進捗を表示するか（標準エラー出力）
+    """
+
+    def __init__(self, config, progress=False):
+        self.config = config
+        self.progress = progress
+        self.rng = random.Random(config.seed)
+        self.counters = {table: itertools.count() for table in TABLES}
+        self.due = 0
+
+    def _id(self, table):
+        return uuid_for(table, next(self.counters[table]))
+
+    def _user_created_at(self, user):
+        # ユーザーは期間の中で一定のペースで登録したことにする（グループなどは登録より後に作る）
+        start = self.config.now - self.config.history
+        return start + self.config.history * (user / self.config.users)
+
+    def _between(self, start, end):
+        if end <= start:
+            return end
+        return start + (end - start) * self.rng.random()
+
+    def generate(self, out_dir):
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        table_columns()
+        with ExitStack() as stack:
+            self.writers = {}
+            for table in TABLES:
+                writer = CopyWriter(out_dir / f"{table}.copy", table, FIELDS[table])
+                stack.callback(writer.close)
+                self.writers[table] = writer
+            self._users()
+            for group in range(self.config.groups):
+                self._group(group)
+                if self.progress and group % 10000 == 0:
+                    print(f"\r   グループ {group:,}/{self.config.groups:,}", end='', file=sys.stderr, flush=True)
+        if self.progress:
+            print(f"\r   グループ {self.config.groups:,}/{self.config.groups:,}", file=sys.stderr)
+
+        rows = {table: writer.rows for table, writer in self.writers.items()}
+        manifest = {
+            'config': self.config.to_dict(),
+            'rows': rows,
+            'total_rows': sum(rows.values()),
+            'due_recurring_todos': self.due,
+            'load_order': load_order(),
+            'columns': {table: list(FIELDS[table]) for table in TABLES},
+        }
+        (out_dir / 'manifest.json').write_text(json.dumps(manifest, ensure_ascii=False, indent=2) + '\n',
+                                               encoding='utf-8')
+        (out_dir / 'load.sql').write_text(load_script(out_dir, manifest['load_order']), encoding='utf-8')
+        return manifest
+
+    def _users(self):
+        config, rng, writers = self.config, self.rng, self.writers
+        for user in range(config.users):
+            user_id = uuid_for('users', user)
+            created_at = self._user_created_at(user)
+            last_accessed_at = self._between(created_at, config.now)
+            writers['users'].write((
+                user_id, f"device-{user:010d}", f"ユーザー{user + 1}", display_id(user), None,
+                rng.random() < 0.9, rng.random() < 0.9, rng.random() < 0.9, False, rng.random() < 0.01,
+                created_at, last_accessed_at, last_accessed_at,
+            ))
+            # 個人のTODO（group_id が NULL）。半分は自分を担当者にする
+            for _ in range(config.personal_todos.sample(rng)):
+                todo_id = self._todo(None, user_id, created_at)
+                if rng.random() < 0.5:
+                    writers['todo_assignments'].write((self._id('todo_assignments'), todo_id, user_id,
+                                                       self._between(created_at, config.now)))
+
+    def _group(self, group):
+        config, rng, writers = self.config, self.rng, self.writers
+        owner = rng.randrange(config.users)
+        size = min(config.group_size.sample(rng), config.users)
+        others = [user for user in rng.sample(range(config.users), size) if user != owner][:size - 1]
+        members = [uuid_for('users', user) for user in [owner] + others]
+        member_set = set(members)
+
+        group_id = uuid_for('groups', group)
+        created_at = self._between(self._user_created_at(owner), config.now)
+        writers['groups'].write((
+            group_id, f"グループ{group + 1}", '家族の買い物と家事' if rng.random() < 0.3 else None, None,
+            rng.choice(CATEGORIES), members[0], created_at, created_at,
+        ))
+        # display_order はユーザーごとの昇順であればよいので、グループの連番を使う
+        for index, user in enumerate([owner] + others):
+            joined_at = created_at if index == 0 else self._between(max(created_at, self._user_created_at(user)),
+                                                                    config.now)
+            writers['group_members'].write((self._id('group_members'), group_id, members[index],
+                                            'owner' if index == 0 else 'member', group, joined_at))
+
+        for _ in range(config.todos_per_group.sample(rng)):
+            author = rng.choice(members)
+            todo_id = self._todo(group_id, author, created_at)
+            for user_id in rng.sample(members, min(config.assignees.sample(rng), len(members))):
+                writers['todo_assignments'].write((self._id('todo_assignments'), todo_id, user_id,
+                                                   self._between(created_at, config.now)))
+            for _ in range(config.comments.sample(rng)):
+                comment_at = self._between(created_at, config.now)
+                writers['todo_comments'].write((self._id('todo_comments'), todo_id, rng.choice(members),
+                                                rng.choice(COMMENTS), comment_at, comment_at))
+
+        for _ in range(config.recurring_per_group.sample(rng)):
+            self._recurring_todo(group_id, members, created_at)
+
+        invitations = config.invitations_per_group.sample(rng)
+        invited = set()
+        for _ in range(invitations * 3):
+            if len(invited) >= invitations:
+                break
+            user_id = uuid_for('users', rng.randrange(config.users))
+            if user_id in member_set or user_id in invited:
+                continue
+            invited.add(user_id)
+            status = _weighted(rng, INVITATION_WEIGHTS)
+            invited_at = self._between(created_at, config.now)
+            writers['group_invitations'].write((
+                self._id('group_invitations'), group_id, rng.choice(members[:2]), user_id, 'member', status,
+                invited_at, None if status == 'pending' else self._between(invited_at, config.now),
+            ))
+
+    def _todo(self, group_id, author, since):
+        config, rng = self.config, self.rng
+        todo_id = self._id('todos')
+        created_at = self._between(since, config.now)
+        deadline = created_at + timedelta(days=rng.randint(0, 14), hours=rng.randint(0, 23)) \
+            if rng.random() < 0.5 else None
+        completed = rng.random() < config.completed_share
+        completed_at = self._between(created_at, config.now) if completed else None
+        self.writers['todos'].write((
+            todo_id, group_id, rng.choice(TODO_TITLES), 'メモ: 忘れずに' if rng.random() < 0.3 else None,
+            deadline, completed, completed_at, author, created_at, completed_at or created_at,
+        ))
+        return todo_id
+
+    def _recurring_todo(self, group_id, members, since):
+        config, rng = self.config, self.rng
+        recurring_id = self._id('recurring_todos')
+        pattern = _weighted(rng, RECURRENCE_WEIGHTS)
+        if pattern == 'weekly':
+            days = sorted(rng.sample(range(7), rng.randint(1, 3)))
+        elif pattern == 'monthly':
+            days = [-1] if rng.random() < 0.2 else sorted(rng.sample(range(1, 29), rng.randint(1, 2)))
+        else:
+            days = None
+        if rng.random() < config.peak_share:
+            generation_time = config.peak_time
+        else:
+            slot = rng.randrange(6 * 4, 23 * 4)
+            generation_time = time(slot // 4, slot % 4 * 15)
+
+        active = rng.random() >= config.inactive_share
+        if active and rng.random() < config.overdue_share:
+            next_at = config.now - timedelta(minutes=rng.randint(1, 24 * 60))
+        else:
+            next_at = next_generation(pattern, days, generation_time, config.now)
+        if active and next_at <= config.now:
+            self.due += 1
+
+        created_at = self._between(since, config.now)
+        self.writers['recurring_todos'].write((
+            recurring_id, group_id, rng.choice(TODO_TITLES), None, pattern, days, generation_time.isoformat(),
+            next_at, rng.randint(1, 7) if rng.random() < 0.6 else None, active, rng.choice(members), created_at,
+            created_at,
+        ))
+        for user_id in rng.sample(members, min(config.assignees.sample(rng), len(members))):
+            if rng.random() < config.departed_share:
+                # グループを抜けた担当者（メンバー以外のユーザー）
+                user_id = uuid_for('users', rng.randrange(config.users))
+                if user_id in members:
+                    continue
+            self.writers['recurring_todo_assignments'].write((self._id('recurring_todo_assignments'),
+                                                              recurring_id, user_id, created_at))
+
+
+def _weighted(rng, weights):
+    value = rng.random()
+    for choice, weight in weights:
+        value -= weight
+        if value < 0:
+            return choice
+    return weights[-1][0]
+
+
+def load_script(out_dir, order):
+    """データを読み込む psql スクリプト（外部キー・トリガーを止めて \\copy で読み込み、統計を更新する）"""
+    lines = [
+        '-- tool/generate_dataset.py が生成した読み込みスクリプト',
+        '-- session_replication_role = replica で外部キーの検査とトリガーを止める（スーパーユーザーが必要）',
+        '\\set ON_ERROR_STOP on',
+        'SET session_replication_role = replica;',
+    ]
+    for table in order:
+        path = (Path(out_dir) / f"{table}.copy").resolve()
+        quoted = str(path).replace("'", "''")
+        lines.append(f"\\copy {table} ({', '.join(FIELDS[table])}) FROM '{quoted}'")
+    lines.append('SET session_replication_role = origin;')
+    lines.append(f"ANALYZE {', '.join(order)};")
+    return '\n'.join(lines) + '\n'
+
+
+def generate(config, out_dir, progress=False):
+    """データセットを書き出して manifest（行数など）を返す"""
+    return DatasetGenerator(config, progress).generate(out_dir)
+
+
+def add_config_arguments(parser):
+    """DatasetConfig の偏りの設定の引数（tool/benchmark_recurring_todos.py と共通）"""
+    parser.add_argument('--groups-per-user', type=float, default=0.6, help='ユーザー1人あたりのグループ数')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='乱数のシード')
+    parser.add_argument('--now', default=DEFAULT_NOW, help=f'基準時刻（既定: {DEFAULT_NOW}）')
+    parser.add_argument('--history-days', type=int, default=365, help='作成日時をさかのぼる日数')
+    parser.add_argument('--group-size', default=DEFAULT_GROUP_SIZE, help='グループの人数の分布')
+    parser.add_argument('--todos-per-group', default=DEFAULT_TODOS_PER_GROUP, help='グループあたりのTODO数の分布')
+    parser.add_argument('--personal-todos', default=DEFAULT_PERSONAL_TODOS, help='ユーザーあたりの個人TODO数の分布')
+    parser.add_argument('--assignees', default=DEFAULT_ASSIGNEES, help='TODOあたりの担当者数の分布')
+    parser.add_argument('--comments', default=DEFAULT_COMMENTS, help='TODOあたりのコメント数の分布')
+    parser.add_argument('--recurring-per-group', default=DEFAULT_RECURRING_PER_GROUP,
+                        help='グループあたりの定期TODO数の分布')
+    parser.add_argument('--invitations-per-group', default=DEFAULT_INVITATIONS_PER_GROUP,
+                        help='グループあたりの招待数の分布')
+    parser.add_argument('--peak-time', default='09:00', help='定期TODOの生成時刻が集中する時刻（JST）')
+    parser.add_argument('--peak-share', type=float, default=0.6, help='生成時刻が --peak-time の定期TODOの割合')
+    parser.add_argument('--overdue-share', type=float, default=0.0,
+                        help='next_generation_at が過去になっている定期TODOの割合')
+    parser.add_argument('--departed-share', type=float, default=0.05, help='グループを抜けた定期TODO担当者の割合')
+
+
+def config_options(args):
+    return {
+        'groups_per_user': args.groups_per_user, 'seed': args.seed, 'now': args.now,
+        'history_days': args.history_days, 'group_size': args.group_size, 'todos_per_group': args.todos_per_group,
+        'personal_todos': args.personal_todos, 'assignees': args.assignees, 'comments': args.comments,
+        'recurring_per_group': args.recurring_per_group, 'invitations_per_group': args.invitations_per_group,
+        'peak_time': args.peak_time, 'peak_share': args.peak_share, 'overdue_share': args.overdue_share,
+        'departed_share': args.departed_share,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='負荷試験用の合成データセット（COPY形式）を生成')
+    scale = parser.add_mutually_exclusive_group(required=True)
+    scale.add_argument('--users', type=parse_count, help='ユーザー数')
+    scale.add_argument('--rows', type=parse_count, help='全テーブルの合計のおおよその行数（1e6 のように指定可）')
+    parser.add_argument('--out', required=True, help='出力先ディレクトリ')
+    add_config_arguments(parser)
+    args = parser.parse_args(argv)
+
+    options = config_options(args)
+    config = DatasetConfig.for_rows(args.rows, **options) if args.rows else DatasetConfig(args.users, **options)
+    print(f"🧪 データセットを生成中: ユーザー {config.users:,}人 / グループ {config.groups:,}件 → {args.out}")
+    manifest = generate(config, args.out, progress=True)
+
+    print(f"✅ 合計 {manifest['total_rows']:,}行")
+    for table in manifest['load_order']:
+        print(f"   {table:<28} {manifest['rows'][table]:>12,}")
+    print(f"   {config.now.isoformat()} に生成対象になる定期TODO: {manifest['due_recurring_todos']:,}件")
+    print(f"   読み込み: psql \"$DATABASE_URL\" -f {Path(args.out) / 'load.sql'}")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+グループアイコンのサイズ別バリアント一括生成
+Storage の group-icons バケットに置かれた元画像（<グループID>/icon.png / icon.jpg）から、
+一覧画面のアバター用に固定サイズ（既定 64 / 128 / 256px）の正方形の画像を作る
+（get-user-groups などは元画像の署名付きURLを返すため、一覧でも元の大きさの画像をダウンロードしている）
+
+- バケットはローカルのディレクトリで代用する（Storage から同期したもの。Supabaseなしで試せる）
+- 出力は元画像と同じディレクトリの <名前>_<サイズ>.<拡張子>（例: 1f0e.../icon_128.png）
+  PNG は透過を保ったまま png_optimize で最小のPNGに、JPEG はプログレッシブJPEGにする
+- 元画像を1回だけデコードし（JPEG は必要な大きさまで縮小デコード）、中央の正方形を切り出して
+  大きいサイズから順に縮小する。元画像より大きいサイズは拡大せず元画像の大きさで書き出す
+- 元画像ごとにプロセスプールで並列に処理する
+- マニフェスト（<バケット>/.variants_manifest.json）に元画像のハッシュと設定を記録し、
+  前回から変わっていない元画像は開かずにスキップする（更新時刻・サイズ、一致しなければ内容のハッシュで判定）
+
+使い方:
+    python tool/generate_group_icon_variants.py storage/group-icons
+    python tool/generate_group_icon_variants.py storage/group-icons --sizes 64,128 --workers 4
+    python tool/generate_group_icon_variants.py storage/group-icons --prune     # 元画像のないバリアントを削除
+    python tool/generate_group_icon_variants.py storage/group-icons --dry-run   # 処理対象だけ表示
+"""
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from icon_cache import atomic_write, bytes_hash, file_hash
+from png_optimize import format_saving, smallest_png
+
+DEFAULT_SIZES = (64, 128, 256)
+DEFAULT_JPEG_QUALITY = 85
+MANIFEST_NAME = '.variants_manifest.json'
+
+# 元画像（create-group / create-todo がアップロードする <グループID>/icon.<拡張子>）
+SOURCE_PATTERN = re.compile(r"^icon\.(png|jpe?g|webp)$", re.IGNORECASE)
+
+# 出力の形式（元画像の拡張子 → (拡張子, PILの形式)）
+OUTPUT_FORMATS = {
+    'png': ('png', 'PNG'),
+    'jpg': ('jpg', 'JPEG'),
+    'jpeg': ('jpg', 'JPEG'),
+    'webp': ('png', 'PNG'),
+}
+
+# 出力の作り方を変えたら上げる（マニフェストの記録が無効になり全て作り直す）
+VARIANTS_VERSION = 1
+
+
+def variant_path(source_path, size):
+    """元画像のパス → バリアントのパス（Storage のオブジェクトパスにもそのまま使える）"""
+    source_path = Path(source_path)
+    extension, _ = OUTPUT_FORMATS[source_path.suffix.lower().lstrip('.')]
+    return source_path.with_name(f"{source_path.stem}_{size}.{extension}")
+
+
+def find_sources(bucket_dir):
+    """バケット内の元画像（バケットからの相対パス順）"""
+    bucket_dir = Path(bucket_dir)
+    return sorted((p for p in bucket_dir.rglob('icon.*') if p.is_file() and SOURCE_PATTERN.match(p.name)),
+                  key=lambda p: p.relative_to(bucket_dir).as_posix())
+
+
+def settings_key(sizes, quality):
+    """バリアントの設定を表す値（変われば全て作り直す）"""
+    return bytes_hash(json.dumps([VARIANTS_VERSION, sorted(sizes), quality]).encode('utf-8'))[:16]
+
+
+class VariantManifest:
+    """
+    元画像ごとの前回の結果（更新時刻・サイズ・内容のハッシュ・設定・出力）
+
+    記録するのはバリアントを全て書き出せた元画像だけ（エラーになったものは毎回処理する）
+    """
+
+    def __init__(self, bucket_dir):
+        self.bucket_dir = Path(bucket_dir)
+        self.path = self.bucket_dir / MANIFEST_NAME
+        self.sources = {}
+        if self.path.exists():
+            data = json.loads(self.path.read_text(encoding='utf-8'))
+            if data.get('version') == 1:
+                self.sources = data['sources']
+
+    def _key(self, path):
+        return Path(path).relative_to(self.bucket_dir).as_posix()
+
+    def is_fresh(self, path, settings):
+        """前回の結果が使えるなら True（出力が消えていれば作り直す）"""
+        entry = self.sources.get(self._key(path))
+        if entry is None or entry['settings'] != settings:
+            return False
+        if not all((self.bucket_dir / output).exists() for output in entry['variants'].values()):
+            return False
+        stat = os.stat(path)
+        if entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            return True
+        # 更新時刻だけ変わった（同期し直した等）場合は内容で判定する
+        if entry['size'] != stat.st_size or entry['sha256'] != file_hash(path):
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+
+    def record(self, path, settings, sha256, variants):
+        stat = os.stat(path)
+        self.sources[self._key(path)] = {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': sha256,
+            'settings': settings,
+            'variants': {str(size): self._key(output) for size, output in variants.items()},
+        }
+
+    def forget(self, path):
+        self.sources.pop(self._key(path), None)
+
+    def save(self):
+        atomic_write(self.path, (json.dumps({'version': 1, 'sources': self.sources}, indent=2, sort_keys=True,
+                                            ensure_ascii=False) + "\n").encode('utf-8'))
+
+
+def decode_square(source_path, largest):
+    """
+    元画像を正方形に切り出してデコードする
+
+    JPEG は draft で largest の2倍以上を保つ範囲まで縮小デコードする（DCTの段階で1/2〜1/8にできる）
+    """
+    with Image.open(source_path) as img:
+        if img.format == 'JPEG':
+            img.draft('RGB', (largest * 2, largest * 2))
+        img = ImageOps.exif_transpose(img)
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P', 'PA') or 'transparency' in img.info
+                          else 'RGB')
+    width, height = img.size
+    side = min(width, height)
+    left, top = (width - side) // 2, (height - side) // 2
+    return img.crop((left, top, left + side, top + side))
+
+
+def encode_variant(img, pil_format, quality):
+    """バリアント1つをエンコードする"""
+    if pil_format == 'PNG':
+        mode = 'RGBA' if img.mode == 'RGBA' and img.getextrema()[3][0] < 255 else 'RGB'
+        # 元画像単位でプロセスを分けているので、1枚の中の候補は直列に試す
+        data, _, _ = smallest_png(np.array(img.convert('RGBA')), mode, workers=1)
+        return data
+    buffer = io.BytesIO()
+    img.convert('RGB').save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def _render(task):
+    """1つの元画像の全バリアントを書き出す（ワーカープロセスで実行）"""
+    source_path, sizes, quality, dry_run = task
+    try:
+        sha256 = file_hash(source_path)
+        _, pil_format = OUTPUT_FORMATS[Path(source_path).suffix.lower().lstrip('.')]
+        img = decode_square(source_path, max(sizes))
+        outputs = {}
+        # 大きいサイズから順に縮小し、次のサイズはその結果から作る（2倍以内なので LANCZOS の画質は保たれる）
+        for size in sorted(sizes, reverse=True):
+            pixels = min(size, img.size[0])
+            if img.size[0] != pixels:
+                img = img.resize((pixels, pixels), Image.LANCZOS, reducing_gap=2.0)
+            data = encode_variant(img, pil_format, quality)
+            output = variant_path(source_path, size)
+            if not dry_run:
+                atomic_write(output, data)
+            outputs[size] = (str(output), pixels, len(data))
+        return str(source_path), sha256, os.path.getsize(source_path), outputs, None
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        return str(source_path), None, None, {}, str(e)
+
+
+def prune_variants(bucket_dir, sizes, dry_run=False):
+    """元画像がなくなったバリアントを削除する。削除したパスのリストを返す"""
+    bucket_dir = Path(bucket_dir)
+    pattern = re.compile(r"^icon_(\d+)\.(png|jpg)$")
+    removed = []
+    for path in sorted(bucket_dir.rglob('icon_*')):
+        match = pattern.match(path.name)
+        if not match:
+            continue
+        has_source = any(SOURCE_PATTERN.match(p.name) and variant_path(p, int(match.group(1))) == path
+                         for p in path.parent.glob('icon.*'))
+        if not has_source or int(match.group(1)) not in sizes:
+            if not dry_run:
+                path.unlink()
+            removed.append(path)
+    return removed
+
+
+def generate_variants(bucket_dir, sizes=DEFAULT_SIZES, quality=DEFAULT_JPEG_QUALITY, workers=None,
+                      use_manifest=True, dry_run=False, prune=False):
+    """
+    バケット内の元画像からバリアントを生成する
+
+    Args:
+        bucket_dir: group-icons バケットの代わりのディレクトリ
+        sizes: 出力する一辺のピクセル数
+        quality: JPEG の品質
+        workers: プロセス数（省略時はCPUコア数）
+        use_manifest: False なら前回の結果を使わず全て作り直す
+        dry_run: 書き出さずに処理対象と削減量だけ表示する
+        prune: 元画像のないバリアント・sizes にないサイズのバリアントを削除する
+
+    Returns:
+        エラーになった元画像の数
+    """
+    bucket_dir = Path(bucket_dir)
+    if not bucket_dir.is_dir():
+        raise ValueError(f"バケットのディレクトリがありません: {bucket_dir}")
+    sizes = sorted(set(sizes))
+    if not sizes or sizes[0] <= 0:
+        raise ValueError(f"サイズは正の整数で指定してください: {sizes}")
+    start = time.perf_counter()
+    settings = settings_key(sizes, quality)
+    manifest = VariantManifest(bucket_dir)
+    sources = find_sources(bucket_dir)
+    pending = [p for p in sources if not (use_manifest and manifest.is_fresh(p, settings))]
+    print(f"📂 {bucket_dir}: 元画像 {len(sources):,}件（処理対象 {len(pending):,}件、"
+          f"前回から変更なし {len(sources) - len(pending):,}件）")
+
+    errors = 0
+    source_bytes = 0
+    size_bytes = {size: 0 for size in sizes}
+    if pending:
+        print(f"🔄 {', '.join(f'{s}px' for s in sizes)} を生成中（{workers or os.cpu_count()}プロセス）...")
+        tasks = [(str(p), sizes, quality, dry_run) for p in pending]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for source, sha256, original, outputs, error in executor.map(_render, tasks, chunksize=4):
+                relative = Path(source).relative_to(bucket_dir).as_posix()
+                if error:
+                    errors += 1
+                    manifest.forget(source)
+                    print(f"   ❌ {relative}: {error}")
+                    continue
+                source_bytes += original
+                for size, (_, _, length) in outputs.items():
+                    size_bytes[size] += length
+                if not dry_run:
+                    manifest.record(source, settings, sha256, {size: path for size, (path, _, _) in outputs.items()})
+
+    if prune:
+        removed = prune_variants(bucket_dir, sizes, dry_run)
+        for path in removed:
+            print(f"   🗑️  {path.relative_to(bucket_dir).as_posix()}")
+        for path in list(manifest.sources):
+            if not (bucket_dir / path).exists():
+                del manifest.sources[path]
+
+    if not dry_run:
+        manifest.save()
+    processed = len(pending) - errors
+    print(f"{'🔍' if dry_run else '✅'} バリアント生成{'（dry-run）' if dry_run else ''}: "
+          f"{processed:,}件（{time.perf_counter() - start:.2f}秒）" + (f"（エラー {errors}件）" if errors else ""))
+    if processed:
+        for size in sizes:
+            print(f"   {size:>4}px: 元画像 {format_saving(source_bytes, size_bytes[size])}")
+    return errors
+
+
+def _parse_sizes(value):
+    try:
+        return [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"サイズはカンマ区切りの整数で指定してください: {value!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='グループアイコンのサイズ別バリアント一括生成')
+    parser.add_argument('bucket_dir', help='group-icons バケットの代わりのディレクトリ')
+    parser.add_argument('--sizes', type=_parse_sizes, default=list(DEFAULT_SIZES),
+                        help='出力する一辺のピクセル数（カンマ区切り。既定: 64,128,256）')
+    parser.add_argument('--quality', type=int, default=DEFAULT_JPEG_QUALITY, help='JPEG の品質')
+    parser.add_argument('--workers', type=int, help='プロセス数（省略時はCPUコア数）')
+    parser.add_argument('--no-manifest', action='store_true', help='前回の結果を使わず全て作り直す')
+    parser.add_argument('--prune', action='store_true', help='元画像のないバリアントを削除する')
+    parser.add_argument('--dry-run', action='store_true', help='書き出さずに処理対象と削減量だけ表示する')
+    args = parser.parse_args(argv)
+
+    errors = generate_variants(args.bucket_dir, args.sizes, args.quality, args.workers,
+                               use_manifest=not args.no_manifest, dry_run=args.dry_run, prune=args.prune)
+    return 2 if errors else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
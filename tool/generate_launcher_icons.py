@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+ランチャーアイコン一括生成スクリプト
+マスター画像を一度だけ読み込み、Androidの mipmap / アダプティブアイコン前景と
+iOSの AppIcon.appiconset の全サイズをプロセスプールで並列に生成する
+（create_ios_icon.py + flutter_launcher_icons の置き換え）
+
+使い方:
+    python tool/generate_launcher_icons.py
+    python tool/generate_launcher_icons.py --master assets/icons/app_icon.png --background '#151826'
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from icon_io import load_rgba, parse_color, to_image
+from png_optimize import format_saving, smallest_png
+
+# プロジェクトルート
+PROJECT_ROOT = Path(__file__).parent.parent
+ANDROID_RES_DIR = PROJECT_ROOT / "android" / "app" / "src" / "main" / "res"
+IOS_ICONSET_DIR = PROJECT_ROOT / "ios" / "Runner" / "Assets.xcassets" / "AppIcon.appiconset"
+
+DEFAULT_MASTER = PROJECT_ROOT / "assets" / "icons" / "app_icon.png"
+DEFAULT_BACKGROUND = '#151826'
+
+# Androidの密度ごとのサイズ（ランチャーアイコン48dp / アダプティブアイコン108dp）
+ANDROID_DENSITIES = {
+    'mdpi': 1.0,
+    'hdpi': 1.5,
+    'xhdpi': 2.0,
+    'xxhdpi': 3.0,
+    'xxxhdpi': 4.0,
+}
+ANDROID_LAUNCHER_DP = 48
+ANDROID_ADAPTIVE_DP = 108
+
+# iOSのアイコン定義（size, idiom, scale）。Contents.json の並び順
+IOS_ICONS = [
+    ('20x20', 'iphone', 2), ('20x20', 'iphone', 3),
+    ('29x29', 'iphone', 1), ('29x29', 'iphone', 2), ('29x29', 'iphone', 3),
+    ('40x40', 'iphone', 2), ('40x40', 'iphone', 3),
+    ('60x60', 'iphone', 2), ('60x60', 'iphone', 3),
+    ('20x20', 'ipad', 1), ('20x20', 'ipad', 2),
+    ('29x29', 'ipad', 1), ('29x29', 'ipad', 2),
+    ('40x40', 'ipad', 1), ('40x40', 'ipad', 2),
+    ('76x76', 'ipad', 1), ('76x76', 'ipad', 2),
+    ('83.5x83.5', 'ipad', 2),
+    ('1024x1024', 'ios-marketing', 1),
+]
+# Contents.json には載せないが従来から出力しているレガシーサイズ
+IOS_LEGACY_ICONS = [('50x50', 1), ('50x50', 2), ('57x57', 1), ('57x57', 2), ('72x72', 1), ('72x72', 2)]
+
+ADAPTIVE_ICON_XML = """<?xml version="1.0" encoding="utf-8"?>
+<adaptive-icon xmlns:android="http://schemas.android.com/apk/res/android">
+  <background android:drawable="@color/ic_launcher_background"/>
+  <foreground android:drawable="@drawable/ic_launcher_foreground"/>
+</adaptive-icon>
+"""
+
+COLORS_XML = """<?xml version="1.0" encoding="utf-8"?>
+<resources>
+    <color name="ic_launcher_background">{color}</color>
+</resources>"""
+
+# ワーカープロセスごとに保持するマスター画像
+_worker_images = {}
+_worker_options = {}
+
+
+def _ios_filename(size, scale):
+    return f"Icon-App-{size}@{scale}x.png"
+
+
+def _ios_pixels(size, scale):
+    return round(float(size.split('x')[0]) * scale)
+
+
+def square_master(arr):
+    """縦横比が正方形でないマスターを透過余白で中央寄せの正方形にする"""
+    height, width = arr.shape[:2]
+    if height == width:
+        return arr
+    side = max(height, width)
+    square = np.zeros((side, side, 4), dtype=np.uint8)
+    top, left = (side - height) // 2, (side - width) // 2
+    square[top:top + height, left:left + width] = arr
+    return square
+
+
+def composite_on(arr, bg_color):
+    """背景色の上に合成したRGB配列（create_ios_icon と同じ合成）"""
+    background = Image.new('RGBA', (arr.shape[1], arr.shape[0]), bg_color)
+    return np.array(Image.alpha_composite(background, to_image(arr)).convert('RGB'))
+
+
+def build_jobs(android_res_dir=ANDROID_RES_DIR, ios_iconset_dir=IOS_ICONSET_DIR):
+    """生成するアイコンの (ソース種別, 出力ピクセル数, 出力パス) を列挙"""
+    jobs = []
+    for density, factor in ANDROID_DENSITIES.items():
+        jobs.append(('rgba', round(ANDROID_LAUNCHER_DP * factor),
+                     Path(android_res_dir) / f"mipmap-{density}" / "ic_launcher.png"))
+        jobs.append(('rgba', round(ANDROID_ADAPTIVE_DP * factor),
+                     Path(android_res_dir) / f"drawable-{density}" / "ic_launcher_foreground.png"))
+    ios_files = {(size, scale) for size, _, scale in IOS_ICONS} | set(IOS_LEGACY_ICONS)
+    for size, scale in sorted(ios_files, key=lambda item: (_ios_pixels(*item), item)):
+        jobs.append(('rgb', _ios_pixels(size, scale), Path(ios_iconset_dir) / _ios_filename(size, scale)))
+    return jobs
+
+
+def _init_worker(images, optimize=True):
+    """ワーカー起動時にマスター画像（RGBA / iOS用RGB）を受け取る"""
+    _worker_images.update(images)
+    _worker_options['optimize'] = optimize
+
+
+def _render(job):
+    """1サイズ分をリサンプリングして書き出す（ワーカープロセスで実行）"""
+    kind, pixels, path = job
+    img = Image.fromarray(_worker_images[kind])
+    if img.size != (pixels, pixels):
+        img = img.resize((pixels, pixels), Image.LANCZOS)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    if not _worker_options['optimize']:
+        img.save(path, 'PNG')
+        return str(path), pixels, None
+    # ファイル単位でプロセスを分けているので、1ファイル内の候補は直列に試す
+    data, default_size, _ = smallest_png(np.array(img.convert('RGBA')), img.mode, workers=1)
+    Path(path).write_bytes(data)
+    return str(path), pixels, (default_size, len(data))
+
+
+def write_ios_contents(ios_iconset_dir=IOS_ICONSET_DIR):
+    """AppIcon.appiconset/Contents.json を更新"""
+    images = [
+        {'size': size, 'idiom': idiom, 'filename': _ios_filename(size, scale), 'scale': f"{scale}x"}
+        for size, idiom, scale in IOS_ICONS
+    ]
+    contents = {'images': images, 'info': {'version': 1, 'author': 'xcode'}}
+    path = Path(ios_iconset_dir) / "Contents.json"
+    path.write_text(json.dumps(contents, indent=2, separators=(',', ' : ')) + "\n", encoding='utf-8')
+
+
+def write_android_adaptive(bg_hex, android_res_dir=ANDROID_RES_DIR):
+    """アダプティブアイコンのXMLと背景色を更新"""
+    anydpi_dir = Path(android_res_dir) / "mipmap-anydpi-v26"
+    anydpi_dir.mkdir(parents=True, exist_ok=True)
+    (anydpi_dir / "ic_launcher.xml").write_text(ADAPTIVE_ICON_XML, encoding='utf-8')
+    values_dir = Path(android_res_dir) / "values"
+    values_dir.mkdir(parents=True, exist_ok=True)
+    (values_dir / "colors.xml").write_text(COLORS_XML.format(color=bg_hex), encoding='utf-8')
+
+
+def generate_launcher_icons(master_path=DEFAULT_MASTER, bg_hex=DEFAULT_BACKGROUND,
+                            android_res_dir=ANDROID_RES_DIR, ios_iconset_dir=IOS_ICONSET_DIR,
+                            workers=None, optimize=True):
+    """
+    マスター画像から全ランチャーアイコンを生成する
+
+    Args:
+        master_path: マスター画像（透過PNG）
+        bg_hex: アダプティブアイコン背景・iOSアイコン背景の色（'#RRGGBB'）
+        android_res_dir: android/app/src/main/res
+        ios_iconset_dir: ios/Runner/Assets.xcassets/AppIcon.appiconset
+        workers: プロセス数（省略時はCPUコア数）
+        optimize: 各PNGを最小サイズの形式で書き出す（png_optimize）
+
+    Returns:
+        生成したファイル数
+    """
+    start = time.perf_counter()
+    master = square_master(load_rgba(master_path))
+    images = {'rgba': master, 'rgb': composite_on(master, parse_color(bg_hex))}
+    jobs = build_jobs(android_res_dir, ios_iconset_dir)
+
+    print(f"📂 マスター: {master_path} ({master.shape[1]}x{master.shape[0]})")
+    print(f"🔄 {len(jobs)}ファイルを生成中（{workers or os.cpu_count()}プロセス）...")
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(images, optimize)) as executor:
+        total_before = total_after = 0
+        for path, pixels, sizes in executor.map(_render, jobs):
+            print(f"   ✅ {pixels:>4}px  {os.path.relpath(path, PROJECT_ROOT)}"
+                  + (f"  {format_saving(*sizes)}" if sizes else ""))
+            if sizes:
+                total_before += sizes[0]
+                total_after += sizes[1]
+
+    write_ios_contents(ios_iconset_dir)
+    write_android_adaptive(bg_hex, android_res_dir)
+
+    print(f"✅ ランチャーアイコン生成完了: {len(jobs)}ファイル（{time.perf_counter() - start:.2f}秒）")
+    print(f"   背景色: {bg_hex}")
+    if optimize:
+        print(f"   PNG最適化: {format_saving(total_before, total_after)}")
+    return len(jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Android / iOS のランチャーアイコンを一括生成')
+    parser.add_argument('--master', default=str(DEFAULT_MASTER), help='マスター画像パス')
+    parser.add_argument('--background', default=DEFAULT_BACKGROUND, help="背景色（例: '#151826'）")
+    parser.add_argument('--android-res', default=str(ANDROID_RES_DIR), help='Androidのresディレクトリ')
+    parser.add_argument('--ios-iconset', default=str(IOS_ICONSET_DIR), help='iOSのAppIcon.appiconset')
+    parser.add_argument('--workers', type=int, help='プロセス数（省略時はCPUコア数）')
+    parser.add_argument('--no-optimize', action='store_true', help='PNGのサイズ最適化を行わない')
+    args = parser.parse_args(argv)
+
+    generate_launcher_icons(args.master, args.background, args.android_res, args.ios_iconset, args.workers,
+                            optimize=not args.no_optimize)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+アイコン処理のビルドキャッシュ（コンテンツアドレス方式）
+- 出力画像は SHA-256 をキーにしたオブジェクトストアに保存する
+- 「入力画像のハッシュ + ステージのパラメータ + ツールのバージョン」が一致する処理はスキップする
+- 上書き前の出力は必ずストアに退避するため、誤った上書きでも元画像を失わない
+- 日付付きバックアップは画像のコピーではなく、ハッシュを並べたJSONで保存する
+
+使い方:
+    python tool/icon_cache.py backup                    # assets/icons/*.png を今日の日付で保存
+    python tool/icon_cache.py backup --label 2025-10-28 assets/icons/app_icon.png
+    python tool/icon_cache.py restore 2025-10-28        # バックアップ時点の内容に戻す
+    python tool/icon_cache.py import-backups            # 従来の backups/<日付>/ をJSON参照に変換
+"""
+import argparse
+import datetime
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+# プロジェクトルート
+PROJECT_ROOT = Path(__file__).parent.parent
+TOOL_DIR = Path(__file__).parent
+ICONS_DIR = PROJECT_ROOT / "assets" / "icons"
+STORE_DIR = ICONS_DIR / "store"
+BACKUPS_DIR = ICONS_DIR / "backups"
+
+# ツールのバージョンに含めるソース（アイコンのステージが import するモジュール）
+# 解析・検出など他のツールを変えてもアイコンのキャッシュは無効にならない
+STAGE_SOURCES = [TOOL_DIR / f"{name}.py" for name in (
+    'icon_pipeline', 'icon_io', 'icon_cache', 'icon_stream', 'pixel_rules', 'flood_fill', 'png_optimize',
+    'png_stream', 'clean_icon_edges', 'remove_white_completely', 'change_icon_background',
+)]
+
+_tool_version = None
+
+
+def tool_version():
+    """ツールのバージョン（STAGE_SOURCES の内容から算出。ステージのコードを変えるとキャッシュは無効になる）"""
+    global _tool_version
+    if _tool_version is None:
+        digest = hashlib.sha256()
+        for path in sorted(STAGE_SOURCES):
+            digest.update(path.name.encode('utf-8'))
+            digest.update(path.read_bytes())
+        _tool_version = digest.hexdigest()[:16]
+    return _tool_version
+
+
+def bytes_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    """ファイル内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_key(input_hash, name, params):
+    """処理のキャッシュキー（入力ハッシュ・処理名・パラメータ・ツールバージョン）"""
+    payload = json.dumps([input_hash, name, params, tool_version()], sort_keys=True, default=str)
+    return bytes_hash(payload.encode('utf-8'))
+
+
+def atomic_write(path, data):
+    """一時ファイルに書いてから置き換える（書き込み途中で元ファイルを壊さない）"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+class IconCache:
+    """オブジェクトストアとビルドマニフェスト"""
+
+    def __init__(self, store_dir=STORE_DIR):
+        self.store_dir = Path(store_dir)
+        self.manifest_path = self.store_dir / "manifest.json"
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        else:
+            self.manifest = {'version': 1, 'builds': {}, 'snapshots': []}
+
+    # --- オブジェクトストア ---
+
+    def object_path(self, digest):
+        return self.store_dir / "objects" / digest[:2] / f"{digest}.png"
+
+    def has_object(self, digest):
+        return self.object_path(digest).exists()
+
+    def put_bytes(self, data):
+        """内容をストアに保存してハッシュを返す（同じ内容は1つだけ保存）"""
+        digest = bytes_hash(data)
+        if not self.has_object(digest):
+            atomic_write(self.object_path(digest), data)
+        return digest
+
+    def put_file(self, path):
+        return self.put_bytes(Path(path).read_bytes())
+
+    def materialize(self, digest, path):
+        """ストアの内容を path に書き出す（既に同じ内容なら何もしない）。書き出したら True"""
+        path = Path(path)
+        if path.exists() and file_hash(path) == digest:
+            return False
+        self.protect(path)
+        atomic_write(path, self.object_path(digest).read_bytes())
+        return True
+
+    def protect(self, path, reason='overwrite'):
+        """上書き前の内容をストアに退避し、スナップショット履歴に記録する"""
+        path = Path(path)
+        if not path.exists():
+            return None
+        digest = self.put_file(path)
+        rel_path = _relative(path)
+        previous = [s for s in self.manifest['snapshots'] if s['path'] == rel_path]
+        if previous and previous[-1]['hash'] == digest:
+            return digest
+        self.manifest['snapshots'].append({
+            'path': rel_path,
+            'hash': digest,
+            'reason': reason,
+            'at': datetime.datetime.now().isoformat(timespec='seconds'),
+        })
+        return digest
+
+    # --- ビルドマニフェスト ---
+
+    def lookup(self, key):
+        """キーに対応する出力ハッシュ（ストアに実体がある場合のみ）"""
+        entry = self.manifest['builds'].get(key)
+        if entry and self.has_object(entry['hash']):
+            return entry['hash']
+        return None
+
+    def record(self, key, path, name):
+        """出力ファイルをストアに保存し、キーと対応付ける"""
+        digest = self.put_file(path)
+        self.manifest['builds'][key] = {
+            'hash': digest,
+            'name': name,
+            'output': _relative(path),
+            'tool_version': tool_version(),
+        }
+        return digest
+
+    def save(self):
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        atomic_write(self.manifest_path,
+                     (json.dumps(self.manifest, indent=2, ensure_ascii=False) + "\n").encode('utf-8'))
+
+    # --- バックアップ ---
+
+    def backup(self, paths, label):
+        """ファイル群をストアに保存し、backups/<label>.json に参照を書く"""
+        entries = {_relative(p): self.put_file(p) for p in paths}
+        BACKUPS_DIR.mkdir(parents=True, exist_ok=True)
+        backup_path = BACKUPS_DIR / f"{label}.json"
+        atomic_write(backup_path, (json.dumps({'label': label, 'files': entries}, indent=2,
+                                              ensure_ascii=False) + "\n").encode('utf-8'))
+        return backup_path, entries
+
+    def restore(self, label):
+        """backups/<label>.json の内容に戻す。戻したファイルのリストを返す"""
+        backup = json.loads((BACKUPS_DIR / f"{label}.json").read_text(encoding='utf-8'))
+        restored = []
+        for rel_path, digest in backup['files'].items():
+            if self.materialize(digest, PROJECT_ROOT / rel_path):
+                restored.append(rel_path)
+        return restored
+
+
+def _relative(path):
+    """マニフェストにはプロジェクトルートからの相対パスで記録する"""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        return str(path)
+
+
+def cached_call(func, input_path, output_path, *args, cache=None):
+    """
+    func(input_path, output_path, *args) をキャッシュ付きで実行する
+    入力・パラメータ・ツール・func を定義したファイルが前回と同じならスキップし、出力が壊れていればストアから復元する
+    （入力が前回の出力と同じなら再処理しない。上書き前の内容はストアに退避される）
+    func のファイルは STAGE_SOURCES に入っていなくても、変えればキャッシュは無効になる
+
+    Returns:
+        実際に func を実行したら True、スキップしたら False
+    """
+    cache = cache or IconCache()
+    name = func.__name__
+    params = [[list(a) if isinstance(a, tuple) else a for a in args], file_hash(inspect.getsourcefile(func))]
+    key = build_key(file_hash(input_path), name, params)
+
+    digest = cache.lookup(key)
+    if digest:
+        if cache.materialize(digest, output_path):
+            print(f"♻️  キャッシュから復元: {output_path}")
+        else:
+            print(f"⏭️  スキップ（入力・パラメータに変更なし）: {output_path}")
+        cache.save()
+        return False
+
+    cache.protect(output_path)
+    func(input_path, output_path, *args)
+    if not Path(output_path).exists():
+        cache.save()
+        return True
+    digest = cache.record(key, output_path, name)
+    if Path(input_path).resolve() == Path(output_path).resolve():
+        # その場で書き換える処理は、結果に再適用しても同じ内容になるものとして記録する
+        cache.manifest['builds'][build_key(digest, name, params)] = dict(cache.manifest['builds'][key])
+    cache.save()
+    return True
+
+
+def import_backups(cache):
+    """従来の backups/<日付>/ ディレクトリをストアに取り込み、JSON参照に置き換える"""
+    converted = []
+    for backup_dir in sorted(p for p in BACKUPS_DIR.iterdir() if p.is_dir()):
+        files = sorted(backup_dir.glob('*.png'))
+        entries = {f"{_relative(ICONS_DIR)}/{f.name}": cache.put_file(f) for f in files}
+        atomic_write(BACKUPS_DIR / f"{backup_dir.name}.json",
+                     (json.dumps({'label': backup_dir.name, 'files': entries}, indent=2,
+                                 ensure_ascii=False) + "\n").encode('utf-8'))
+        shutil.rmtree(backup_dir)
+        converted.append((backup_dir.name, len(files)))
+    return converted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='アイコンのビルドキャッシュ・バックアップ管理')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backup_parser = subparsers.add_parser('backup', help='現在のアイコンをバックアップ')
+    backup_parser.add_argument('paths', nargs='*', help='対象ファイル（省略時は assets/icons/*.png）')
+    backup_parser.add_argument('--label', default=datetime.date.today().isoformat())
+
+    restore_parser = subparsers.add_parser('restore', help='バックアップ時点の内容に戻す')
+    restore_parser.add_argument('label')
+
+    subparsers.add_parser('import-backups', help='backups/<日付>/ をJSON参照に変換')
+
+    args = parser.parse_args(argv)
+    cache = IconCache()
+
+    if args.command == 'backup':
+        paths = args.paths or sorted(ICONS_DIR.glob('*.png'))
+        backup_path, entries = cache.backup(paths, args.label)
+        print(f"✅ バックアップ完了: {_relative(backup_path)}（{len(entries)}ファイル）")
+    elif args.command == 'restore':
+        restored = cache.restore(args.label)
+        print(f"✅ 復元完了: {len(restored)}ファイル")
+        for rel_path in restored:
+            print(f"   {rel_path}")
+    elif args.command == 'import-backups':
+        for label, count in import_backups(cache):
+            print(f"✅ {label}: {count}ファイルを参照に変換")
+
+    cache.save()
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (OSError, ValueError, KeyError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,70 @@
+"""
+アイコン画像の読み書き共通処理
+PIL画像とnumpy配列（H x W x 4 の uint8 RGBA）の相互変換と、アルファ値によるトリミング範囲の計算をまとめる
+"""
+import numpy as np
+from PIL import Image
+
+
+def load_rgba(input_path):
+    """画像をRGBAのnumpy配列（書き込み可能なコピー）として読み込む"""
+    with Image.open(input_path) as img:
+        return np.array(img.convert('RGBA'))
+
+
+def to_image(arr):
+    """RGBA配列をPIL画像に変換"""
+    return Image.fromarray(np.ascontiguousarray(arr, dtype=np.uint8))
+
+
+def save_rgba(arr, output_path):
+    """RGBA配列をPNGとして保存"""
+    to_image(arr).save(output_path, 'PNG')
+
+
+def parse_color(value):
+    """'#151826' / '#151826ff' / [21, 24, 38] をRGBAタプルに変換"""
+    if isinstance(value, str):
+        hex_value = value.lstrip('#')
+        if len(hex_value) not in (6, 8):
+            raise ValueError(f"不正な色指定です: {value!r}")
+        value = [int(hex_value[i:i + 2], 16) for i in range(0, len(hex_value), 2)]
+    color = tuple(int(v) for v in value)
+    return color + (255,) if len(color) == 3 else color
+
+
+def alpha_bboxes(arr, thresholds):
+    """
+    アルファ値が各閾値より大きいピクセルのバウンディングボックスをまとめて求める
+    行・列ごとのアルファ最大値を1回だけ計算し、閾値ごとの判定はその1次元配列で行う
+
+    Returns:
+        {閾値: (left, top, right, bottom) または None}（right / bottom は排他的）
+    """
+    alpha = arr[..., 3]
+    row_max = alpha.max(axis=1)
+    col_max = alpha.max(axis=0)
+    boxes = {}
+    for threshold in thresholds:
+        rows = np.flatnonzero(row_max > threshold)
+        if rows.size == 0:
+            boxes[threshold] = None
+            continue
+        cols = np.flatnonzero(col_max > threshold)
+        boxes[threshold] = (int(cols[0]), int(rows[0]), int(cols[-1]) + 1, int(rows[-1]) + 1)
+    return boxes
+
+
+def alpha_bbox(arr, threshold=0):
+    """アルファ値が閾値より大きいピクセルのバウンディングボックス（なければ None）"""
+    return alpha_bboxes(arr, [threshold])[threshold]
+
+
+def trim_box(arr, threshold):
+    """
+    トリミング範囲（従来のトリミング処理と同じく、幅・高さが2ピクセル以上の場合のみ）
+    """
+    bbox = alpha_bbox(arr, threshold)
+    if bbox and bbox[2] - bbox[0] > 1 and bbox[3] - bbox[1] > 1:
+        return bbox
+    return None
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+アイコン処理パイプライン
+画像を一度だけデコードし、宣言したステージをメモリ上で順に適用する
+ファイルに書き出すのは export ステージだけ（中間ファイルは作らない）
+
+使い方:
+    # 標準のアイコン生成（背景除去→エッジクリーニング→トリミング→iOS用アイコン）
+    python tool/icon_pipeline.py --preset app_icon
+
+    # ステージを直接指定（ステージ名:キー=値,キー=値）
+    python tool/icon_pipeline.py assets/icons/app_icon.png \\
+        --stage recolor:color=#151826 \\
+        --stage export:path=assets/icons/app_icon.png \\
+        --stage composite:color=#151826 \\
+        --stage export:path=assets/icons/app_icon_ios.png,mode=RGB
+
+    # JSON設定ファイル {"input": ..., "stages": [{"stage": "trim", ...}, ...]}
+    python tool/icon_pipeline.py --config icon_pipeline.json
+
+    # 巨大なマスター画像は行ストリップ単位で処理（メモリ使用量がストリップの大きさに比例）
+    python tool/icon_pipeline.py --preset app_icon --strip-rows 256
+
+export に optimize=true を付けると、可逆な範囲で最も小さいPNGを探して書き出す（png_optimize.py）
+入力とステージが前回と同じなら処理をスキップする（icon_cache.py のキャッシュ。--no-cache で無効）
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from icon_io import alpha_bbox, load_rgba, parse_color, to_image
+from icon_cache import IconCache, atomic_write, build_key, file_hash
+from icon_stream import stream_pipeline
+from png_optimize import default_png_bytes, format_saving, smallest_png
+from flood_fill import remove_dark_background
+from pixel_rules import apply_rules
+from clean_icon_edges import EDGE_CLEAN_RULES
+from remove_white_completely import WHITE_REMOVAL_RULES
+from change_icon_background import background_rules
+
+# よく使うステージ構成
+PRESETS = {
+    # process_icon_final → clean_icon_edges → trim_transparent → create_ios_icon
+    'app_icon': {
+        'input': 'assets/icons/app_icon_original.png',
+        'stages': [
+            {'stage': 'flood_fill', 'threshold': 50},
+            {'stage': 'trim', 'threshold': 10},
+            {'stage': 'edge_clean'},
+            {'stage': 'trim'},
+            {'stage': 'export', 'path': 'assets/icons/app_icon.png', 'optimize': True},
+            {'stage': 'composite', 'color': '#151826'},
+            {'stage': 'export', 'path': 'assets/icons/app_icon_ios.png', 'mode': 'RGB', 'optimize': True},
+        ],
+    },
+    # change_icon_background → create_ios_icon
+    'background': {
+        'input': 'assets/icons/app_icon.png',
+        'stages': [
+            {'stage': 'recolor', 'color': '#151826'},
+            {'stage': 'export', 'path': 'assets/icons/app_icon.png', 'optimize': True},
+            {'stage': 'composite', 'color': '#151826'},
+            {'stage': 'export', 'path': 'assets/icons/app_icon_ios.png', 'mode': 'RGB', 'optimize': True},
+        ],
+    },
+}
+
+
+def stage_flood_fill(arr, threshold=30, seeds='corners', connectivity=4, keep_rgb=False):
+    """四隅から連結した暗い背景を透過"""
+    count = remove_dark_background(arr, threshold, seeds, connectivity, keep_rgb)
+    print(f"   背景除去: {count:,}ピクセル")
+    return arr
+
+
+def stage_edge_clean(arr):
+    """エッジの半透明で白っぽいピクセルを透過（clean_icon_edges と同じ）"""
+    count = sum(apply_rules(arr, EDGE_CLEAN_RULES))
+    print(f"   エッジクリーニング: {count:,}ピクセル")
+    return arr
+
+
+def stage_remove_white(arr):
+    """白い領域を完全に除去（remove_white_completely と同じ）"""
+    count = sum(apply_rules(arr, WHITE_REMOVAL_RULES))
+    print(f"   白い領域除去: {count:,}ピクセル")
+    return arr
+
+
+def stage_recolor(arr, color):
+    """暗い色（R, G, B < 100）を指定色に置き換え（change_background_color と同じ）"""
+    apply_rules(arr, background_rules(parse_color(color)))
+    return arr
+
+
+def stage_trim(arr, threshold=0):
+    """アルファ値が閾値より大きい領域でトリミング"""
+    bbox = alpha_bbox(arr, threshold)
+    if bbox is None:
+        print("   ⚠️  有効なピクセルがないためトリミングをスキップ")
+        return arr
+    left, top, right, bottom = bbox
+    print(f"   トリミング: {arr.shape[1]}x{arr.shape[0]} → {right - left}x{bottom - top}")
+    return arr[top:bottom, left:right].copy()
+
+
+def stage_composite(arr, color):
+    """指定色の背景に合成して不透明にする（create_ios_icon と同じ）"""
+    img = to_image(arr)
+    background = Image.new('RGBA', img.size, parse_color(color))
+    return np.array(Image.alpha_composite(background, img))
+
+
+def stage_export(arr, path, mode='RGBA', optimize=False):
+    """現在の画像を書き出す（mode='RGB' で透過なし、optimize=True で最小サイズのPNGを探す）"""
+    if optimize:
+        data, default_size, description = smallest_png(arr, mode)
+    else:
+        data = default_png_bytes(arr, mode)
+    # 書き込み途中で既存ファイルを壊さないよう一時ファイル経由で置き換える
+    atomic_write(path, data)
+    print(f"   💾 書き出し: {path} ({mode}, {arr.shape[1]}x{arr.shape[0]})")
+    if optimize:
+        print(f"      最適化: {format_saving(default_size, len(data))} [{description}]")
+    return arr
+
+
+STAGES = {
+    'flood_fill': stage_flood_fill,
+    'edge_clean': stage_edge_clean,
+    'remove_white': stage_remove_white,
+    'recolor': stage_recolor,
+    'trim': stage_trim,
+    'composite': stage_composite,
+    'export': stage_export,
+}
+
+
+def stage_keys(input_path, stages):
+    """
+    各ステージのキャッシュキー（入力ハッシュから順に連鎖させる）
+    export は画像を変えないため、書き出し先を除いたキーだけを持ち連鎖には含めない
+    """
+    key = file_hash(input_path)
+    keys = []
+    for spec in stages:
+        params = {k: v for k, v in spec.items() if k not in ('stage', 'path')}
+        stage_key = build_key(key, spec['stage'], params)
+        keys.append(stage_key)
+        if spec['stage'] != 'export':
+            key = stage_key
+    return keys
+
+
+def _restore_from_cache(cache, stages, keys):
+    """全exportの結果がキャッシュにあればデコードせずに書き出す。できたら True"""
+    exports = [(spec['path'], key) for spec, key in zip(stages, keys) if spec['stage'] == 'export']
+    digests = [cache.lookup(key) for _, key in exports]
+    if not exports or not all(digests):
+        return False
+    for (path, _), digest in zip(exports, digests):
+        if cache.materialize(digest, path):
+            print(f"   ♻️  キャッシュから復元: {path}")
+        else:
+            print(f"   ⏭️  変更なし: {path}")
+    return True
+
+
+def _same_file(a, b):
+    return Path(a).resolve() == Path(b).resolve()
+
+
+def run_pipeline(input_path, stages, cache=None, strip_rows=None):
+    """
+    画像を一度だけ読み込み、ステージを順に適用する
+
+    Args:
+        input_path: 入力画像パス
+        stages: {'stage': ステージ名, その他パラメータ} のリスト
+        cache: IconCache。指定すると入力・ステージが前回と同じ場合は処理をスキップし、
+               上書きされる出力はストアに退避する
+        strip_rows: 指定するとこの行数ずつストリーミング処理する（巨大な画像用。結果は同じ）
+
+    Returns:
+        最終ステージ適用後のRGBA配列（キャッシュでスキップした場合・ストリーミング時は None）
+    """
+    for spec in stages:
+        if spec.get('stage') not in STAGES:
+            raise ValueError(f"不明なステージです: {spec.get('stage')!r}（{', '.join(STAGES)}）")
+
+    keys = stage_keys(input_path, stages) if cache is not None else [None] * len(stages)
+    if cache is not None and _restore_from_cache(cache, stages, keys):
+        cache.save()
+        print("✅ キャッシュ一致（再処理なし）")
+        return None
+
+    if strip_rows:
+        exports = [(spec['path'], key) for spec, key in zip(stages, keys) if spec['stage'] == 'export']
+        if cache is not None:
+            for path, _ in exports:
+                cache.protect(path)
+        stream_pipeline(input_path, stages, strip_rows)
+        if cache is not None:
+            for path, key in exports:
+                cache.record(key, path, 'export')
+        arr = None
+    else:
+        arr = load_rgba(input_path)
+        print(f"📂 読み込み: {input_path} ({arr.shape[1]}x{arr.shape[0]})")
+
+        for i, (spec, key) in enumerate(zip(stages, keys), 1):
+            params = {k: v for k, v in spec.items() if k != 'stage'}
+            print(f"🔄 ステージ{i}: {spec['stage']}")
+            if cache is not None and spec['stage'] == 'export':
+                cache.protect(spec['path'])
+            arr = STAGES[spec['stage']](arr, **params)
+            if cache is not None and spec['stage'] == 'export':
+                cache.record(key, spec['path'], 'export')
+
+    if cache is not None:
+        if any(spec['stage'] == 'export' and _same_file(spec['path'], input_path) for spec in stages):
+            # 入力を上書きした場合は、次回その結果を入力にしても同じ出力になるものとして記録する
+            builds = cache.manifest['builds']
+            for new_key, key in zip(stage_keys(input_path, stages), keys):
+                if key in builds:
+                    builds[new_key] = dict(builds[key])
+        cache.save()
+    print("✅ パイプライン完了")
+    return arr
+
+
+def parse_stage_arg(text):
+    """'name:key=value,key=value' をステージ定義に変換"""
+    name, _, rest = text.partition(':')
+    spec = {'stage': name}
+    for item in filter(None, rest.split(',')):
+        key, _, value = item.partition('=')
+        try:
+            spec[key] = json.loads(value)
+        except json.JSONDecodeError:
+            spec[key] = value
+    return spec
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='アイコン処理パイプライン')
+    parser.add_argument('input', nargs='?', help='入力画像パス')
+    parser.add_argument('--stage', action='append', default=[], type=parse_stage_arg,
+                        help="ステージ（例: flood_fill:threshold=50）。指定順に実行")
+    parser.add_argument('--config', help='JSON設定ファイル')
+    parser.add_argument('--preset', choices=sorted(PRESETS), help='定義済みのステージ構成')
+    parser.add_argument('--no-cache', action='store_true', help='キャッシュを使わず常に再処理する')
+    parser.add_argument('--strip-rows', type=int, help='指定した行数ずつストリーミング処理する（4096px以上のマスター向け）')
+    args = parser.parse_args(argv)
+
+    if args.config:
+        with open(args.config, encoding='utf-8') as f:
+            config = json.load(f)
+    elif args.preset:
+        config = PRESETS[args.preset]
+    else:
+        config = {}
+
+    input_path = args.input or config.get('input')
+    stages = args.stage or config.get('stages', [])
+    if not input_path or not stages:
+        parser.error('入力画像とステージを指定してください（--stage / --config / --preset）')
+
+    run_pipeline(input_path, stages, cache=None if args.no_cache else IconCache(), strip_rows=args.strip_rows)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except (OSError, ValueError, TypeError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,264 @@
+"""
+アイコン処理パイプラインのストリーミング実行（巨大なマスター画像用）
+icon_pipeline のステージを行ストリップ単位で適用し、メモリ使用量をストリップの大きさに抑える
+
+- recolor / edge_clean / remove_white / composite / export はストリップごとに処理する
+- flood_fill と trim は画像全体を見る必要があるため、事前に1回読み通して解析する
+  （flood_fill は背景マスクのランだけを保持し、ストリップ境界をまたぐ連結も正しく扱う）
+- 解析のたびに入力を先頭から読み直すので、中間画像はメモリにもディスクにも持たない
+
+結果はメモリ上で処理した場合（icon_pipeline.run_pipeline）とピクセル単位で一致する
+"""
+import numpy as np
+from PIL import Image
+
+from icon_io import parse_color
+from png_stream import PngStripReader, PngStripWriter
+from flood_fill import dark_mask, mask_runs, runs_to_mask, select_runs
+from pixel_rules import apply_rules
+from clean_icon_edges import EDGE_CLEAN_RULES
+from remove_white_completely import WHITE_REMOVAL_RULES
+from change_icon_background import background_rules
+
+STRIP_ROWS = 256
+
+
+class StreamStage:
+    """ストリップ単位で処理するステージの基底クラス"""
+
+    # True なら最終パスの前に画像全体を1回読み通して解析する
+    needs_analysis = False
+
+    def start_pass(self):
+        """各パスの開始時に呼ばれる"""
+
+    def analyze(self, strips, width, height):
+        """このステージへの入力ストリップを全て受け取って解析する"""
+
+    def shape(self, width, height):
+        """出力サイズ"""
+        return width, height
+
+    def apply(self, y, strip):
+        """(開始行, ストリップ) を処理して返す。出力する行がなければ None"""
+        return y, strip
+
+    def report(self):
+        """最終パス後に結果を表示する"""
+
+
+class RuleStage(StreamStage):
+    """pixel_rules のルールを適用する（edge_clean / remove_white / recolor）"""
+
+    def __init__(self, rules, label=None):
+        self.rules = rules
+        self.label = label
+        self.count = 0
+
+    def start_pass(self):
+        self.count = 0
+
+    def apply(self, y, strip):
+        self.count += sum(apply_rules(strip, self.rules))
+        return y, strip
+
+    def report(self):
+        if self.label:
+            print(f"   {self.label}: {self.count:,}ピクセル")
+
+
+class FloodFillStage(StreamStage):
+    """四隅などから連結した暗い背景を透過（背景マスクのランだけを保持する）"""
+
+    needs_analysis = True
+
+    def __init__(self, threshold=30, seeds='corners', connectivity=4, keep_rgb=False):
+        self.threshold = threshold
+        self.seeds = seeds
+        self.connectivity = connectivity
+        self.keep_rgb = keep_rgb
+
+    def analyze(self, strips, width, height):
+        runs = []
+        for _, strip in strips:
+            runs.extend(mask_runs(dark_mask(strip, self.threshold)))
+        self.width = width
+        self.selected = select_runs(runs, width, self.seeds, self.connectivity)
+        self.count = int(sum((ends - starts).sum() for starts, ends in self.selected))
+
+    def apply(self, y, strip):
+        region = runs_to_mask(self.selected[y:y + strip.shape[0]], self.width)
+        if self.keep_rgb:
+            strip[..., 3][region] = 0
+        else:
+            strip[region] = 0
+        return y, strip
+
+    def report(self):
+        print(f"   背景除去: {self.count:,}ピクセル")
+
+
+class TrimStage(StreamStage):
+    """アルファ値が閾値より大きい領域でトリミング"""
+
+    needs_analysis = True
+
+    def __init__(self, threshold=0):
+        self.threshold = threshold
+        self.bbox = None
+
+    def analyze(self, strips, width, height):
+        top = bottom = None
+        cols = np.zeros(width, dtype=bool)
+        for y, strip in strips:
+            opaque = strip[..., 3] > self.threshold
+            rows = np.flatnonzero(opaque.any(axis=1))
+            if rows.size:
+                top = y + int(rows[0]) if top is None else top
+                bottom = y + int(rows[-1]) + 1
+                cols |= opaque.any(axis=0)
+        if top is not None:
+            col_index = np.flatnonzero(cols)
+            self.bbox = int(col_index[0]), top, int(col_index[-1]) + 1, bottom
+        self.size = (width, height)
+
+    def shape(self, width, height):
+        if self.bbox is None:
+            return width, height
+        left, top, right, bottom = self.bbox
+        return right - left, bottom - top
+
+    def apply(self, y, strip):
+        if self.bbox is None:
+            return y, strip
+        left, top, right, bottom = self.bbox
+        start, end = max(y, top), min(y + strip.shape[0], bottom)
+        if start >= end:
+            return None
+        return start - top, strip[start - y:end - y, left:right]
+
+    def report(self):
+        if self.bbox is None:
+            print("   ⚠️  有効なピクセルがないためトリミングをスキップ")
+        else:
+            width, height = self.size
+            left, top, right, bottom = self.bbox
+            print(f"   トリミング: {width}x{height} → {right - left}x{bottom - top}")
+
+
+class CompositeStage(StreamStage):
+    """指定色の背景に合成して不透明にする"""
+
+    def __init__(self, color):
+        self.color = color
+
+    def apply(self, y, strip):
+        img = Image.fromarray(np.ascontiguousarray(strip))
+        background = Image.new('RGBA', img.size, self.color)
+        return y, np.array(Image.alpha_composite(background, img))
+
+
+class ExportStage(StreamStage):
+    """最終パスでストリップを順にPNGへ書き出す"""
+
+    def __init__(self, path, mode='RGBA', optimize=False):
+        self.path = path
+        self.mode = mode
+        # ストリーミングでは画像全体を見られないため、最大圧縮レベル＋行ごとのフィルタ選択のみ行う
+        self.compress_level = 9 if optimize else 6
+        self.writer = None
+
+    def shape(self, width, height):
+        self.size = (width, height)
+        return width, height
+
+    def open(self):
+        self.writer = PngStripWriter(self.path, *self.size, mode=self.mode, compress_level=self.compress_level)
+
+    def apply(self, y, strip):
+        if self.writer is not None:
+            self.writer.write(strip)
+        return y, strip
+
+    def close(self):
+        self.writer.close()
+        print(f"   💾 書き出し: {self.path} ({self.mode}, {self.size[0]}x{self.size[1]})")
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.abort()
+
+
+def make_stage(spec):
+    """ステージ定義（icon_pipeline と同じ形式）からストリーミング用ステージを作る"""
+    params = {k: v for k, v in spec.items() if k != 'stage'}
+    name = spec['stage']
+    if name == 'flood_fill':
+        return FloodFillStage(**params)
+    if name == 'edge_clean':
+        return RuleStage(EDGE_CLEAN_RULES, 'エッジクリーニング')
+    if name == 'remove_white':
+        return RuleStage(WHITE_REMOVAL_RULES, '白い領域除去')
+    if name == 'recolor':
+        return RuleStage(background_rules(parse_color(params['color'])))
+    if name == 'trim':
+        return TrimStage(**params)
+    if name == 'composite':
+        return CompositeStage(parse_color(params['color']))
+    if name == 'export':
+        return ExportStage(**params)
+    raise ValueError(f"ストリーミング非対応のステージです: {name!r}")
+
+
+def _strips_through(reader, stages, strip_rows):
+    """入力を先頭から読み、ステージを順に通したストリップを返す"""
+    for stage in stages:
+        stage.start_pass()
+    for y, strip in reader.strips(strip_rows):
+        for stage in stages:
+            result = stage.apply(y, strip)
+            if result is None:
+                break
+            y, strip = result
+        else:
+            yield y, strip
+
+
+def stream_pipeline(input_path, stages, strip_rows=STRIP_ROWS):
+    """
+    ステージを行ストリップ単位で適用する
+
+    Args:
+        input_path: 入力PNG（ビット深度8・インターレースなし）
+        stages: icon_pipeline と同じステージ定義のリスト
+        strip_rows: 1ストリップの行数
+    """
+    reader = PngStripReader(input_path)
+    width, height = reader.size
+    print(f"📂 ストリーミング読み込み: {input_path} ({width}x{height}, {strip_rows}行ずつ)")
+
+    built = []
+    for i, spec in enumerate(stages, 1):
+        stage = make_stage(spec)
+        if stage.needs_analysis:
+            print(f"🔍 解析パス: ステージ{i} {spec['stage']}")
+            stage.analyze(_strips_through(reader, built, strip_rows), width, height)
+        width, height = stage.shape(width, height)
+        built.append(stage)
+
+    print("🔄 最終パス: " + " → ".join(spec['stage'] for spec in stages))
+    exports = [stage for stage in built if isinstance(stage, ExportStage)]
+    try:
+        for stage in exports:
+            stage.open()
+        for _ in _strips_through(reader, built, strip_rows):
+            pass
+    except BaseException:
+        for stage in exports:
+            stage.abort()
+        raise
+
+    for stage in built:
+        stage.report()
+    for stage in exports:
+        stage.close()
@@ -0,0 +1,707 @@
+#!/usr/bin/env python3
+"""
+マイグレーションのロック・テーブル書き直しの検査（オフラインで動く）
+database/migrations/*.sql の各文について、取るロック（ACCESS EXCLUSIVE など）と重い処理
+（テーブルの書き直し・全件スキャン・インデックス作成・全行更新）を判定し、
+指定した行数から所要時間を見積もって、より安全な書き方（CONCURRENTLY・NOT VALID・バッチ更新）を提案する
+
+- 同じファイルで作成したテーブルは空なので問題にしない
+- 列の型の変更は、それまでのDDL・マイグレーションを適用したスキーマの型と比べて書き直しになるかを判定する
+- SQLエディタに貼り付けて実行するとファイル全体が1つのトランザクションになるため、
+  取ったロックを最後の文まで保持する時間も見積もる
+
+行数は --rows で指定するか、本番の統計から作ったJSONを --stats で渡す
+    SELECT json_object_agg(relname, n_live_tup) FROM pg_stat_user_tables;
+
+使い方:
+    python tool/lint_migrations.py
+    python tool/lint_migrations.py 012_add_display_order_to_group_members.sql --rows group_members=200000
+    python tool/lint_migrations.py --stats table_rows.json --max-lock-seconds 2
+    python tool/lint_migrations.py -v    # ロックを取る全ての文を表示
+"""
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+from sql_schema import (DOLLAR_BODY, MIGRATIONS_DIR, NAME, Schema, closing, relative, schema_files, split_statements,
+                        split_top)
+
+# ロックの強さの順（後ろほど強い）
+LOCK_LEVELS = [
+    'ACCESS SHARE', 'ROW SHARE', 'ROW EXCLUSIVE', 'SHARE UPDATE EXCLUSIVE', 'SHARE', 'SHARE ROW EXCLUSIVE',
+    'EXCLUSIVE', 'ACCESS EXCLUSIVE',
+]
+
+# 処理の速さの目安（行/秒。1行数百バイト程度・小〜中規模のインスタンスを想定した大まかな値）
+ROWS_PER_SECOND = {
+    'scan': 1_000_000,       # 制約の検証などの全件スキャン
+    'index': 300_000,        # インデックスの作成
+    'rewrite': 200_000,      # テーブルの書き直し（インデックスの再作成を含む）
+    'update': 50_000,        # UPDATE / DELETE（行ロック・WALを伴う）
+}
+WORK_LABELS = {
+    'scan': '全件スキャン', 'index': 'インデックス作成', 'rewrite': 'テーブルの書き直し', 'update': '大量の行の変更',
+    'fail': '既存の行があると失敗', 'metadata': '定義の変更のみ',
+}
+
+# 1つのトランザクションで更新してよい行数の目安（これを超える UPDATE / DELETE はバッチにする）
+BATCH_ROWS = 10_000
+DEFAULT_MAX_LOCK_SECONDS = 1.0
+DEFAULT_LOCK_TIMEOUT = '3s'
+
+# 既存の行ごとに値が変わる（ADD COLUMN の DEFAULT で書き直しになる）関数
+VOLATILE_FUNCTIONS = re.compile(
+    r"\b(random|gen_random_uuid|uuid_generate_v[14]|clock_timestamp|timeofday|nextval)\s*\(", re.I)
+# 書き直しにならない型の変更（varchar の桁を増やす・制限を外す）
+VARCHAR = re.compile(r"(?:character\s+varying|varchar)\s*(?:\(\s*(\d+)\s*\))?$", re.I)
+NUMERIC = re.compile(r"(?:numeric|decimal)\s*(?:\(\s*(\d+)\s*(?:,\s*(\d+)\s*)?\))?$", re.I)
+
+SEVERITY_ORDER = ['info', 'warning', 'error']
+SEVERITY_LABELS = {'info': 'ℹ️ ', 'warning': '⚠️ ', 'error': '❌'}
+
+
+def lock_rank(lock):
+    return LOCK_LEVELS.index(lock) if lock else -1
+
+
+def blocks(lock):
+    """ロックが止める操作"""
+    if lock == 'ACCESS EXCLUSIVE':
+        return '読み書きを停止'
+    if lock_rank(lock) >= lock_rank('SHARE'):
+        return '書き込みを停止'
+    return ''
+
+
+def format_seconds(seconds):
+    if seconds < 1:
+        return f"{seconds * 1000:.0f}ミリ秒"
+    if seconds < 120:
+        return f"{seconds:.1f}秒"
+    return f"{seconds / 60:.1f}分"
+
+
+class Operation:
+    """
+    1つの文（ALTER TABLE なら1つの操作）が1つのテーブルに対して行うこと
+
+    Args:
+        work: 'scan' / 'index' / 'rewrite' / 'update' / 'fail' / 'metadata'
+        suggestion: 代わりに実行するSQL（またはその手順のコメント）
+    """
+
+    def __init__(self, table, lock, work, description, suggestion=None, note=None):
+        self.table = table
+        self.lock = lock
+        self.work = work
+        self.description = description
+        self.suggestion = suggestion
+        self.note = note
+
+
+class Finding:
+    def __init__(self, path, line, severity, message, suggestion=None, operation=None, seconds=None):
+        self.path = path
+        self.line = line
+        self.severity = severity
+        self.message = message
+        self.suggestion = suggestion
+        self.operation = operation
+        self.seconds = seconds
+
+    def location(self):
+        return f"{self.path}:{self.line}"
+
+    def to_dict(self):
+        operation = self.operation
+        return {
+            'path': self.path, 'line': self.line, 'severity': self.severity, 'message': self.message,
+            'suggestion': self.suggestion, 'table': operation and operation.table,
+            'lock': operation and operation.lock, 'work': operation and operation.work, 'seconds': self.seconds,
+        }
+
+
+def _table(text):
+    return text.split('.')[-1].strip('"').lower()
+
+
+def _one_line(text):
+    return ' '.join(text.split())
+
+
+def _binary_compatible(old, new):
+    """型の変更がテーブルの書き直しなしで済むか（varchar の桁を増やす・text にする、numeric の精度を上げる）"""
+    old, new = _one_line(old).lower(), _one_line(new).lower()
+    if old == new:
+        return True
+    old_varchar, new_varchar = VARCHAR.match(old), VARCHAR.match(new)
+    if old_varchar and (new == 'text' or new_varchar):
+        if new == 'text' or not new_varchar.group(1):
+            return True
+        return bool(old_varchar.group(1)) and int(new_varchar.group(1)) >= int(old_varchar.group(1))
+    old_numeric, new_numeric = NUMERIC.match(old), NUMERIC.match(new)
+    if old_numeric and new_numeric:
+        if not new_numeric.group(1):
+            return True
+        return (bool(old_numeric.group(1)) and (old_numeric.group(2) or '0') == (new_numeric.group(2) or '0')
+                and int(new_numeric.group(1)) >= int(old_numeric.group(1)))
+    return False
+
+
+class MigrationLinter:
+    """
+    1つのマイグレーションファイルの検査
+
+    Args:
+        schema: このファイルより前のSQLを適用したスキーマ（列の型・主キーの参照用）
+        rows: {テーブル名: 行数}（指定のないテーブルは行数不明として扱う）
+    """
+
+    def __init__(self, path, text, schema, rows=None, max_lock_seconds=DEFAULT_MAX_LOCK_SECONDS):
+        self.path = relative(path)
+        self.text = text
+        self.schema = schema
+        self.rows = rows or {}
+        self.max_lock_seconds = max_lock_seconds
+        # このファイルで作成したテーブル（空なので重い処理にならない）
+        self.new_tables = set()
+        # このファイルで追加した列 {(テーブル, 列)}（バッチ更新の未更新の行の条件に使う）
+        self.new_columns = set()
+        # [(行, Operation), ...]
+        self.operations = []
+        self.findings = []
+
+    def lint(self):
+        statements = split_statements(self.text)
+        for statement, line in statements:
+            for operation in self.classify(statement):
+                self.operations.append((line, operation))
+                self._check(line, operation)
+        self._check_file(statements)
+        return self
+
+    # ===================================
+    # 文の分類
+    # ===================================
+
+    def classify(self, statement):
+        """文が行う操作のリスト"""
+        text = _one_line(statement)
+        upper = text.upper()
+        if upper.startswith('DO '):
+            body = DOLLAR_BODY.search(statement)
+            operations = []
+            for inner, _ in split_statements(body.group(2) if body else ''):
+                m = re.search(r"\b(CREATE|ALTER|DROP|UPDATE|DELETE|TRUNCATE|REINDEX|VACUUM|CLUSTER)\b", inner, re.I)
+                if m:
+                    operations += self.classify(inner[m.start():])
+            for operation in operations:
+                if operation.work == 'update':
+                    # ループの中の UPDATE などは形が様々なため、書き換えの提案はせず注意だけにする
+                    operation.suggestion = None
+                    operation.note = 'DO ブロック全体が1つのトランザクションになる（大きいテーブルはループの中で COMMIT してバッチにする）'
+            return operations
+        if upper.startswith('WITH '):
+            m = re.search(r"\)\s*(UPDATE|DELETE\s+FROM)\s", text, re.I)
+            return self._dml(text[m.start() + 1:].strip(), text) if m else []
+        for prefix, handler in (
+                ('CREATE TABLE', self._create_table), ('CREATE UNLOGGED TABLE', self._create_table),
+                ('CREATE INDEX', self._create_index), ('CREATE UNIQUE INDEX', self._create_index),
+                ('DROP INDEX', self._drop_index), ('ALTER TABLE', self._alter_table),
+                ('UPDATE ', self._dml_statement), ('DELETE ', self._dml_statement),
+                ('TRUNCATE', self._truncate), ('DROP TABLE', self._drop_table),
+                ('CREATE POLICY', self._policy), ('ALTER POLICY', self._policy), ('DROP POLICY', self._policy),
+                ('CREATE TRIGGER', self._trigger), ('CREATE OR REPLACE TRIGGER', self._trigger),
+                ('DROP TRIGGER', self._trigger), ('REINDEX', self._reindex), ('VACUUM', self._vacuum),
+                ('CLUSTER', self._cluster)):
+            if upper.startswith(prefix):
+                return handler(text, statement)
+        return []
+
+    def _create_table(self, text, statement):
+        m = re.match(rf"CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?{NAME}", text, re.I)
+        table = m.group(1).lower()
+        self.new_tables.add(table)
+        operations = []
+        # 外部キーの参照先は、作成中に SHARE ROW EXCLUSIVE で書き込みが止まる（短時間）
+        for reference in sorted(set(re.findall(rf"REFERENCES\s+{NAME}", text, re.I))):
+            referenced = reference.lower()
+            if referenced != table:
+                operations.append(Operation(referenced, 'SHARE ROW EXCLUSIVE', 'metadata',
+                                            f"{table} の外部キーの作成（参照先）"))
+        return operations
+
+    def _create_index(self, text, statement):
+        m = re.match(rf"CREATE\s+(UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(IF\s+NOT\s+EXISTS\s+)?(?:{NAME}\s+)?"
+                     rf"ON\s+(?:ONLY\s+)?{NAME}", text, re.I)
+        table = m.group(5).lower()
+        kind = 'UNIQUE INDEX' if m.group(1) else 'INDEX'
+        if m.group(2):
+            return [Operation(table, 'SHARE UPDATE EXCLUSIVE', 'index', f"{kind} {m.group(4)} の作成（CONCURRENTLY）",
+                              note='CONCURRENTLY はトランザクションの中では実行できない（他の文と分けて1文ずつ実行する）')]
+        safe = re.sub(r"^CREATE\s+(UNIQUE\s+)?INDEX\s+(IF\s+NOT\s+EXISTS\s+)?",
+                      lambda k: f"CREATE {'UNIQUE ' if k.group(1) else ''}INDEX CONCURRENTLY IF NOT EXISTS ", text,
+                      flags=re.I)
+        return [Operation(table, 'SHARE', 'index', f"{kind} {m.group(4)} の作成",
+                          suggestion=f"-- トランザクションの外で1文だけで実行する\n{safe};")]
+
+    def _drop_index(self, text, statement):
+        m = re.match(r"DROP\s+INDEX\s+(CONCURRENTLY\s+)?(IF\s+EXISTS\s+)?(.+?)(?:\s+(CASCADE|RESTRICT))?$", text, re.I)
+        operations = []
+        for name in m.group(3).split(','):
+            name = _table(name)
+            index = self.schema.indexes.get(name)
+            table = index.table if index else None
+            if m.group(1):
+                operations.append(Operation(table, 'SHARE UPDATE EXCLUSIVE', 'metadata', f"INDEX {name} の削除"))
+            else:
+                operations.append(Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"INDEX {name} の削除",
+                                            suggestion=f"DROP INDEX CONCURRENTLY IF EXISTS {name};"))
+        return operations
+
+    def _alter_table(self, text, statement):
+        m = re.match(rf"ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?{NAME}\s+(.*)$", text, re.I | re.S)
+        if not m:
+            return []
+        table = m.group(1).lower()
+        operations = []
+        for action in split_top(m.group(2)):
+            operations += self._alter_action(table, action)
+        return operations
+
+    def _alter_action(self, table, action):
+        upper = action.upper()
+        add_constraint = re.match(r"ADD\s+(?:CONSTRAINT\s+\"?(\w+)\"?\s+)?(CHECK|FOREIGN\s+KEY|UNIQUE|PRIMARY\s+KEY|"
+                                  r"EXCLUDE)\b(.*)$", action, re.I | re.S)
+        if add_constraint:
+            return self._add_constraint(table, add_constraint.group(1), _one_line(add_constraint.group(2)).upper(),
+                                        add_constraint.group(3).strip(), action)
+        if upper.startswith('ADD'):
+            m = re.match(r"ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?\"?(\w+)\"?\s+(.*)$", action, re.I | re.S)
+            return self._add_column(table, m.group(1).lower(), m.group(2)) if m else []
+        if upper.startswith('DROP COLUMN') or (upper.startswith('DROP ') and not upper.startswith('DROP CONSTRAINT')):
+            m = re.match(r"DROP\s+(?:COLUMN\s+)?(?:IF\s+EXISTS\s+)?\"?(\w+)\"?", action, re.I)
+            return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"列 {m.group(1)} の削除",
+                              note='Edge Functions・アプリの旧バージョンがこの列を参照しなくなってから実行する'
+                                   '（select の列指定・insert の項目）')]
+        if upper.startswith('DROP CONSTRAINT'):
+            m = re.match(r"DROP\s+CONSTRAINT\s+(?:IF\s+EXISTS\s+)?\"?(\w+)\"?", action, re.I)
+            return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"制約 {m.group(1)} の削除")]
+        alter_column = re.match(r"ALTER\s+(?:COLUMN\s+)?\"?(\w+)\"?\s+(.*)$", action, re.I | re.S)
+        if alter_column:
+            return self._alter_column(table, alter_column.group(1).lower(), alter_column.group(2).strip())
+        if upper.startswith('RENAME'):
+            return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"名前の変更（{_one_line(action)}）",
+                              note='古い名前を参照しているEdge Functions・アプリは失敗する')]
+        if re.match(r"SET\s+(LOGGED|UNLOGGED|TABLESPACE)\b", upper) or upper.startswith('SET WITHOUT OIDS'):
+            return [Operation(table, 'ACCESS EXCLUSIVE', 'rewrite', _one_line(action))]
+        if re.match(r"(ENABLE|DISABLE|FORCE|NO\s+FORCE)\s+ROW\s+LEVEL\s+SECURITY", upper):
+            return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', _one_line(action))]
+        if re.match(r"(ENABLE|DISABLE)\s+TRIGGER", upper):
+            return [Operation(table, 'SHARE ROW EXCLUSIVE', 'metadata', _one_line(action))]
+        if re.match(r"VALIDATE\s+CONSTRAINT", upper):
+            return [Operation(table, 'SHARE UPDATE EXCLUSIVE', 'scan', _one_line(action))]
+        return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', _one_line(action))]
+
+    def _add_constraint(self, table, name, kind, body, action):
+        not_valid = bool(re.search(r"\bNOT\s+VALID\s*$", body, re.I))
+        name = name or f"{table}_{kind.split()[0].lower()}"
+        if kind == 'CHECK':
+            if not_valid:
+                return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"CHECK制約 {name} の追加（NOT VALID）")]
+            return [Operation(table, 'ACCESS EXCLUSIVE', 'scan', f"CHECK制約 {name} の追加",
+                              suggestion=f"ALTER TABLE {table} ADD CONSTRAINT {name} CHECK {body} NOT VALID;\n"
+                                         f"ALTER TABLE {table} VALIDATE CONSTRAINT {name};  "
+                                         f"-- SHARE UPDATE EXCLUSIVE（読み書きは止めない）")]
+        if kind == 'FOREIGN KEY':
+            reference = re.search(rf"REFERENCES\s+{NAME}", body, re.I)
+            operations = []
+            if reference and reference.group(1).lower() != table:
+                operations.append(Operation(reference.group(1).lower(), 'SHARE ROW EXCLUSIVE', 'metadata',
+                                            f"{table} の外部キー {name} の追加（参照先）"))
+            if not_valid:
+                return [Operation(table, 'SHARE ROW EXCLUSIVE', 'metadata', f"外部キー {name} の追加（NOT VALID）")] \
+                    + operations
+            return [Operation(table, 'SHARE ROW EXCLUSIVE', 'scan', f"外部キー {name} の追加",
+                              suggestion=f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY {body} NOT VALID;\n"
+                                         f"ALTER TABLE {table} VALIDATE CONSTRAINT {name};  "
+                                         f"-- SHARE UPDATE EXCLUSIVE（読み書きは止めない）")] + operations
+        if kind in ('UNIQUE', 'PRIMARY KEY'):
+            using_index = re.match(r"USING\s+INDEX\b", body, re.I)
+            if using_index:
+                return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"{kind}制約 {name} の追加（既存のインデックス）")]
+            columns = body[body.index('(') + 1:closing(body, body.index('('))] if '(' in body else ''
+            return [Operation(table, 'ACCESS EXCLUSIVE', 'index', f"{kind}制約 {name} の追加",
+                              suggestion=f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}({columns});"
+                                         f"  -- トランザクションの外で実行\n"
+                                         f"ALTER TABLE {table} ADD CONSTRAINT {name} {kind} USING INDEX {name};")]
+        return [Operation(table, 'ACCESS EXCLUSIVE', 'index', f"{kind}制約 {name} の追加")]
+
+    def _add_column(self, table, column, definition):
+        self.new_columns.add((table, column))
+        definition = _one_line(definition)
+        upper = definition.upper()
+        type_name = re.split(r"\s+(?:NOT|NULL|DEFAULT|PRIMARY|UNIQUE|REFERENCES|CHECK|CONSTRAINT|GENERATED|COLLATE)\b",
+                             definition, maxsplit=1, flags=re.I)[0]
+        default = re.search(r"\bDEFAULT\s+(.+?)(?:\s+(?:NOT\s+NULL|NULL|PRIMARY|UNIQUE|REFERENCES|CHECK|"
+                            r"CONSTRAINT|COLLATE)\b|$)", definition, re.I)
+        operations = []
+        if re.search(r"\bGENERATED\s+ALWAYS\s+AS\s*\(.*\)\s*STORED\b", definition, re.I) \
+                or re.match(r"(SMALL|BIG)?SERIAL\b", type_name, re.I) or 'AS IDENTITY' in upper:
+            operations.append(Operation(table, 'ACCESS EXCLUSIVE', 'rewrite',
+                                        f"列 {column} の追加（既存の行ごとに値を計算）"))
+        elif default and VOLATILE_FUNCTIONS.search(default.group(1)):
+            expression = default.group(1)
+            operations.append(Operation(
+                table, 'ACCESS EXCLUSIVE', 'rewrite', f"列 {column} の追加（DEFAULT {expression} は行ごとに値が変わる）",
+                suggestion=f"ALTER TABLE {table} ADD COLUMN {column} {type_name};\n"
+                           f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT {expression};\n"
+                           + self._batched(table, f"UPDATE {table} SET {column} = {expression}",
+                                           f"{column} IS NULL")))
+        elif 'NOT NULL' in upper and not default:
+            operations.append(Operation(
+                table, 'ACCESS EXCLUSIVE', 'fail', f"列 {column} の追加（NOT NULL で DEFAULT なし）",
+                suggestion=f"ALTER TABLE {table} ADD COLUMN {column} {type_name};\n"
+                           f"-- 既存の行に値を入れてから NOT NULL にする（ALTER COLUMN ... SET NOT NULL の提案を参照）"))
+        else:
+            # PostgreSQL 11以降、定数の DEFAULT は書き直しにならない
+            operations.append(Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"列 {column} の追加"))
+        if re.search(r"\b(UNIQUE|PRIMARY\s+KEY)\b", upper):
+            operations.append(Operation(table, 'ACCESS EXCLUSIVE', 'index', f"列 {column} の一意制約のインデックス作成"))
+        if re.search(r"\bCHECK\s*\(", upper):
+            operations.append(Operation(table, 'ACCESS EXCLUSIVE', 'scan', f"列 {column} のCHECK制約の検証"))
+        reference = re.search(rf"REFERENCES\s+{NAME}", definition, re.I)
+        if reference and reference.group(1).lower() != table:
+            operations.append(Operation(reference.group(1).lower(), 'SHARE ROW EXCLUSIVE', 'metadata',
+                                        f"{table}.{column} の外部キーの追加（参照先）"))
+        return operations
+
+    def _alter_column(self, table, column, action):
+        upper = _one_line(action).upper()
+        if upper.startswith('SET NOT NULL'):
+            constraint = f"{table}_{column}_not_null"
+            return [Operation(
+                table, 'ACCESS EXCLUSIVE', 'scan', f"列 {column} の NOT NULL 化",
+                suggestion=f"ALTER TABLE {table} ADD CONSTRAINT {constraint} CHECK ({column} IS NOT NULL) NOT VALID;\n"
+                           f"ALTER TABLE {table} VALIDATE CONSTRAINT {constraint};  -- 読み書きは止めない\n"
+                           f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL;  "
+                           f"-- 検証済みのCHECK制約があれば全件スキャンしない（PostgreSQL 12以降）\n"
+                           f"ALTER TABLE {table} DROP CONSTRAINT {constraint};")]
+        m = re.match(r"(?:SET\s+DATA\s+)?TYPE\s+(.+?)(?:\s+COLLATE\s+\S+)?(?:\s+USING\s+(.+))?$", _one_line(action),
+                     re.I)
+        if m:
+            new_type = m.group(1)
+            old = self.schema.tables.get(table) and self.schema.tables[table].columns.get(column)
+            if old and not m.group(2) and _binary_compatible(old.type_name, new_type):
+                return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata',
+                                  f"列 {column} の型の変更（{old.type_name} → {new_type}。書き直しなし）")]
+            before = f"{old.type_name} → " if old else ''
+            expression = m.group(2) or f"{column}::{new_type}"
+            return [Operation(
+                table, 'ACCESS EXCLUSIVE', 'rewrite', f"列 {column} の型の変更（{before}{new_type}）",
+                suggestion=f"-- 新しい列に値を移し、Edge Functions・アプリを切り替えてから古い列を削除する\n"
+                           f"ALTER TABLE {table} ADD COLUMN {column}_new {new_type};\n"
+                           + self._batched(table, f"UPDATE {table} SET {column}_new = {expression}",
+                                           f"{column}_new IS NULL AND {column} IS NOT NULL"))]
+        if re.match(r"(SET|DROP)\s+DEFAULT|DROP\s+NOT\s+NULL|SET\s+STATISTICS", upper):
+            return [Operation(table, 'ACCESS EXCLUSIVE' if 'STATISTICS' not in upper else 'SHARE UPDATE EXCLUSIVE',
+                              'metadata', f"列 {column} の {_one_line(action)}")]
+        return [Operation(table, 'ACCESS EXCLUSIVE', 'metadata', f"列 {column} の {_one_line(action)}")]
+
+    def _dml_statement(self, text, statement):
+        return self._dml(text, text)
+
+    def _dml(self, text, statement):
+        """UPDATE / DELETE（statement は WITH を含む文全体）"""
+        m = re.match(rf"(UPDATE|DELETE\s+FROM)\s+(?:ONLY\s+)?{NAME}", text, re.I)
+        if not m:
+            return []
+        table = m.group(2).lower()
+        where = _top_level_where(text)
+        kind = 'UPDATE' if m.group(1).upper() == 'UPDATE' else 'DELETE'
+        scope = '条件付き' if where is not None else '全行'
+        pending = None
+        set_column = re.search(r"\bSET\s+\"?(\w+)\"?\s*=", text, re.I) if kind == 'UPDATE' else None
+        if set_column and (table, set_column.group(1).lower()) in self.new_columns:
+            # このファイルで追加した列への値の設定は、まだ NULL の行が未更新の行
+            pending = f"{set_column.group(1)} IS NULL"
+        elif kind == 'DELETE' and where is not None:
+            # 削除は条件に合う行が残っている間続ける
+            pending = text[where + len('WHERE '):]
+        suggestion = self._batched(table, statement, pending, statement.upper().startswith('WITH'))
+        return [Operation(table, 'ROW EXCLUSIVE', 'update', f"{kind}（{scope}）", suggestion=suggestion)]
+
+    def _truncate(self, text, statement):
+        tables = re.sub(r"^TRUNCATE\s+(TABLE\s+)?(ONLY\s+)?", '', text, flags=re.I)
+        tables = re.split(r"\s+(RESTART|CONTINUE|CASCADE|RESTRICT)\b", tables, flags=re.I)[0]
+        return [Operation(_table(t), 'ACCESS EXCLUSIVE', 'metadata', 'TRUNCATE') for t in tables.split(',')]
+
+    def _drop_table(self, text, statement):
+        tables = re.sub(r"^DROP\s+TABLE\s+(IF\s+EXISTS\s+)?", '', text, flags=re.I)
+        tables = re.split(r"\s+(CASCADE|RESTRICT)\b", tables, flags=re.I)[0]
+        return [Operation(_table(t), 'ACCESS EXCLUSIVE', 'metadata', 'テーブルの削除') for t in tables.split(',')]
+
+    def _policy(self, text, statement):
+        m = re.search(rf"\bON\s+{NAME}", text, re.I)
+        return [Operation(m.group(1).lower(), 'ACCESS EXCLUSIVE', 'metadata', 'RLSポリシーの変更')] if m else []
+
+    def _trigger(self, text, statement):
+        m = re.search(rf"\bON\s+{NAME}", text, re.I)
+        return [Operation(m.group(1).lower(), 'SHARE ROW EXCLUSIVE', 'metadata', 'トリガーの変更')] if m else []
+
+    def _reindex(self, text, statement):
+        m = re.match(rf"REINDEX\s+(?:\(.*?\)\s+)?(INDEX|TABLE)\s+(CONCURRENTLY\s+)?{NAME}", text, re.I)
+        if not m:
+            return []
+        name = m.group(3).lower()
+        index = self.schema.indexes.get(name) if m.group(1).upper() == 'INDEX' else None
+        table = index.table if index else name
+        if m.group(2):
+            return [Operation(table, 'SHARE UPDATE EXCLUSIVE', 'index', f"REINDEX {name}（CONCURRENTLY）")]
+        return [Operation(table, 'SHARE', 'index', f"REINDEX {name}",
+                          suggestion=f"REINDEX {m.group(1).upper()} CONCURRENTLY {name};  -- PostgreSQL 12以降")]
+
+    def _vacuum(self, text, statement):
+        if not re.search(r"\bFULL\b", text, re.I):
+            return []
+        m = re.search(rf"\b{NAME}\s*$", text)
+        return [Operation(m.group(1).lower() if m else None, 'ACCESS EXCLUSIVE', 'rewrite', 'VACUUM FULL',
+                          note='pg_repack などオンラインで再編成できるツールを使う')]
+
+    def _cluster(self, text, statement):
+        m = re.match(rf"CLUSTER\s+(?:VERBOSE\s+)?{NAME}", text, re.I)
+        return [Operation(m.group(1).lower() if m else None, 'ACCESS EXCLUSIVE', 'rewrite', 'CLUSTER',
+                          note='pg_repack などオンラインで再編成できるツールを使う')]
+
+    def _batched(self, table, statement, pending=None, recomputed=False):
+        """UPDATE / DELETE をバッチごとにCOMMITする DO ブロックにする"""
+        key = self._key_column(table)
+        pending = pending or '<未更新の行の条件>'
+        batch = f"{table}.{key} IN (SELECT {key} FROM {table} WHERE {pending} LIMIT {BATCH_ROWS // 10})"
+        where = _top_level_where(statement)
+        if where is None:
+            batched = f"{statement} WHERE {batch}"
+        else:
+            batched = f"{statement[:where]}WHERE {batch} AND {statement[where + len('WHERE '):]}"
+        lines = [
+            f"-- {BATCH_ROWS // 10}行ずつ処理し、バッチごとにCOMMITする"
+            f"（DO ブロックをトランザクションの外で実行する。PostgreSQL 11以降）",
+        ]
+        if recomputed:
+            lines.append('-- WITH の集計はバッチごとに計算し直すため、大きいテーブルでは先に一時テーブルへ書き出す')
+        lines += [
+            'DO $$',
+            'DECLARE',
+            '  affected integer;',
+            'BEGIN',
+            '  LOOP',
+            f"    {batched};",
+            '    GET DIAGNOSTICS affected = ROW_COUNT;',
+            '    EXIT WHEN affected = 0;',
+            '    COMMIT;',
+            '  END LOOP;',
+            'END $$;',
+        ]
+        return '\n'.join(lines)
+
+    def _key_column(self, table):
+        """バッチの区切りに使う列（単一列の主キー、なければ ctid）"""
+        for index in self.schema.indexes_on(table):
+            if index.constraint == 'PRIMARY KEY' and len(index.columns) == 1:
+                return index.column_names[0]
+        return 'ctid'
+
+    # ===================================
+    # 判定
+    # ===================================
+
+    def estimate(self, operation):
+        """重い処理の所要時間（秒）。行数が分からなければ None"""
+        if operation.work not in ROWS_PER_SECOND:
+            return 0.0
+        if operation.table in self.new_tables:
+            return 0.0
+        rows = self.rows.get(operation.table)
+        return None if rows is None else rows / ROWS_PER_SECOND[operation.work]
+
+    def _check(self, line, operation):
+        seconds = self.estimate(operation)
+        new = operation.table in self.new_tables
+        blocked = blocks(operation.lock)
+        rows = self.rows.get(operation.table)
+        labels = [operation.lock, WORK_LABELS[operation.work]] if operation.work != 'metadata' else [operation.lock]
+        if blocked:
+            labels.append(blocked)
+        if seconds:
+            labels.append(f"推定 {format_seconds(seconds)}（{rows:,}行）")
+        elif seconds is None:
+            labels.append('行数不明')
+
+        if new or operation.work == 'metadata':
+            severity = 'info'
+        elif operation.work == 'fail':
+            severity = 'info' if rows == 0 else 'error'
+        elif operation.work == 'update':
+            severity = 'warning' if rows is None or rows > BATCH_ROWS else 'info'
+        elif not blocked:
+            severity = 'info'
+        elif seconds is None:
+            severity = 'warning'
+        else:
+            severity = 'error' if seconds >= self.max_lock_seconds else 'warning'
+        if new and operation.work != 'metadata':
+            labels.append('このファイルで作成したテーブル')
+        message = f"{operation.table or '?'}: {operation.description} [{'・'.join(labels)}]"
+        if operation.note:
+            message += f"\n    ※ {operation.note}"
+        self.findings.append(Finding(self.path, line, severity, message, None if new else operation.suggestion,
+                                     operation, seconds))
+
+    def _check_file(self, statements):
+        text = self.text
+        existing = [(line, op) for line, op in self.operations
+                    if op.table and op.table not in self.new_tables and lock_rank(op.lock) >= lock_rank('SHARE')]
+        if existing and not re.search(r"\bSET\s+(LOCAL\s+)?lock_timeout\b", text, re.I):
+            line, operation = existing[0]
+            self.findings.append(Finding(
+                self.path, 1, 'warning',
+                f"lock_timeout が未設定（{operation.table} に {operation.lock} を取る。"
+                f"ロック待ちの間は後から来たクエリも全て待たされる）",
+                f"SET lock_timeout = '{DEFAULT_LOCK_TIMEOUT}';  -- ファイルの先頭に追加（タイムアウトしたら再実行する）"))
+
+        concurrent = [line for line, op in self.operations if 'CONCURRENTLY' in op.description]
+        if concurrent and len([s for s in statements if not re.match(r"(COMMENT|SELECT)\b", s[0], re.I)]) > 1:
+            self.findings.append(Finding(
+                self.path, concurrent[0], 'warning',
+                'CONCURRENTLY の文が他の文と同じファイルにある（SQLエディタでまとめて実行すると'
+                'トランザクションの中になり失敗する）',
+                'CONCURRENTLY の文は別のファイルに分けるか、1文ずつ実行する'))
+
+        # ファイル全体を1つのトランザクションで実行した場合に、各テーブルのロックを保持する時間
+        held = {}
+        for n, (line, operation) in enumerate(self.operations):
+            if (not operation.table or operation.table in self.new_tables
+                    or lock_rank(operation.lock) < lock_rank('SHARE')
+                    or lock_rank(operation.lock) <= lock_rank(held.get(operation.table, (None, 0))[0])):
+                continue
+            seconds = [self.estimate(op) for _, op in self.operations[n:]]
+            if None in seconds:
+                continue
+            held[operation.table] = (operation.lock, line, sum(seconds))
+        for table, (lock, line, seconds) in sorted(held.items()):
+            if seconds >= self.max_lock_seconds:
+                self.findings.append(Finding(
+                    self.path, line, 'error',
+                    f"{table}: まとめて実行すると {lock} を最後の文まで約{format_seconds(seconds)}保持する"
+                    f"（{blocks(lock)}）",
+                    'ロックを取る文と重い処理を別々に実行する（ファイルを分ける・バッチ更新にする）'))
+
+    @property
+    def severity(self):
+        return max((f.severity for f in self.findings), key=SEVERITY_ORDER.index, default=None)
+
+
+def _top_level_where(statement):
+    """文の最上位（括弧の外）の WHERE の位置（なければ None）"""
+    depth = 0
+    found = None
+    for m in re.finditer(r"'(?:[^']|'')*'|[()]|\bWHERE\s", statement, re.I):
+        token = m.group()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif token[0] != "'" and depth == 0:
+            found = m.start()
+    return found
+
+
+def parse_rows(values, stats_path=None):
+    """--rows テーブル=行数 と --stats のJSONから {テーブル: 行数}"""
+    rows = {}
+    if stats_path:
+        data = json.loads(Path(stats_path).read_text(encoding='utf-8'))
+        if not isinstance(data, dict):
+            raise ValueError(f"行数のJSONは {{テーブル名: 行数}} の形にしてください: {stats_path}")
+        rows.update({_table(k): int(v) for k, v in data.items() if v is not None})
+    for value in values or []:
+        table, _, count = value.partition('=')
+        if not count:
+            raise ValueError(f"--rows は テーブル=行数 の形で指定してください: {value}")
+        rows[_table(table)] = int(count.replace(',', '').replace('_', ''))
+    return rows
+
+
+def lint_files(paths, rows=None, max_lock_seconds=DEFAULT_MAX_LOCK_SECONDS):
+    """マイグレーションを適用順に検査する（各ファイルの前までのSQLを適用したスキーマで判定）"""
+    order = schema_files()
+    targets = {Path(p).resolve() for p in paths}
+    schema = Schema()
+    linters = []
+    for path in order:
+        text = path.read_text(encoding='utf-8')
+        if path.resolve() in targets:
+            linters.append(MigrationLinter(path, text, schema, rows, max_lock_seconds).lint())
+        schema.apply_text(text, path)
+    # database/ 以外のファイルはスキーマの適用順に含めず、全てを適用したスキーマで検査する
+    for path in sorted(targets - {p.resolve() for p in order}):
+        linters.append(MigrationLinter(path, path.read_text(encoding='utf-8'), schema, rows, max_lock_seconds).lint())
+    return linters
+
+
+def print_findings(linters, verbose=False):
+    counts = {severity: 0 for severity in SEVERITY_ORDER}
+    for linter in linters:
+        findings = [f for f in linter.findings
+                    if verbose or f.severity != 'info' or f.suggestion or (f.operation and f.operation.note)]
+        if not findings:
+            continue
+        print(f"📄 {linter.path}")
+        for finding in sorted(findings, key=lambda f: f.line):
+            counts[finding.severity] += 1
+            print(f"  {finding.line}: {SEVERITY_LABELS[finding.severity]} {finding.message}")
+            if finding.suggestion:
+                print('    → 代わりに:')
+                for line in finding.suggestion.splitlines():
+                    print(f"        {line}")
+        print()
+    print(f"検査: {len(linters)}ファイル（エラー {counts['error']}件、警告 {counts['warning']}件）")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='マイグレーションのロック・テーブル書き直しの検査')
+    parser.add_argument('files', nargs='*', help='対象のマイグレーション（ファイル名またはパス。省略時は全て）')
+    parser.add_argument('--rows', action='append', metavar='TABLE=ROWS', help='テーブルの行数（複数指定可）')
+    parser.add_argument('--stats', help='テーブルの行数のJSON（{"todos": 120000, ...}）')
+    parser.add_argument('--max-lock-seconds', type=float, default=DEFAULT_MAX_LOCK_SECONDS,
+                        help=f"読み書きを止めてよい時間の上限（秒、既定 {DEFAULT_MAX_LOCK_SECONDS}）")
+    parser.add_argument('--json', help='検査結果のJSONの書き出し先')
+    parser.add_argument('-v', '--verbose', action='store_true', help='問題のない文のロックも表示する')
+    args = parser.parse_args(argv)
+
+    paths = []
+    for name in args.files or sorted(MIGRATIONS_DIR.glob('*.sql')):
+        path = Path(name)
+        if not path.is_file() and (MIGRATIONS_DIR / name).is_file():
+            path = MIGRATIONS_DIR / name
+        if not path.is_file():
+            raise ValueError(f"マイグレーションがありません: {name}")
+        paths.append(path)
+
+    linters = lint_files(paths, parse_rows(args.rows, args.stats), args.max_lock_seconds)
+    print_findings(linters, args.verbose)
+    if args.json:
+        findings = [f.to_dict() for linter in linters for f in linter.findings]
+        Path(args.json).write_text(json.dumps(findings, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+        print(f"\n💾 JSON: {args.json}")
+    return 1 if any(linter.severity in ('warning', 'error') for linter in linters) else 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
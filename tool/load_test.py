@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+"""
+Edge Functions の負荷試験
+supabase/functions の各Function（tool/update_edge_functions.py と同じく list_functions で列挙）に、
+重みをつけたシナリオの割合で asyncio から同時にリクエストを送り、
+Functionごとの応答時間（p50 / p95 / p99）・スループット・エラー率を測る
+
+- リクエストの本文は各 index.ts の `interface ...Request` の必須項目から作る
+  （*_id は --context のJSONの値。既定は tool/generate_dataset.py の最初のユーザー・グループなどのID）
+- シナリオは組み込みの割合（--mix app / read / uniform）か、JSONファイル（--scenario）で指定する
+    {"weights": {"get-user-groups": 10, ...}, "bodies": {"get-group-todos": {"group_id": "{group_id}"}}}
+- 接続先は、ローカルで起動した Functions（supabase functions serve）か、
+  同梱のスタブサーバー（tool/edge_function_stub_server.py。--stub で自動起動）
+- --record で各Functionの応答を1回ずつ記録し、スタブサーバーで応答時間つきで再生できる
+- --baseline で保存した結果と比較し、合計が劣化していれば終了コード1（CI用）。
+  Functionごとの劣化は参考表示で、--per-endpoint で判定にも含める（--min-samples 未満の件数のFunctionは比べない）
+
+使い方:
+    python tool/load_test.py --stub --duration 10                                  # オフライン（スタブ）
+    python tool/load_test.py --base-url http://127.0.0.1:54321/functions/v1 --context ids.json \\
+        --concurrency 20 --duration 30 --json result.json
+    python tool/load_test.py --base-url http://127.0.0.1:54321/functions/v1 --record recordings.json
+    python tool/load_test.py --stub recordings.json --mix read --json result.json --baseline baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import ssl
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from codemod import FUNCTIONS_DIR, list_functions
+from edge_function_stub_server import EdgeFunctionStub, load_recordings, save_recordings
+from generate_dataset import uuid_for
+
+DEFAULT_BASE_URL = 'http://127.0.0.1:54321/functions/v1'
+DEFAULT_CONCURRENCY = 10
+DEFAULT_DURATION = 10.0
+DEFAULT_TIMEOUT = 30.0
+# --per-endpoint で Functionごとに比べる最小の件数（p95 の外側が5件以上になる）
+MIN_SAMPLES = 100
+
+# 本文の *_id に入れる既定の値（tool/generate_dataset.py のデータセットの最初の行）
+DEFAULT_CONTEXT = {
+    'user_id': uuid_for('users', 0),
+    'group_id': uuid_for('groups', 0),
+    'todo_id': uuid_for('todos', 0),
+    'recurring_todo_id': uuid_for('recurring_todos', 0),
+    'invitation_id': uuid_for('group_invitations', 0),
+    'quick_action_id': '00000000-0000-4000-8000-000000000000',
+    'device_id': 'device-0000000000',
+    'display_id': '00000000',
+}
+
+# 組み込みのシナリオ（Function名 → 重み）
+MIXES = {
+    # アプリの利用状況を想定（起動・一覧の取得が中心で、完了の切り替えが続く）
+    'app': {
+        'check-app-status': 5, 'get-user-by-device': 2, 'initialize-user-cache': 5, 'get-user-groups': 10,
+        'get-group-todos': 15, 'get-my-todos': 10, 'toggle-todo-completion': 8, 'get-todo-detail': 4,
+        'get-todo-comments': 3, 'create-todo': 3, 'update-todo': 2, 'get-group-detail': 3,
+        'get-group-members': 3, 'get-recurring-todos': 2, 'get-quick-actions': 2,
+        'get-pending-invitations': 2, 'get-announcements': 1,
+    },
+    # 取得系だけ（データを変えないので何度でも流せる）
+    'read': 'read',
+    # 全Functionを同じ割合で（削除・引き継ぎなどは --include-destructive のときだけ）
+    'uniform': 'uniform',
+}
+READ_PREFIXES = ('get-', 'check-', 'validate-', 'initialize-')
+# データを消す・移すFunction（uniform で既定では送らない）
+DESTRUCTIVE = re.compile(r'^(delete-|remove-|transfer-|cancel-|reject-)')
+
+REQUEST_INTERFACE = re.compile(r"interface\s+\w*Request\s*\{(.*?)\n\}", re.S)
+INTERFACE_FIELD = re.compile(r"^([ \t]*)(\w+)(\??)\s*:\s*([^/\n;]+)", re.M)
+
+# 名前だけでは値を決められない項目（CHECK制約の値・ユーザーIDを入れる項目など）
+FIELD_DEFAULTS = {
+    'new_role': 'member', 'invited_role': 'member', 'recurrence_pattern': 'daily', 'generation_time': '09:00:00',
+    'platform': 'ios', 'current_version': '1.0.0', 'inquiry_type': 'other', 'error_type': 'load_test',
+    'created_by': '{user_id}', 'executed_by': '{user_id}', 'created_at': '2025-01-01T00:00:00Z',
+}
+
+
+class Endpoint:
+    """負荷試験の対象の1Function"""
+
+    def __init__(self, name, weight, body):
+        self.name = name
+        self.weight = weight
+        self.body = body
+
+
+def request_fields(function_name, functions_dir=FUNCTIONS_DIR):
+    """index.ts の `interface ...Request` の項目 → [(名前, 省略可か, 型), ...]"""
+    path = Path(functions_dir) / function_name / 'index.ts'
+    if not path.exists():
+        return []
+    m = REQUEST_INTERFACE.search(path.read_text(encoding='utf-8'))
+    if not m:
+        return []
+    fields = INTERFACE_FIELD.findall(m.group(1))
+    if not fields:
+        return []
+    # 入れ子の型（Array<{ ... }> の中）の項目は除く
+    indent = min(len(field[0]) for field in fields)
+    return [(name, bool(optional), type_name.strip()) for spaces, name, optional, type_name in fields
+            if len(spaces) == indent]
+
+
+def default_body(function_name, context, functions_dir=FUNCTIONS_DIR):
+    """必須項目を型と名前から埋めた本文"""
+    body = {}
+    for name, optional, type_name in request_fields(function_name, functions_dir):
+        if optional:
+            continue
+        if name in context:
+            body[name] = context[name]
+        elif name in FIELD_DEFAULTS:
+            body[name] = _substitute(FIELD_DEFAULTS[name], context)
+        elif name.endswith('_ids'):
+            body[name] = [context.get(name[:-1], context['user_id'])]
+        elif name.endswith('_id'):
+            body[name] = context['user_id']
+        elif type_name.endswith('[]') or type_name.startswith('Array<'):
+            body[name] = []
+        elif type_name == 'boolean':
+            body[name] = True
+        elif type_name == 'number':
+            body[name] = 1
+        else:
+            body[name] = '負荷試験'
+    return body
+
+
+def _substitute(value, context):
+    """本文のテンプレートの "{user_id}" などを --context の値で置き換える"""
+    if isinstance(value, str):
+        m = re.fullmatch(r"\{(\w+)\}", value)
+        if m and m.group(1) in context:
+            return context[m.group(1)]
+        return value
+    if isinstance(value, list):
+        return [_substitute(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: _substitute(item, context) for key, item in value.items()}
+    return value
+
+
+def discover_functions(functions_dir=FUNCTIONS_DIR):
+    """負荷試験の対象にできるFunction（index.ts があるもの。_shared は除く）"""
+    return [name for name in list_functions(functions_dir)
+            if not name.startswith('_') and (Path(functions_dir) / name / 'index.ts').exists()]
+
+
+def build_endpoints(mix='app', scenario=None, context=None, include_destructive=False,
+                    functions_dir=FUNCTIONS_DIR):
+    """
+    シナリオの重みと本文から Endpoint の一覧を作る
+
+    Args:
+        mix: 組み込みのシナリオ名（scenario がなければ使う）
+        scenario: {'weights': {...}, 'bodies': {...}}
+        context: 本文の *_id に入れる値
+    """
+    context = {**DEFAULT_CONTEXT, **(context or {})}
+    available = discover_functions(functions_dir)
+    bodies = {}
+    if scenario:
+        weights = scenario.get('weights') or {}
+        bodies = scenario.get('bodies') or {}
+    elif MIXES.get(mix) == 'read':
+        weights = {name: 1 for name in available if name.startswith(READ_PREFIXES)}
+    elif MIXES.get(mix) == 'uniform':
+        weights = {name: 1 for name in available if include_destructive or not DESTRUCTIVE.match(name)}
+    elif mix in MIXES:
+        weights = MIXES[mix]
+    else:
+        raise ValueError(f"不明なシナリオです: {mix}（{', '.join(MIXES)}）")
+
+    unknown = [name for name in weights if name not in available]
+    if unknown:
+        raise ValueError(f"supabase/functions にないFunctionです: {', '.join(unknown)}")
+    endpoints = []
+    for name, weight in weights.items():
+        if weight <= 0:
+            continue
+        body = _substitute(bodies[name], context) if name in bodies else default_body(name, context, functions_dir)
+        endpoints.append(Endpoint(name, weight, body))
+    if not endpoints:
+        raise ValueError("リクエストを送るFunctionがありません")
+    return endpoints
+
+
+# ===================================
+# HTTPクライアント（asyncio のストリームで HTTP/1.1 keep-alive）
+# ===================================
+
+class HttpConnection:
+    """1本の接続（ワーカーごとに持ち、切れたら張り直す）"""
+
+    def __init__(self, base_url, headers, timeout):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError(f"http / https のURLを指定してください: {base_url}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == 'https' else None
+        self.prefix = parts.path.rstrip('/')
+        self.headers = {'Host': parts.netloc, 'Content-Type': 'application/json', **headers}
+        self.timeout = timeout
+        self.reader = self.writer = None
+
+    async def request(self, name, body):
+        """POST {base_url}/{name} → (ステータス, 本文のバイト列)"""
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        head = [f"POST {self.prefix}/{name} HTTP/1.1"]
+        head += [f"{key}: {value}" for key, value in self.headers.items()]
+        head.append(f"Content-Length: {len(data)}")
+        payload = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data
+        for attempt in range(2):
+            if self.writer is None:
+                self.reader, self.writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port, ssl=self.ssl), self.timeout)
+            try:
+                self.writer.write(payload)
+                await self.writer.drain()
+                return await asyncio.wait_for(self._response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # keep-alive の接続がサーバー側で閉じられていたら1回だけ張り直す
+                await self.close()
+                if attempt:
+                    raise
+
+    async def _response(self):
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            key, _, value = line.decode('latin-1').partition(':')
+            headers[key.strip().lower()] = value.strip()
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunk = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            body = b''.join(chunks)
+        elif 'content-length' in headers:
+            body = await self.reader.readexactly(int(headers['content-length']))
+        else:
+            body = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, body
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self.reader = self.writer = None
+
+
+# ===================================
+# 負荷の生成と集計
+# ===================================
+
+class Sample:
+    __slots__ = ('name', 'latency', 'status', 'error', 'failed')
+
+    def __init__(self, name, latency, status, error=None, failed=False):
+        self.name = name
+        self.latency = latency
+        self.status = status
+        # 通信エラー・4xx / 5xx の内容
+        self.error = error
+        # 200 で {"success": false}（業務エラー。エラー率には含めない）
+        self.failed = failed
+
+
+async def _send(connection, endpoint):
+    """1リクエスト → (Sample, 応答のJSON)"""
+    started = time.perf_counter()
+    try:
+        status, data = await connection.request(endpoint.name, endpoint.body)
+    except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+        await connection.close()
+        return Sample(endpoint.name, time.perf_counter() - started, 0, type(e).__name__), None
+    latency = time.perf_counter() - started
+    if status >= 400:
+        return Sample(endpoint.name, latency, status, f"HTTP {status}"), None
+    try:
+        payload = json.loads(data or b'null')
+    except ValueError:
+        payload = None
+    failed = isinstance(payload, dict) and payload.get('success') is False
+    return Sample(endpoint.name, latency, status, failed=failed), payload
+
+
+async def run_load(endpoints, base_url, headers, concurrency=DEFAULT_CONCURRENCY, duration=DEFAULT_DURATION,
+                   requests=None, warmup=0.0, timeout=DEFAULT_TIMEOUT, seed=None):
+    """
+    concurrency 本のワーカーが、応答を受け取るたびに次のリクエストを送る（クローズドループ）
+
+    Args:
+        duration: 計測する秒数（requests を指定したときは上限）
+        requests: 送るリクエストの総数
+        warmup: 計測を始める前に送り続ける秒数（結果に含めない）
+
+    Returns:
+        (サンプルの一覧, 計測した秒数)
+    """
+    rng = random.Random(seed)
+    weights = [endpoint.weight for endpoint in endpoints]
+    samples = []
+    remaining = [requests]
+    measuring = asyncio.Event()
+
+    async def worker():
+        connection = HttpConnection(base_url, headers, timeout)
+        try:
+            while time.perf_counter() < deadline:
+                if measuring.is_set() and remaining[0] is not None:
+                    if remaining[0] <= 0:
+                        break
+                    remaining[0] -= 1
+                endpoint = rng.choices(endpoints, weights)[0]
+                sample, _ = await _send(connection, endpoint)
+                if measuring.is_set():
+                    samples.append(sample)
+        finally:
+            await connection.close()
+
+    started = time.perf_counter()
+    deadline = started + warmup + duration
+    tasks = [asyncio.create_task(worker()) for _ in range(concurrency)]
+    if warmup:
+        await asyncio.sleep(warmup)
+    measuring.set()
+    measured_from = time.perf_counter()
+    await asyncio.gather(*tasks)
+    return samples, time.perf_counter() - measured_from
+
+
+def percentile(values, q):
+    """線形補間のパーセンタイル（values は昇順）"""
+    if not values:
+        return None
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def summarize(samples, elapsed):
+    """{'total': 集計, 'endpoints': {Function名: 集計}}"""
+    def stats(group):
+        latencies = sorted(sample.latency * 1000 for sample in group)
+        errors = [sample for sample in group if sample.error]
+        statuses = {}
+        for sample in group:
+            statuses[str(sample.status)] = statuses.get(str(sample.status), 0) + 1
+        return {
+            'requests': len(group),
+            'throughput': len(group) / elapsed if elapsed else 0.0,
+            'errors': len(errors),
+            'error_rate': len(errors) / len(group) if group else 0.0,
+            'failures': sum(1 for sample in group if sample.failed),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1] if latencies else None,
+            'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+            'statuses': statuses,
+        }
+
+    by_name = {}
+    for sample in samples:
+        by_name.setdefault(sample.name, []).append(sample)
+    return {'total': stats(samples), 'endpoints': {name: stats(group) for name, group in sorted(by_name.items())}}
+
+
+def _ms(value):
+    return f"{value:8.1f}" if value is not None else f"{'-':>8}"
+
+
+def print_summary(summary):
+    print(f"\n{'Function':<32} {'件数':>7} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'エラー':>7} {'失敗':>6}")
+    rows = list(summary['endpoints'].items()) + [('合計', summary['total'])]
+    for name, stats in rows:
+        print(f"{name:<32} {stats['requests']:>7,} {stats['throughput']:>8.1f} {_ms(stats['p50_ms'])} "
+              f"{_ms(stats['p95_ms'])} {_ms(stats['p99_ms'])} {stats['error_rate']:>7.1%} {stats['failures']:>6,}")
+
+
+def compare_with_baseline(baseline, current, max_regression, max_error_rate_increase, per_endpoint=False,
+                          min_samples=MIN_SAMPLES):
+    """
+    基準の結果と比較して表示する
+
+    劣化の判定は合計で行う。Functionごとの件数は少なく p95 が末尾の数件で決まり、
+    同じ条件で測り直しても 10% 以上ぶれるため、Functionごとの結果は参考として表示するだけにする。
+
+    Args:
+        max_regression: p95 の増加率・スループットの減少率（%）の許容値
+        max_error_rate_increase: エラー率の増加（ポイント）の許容値
+        per_endpoint: Functionごとの p95・エラー率も判定に含める
+        min_samples: Functionごとに比べる最小の件数（基準・今回のどちらかが下回れば比べない）
+
+    Returns:
+        劣化した項目の説明のリスト
+    """
+    regressions = []
+    print(f"\n📊 基準との比較（許容: p95 +{max_regression}% / スループット -{max_regression}% / "
+          f"エラー率 +{max_error_rate_increase}pt。"
+          + (f"Functionごとは {min_samples}件以上" if per_endpoint else "Functionごとは参考") + "）")
+    previous_endpoints = baseline['summary']['endpoints']
+    rows = [(name, stats, previous_endpoints.get(name)) for name, stats in current['summary']['endpoints'].items()]
+    rows.append(('合計', current['summary']['total'], baseline['summary']['total']))
+    for name, stats, old in rows:
+        if old is None:
+            print(f"   ➕ {name}: 基準なし")
+            continue
+        gated = name == '合計' or per_endpoint
+        if name != '合計' and min(stats['requests'], old['requests']) < min_samples:
+            print(f"   ➖ {name}: 件数不足（{old['requests']} → {stats['requests']}件）")
+            continue
+        checks = []
+        if old['p95_ms'] and stats['p95_ms'] is not None:
+            change = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100
+            checks.append(('p95', f"{old['p95_ms']:.1f}ms → {stats['p95_ms']:.1f}ms ({change:+.1f}%)",
+                           change > max_regression))
+        if name == '合計' and old['throughput']:
+            change = (stats['throughput'] - old['throughput']) / old['throughput'] * 100
+            checks.append(('スループット', f"{old['throughput']:.1f} → {stats['throughput']:.1f}req/s "
+                                      f"({change:+.1f}%)", -change > max_regression))
+        increase = (stats['error_rate'] - old['error_rate']) * 100
+        checks.append(('エラー率', f"{old['error_rate']:.1%} → {stats['error_rate']:.1%}",
+                       increase > max_error_rate_increase))
+        for label, text, failed in checks:
+            print(f"   {('❌' if gated else '⚠️ ') if failed else '✅'} {name} {label}: {text}")
+            if failed and gated:
+                regressions.append(f"{name} {label}")
+    return regressions
+
+
+async def record(endpoints, base_url, headers, timeout):
+    """各Functionに1回ずつ送り、応答（ステータス・本文・応答時間）を記録する"""
+    connection = HttpConnection(base_url, headers, timeout)
+    recordings = {}
+    try:
+        for endpoint in endpoints:
+            sample, payload = await _send(connection, endpoint)
+            mark = '❌' if sample.error else ('⚠️ ' if sample.failed else '✅')
+            print(f"   {mark} {endpoint.name}: {sample.status} {sample.latency * 1000:.1f}ms")
+            if sample.status:
+                recordings[endpoint.name] = {'status': sample.status, 'body': payload,
+                                             'latency_ms': round(sample.latency * 1000, 1)}
+    finally:
+        await connection.close()
+    return recordings
+
+
+def _load_json(path, label):
+    try:
+        return json.loads(Path(path).read_text(encoding='utf-8'))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"{label} のJSONを読めません: {path}: {e}") from None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Edge Functions の負荷試験')
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--base-url', default=os.environ.get('FUNCTIONS_URL', DEFAULT_BASE_URL),
+                        help=f'Functions のURL（既定: 環境変数 FUNCTIONS_URL か {DEFAULT_BASE_URL}）')
+    target.add_argument('--stub', nargs='?', const='', metavar='RECORDINGS',
+                        help='同梱のスタブサーバーを起動して使う（記録した応答のファイルを指定可）')
+    parser.add_argument('--anon-key', default=os.environ.get('SUPABASE_ANON_KEY', ''),
+                        help='Authorization に付けるキー（既定: 環境変数 SUPABASE_ANON_KEY）')
+    parser.add_argument('--skip-maintenance', action='store_true',
+                        help='x-admin-skip-maintenance を付けてメンテナンスチェックを飛ばす')
+    parser.add_argument('--mix', default='app', help=f"組み込みのシナリオ（{', '.join(MIXES)}）")
+    parser.add_argument('--scenario', help='シナリオのJSON（weights / bodies）')
+    parser.add_argument('--context', help='本文の *_id などに入れる値のJSON')
+    parser.add_argument('--include-destructive', action='store_true', help='uniform に削除・引き継ぎ系も含める')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='同時に送るリクエスト数')
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help='計測する秒数')
+    parser.add_argument('--requests', type=int, help='送るリクエストの総数（--duration は上限になる）')
+    parser.add_argument('--warmup', type=float, default=0.0, help='計測前に送り続ける秒数')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='1リクエストのタイムアウト（秒）')
+    parser.add_argument('--seed', type=int, help='シナリオの選択の乱数のシード')
+    parser.add_argument('--stub-latency-ms', type=float, default=20.0, help='--stub で記録がないときの応答時間')
+    parser.add_argument('--stub-jitter', type=float, default=0.3, help='--stub の応答時間のばらつき（σ）')
+    parser.add_argument('--stub-error-rate', type=float, default=0.0, help='--stub で 500 を返す割合')
+    parser.add_argument('--record', metavar='RECORDINGS', help='各Functionの応答を1回ずつ記録して終了する')
+    parser.add_argument('--list', action='store_true', help='対象のFunctionと本文を表示して終了する')
+    parser.add_argument('--json', help='結果をJSONで保存')
+    parser.add_argument('--baseline', help='比較する基準の結果（--json で保存したもの）')
+    parser.add_argument('--max-regression', type=float, default=10.0,
+                        help='p95 の増加・スループットの減少の許容率（%%）。超えたら終了コード1')
+    parser.add_argument('--max-error-rate-increase', type=float, default=1.0,
+                        help='エラー率の増加の許容値（ポイント）')
+    parser.add_argument('--per-endpoint', action='store_true',
+                        help='Functionごとの p95・エラー率の劣化でも終了コード1にする（既定は合計だけ）')
+    parser.add_argument('--min-samples', type=int, default=MIN_SAMPLES,
+                        help=f'Functionごとに比べる最小の件数（既定: {MIN_SAMPLES}）')
+    args = parser.parse_args(argv)
+    if args.concurrency < 1 or args.duration <= 0:
+        parser.error('--concurrency は1以上、--duration は0より大きくしてください')
+
+    context = _load_json(args.context, '--context') if args.context else None
+    scenario = _load_json(args.scenario, '--scenario') if args.scenario else None
+    endpoints = build_endpoints(args.mix, scenario, context, args.include_destructive)
+    if args.list:
+        total = sum(endpoint.weight for endpoint in endpoints)
+        for endpoint in endpoints:
+            print(f"{endpoint.name:<32} {endpoint.weight / total:>6.1%}  "
+                  f"{json.dumps(endpoint.body, ensure_ascii=False)}")
+        return 0
+
+    headers = {}
+    if args.anon_key:
+        headers['Authorization'] = f"Bearer {args.anon_key}"
+        headers['apikey'] = args.anon_key
+    if args.skip_maintenance:
+        headers['x-admin-skip-maintenance'] = 'true'
+
+    if args.record:
+        if args.stub is not None:
+            parser.error('--record は実際の Functions（--base-url）に対して使ってください')
+        print(f"🎙  応答を記録中: {args.base_url}")
+        recordings = asyncio.run(record(endpoints, args.base_url, headers, args.timeout))
+        save_recordings(args.record, recordings, args.base_url)
+        print(f"💾 {args.record}（{len(recordings)}件）")
+        return 0
+
+    stub = None
+    base_url = args.base_url
+    if args.stub is not None:
+        recordings = load_recordings(args.stub) if args.stub else {}
+        stub = EdgeFunctionStub(recordings, port=0, latency_ms=args.stub_latency_ms, jitter=args.stub_jitter,
+                                error_rate=args.stub_error_rate, seed=args.seed).start()
+        base_url = stub.functions_url
+        print(f"🧪 スタブサーバー: {base_url}（記録 {len(recordings)}件）")
+
+    mix = 'scenario' if scenario else args.mix
+    print(f"🚀 {len(endpoints)} Functions / 同時 {args.concurrency} / "
+          + (f"{args.requests:,}リクエスト" if args.requests else f"{args.duration:g}秒") + f" → {base_url}")
+    try:
+        samples, elapsed = asyncio.run(run_load(endpoints, base_url, headers, args.concurrency, args.duration,
+                                                args.requests, args.warmup, args.timeout, args.seed))
+    finally:
+        if stub:
+            stub.stop()
+    if not samples:
+        raise ValueError("計測期間内に応答がありませんでした")
+
+    summary = summarize(samples, elapsed)
+    print_summary(summary)
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'target': 'stub' if stub else base_url, 'mix': mix, 'concurrency': args.concurrency,
+        'elapsed': elapsed, 'weights': {endpoint.name: endpoint.weight for endpoint in endpoints},
+        'summary': summary,
+    }
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        print(f"\n💾 {args.json}")
+
+    if args.baseline:
+        baseline = _load_json(args.baseline, '--baseline')
+        regressions = compare_with_baseline(baseline, report, args.max_regression, args.max_error_rate_increase,
+                                            args.per_endpoint, args.min_samples)
+        if regressions:
+            print(f"❌ 性能が劣化しています: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+        print("✅ 性能劣化なし")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+メンテナンス状態のスタブサーバー（Edge Functionsをローカルでテストするときのメンテナンス状態の配信元）
+SUPABASE_URL をこのサーバーに向けると、メンテナンスチェックが読む次のエンドポイントに応答する
+
+- GET  /rest/v1/maintenance_mode              maintenance_mode テーブル（_shared/maintenance.ts の getMaintenanceState）
+- POST /functions/v1/check-maintenance-mode   従来のメンテナンスチェックFunction
+- GET  /__stub/state                          現在の状態
+- POST /__stub/state                          状態の変更（{"is_maintenance": true, "end_time": "...", "fail": false, "delay_ms": 0}）
+- GET  /__stub/stats                          エンドポイントごとのリクエスト数（キャッシュの効果の確認用）
+- POST /__stub/reset                          リクエスト数のリセット
+  （/__stub/* は tool/stub_server.py の共通部分）
+
+使い方:
+    python tool/maintenance_stub_server.py                         # http://127.0.0.1:54329
+    python tool/maintenance_stub_server.py --maintenance --end-time 2025-01-01T09:00:00Z
+    python tool/maintenance_stub_server.py --fail                  # 500 を返す（MAINTENANCE_FAIL_POLICY の確認）
+
+    SUPABASE_URL=http://127.0.0.1:54329 MAINTENANCE_CACHE_TTL_MS=1000 supabase functions serve --no-verify-jwt
+    curl -X POST localhost:54329/__stub/state -d '{"is_maintenance": true}'
+"""
+import argparse
+import sys
+import time
+
+from stub_server import StubHandler, StubServer
+
+DEFAULT_PORT = 54329
+
+TABLE_PATH = '/rest/v1/maintenance_mode'
+FUNCTION_PATH = '/functions/v1/check-maintenance-mode'
+
+# PostgREST で1行をオブジェクトとして返させる Accept（.single()）
+SINGLE_OBJECT_TYPE = 'application/vnd.pgrst.object+json'
+
+
+class _Handler(StubHandler):
+    def endpoint(self, method, path, body):
+        stub = self.server.stub
+        if (method, path) == ('GET', TABLE_PATH):
+            stub.count(path)
+            state = self._wait(stub)
+            if state['fail']:
+                return self._send(500, {'message': 'stub failure'})
+            row = {'is_maintenance': state['is_maintenance'], 'end_time': state['end_time']}
+            if SINGLE_OBJECT_TYPE in (self.headers.get('Accept') or ''):
+                return self._send(200, row)
+            return self._send(200, [row])
+        if (method, path) == ('POST', FUNCTION_PATH):
+            stub.count(path)
+            state = self._wait(stub)
+            if state['fail']:
+                return self._send(500, {'status': 'error', 'message': 'システムエラーが発生しました。しばらくお待ちください'})
+            if state['is_maintenance']:
+                return self._send(200, {'status': 'maintenance', 'end_time': state['end_time'] or None})
+            return self._send(200, {'status': 'ok'})
+        return super().endpoint(method, path, body)
+
+    def _wait(self, stub):
+        state = stub.snapshot()[0]
+        if state['delay_ms']:
+            time.sleep(state['delay_ms'] / 1000)
+        return state
+
+
+class MaintenanceStub(StubServer):
+    """
+    メンテナンス状態を返すHTTPサーバー（別スレッドで動かす）
+
+    Args:
+        port: 待ち受けポート（0なら空いているポート）
+        is_maintenance: メンテナンス中か
+        end_time: メンテナンス終了予定時刻（ISO 8601形式）
+        fail: True なら全エンドポイントで 500 を返す
+        delay_ms: 応答までの遅延（ミリ秒）
+    """
+
+    handler_class = _Handler
+
+    def __init__(self, port=DEFAULT_PORT, host='127.0.0.1', is_maintenance=False, end_time=None, fail=False,
+                 delay_ms=0):
+        super().__init__({'is_maintenance': is_maintenance, 'end_time': end_time, 'fail': fail,
+                          'delay_ms': delay_ms}, port, host)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='メンテナンス状態のスタブサーバー')
+    parser.add_argument('--host', default='127.0.0.1', help='待ち受けアドレス')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='待ち受けポート')
+    parser.add_argument('--maintenance', action='store_true', help='メンテナンス中として応答する')
+    parser.add_argument('--end-time', help='メンテナンス終了予定時刻（ISO 8601形式）')
+    parser.add_argument('--fail', action='store_true', help='500 を返す')
+    parser.add_argument('--delay-ms', type=int, default=0, help='応答までの遅延（ミリ秒）')
+    args = parser.parse_args(argv)
+
+    stub = MaintenanceStub(args.port, args.host, args.maintenance, args.end_time, args.fail, args.delay_ms)
+    print(f"🧪 メンテナンス状態のスタブサーバー: {stub.url}（Ctrl+C で終了）")
+    print(f"   SUPABASE_URL={stub.url}")
+    stub.serve()
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except OSError as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,88 @@
+"""
+ピクセル判定ルールエンジン
+「a < 250 かつ r,g,b > 200 なら透過」のような閾値ルールを
+画像全体へのマスク演算にコンパイルして一括適用する
+
+ルールは (条件のタプル, 代入内容の辞書) で記述する
+    条件: 'a < 250', 'rgb > 200', 'r <= 30' など（チャンネル 演算子 値）
+          'rgb' は r, g, b すべてが条件を満たすことを意味する
+    代入: {'a': 0}, {'rgba': (0, 0, 0, 0)}, {'rgb': (21, 24, 38)} など
+
+ルールリストは if / elif と同じく先頭から評価し、最初に一致したルールだけを適用する
+条件はすべて元のピクセル値に対して評価する（ループ版と同じ結果になる）
+"""
+import operator
+
+import numpy as np
+
+CHANNELS = {'r': (0,), 'g': (1,), 'b': (2,), 'a': (3,), 'rgb': (0, 1, 2), 'rgba': (0, 1, 2, 3)}
+
+OPERATORS = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+_compiled_cache = {}
+
+
+def _parse_condition(condition):
+    """'rgb > 200' を (チャンネル番号, 演算関数, 値) に変換"""
+    parts = condition.split()
+    if len(parts) != 3 or parts[0] not in CHANNELS or parts[1] not in OPERATORS:
+        raise ValueError(f"不正な条件です: {condition!r}")
+    return CHANNELS[parts[0]], OPERATORS[parts[1]], int(parts[2])
+
+
+def _parse_assignment(channel, value):
+    """{'rgb': (r, g, b)} の1項目を (チャンネル番号, 値のタプル) に変換"""
+    if channel not in CHANNELS:
+        raise ValueError(f"不正なチャンネルです: {channel!r}")
+    indices = CHANNELS[channel]
+    values = tuple(value) if isinstance(value, (tuple, list)) else (value,) * len(indices)
+    if len(values) != len(indices):
+        raise ValueError(f"{channel} には {len(indices)} 個の値が必要です: {value!r}")
+    return indices, values
+
+
+def compile_rules(rules):
+    """ルールリストを評価可能な形式に変換（同じルールは再利用）"""
+    key = repr(rules)
+    if key not in _compiled_cache:
+        compiled = []
+        for conditions, assignments in rules:
+            compiled.append((
+                [_parse_condition(c) for c in conditions],
+                [_parse_assignment(ch, v) for ch, v in assignments.items()],
+            ))
+        _compiled_cache[key] = compiled
+    return _compiled_cache[key]
+
+
+def rule_masks(arr, rules):
+    """各ルールが適用されるピクセルのマスクを返す（先に一致したルールが優先）"""
+    remaining = np.ones(arr.shape[:2], dtype=bool)
+    masks = []
+    for conditions, _ in compile_rules(rules):
+        mask = remaining.copy()
+        for indices, op, value in conditions:
+            for i in indices:
+                mask &= op(arr[..., i], value)
+        remaining &= ~mask
+        masks.append(mask)
+    return masks
+
+
+def apply_rules(arr, rules):
+    """RGBA配列にルールを適用（配列を直接書き換える）し、ルールごとの適用ピクセル数を返す"""
+    masks = rule_masks(arr, rules)
+    counts = []
+    for mask, (_, assignments) in zip(masks, compile_rules(rules)):
+        for indices, values in assignments:
+            for i, value in zip(indices, values):
+                arr[..., i][mask] = value
+        counts.append(int(np.count_nonzero(mask)))
+    return counts
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+PNGのサイズ最適化（可逆）
+同じピクセルを表す複数の表現・フィルタ・zlib設定でエンコードし、最も小さいものを採用する
+
+- 色の表現: RGBA / RGB（全ピクセル不透明の場合）/ グレー / パレット（256色以下の場合）
+- フィルタ: None / Sub / Up / Average / Paeth / 行ごとの自動選択
+- zlib: 圧縮レベル・圧縮戦略の組み合わせ
+- 補助チャンク（テキスト・時刻・色空間など）は書き出さない
+
+使い方:
+    python tool/png_optimize.py assets/icons/app_icon.png assets/icons/app_icon_ios.png
+    python tool/png_optimize.py assets/icons/*.png --dry-run     # 書き換えずに削減量だけ表示
+"""
+import argparse
+import io
+import os
+import struct
+import sys
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from icon_io import load_rgba, to_image
+from icon_cache import atomic_write
+from png_stream import PNG_SIGNATURE, FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH
+from png_stream import filter_scanlines, write_chunk
+
+# 試すフィルタ（None は行ごとの自動選択）
+FILTERS = (FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH, None)
+
+# 全候補をこの設定で圧縮して順位を付ける（レベル9はレベル6の約10倍遅いため）
+SCREEN_SETTING = (6, zlib.Z_DEFAULT_STRATEGY)
+
+# 上位の候補だけ試す (圧縮レベル, 圧縮戦略)
+ZLIB_SETTINGS = (
+    (9, zlib.Z_DEFAULT_STRATEGY),
+    (9, zlib.Z_FILTERED),
+)
+
+# 上位何候補を ZLIB_SETTINGS で圧縮し直すか
+FINALISTS = 2
+
+FILTER_NAMES = {
+    FILTER_NONE: 'none', FILTER_SUB: 'sub', FILTER_UP: 'up',
+    FILTER_AVERAGE: 'average', FILTER_PAETH: 'paeth', None: 'adaptive',
+}
+
+
+class Representation:
+    """色の表現（PNGのカラータイプと行データ）"""
+
+    def __init__(self, name, color_type, pixels, extra_chunks=()):
+        self.name = name
+        self.color_type = color_type
+        # (高さ, 幅, 1ピクセルのバイト数)
+        self.pixels = pixels
+        self.bpp = pixels.shape[2]
+        self.extra_chunks = list(extra_chunks)
+
+    def rows(self):
+        return self.pixels.reshape(self.pixels.shape[0], -1)
+
+    def chunk_bytes(self):
+        """IDAT以外に書き出すチャンク（PLTE・tRNS）のバイト数（長さ・種類・CRCの12バイトを含む）"""
+        return sum(12 + len(data) for _, data in self.extra_chunks)
+
+
+def representations(arr):
+    """RGBA配列を劣化なく表せる色の表現を列挙する"""
+    alpha = arr[..., 3]
+    opaque = bool((alpha == 255).all())
+    gray = bool(((arr[..., 0] == arr[..., 1]) & (arr[..., 1] == arr[..., 2])).all())
+
+    reps = [Representation('rgba', 6, arr)]
+    if opaque:
+        reps.append(Representation('rgb', 2, arr[..., :3]))
+    if gray:
+        reps.append(Representation('gray', 0, arr[..., :1]) if opaque else
+                    Representation('gray+alpha', 4, arr[..., [0, 3]]))
+
+    palette = _palette(arr)
+    if palette is not None:
+        reps.append(palette)
+    return reps
+
+
+def _palette(arr):
+    """256色以下ならパレット表現（透明度のある色を先頭に並べ、tRNSを短くする）"""
+    packed = np.ascontiguousarray(arr).view(np.uint32).reshape(-1)
+    colors, inverse = np.unique(packed, return_inverse=True)
+    if len(colors) > 256:
+        return None
+    rgba = colors.view(np.uint8).reshape(-1, 4)
+    order = np.argsort(rgba[:, 3] == 255, kind='stable')
+    remap = np.empty(len(colors), dtype=np.uint8)
+    remap[order] = np.arange(len(colors), dtype=np.uint8)
+    rgba = rgba[order]
+
+    chunks = [(b'PLTE', rgba[:, :3].tobytes())]
+    translucent = int(np.count_nonzero(rgba[:, 3] < 255))
+    if translucent:
+        chunks.append((b'tRNS', rgba[:translucent, 3].tobytes()))
+    indices = remap[inverse.reshape(-1)].reshape(arr.shape[0], arr.shape[1], 1)
+    return Representation('palette', 3, indices, chunks)
+
+
+def _compress(filtered, level, strategy):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS, 9, strategy)
+    return compressor.compress(filtered) + compressor.flush()
+
+
+def _encode(rep, filter_type, settings):
+    """1つの表現・フィルタについて各zlib設定で圧縮し、最も小さい (IDATデータ, 設定) を返す"""
+    filtered = filter_scanlines(rep.rows(), None, rep.bpp, filter_type)
+    best = None
+    for level, strategy in settings:
+        data = _compress(filtered, level, strategy)
+        if best is None or len(data) < len(best[0]):
+            best = (data, (rep, filter_type, level, strategy))
+    return best
+
+
+def _png_size(result):
+    """_encode の結果のPNG全体の大きさの順位付け用（IDAT + PLTE・tRNS。共通のチャンクは除く）"""
+    idat, (rep, *_) = result
+    return len(idat) + rep.chunk_bytes()
+
+
+def _png_bytes(rep, idat, width, height):
+    out = io.BytesIO()
+    out.write(PNG_SIGNATURE)
+    write_chunk(out, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, rep.color_type, 0, 0, 0))
+    for chunk_type, data in rep.extra_chunks:
+        write_chunk(out, chunk_type, data)
+    write_chunk(out, b'IDAT', idat)
+    write_chunk(out, b'IEND', b'')
+    return out.getvalue()
+
+
+def default_png_bytes(arr, mode='RGBA'):
+    """従来の img.save(path, 'PNG') と同じ書き出し結果"""
+    img = to_image(arr)
+    if mode != 'RGBA':
+        img = img.convert(mode)
+    buffer = io.BytesIO()
+    img.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def optimize_png(arr, mode='RGBA', workers=None):
+    """
+    RGBA配列を最も小さくなる形式でPNGにエンコードする
+
+    Args:
+        arr: RGBA配列
+        mode: 'RGB' なら透過情報を捨てる（従来の img.convert('RGB') と同じ）
+        workers: 候補を並列に試すスレッド数（zlibの圧縮中はGILを解放する）
+
+    Returns:
+        (PNGのバイト列, 採用した形式の説明)
+    """
+    if mode == 'RGB':
+        arr = np.array(to_image(arr).convert('RGB').convert('RGBA'))
+    elif mode != 'RGBA':
+        raise ValueError(f"最適化できるのは RGBA / RGB のみです: {mode}")
+    height, width = arr.shape[:2]
+
+    # パレットはインデックスの差分に意味がないためフィルタなしのみ（PNG仕様の推奨）
+    tasks = [(rep, filter_type) for rep in representations(arr) for filter_type in FILTERS
+             if rep.color_type != 3 or filter_type == FILTER_NONE]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        screened = list(executor.map(lambda task: _encode(*task, [SCREEN_SETTING]), tasks))
+        screened.sort(key=_png_size)
+        finalists = [setting[:2] for _, setting in screened[:FINALISTS]]
+        results = screened + list(executor.map(lambda task: _encode(*task, ZLIB_SETTINGS), finalists))
+    idat, (rep, filter_type, level, strategy) = min(results, key=_png_size)
+    data = _png_bytes(rep, idat, width, height)
+
+    # 念のためデコードして元のピクセルと一致することを確かめる
+    with Image.open(io.BytesIO(data)) as img:
+        if not np.array_equal(np.array(img.convert('RGBA')), arr):
+            raise ValueError("最適化したPNGのピクセルが一致しません")
+
+    strategy_name = 'filtered' if strategy == zlib.Z_FILTERED else 'default'
+    return data, f"{rep.name}, filter={FILTER_NAMES[filter_type]}, level={level}, strategy={strategy_name}"
+
+
+def smallest_png(arr, mode='RGBA', workers=None):
+    """
+    従来の書き出し結果と最適化結果のうち小さい方を返す
+
+    Returns:
+        (PNGのバイト列, 従来の書き出しのバイト数, 採用した形式の説明)
+    """
+    default = default_png_bytes(arr, mode)
+    data, description = optimize_png(arr, mode, workers)
+    if len(data) >= len(default):
+        return default, len(default), '変更なし'
+    return data, len(default), description
+
+
+def optimize_file(path, dry_run=False, workers=None):
+    """
+    PNGファイルを最適化して上書きする（小さくならなければそのまま）
+
+    Returns:
+        (元のバイト数, 最適化後のバイト数, 採用した形式の説明)
+    """
+    before = os.path.getsize(path)
+    with Image.open(path) as img:
+        if img.mode not in ('L', 'LA', 'P', 'RGB', 'RGBA'):
+            # 16ビットなどはRGBA（8ビット）に変換すると劣化するため対象外
+            return before, before, f'対象外（{img.mode}）'
+    data, description = optimize_png(load_rgba(path), workers=workers)
+    if len(data) >= before:
+        return before, before, '変更なし'
+    if not dry_run:
+        atomic_write(path, data)
+    return before, len(data), description
+
+
+def _optimize_job(args):
+    path, dry_run = args
+    # ファイル単位でプロセスを分けるので、1ファイル内の候補は直列に試す
+    return (path,) + optimize_file(path, dry_run, workers=1)
+
+
+def format_saving(before, after):
+    saved = before - after
+    ratio = saved / before * 100 if before else 0
+    return f"{before:,} → {after:,} bytes（-{saved:,} bytes, -{ratio:.1f}%）"
+
+
+def optimize_files(paths, dry_run=False, workers=None):
+    """複数のPNGをファイル単位で並列に最適化し、削減量を表示する"""
+    total_before = total_after = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for path, before, after, description in executor.map(_optimize_job, [(p, dry_run) for p in paths]):
+            print(f"   {'🔍' if dry_run else '✅'} {path}: {format_saving(before, after)} [{description}]")
+            total_before += before
+            total_after += after
+    print(f"📦 合計: {format_saving(total_before, total_after)}")
+    return total_before, total_after
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PNGのサイズ最適化（可逆）')
+    parser.add_argument('paths', nargs='+', help='PNGファイル')
+    parser.add_argument('--dry-run', action='store_true', help='書き換えずに削減量だけ表示')
+    parser.add_argument('--workers', type=int, help='プロセス数（省略時はCPUコア数）')
+    args = parser.parse_args(argv)
+
+    optimize_files(args.paths, args.dry_run, args.workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
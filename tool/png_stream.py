@@ -0,0 +1,258 @@
+"""
+PNGの行ストリップ単位の読み書き
+画像全体を展開せず、数百行ずつデコード・エンコードする（巨大なマスター画像用）
+
+- 読み込み: IDATを少しずつ展開し、フィルタ解除はPillowのデコーダに任せる
+  （ストリップ直前の行をフィルタなしの行として先頭に付けることで、
+   Up / Average / Paeth の参照行をストリップ境界をまたいで引き継ぐ）
+- 書き込み: numpyでフィルタをかけ、zlibで逐次圧縮してIDATに書き出す
+- 対応形式: ビット深度8・インターレースなしのグレー / RGB / パレット / グレー+α / RGBA
+"""
+import os
+import struct
+import tempfile
+import zlib
+
+import numpy as np
+from PIL import Image
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# カラータイプ → (Pillowのモード, 1ピクセルのバイト数)
+COLOR_TYPES = {
+    0: ('L', 1),
+    2: ('RGB', 3),
+    3: ('P', 1),
+    4: ('LA', 2),
+    6: ('RGBA', 4),
+}
+
+FILTER_NONE, FILTER_SUB, FILTER_UP, FILTER_AVERAGE, FILTER_PAETH = range(5)
+
+IDAT_CHUNK_SIZE = 1 << 16
+
+
+def read_chunks(f):
+    """PNGファイルのチャンクを (種類, データ) で順に返す"""
+    if f.read(8) != PNG_SIGNATURE:
+        raise ValueError("PNGファイルではありません")
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        length, chunk_type = struct.unpack('>I4s', header)
+        data = f.read(length)
+        f.read(4)  # CRC
+        yield chunk_type, data
+        if chunk_type == b'IEND':
+            return
+
+
+def write_chunk(f, chunk_type, data):
+    """チャンクを1つ書き出す"""
+    f.write(struct.pack('>I', len(data)))
+    f.write(chunk_type)
+    f.write(data)
+    f.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+
+class PngStripReader:
+    """PNGをストリップ単位でRGBA配列として読み出す"""
+
+    def __init__(self, path):
+        self.path = path
+        self.palette = None
+        self.transparency = None
+        with open(path, 'rb') as f:
+            for chunk_type, data in read_chunks(f):
+                if chunk_type == b'IHDR':
+                    (self.width, self.height, bit_depth, self.color_type,
+                     _, _, interlace) = struct.unpack('>IIBBBBB', data)
+                    if bit_depth != 8 or interlace or self.color_type not in COLOR_TYPES:
+                        raise ValueError(
+                            f"ストリーミング非対応のPNG形式です（ビット深度{bit_depth}, "
+                            f"カラータイプ{self.color_type}, インターレース{interlace}）")
+                elif chunk_type == b'PLTE':
+                    self.palette = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+                elif chunk_type == b'tRNS':
+                    self.transparency = data
+                elif chunk_type == b'IDAT':
+                    break
+        self.mode, self.bpp = COLOR_TYPES[self.color_type]
+        self.size = (self.width, self.height)
+
+    def _idat_data(self):
+        with open(self.path, 'rb') as f:
+            for chunk_type, data in read_chunks(f):
+                if chunk_type == b'IDAT':
+                    yield data
+
+    def _decode(self, filtered, prev_row, rows):
+        """フィルタ済みの行をデコード（前の行をフィルタなしの行として先頭に付ける）"""
+        data = b'\x00' + prev_row + filtered
+        img = Image.frombytes(self.mode, (self.width, rows + 1), zlib.compress(data, 0), 'zip', self.mode)
+        return np.array(img)[1:]
+
+    def _to_rgba(self, raw):
+        """デコード結果をRGBA配列に変換（Image.convert('RGBA') と同じ結果）"""
+        height, width = raw.shape[:2]
+        if self.color_type == 6:
+            return raw
+        if self.color_type == 3:
+            alpha = np.full(256, 255, dtype=np.uint8)
+            if self.transparency:
+                values = np.frombuffer(self.transparency, dtype=np.uint8)
+                alpha[:len(values)] = values
+            palette = np.zeros((256, 3), dtype=np.uint8)
+            palette[:len(self.palette)] = self.palette
+            rgba = np.empty((height, width, 4), dtype=np.uint8)
+            rgba[..., :3] = palette[raw]
+            rgba[..., 3] = alpha[raw]
+            return rgba
+
+        rgba = np.empty((height, width, 4), dtype=np.uint8)
+        if self.color_type in (0, 4):
+            gray = raw if self.color_type == 0 else raw[..., 0]
+            rgba[..., :3] = gray[..., None]
+            rgba[..., 3] = 255 if self.color_type == 0 else raw[..., 1]
+        else:
+            rgba[..., :3] = raw
+            rgba[..., 3] = 255
+        if self.transparency and self.color_type in (0, 2):
+            key = struct.unpack(f">{len(self.transparency) // 2}H", self.transparency)
+            pixels = raw[..., None] if self.color_type == 0 else raw
+            rgba[..., 3][(pixels == np.array(key)).all(axis=-1)] = 0
+        return rgba
+
+    def strips(self, strip_rows=256):
+        """(開始行, RGBA配列) を上から順に返す"""
+        stride = self.width * self.bpp + 1
+        decompressor = zlib.decompressobj()
+        pending = b''
+        prev_row = bytes(stride - 1)
+        y = 0
+        idat = self._idat_data()
+        while y < self.height:
+            rows = min(strip_rows, self.height - y)
+            need = rows * stride
+            while len(pending) < need:
+                if decompressor.unconsumed_tail:
+                    data = decompressor.unconsumed_tail
+                else:
+                    data = next(idat, None)
+                    if data is None:
+                        raise ValueError("IDATデータが不足しています")
+                pending += decompressor.decompress(data, need - len(pending))
+            raw = self._decode(pending[:need], prev_row, rows)
+            pending = pending[need:]
+            prev_row = raw[-1].tobytes()
+            yield y, self._to_rgba(raw)
+            y += rows
+
+
+def filter_scanlines(rows, prev_row, bpp, filter_type=None):
+    """
+    行データにPNGフィルタをかけ、先頭にフィルタ種別を付けたバイト列を返す
+
+    Args:
+        rows: (行数, 幅 * bpp) の uint8 配列
+        prev_row: 直前の行（先頭行なら None）
+        bpp: 1ピクセルのバイト数
+        filter_type: 0-4 のフィルタ種別。None なら行ごとに最も小さくなりそうなものを選ぶ
+    """
+    rows = rows.astype(np.int16)
+    n, length = rows.shape
+    up = np.empty_like(rows)
+    up[0] = 0 if prev_row is None else prev_row
+    up[1:] = rows[:-1]
+    left = np.zeros_like(rows)
+    left[:, bpp:] = rows[:, :-bpp]
+    upleft = np.zeros_like(rows)
+    upleft[:, bpp:] = up[:, :-bpp]
+
+    def paeth():
+        p = left + up - upleft
+        pa, pb, pc = np.abs(p - left), np.abs(p - up), np.abs(p - upleft)
+        return np.where((pa <= pb) & (pa <= pc), left, np.where(pb <= pc, up, upleft))
+
+    predictors = {
+        FILTER_NONE: lambda: 0,
+        FILTER_SUB: lambda: left,
+        FILTER_UP: lambda: up,
+        FILTER_AVERAGE: lambda: (left + up) >> 1,
+        FILTER_PAETH: paeth,
+    }
+
+    if filter_type is not None:
+        types = np.full(n, filter_type, dtype=np.uint8)
+        filtered = (rows - predictors[filter_type]()).astype(np.uint8)
+    else:
+        # 符号付きバイトとしての絶対値の和が最小のフィルタを行ごとに選ぶ（libpngと同じ経験則）
+        types = np.zeros(n, dtype=np.uint8)
+        filtered = rows.astype(np.uint8)
+        best = np.abs(filtered.view(np.int8).astype(np.int16)).sum(axis=1, dtype=np.int64)
+        for t in range(1, 5):
+            candidate = (rows - predictors[t]()).astype(np.uint8)
+            score = np.abs(candidate.view(np.int8).astype(np.int16)).sum(axis=1, dtype=np.int64)
+            better = score < best
+            types[better] = t
+            best[better] = score[better]
+            filtered[better] = candidate[better]
+
+    out = np.empty((n, length + 1), dtype=np.uint8)
+    out[:, 0] = types
+    out[:, 1:] = filtered
+    return out.tobytes()
+
+
+class PngStripWriter:
+    """ストリップ単位でPNGを書き出す（書き終えるまで一時ファイルに書き、最後に置き換える）"""
+
+    def __init__(self, path, width, height, mode='RGBA', compress_level=6, filter_type=None):
+        if mode not in ('RGBA', 'RGB'):
+            raise ValueError(f"ストリーミング書き出しは RGBA / RGB のみ対応です: {mode}")
+        self.path = path
+        self.width, self.height, self.mode = width, height, mode
+        self.bpp = 4 if mode == 'RGBA' else 3
+        self.filter_type = filter_type
+        self.rows_written = 0
+        self._prev_row = None
+        self._pending = b''
+        self._compressor = zlib.compressobj(compress_level)
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, self._tmp_path = tempfile.mkstemp(dir=directory, prefix='.strip-', suffix='.png.tmp')
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(PNG_SIGNATURE)
+        color_type = 6 if mode == 'RGBA' else 2
+        write_chunk(self._file, b'IHDR', struct.pack('>IIBBBBB', width, height, 8, color_type, 0, 0, 0))
+
+    def _flush(self, data, final=False):
+        self._pending += data
+        while len(self._pending) >= IDAT_CHUNK_SIZE or (final and self._pending):
+            write_chunk(self._file, b'IDAT', self._pending[:IDAT_CHUNK_SIZE])
+            self._pending = self._pending[IDAT_CHUNK_SIZE:]
+
+    def write(self, strip):
+        """RGBA配列のストリップを追記する"""
+        if strip.shape[0] == 0:
+            return
+        rows = strip[..., :self.bpp].reshape(strip.shape[0], -1)
+        self._flush(self._compressor.compress(filter_scanlines(rows, self._prev_row, self.bpp, self.filter_type)))
+        self._prev_row = rows[-1].copy()
+        self.rows_written += strip.shape[0]
+
+    def close(self):
+        """圧縮を終えてIENDを書き、出力先に置き換える"""
+        if self.rows_written != self.height:
+            self.abort()
+            raise ValueError(f"書き込んだ行数が一致しません: {self.rows_written}/{self.height}")
+        self._flush(self._compressor.flush(), final=True)
+        write_chunk(self._file, b'IEND', b'')
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """書きかけの一時ファイルを破棄する"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
@@ -1,100 +1,192 @@
-from PIL import Image
-from collections import deque
-
-def remove_antialiasing(input_path, output_path):
-    """アンチエイリアシングによる半透明の白い縁を除去"""
-    img = Image.open(input_path).convert('RGBA')
-    pixels = img.load()
-    width, height = img.size
-
-    print("🔄 ステップ1: 黒背景除去（Flood Fill）...")
-
-    visited = [[False] * height for _ in range(width)]
-
-    def is_dark_background(x, y):
-        """暗い背景ピクセルの判定"""
-        r, g, b, a = pixels[x, y]
-        return r <= 30 and g <= 30 and b <= 30
-
-    def flood_fill_bfs(start_x, start_y):
-        """幅優先探索で連結した背景ピクセルを透過"""
-        queue = deque([(start_x, start_y)])
-        visited[start_x][start_y] = True
-        count = 0
-
-        while queue:
-            x, y = queue.popleft()
-
-            if is_dark_background(x, y):
-                pixels[x, y] = (0, 0, 0, 0)
-                count += 1
-
-                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    nx, ny = x + dx, y + dy
-                    if 0 <= nx < width and 0 <= ny < height and not visited[nx][ny]:
-                        visited[nx][ny] = True
-                        queue.append((nx, ny))
-
-        return count
-
-    # 四隅から flood fill
-    total_removed = 0
-    corners = [(0, 0), (width - 1, 0), (0, height - 1), (width - 1, height - 1)]
-    for x, y in corners:
-        if not visited[x][y]:
-            removed = flood_fill_bfs(x, y)
-            total_removed += removed
+import argparse
+
+import numpy as np
+
+from icon_io import load_rgba, save_rgba, trim_box
+from flood_fill import connected_region, dark_mask
+from pixel_rules import apply_rules
+
+# 半透明（アルファ値が低い）かつ明るい色のピクセルを透過するルール
+EDGE_CLEAN_RULES = [
+    # 明るいグレー・白っぽいピクセル
+    (('a > 0', 'a < 240', 'rgb > 100'), {'rgba': (0, 0, 0, 0)}),
+    # 非常に薄い（アルファ値50未満）ピクセルは色に関わらず透過
+    (('a > 0', 'a < 50'), {'rgba': (0, 0, 0, 0)}),
+]
+
+# 閾値プロファイル
+#   threshold: RGB値がすべてこの値以下のピクセルを背景とみなす
+#   fringe_width: 除去した背景から何ピクセル以内を縁（背景色が混ざった領域）とみなすか
+#   min_alpha: 縁の処理後にアルファ値がこれ未満になったピクセルは完全透過にする
+#   edge_rules: 縁の処理の代わりに適用するルール（従来の白い縁の除去）
+#   trim_threshold: アルファ値がこれより大きい領域でトリミング
+PROFILES = {
+    # 縁の色から背景色を取り除き、なめらかな半透明にする
+    'smooth': {
+        'threshold': 30,
+        'fringe_width': 2,
+        'min_alpha': 8,
+        'edge_rules': None,
+        'trim_threshold': 10,
+    },
+    # 従来の処理（半透明の白い縁を消すだけ）
+    'legacy': {
+        'threshold': 30,
+        'fringe_width': 0,
+        'min_alpha': 0,
+        'edge_rules': EDGE_CLEAN_RULES,
+        'trim_threshold': 50,
+    },
+}
+
+
+def _shift_pairs(height, width):
+    """8近傍それぞれについて (移動先スライス, 移動元スライス) を返す"""
+    pairs = []
+    for dy in (-1, 0, 1):
+        for dx in (-1, 0, 1):
+            if dy or dx:
+                dst = (slice(max(dy, 0), height + min(dy, 0)), slice(max(dx, 0), width + min(dx, 0)))
+                src = (slice(max(-dy, 0), height + min(-dy, 0)), slice(max(-dx, 0), width + min(-dx, 0)))
+                pairs.append((dst, src))
+    return pairs
+
+
+def _dilate(mask, width):
+    """マスクを8近傍で width ピクセル膨張させる"""
+    pairs = _shift_pairs(*mask.shape)
+    grown = mask.copy()
+    for _ in range(width):
+        step = grown.copy()
+        for dst, src in pairs:
+            step[dst] |= grown[src]
+        grown = step
+    return grown
+
+
+def _spread_colors(arr, known, steps):
+    """
+    known のピクセルの色を8近傍へ steps 回広げる（縁のピクセルに最も近い内側の色を割り当てる）
+
+    Returns:
+        (色の配列, 色が割り当てられたかどうかのマスク)
+    """
+    pairs = _shift_pairs(*known.shape)
+    colors = np.where(known[..., None], arr[..., :3], 0).astype(np.uint8)
+    filled = known.copy()
+    for _ in range(steps):
+        new_colors, new_filled = colors.copy(), filled.copy()
+        for dst, src in pairs:
+            take = ~new_filled[dst] & filled[src]
+            new_colors[dst][take] = colors[src][take]
+            new_filled[dst] |= take
+        colors, filled = new_colors, new_filled
+    return colors, filled
+
+
+def unpremultiply(pixels, background, foreground):
+    """
+    背景色と合成された色を「前景色 + アルファ値」に分解する
+    C = α·F + (1 - α)·B として、内側の色 F と背景色 B を結ぶ線分に C を射影して α を求め、
+    色は F' = B + (C - B) / α で元に戻す
+
+    Args:
+        pixels: (N, 4) のRGBA配列
+        background: 背景色 (r, g, b)
+        foreground: (N, 3) の内側の色（各ピクセルに最も近い内側のピクセルの色）
+
+    Returns:
+        (N, 4) のRGBA配列（アルファ値は元のアルファ値との積）
+    """
+    color = pixels[:, :3].astype(np.float32)
+    bg = np.asarray(background, dtype=np.float32)
+    direction = foreground.astype(np.float32) - bg
+    length = (direction ** 2).sum(axis=1)
+    projected = ((color - bg) * direction).sum(axis=1) / np.maximum(length, 1)
+    # 内側の色が背景色とほぼ同じなら分解できないのでそのまま残す
+    alpha = np.where(length < 1, 1, np.clip(projected, 0, 1))
+
+    safe = np.maximum(alpha, 1e-6)[:, None]
+    restored = np.where(alpha[:, None] > 0, bg + (color - bg) / safe, color)
+
+    result = np.empty_like(pixels)
+    result[:, :3] = np.clip(np.rint(restored), 0, 255)
+    result[:, 3] = np.rint(alpha * pixels[:, 3])
+    return result
+
+
+def remove_antialiasing_array(arr, profile='smooth', background=None):
+    """
+    背景除去・縁の処理・トリミング範囲の計算をまとめて行う（配列を直接書き換える）
+
+    Args:
+        arr: RGBA配列
+        profile: PROFILES のキー、またはプロファイルと同じキーを持つ辞書
+        background: 縁の処理で取り除く背景色。省略時は除去した背景の平均色
+
+    Returns:
+        (背景除去ピクセル数, 縁の処理ピクセル数, トリミング範囲または None)
+    """
+    settings = PROFILES[profile] if isinstance(profile, str) else profile
+
+    # 1. 四隅から連結した暗い背景
+    region = connected_region(dark_mask(arr, settings['threshold']))
+    removed = int(np.count_nonzero(region))
+    if background is None and removed:
+        background = tuple(float(arr[..., c][region].mean()) for c in range(3))
+
+    # 2. 背景に接する縁から背景色を取り除く（背景を消す前の色で計算する）
+    edge_count = 0
+    if settings['fringe_width'] and removed:
+        width = settings['fringe_width']
+        near = _dilate(region, width)
+        visible = arr[..., 3] > 0
+        fringe = near & ~region & visible
+        inner_colors, found = _spread_colors(arr, visible & ~near, width)
+        # 内側の色が見つからない縁（細い線など）は元の色を前景色とみなす
+        foreground = np.where(found[fringe][:, None], inner_colors[fringe], arr[..., :3][fringe])
+        pixels = unpremultiply(arr[fringe], background, foreground)
+        pixels[pixels[:, 3] < settings['min_alpha']] = 0
+        arr[fringe] = pixels
+        edge_count = int(np.count_nonzero(fringe))
+
+    arr[region] = 0
+
+    # 3. 従来のルールによる縁の除去
+    if settings['edge_rules']:
+        edge_count += sum(apply_rules(arr, settings['edge_rules']))
+
+    # 4. トリミング範囲
+    return removed, edge_count, trim_box(arr, settings['trim_threshold'])
+
+
+def remove_antialiasing(input_path, output_path, profile='smooth'):
+    """アンチエイリアシングによる縁（背景色の混ざった縁・半透明の白い縁）を処理して背景を除去"""
+    arr = load_rgba(input_path)
+    height, width = arr.shape[:2]
+
+    print(f"🔄 背景除去・縁の処理・トリミング（プロファイル: {profile}）...")
+
+    total_removed, edge_cleaned, bbox = remove_antialiasing_array(arr, profile)
 
     print(f"   黒背景除去: {total_removed:,}ピクセル")
-
-    print("🔄 ステップ2: 半透明の白い縁除去（エッジクリーニング）...")
-
-    # 半透明ピクセルを完全透過に変換
-    edge_cleaned = 0
-    for x in range(width):
-        for y in range(height):
-            r, g, b, a = pixels[x, y]
-
-            # 半透明（アルファ値が低い）かつ明るい色のピクセルを透過
-            if 0 < a < 240:
-                # 明るいグレー・白っぽいピクセル
-                if r > 100 and g > 100 and b > 100:
-                    pixels[x, y] = (0, 0, 0, 0)
-                    edge_cleaned += 1
-                # 非常に薄い（アルファ値50未満）ピクセルは色に関わらず透過
-                elif a < 50:
-                    pixels[x, y] = (0, 0, 0, 0)
-                    edge_cleaned += 1
-
     print(f"   エッジクリーニング: {edge_cleaned:,}ピクセル")
 
-    print("🔄 ステップ3: トリミング...")
-
-    # 不透明なピクセルのバウンディングボックスを取得
-    min_x, min_y = width, height
-    max_x, max_y = 0, 0
-
-    for x in range(width):
-        for y in range(height):
-            r, g, b, a = pixels[x, y]
-            if a > 50:  # ある程度不透明なピクセル
-                min_x = min(min_x, x)
-                min_y = min(min_y, y)
-                max_x = max(max_x, x)
-                max_y = max(max_y, y)
-
-    if min_x < max_x and min_y < max_y:
-        cropped = img.crop((min_x, min_y, max_x + 1, max_y + 1))
-        cropped.save(output_path, 'PNG')
+    if bbox:
+        left, top, right, bottom = bbox
+        save_rgba(arr[top:bottom, left:right], output_path)
         print(f"✅ 処理完了: {output_path}")
         print(f"   元のサイズ: {width}x{height}")
-        print(f"   新しいサイズ: {cropped.size}")
+        print(f"   新しいサイズ: {(right - left, bottom - top)}")
     else:
-        img.save(output_path, 'PNG')
+        save_rgba(arr, output_path)
         print(f"✅ 保存完了: {output_path}")
 
 if __name__ == '__main__':
-    remove_antialiasing(
-        'assets/icons/app_icon_original.png',
-        'assets/icons/app_icon.png'
-    )
+    parser = argparse.ArgumentParser(description='アンチエイリアシングの縁を処理して背景を除去')
+    parser.add_argument('input', nargs='?', default='assets/icons/app_icon_original.png')
+    parser.add_argument('output', nargs='?', default='assets/icons/app_icon.png')
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='smooth', help='閾値プロファイル')
+    args = parser.parse_args()
+
+    remove_antialiasing(args.input, args.output, args.profile)
@@ -0,0 +1,556 @@
+#!/usr/bin/env python3
+"""
+定期TODOの生成スケジュールのシミュレーター
+cron（pg_cron で1分ごと）の execute_recurring_todos() が、いつ何件のTODOを作るかをデータベースなしで再現し、
+1回の実行（tick）ごとの生成件数と推定書き込み量のヒストグラムを出す
+
+- 次回生成日時は calculate_next_generation（JSTの generation_time、毎週は翌日以降の該当曜日、
+  毎月は recurrence_days の先頭の日・-1 は当月末・29〜31日で月をまたいだら翌月の該当日）を
+  最新の定義（20251114_fix_search_path_security.sql）のまま配列演算で再実装する
+- 期限は生成時刻 + deadline_days_after 日（NULL なら期限なし）
+- 曜日・日付の指定がない毎週・毎月の定期TODOは関数が例外になり、毎回 error_logs に書いて次回生成日時が進まない
+- 毎月の月末（-1）は当月末を返すため、月末の生成時刻を過ぎると当日中は毎回生成対象になる（その件数も数える）
+- 推定書き込み量は DDL の列の型・インデックスから、1件あたりのタプルとインデックスエントリの大きさを見積もる
+
+入力は次のいずれか
+- --csv: recurring_todos のエクスポート（\\copy (SELECT ...) TO ... CSV HEADER。担当者数は --assignments-csv か平均で補う）
+- --dataset: tool/generate_dataset.py の出力先
+- --synthetic: 件数を指定して合成（--peak-time に --peak-share の割合で集中）
+
+使い方:
+    python tool/simulate_recurring_todos.py --synthetic 1000000 --days 14
+    python tool/simulate_recurring_todos.py --dataset /tmp/dataset --interval 5 --csv-out ticks.csv
+    python tool/simulate_recurring_todos.py --csv recurring_todos.csv --assignments-csv recurring_todo_assignments.csv \\
+        --start 2025-12-15T00:00:00+09:00 --benchmark bench.json
+    python tool/simulate_recurring_todos.py --synthetic 100000 --timezone UTC   # JST対応前の解釈（generation_time がUTC）
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+from arg_types import parse_count, parse_now
+from generate_dataset import DEFAULT_NOW, DEFAULT_SEED, RECURRENCE_WEIGHTS
+from sql_schema import DDL_DIR, Schema
+
+DAY = 86400
+# タイムゾーンのUTCからのずれ（秒）。Asia/Tokyo は夏時間がないので固定
+TIMEZONE_OFFSETS = {'Asia/Tokyo': 9 * 3600, 'UTC': 0}
+
+DAILY, WEEKLY, MONTHLY, UNKNOWN = 0, 1, 2, 3
+PATTERNS = {'daily': DAILY, 'weekly': WEEKLY, 'monthly': MONTHLY}
+
+# cron の実行間隔（分）。database/ddl の cron.schedule は '*/1 * * * *'
+DEFAULT_INTERVAL = 1
+# 1秒に処理できる定期TODOの件数の仮定（--benchmark で tool/benchmark_recurring_todos.py の結果を使える）
+DEFAULT_ROWS_PER_SECOND = 1000
+# 1回の実行を間隔の何割までに収めるか（バッチサイズの提案に使う）
+TARGET_UTILIZATION = 0.5
+
+# 推定書き込み量に使う列の型ごとの大きさ（バイト。text は平均的な長さ）
+TYPE_WIDTHS = {
+    'uuid': 16, 'timestamptz': 8, 'timestamp': 8, 'timestamp with time zone': 8, 'date': 4, 'time': 8,
+    'boolean': 1, 'integer': 4, 'bigint': 8, 'smallint': 2, 'integer[]': 32, 'jsonb': 64, 'text': 24,
+}
+HEAP_TUPLE_OVERHEAD = 28     # タプルヘッダー 23 + アラインメント + 行ポインタ 4
+INDEX_TUPLE_OVERHEAD = 12    # インデックスタプルヘッダー 8 + 行ポインタ 4
+
+
+class RecurringSchedule:
+    """
+    定期TODOの配列表現（1行 = 1件）
+
+    Args:
+        pattern: DAILY / WEEKLY / MONTHLY / UNKNOWN
+        week_mask: 毎週の曜日のビット（日曜 = 1 << 0）
+        month_day: 毎月の recurrence_days の先頭（-1 は月末、0 は指定なし）
+        has_days: recurrence_days が空でないか
+        generation_seconds: generation_time の 0時からの秒数
+        next_at: next_generation_at（UNIX時刻の秒）
+        deadline_days: deadline_days_after（NULL は -1）
+        assignees: 担当者数
+    """
+
+    def __init__(self, pattern, week_mask, month_day, has_days, generation_seconds, next_at, active, deadline_days,
+                 assignees):
+        self.pattern = np.asarray(pattern, dtype=np.int8)
+        self.week_mask = np.asarray(week_mask, dtype=np.int16)
+        self.month_day = np.asarray(month_day, dtype=np.int16)
+        self.has_days = np.asarray(has_days, dtype=bool)
+        self.generation_seconds = np.asarray(generation_seconds, dtype=np.int64)
+        self.next_at = np.asarray(next_at, dtype=np.int64)
+        self.active = np.asarray(active, dtype=bool)
+        self.deadline_days = np.asarray(deadline_days, dtype=np.int32)
+        self.assignees = np.asarray(assignees, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.pattern)
+
+    @classmethod
+    def from_rows(cls, rows, assignees=None, default_assignees=1):
+        """
+        辞書の行（recurring_todos の列名 → 文字列）から作る
+
+        Args:
+            assignees: {recurring_todo_id: 担当者数}（ない行は default_assignees）
+        """
+        columns = {name: [] for name in ('pattern', 'week_mask', 'month_day', 'has_days', 'generation_seconds',
+                                         'next_at', 'active', 'deadline_days', 'assignees')}
+        for row in rows:
+            days = _parse_days(row.get('recurrence_days'))
+            columns['pattern'].append(PATTERNS.get(row['recurrence_pattern'], UNKNOWN))
+            columns['week_mask'].append(sum(1 << day for day in set(days) if 0 <= day <= 6))
+            columns['month_day'].append(days[0] if days else 0)
+            columns['has_days'].append(bool(days))
+            columns['generation_seconds'].append(_parse_time(row.get('generation_time') or '09:00:00'))
+            columns['next_at'].append(int(parse_now(row['next_generation_at'].replace(' ', 'T')).timestamp()))
+            columns['active'].append(_parse_bool(row.get('is_active', 't')))
+            deadline = row.get('deadline_days_after')
+            columns['deadline_days'].append(int(deadline) if deadline not in (None, '', '\\N') else -1)
+            if assignees is None:
+                columns['assignees'].append(default_assignees)
+            else:
+                columns['assignees'].append(assignees.get(row.get('id'), 0))
+        return cls(**columns)
+
+    @classmethod
+    def synthetic(cls, count, start, peak_time='09:00', peak_share=0.6, inactive_share=0.1, assignees=1,
+                  seed=DEFAULT_SEED, offset=TIMEZONE_OFFSETS['Asia/Tokyo']):
+        """tool/generate_dataset.py と同じ偏り（パターンの割合・生成時刻の集中）の定期TODOを合成する"""
+        rng = np.random.default_rng(seed)
+        names, weights = zip(*RECURRENCE_WEIGHTS)
+        pattern = rng.choice([PATTERNS[name] for name in names], size=count, p=weights).astype(np.int8)
+        # 毎週は1〜3曜日、毎月は2割が月末・残りは1〜28日
+        week_mask = np.zeros(count, dtype=np.int16)
+        for _ in range(3):
+            week_mask |= np.where(rng.random(count) < 0.6, 1 << rng.integers(0, 7, count), 0).astype(np.int16)
+        week_mask = np.where(week_mask == 0, 1 << rng.integers(0, 7, count), week_mask)
+        month_day = np.where(rng.random(count) < 0.2, -1, rng.integers(1, 29, count))
+        hours, minutes = (int(part) for part in peak_time.split(':')[:2])
+        slots = rng.integers(6 * 4, 23 * 4, count)
+        generation_seconds = np.where(rng.random(count) < peak_share, hours * 3600 + minutes * 60, slots * 900)
+        schedule = cls(pattern, week_mask, month_day, np.ones(count, dtype=bool), generation_seconds,
+                       np.zeros(count, dtype=np.int64), rng.random(count) >= inactive_share,
+                       np.where(rng.random(count) < 0.6, rng.integers(1, 8, count), -1),
+                       np.full(count, assignees))
+        schedule.next_at = schedule.first_generation(start, offset)
+        return schedule
+
+    def first_generation(self, start, offset):
+        """start 以降で最初の生成時刻（前日を基準に calculate_next_generation を start を超えるまで繰り返す）"""
+        next_at, _ = next_generation_times(self, np.full(len(self), start - DAY, dtype=np.int64), offset)
+        for _ in range(62):
+            early = next_at < start
+            if not early.any():
+                break
+            advanced, _ = next_generation_times(self, next_at, offset)
+            next_at = np.where(early, advanced, next_at)
+        return next_at
+
+    def subset(self, mask):
+        return RecurringSchedule(self.pattern[mask], self.week_mask[mask], self.month_day[mask], self.has_days[mask],
+                                 self.generation_seconds[mask], self.next_at[mask], self.active[mask],
+                                 self.deadline_days[mask], self.assignees[mask])
+
+
+def _parse_days(value):
+    if value in (None, '', '\\N'):
+        return []
+    text = value.strip().strip('{}[]')
+    return [int(part) for part in text.split(',') if part.strip()]
+
+
+def _parse_time(value):
+    parts = [float(part) for part in value.split(':')]
+    return int(parts[0] * 3600 + (parts[1] if len(parts) > 1 else 0) * 60 + (parts[2] if len(parts) > 2 else 0))
+
+
+def _parse_bool(value):
+    return str(value).lower() in ('t', 'true', '1')
+
+
+def _first_of_next_month(day):
+    """エポックからの日数 → 翌月1日（エポックからの日数）"""
+    return (day.astype('datetime64[D]').astype('datetime64[M]') + 1).astype('datetime64[D]').astype(np.int64)
+
+
+def _day_of_month(day):
+    return (day - day.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)) + 1
+
+
+def next_generation_times(schedule, base, offset):
+    """
+    calculate_next_generation(pattern, days, generation_time, base) の配列版
+    → (次回生成時刻, 例外になるか)
+    """
+    day = (base + offset) // DAY
+    dow = (day + 4) % 7  # 1970-01-01 は木曜日（DOW = 4）
+    days_to_add = np.full(len(day), 7, dtype=np.int64)
+    for i in range(7, 0, -1):
+        hit = (schedule.week_mask.astype(np.int64) >> ((dow + i) % 7)) & 1 == 1
+        days_to_add = np.where(hit, i, days_to_add)
+
+    # 毎月は翌月1日 + (日 - 1)日、-1 は当月末
+    # 月の日数を超えて日がずれた場合は、ずれた先の月の翌月1日 + (日 - 1)日にする（1回だけ。29〜31日）
+    month_day = schedule.month_day.astype(np.int64)
+    first_of_next_month = _first_of_next_month(day)
+    monthly_day = first_of_next_month + month_day - 1
+    shifted = (month_day != -1) & (_day_of_month(monthly_day) != month_day)
+    monthly_day = np.where(shifted, _first_of_next_month(monthly_day) + month_day - 1, monthly_day)
+    monthly_day = np.where(month_day == -1, first_of_next_month - 1, monthly_day)
+
+    next_day = np.select([schedule.pattern == DAILY, schedule.pattern == WEEKLY, schedule.pattern == MONTHLY],
+                         [day + 1, day + days_to_add, monthly_day], day)
+    error = (schedule.pattern == UNKNOWN) | ((schedule.pattern != DAILY) & ~schedule.has_days)
+    return next_day * DAY + schedule.generation_seconds - offset, error
+
+
+class WriteModel:
+    """
+    1件の生成で書き込むタプルの大きさの見積もり（DDLの列の型とインデックスから）
+
+    - 生成1件: todos の INSERT + recurring_todos の UPDATE（next_generation_at にインデックスがあるため HOT にならない）
+    - 担当者1人: todo_assignments の INSERT
+    - 例外1件: error_logs の INSERT
+    """
+
+    TABLES = ('todos', 'recurring_todos', 'todo_assignments', 'error_logs')
+
+    def __init__(self, tables):
+        # {テーブル: (ヒープのバイト数, インデックス数, インデックスのバイト数)}
+        self.tables = tables
+
+    @classmethod
+    def from_schema(cls, schema=None):
+        schema = schema or Schema.load(sorted(DDL_DIR.glob('*.sql')))
+        tables = {}
+        for name in cls.TABLES:
+            if name not in schema.tables:
+                raise ValueError(f"DDLにテーブルがありません: {name}")
+            columns = schema.tables[name].columns
+            heap = HEAP_TUPLE_OVERHEAD + sum(_type_width(column.type_name) for column in columns.values())
+            indexes = schema.indexes_on(name)
+            index_bytes = sum(INDEX_TUPLE_OVERHEAD + sum(_type_width(columns[column].type_name)
+                                                         if column in columns else 8
+                                                         for column in index.column_names)
+                              for index in indexes)
+            tables[name] = (heap, len(indexes), index_bytes)
+        return cls(tables)
+
+    def per_event(self):
+        """{'generated' | 'assignment' | 'error': (タプル数, インデックスエントリ数, バイト数)}"""
+        def cost(*names):
+            return (len(names), sum(self.tables[name][1] for name in names),
+                    sum(self.tables[name][0] + self.tables[name][2] for name in names))
+        return {
+            'generated': cost('todos', 'recurring_todos'),
+            'assignment': cost('todo_assignments'),
+            'error': cost('error_logs'),
+        }
+
+
+def _type_width(type_name):
+    return TYPE_WIDTHS.get(type_name.lower(), 16)
+
+
+class Histogram:
+    """tick（cron の1回の実行）ごとの件数"""
+
+    def __init__(self, start, interval, ticks):
+        self.start = start
+        self.interval = interval
+        self.generated = np.zeros(ticks, dtype=np.int64)
+        self.assignments = np.zeros(ticks, dtype=np.int64)
+        self.with_deadline = np.zeros(ticks, dtype=np.int64)
+        self.errors = np.zeros(ticks, dtype=np.int64)
+        # 月末（-1）の再生成で、同じ定期TODOが当日中に何度も生成された件数（generated の内数）
+        self.repeated = np.zeros(ticks, dtype=np.int64)
+        self.repeating_rows = 0
+        self.error_rows = 0
+
+    def __len__(self):
+        return len(self.generated)
+
+    def tick_time(self, index):
+        return self.start + index * self.interval
+
+    def writes(self, model):
+        """tick ごとの (タプル数, インデックスエントリ数, バイト数)"""
+        costs = model.per_event()
+        totals = []
+        for position in range(3):
+            totals.append(self.generated * costs['generated'][position]
+                          + self.assignments * costs['assignment'][position]
+                          + self.errors * costs['error'][position])
+        return totals
+
+
+def simulate(schedule, start, days, interval=DEFAULT_INTERVAL, offset=TIMEZONE_OFFSETS['Asia/Tokyo']):
+    """
+    start から days 日間、interval 分ごとの cron の実行を再現する
+    各定期TODOが次に生成される tick をまとめて求め、生成後の次回生成日時を配列で計算する処理を、期間内に残る行がなくなるまで繰り返す
+    """
+    step = interval * 60
+    ticks = int(days * DAY // step)
+    histogram = Histogram(start, step, ticks)
+    rows = schedule.subset(schedule.active)
+    next_at = rows.next_at
+    # 例外の行・月末の再生成は「その tick から以降（または当日中）の全ての tick」になるので差分の配列で数える
+    error_diff = np.zeros(ticks + 1, dtype=np.int64)
+    repeat_diff = np.zeros(ticks + 1, dtype=np.int64)
+    repeat_assign_diff = np.zeros(ticks + 1, dtype=np.int64)
+    repeat_deadline_diff = np.zeros(ticks + 1, dtype=np.int64)
+    repeating = np.zeros(len(rows), dtype=bool)
+    index = np.arange(len(rows))
+
+    while len(index):
+        # next_generation_at <= 実行時刻 になる最初の tick
+        tick = np.maximum(-(-(next_at - start) // step), 0)
+        inside = tick < ticks
+        index, next_at, tick = index[inside], next_at[inside], tick[inside]
+        if not len(index):
+            break
+        current = rows.subset(index)
+        base = start + tick * step
+        following, error = next_generation_times(current, base, offset)
+
+        # 例外: 次回生成日時が進まず、以降の全ての tick で error_logs に書く
+        np.add.at(error_diff, tick[error], 1)
+        histogram.error_rows += int(error.sum())
+
+        ok = ~error
+        histogram.generated += np.bincount(tick[ok], minlength=ticks)
+        histogram.assignments += np.bincount(tick[ok], weights=current.assignees[ok], minlength=ticks).astype(np.int64)
+        histogram.with_deadline += np.bincount(tick[ok & (current.deadline_days > 0)], minlength=ticks)
+
+        # 次回生成日時が実行時刻以前（月末の当日）: 翌日0時（JST）を過ぎた最初の tick まで毎回生成される
+        stuck = ok & (following <= base)
+        if stuck.any():
+            midnight = ((base[stuck] + offset) // DAY + 1) * DAY - offset
+            resume = np.minimum(-(-(midnight - start) // step), ticks)
+            np.add.at(repeat_diff, tick[stuck] + 1, 1)
+            np.add.at(repeat_diff, resume, -1)
+            np.add.at(repeat_assign_diff, tick[stuck] + 1, current.assignees[stuck])
+            np.add.at(repeat_assign_diff, resume, -current.assignees[stuck])
+            with_deadline = current.deadline_days[stuck] > 0
+            np.add.at(repeat_deadline_diff, tick[stuck][with_deadline] + 1, 1)
+            np.add.at(repeat_deadline_diff, resume[with_deadline], -1)
+            repeating[index[stuck]] = True
+            following[stuck] = start + resume * step
+
+        index, next_at = index[ok], following[ok]
+
+    histogram.errors = np.cumsum(error_diff)[:ticks]
+    histogram.repeated = np.cumsum(repeat_diff)[:ticks]
+    histogram.generated += histogram.repeated
+    histogram.assignments += np.cumsum(repeat_assign_diff)[:ticks]
+    histogram.with_deadline += np.cumsum(repeat_deadline_diff)[:ticks]
+    histogram.repeating_rows = int(repeating.sum())
+    return histogram
+
+
+# ===================================
+# 入力
+# ===================================
+
+def load_csv(path, assignments_path=None, default_assignees=1):
+    """recurring_todos の CSV（ヘッダーつき）と、任意で recurring_todo_assignments の CSV"""
+    assignees = None
+    if assignments_path:
+        assignees = {}
+        with open(assignments_path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                assignees[row['recurring_todo_id']] = assignees.get(row['recurring_todo_id'], 0) + 1
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        missing = {'recurrence_pattern', 'next_generation_at'} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path} に列がありません: {', '.join(sorted(missing))}")
+        return RecurringSchedule.from_rows(reader, assignees, default_assignees)
+
+
+def load_dataset(data_dir):
+    """tool/generate_dataset.py の出力先 → (RecurringSchedule, 基準時刻)"""
+    data_dir = Path(data_dir)
+    manifest = json.loads((data_dir / 'manifest.json').read_text(encoding='utf-8'))
+    columns = manifest['columns']
+
+    assignees = {}
+    assignment_columns = columns['recurring_todo_assignments']
+    position = assignment_columns.index('recurring_todo_id')
+    with open(data_dir / 'recurring_todo_assignments.copy', encoding='utf-8') as f:
+        for line in f:
+            key = line.rstrip('\n').split('\t')[position]
+            assignees[key] = assignees.get(key, 0) + 1
+
+    def rows():
+        with open(data_dir / 'recurring_todos.copy', encoding='utf-8') as f:
+            for line in f:
+                yield dict(zip(columns['recurring_todos'], line.rstrip('\n').split('\t')))
+
+    return RecurringSchedule.from_rows(rows(), assignees), parse_now(manifest['config']['now'])
+
+
+def rows_per_second_from_benchmark(path):
+    """tool/benchmark_recurring_todos.py の結果（最も大きい規模）から1秒あたりの処理件数"""
+    report = json.loads(Path(path).read_text(encoding='utf-8'))
+    results = [result for result in report.get('results', []) if result.get('ms_per_due')]
+    if not results:
+        raise ValueError(f"{path} に生成対象ありの計測結果がありません")
+    largest = max(results, key=lambda result: result['total_rows'])
+    return 1000 / largest['ms_per_due']
+
+
+# ===================================
+# 出力
+# ===================================
+
+def plan(histogram, rows_per_second):
+    """ピーク時の実行時間と、間隔内に収めるためのバッチサイズ"""
+    peak = int(histogram.generated.max()) if len(histogram) else 0
+    peak_seconds = peak / rows_per_second
+    batch_size = max(1, int(rows_per_second * histogram.interval * TARGET_UTILIZATION))
+    return {
+        'peak_generated': peak,
+        'peak_seconds': peak_seconds,
+        'rows_per_second': rows_per_second,
+        'batch_size': batch_size,
+        'runs_at_peak': math.ceil(peak / batch_size) if peak else 0,
+        'overruns': int((histogram.generated / rows_per_second > histogram.interval).sum()),
+    }
+
+
+def _local(timestamp, offset):
+    return datetime.fromtimestamp(int(timestamp), timezone(timedelta(seconds=offset)))
+
+
+def write_csv(path, histogram, model, offset):
+    rows, index_entries, size = histogram.writes(model)
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['tick', 'generated', 'repeated', 'assignments', 'with_deadline', 'errors', 'tuples',
+                         'index_entries', 'bytes'])
+        for i in range(len(histogram)):
+            writer.writerow([_local(histogram.tick_time(i), offset).isoformat(), histogram.generated[i],
+                             histogram.repeated[i], histogram.assignments[i], histogram.with_deadline[i],
+                             histogram.errors[i], rows[i], index_entries[i], size[i]])
+
+
+def print_report(histogram, model, offset, rows_per_second, top=10):
+    tuples, index_entries, size = histogram.writes(model)
+    days = len(histogram) * histogram.interval / DAY
+    print(f"   実行回数 {len(histogram):,}回（{histogram.interval // 60}分ごと・{days:g}日間）")
+    print(f"   生成 {int(histogram.generated.sum()):,}件 / 担当者 {int(histogram.assignments.sum()):,}件 / "
+          f"期限つき {int(histogram.with_deadline.sum()):,}件 / エラー {int(histogram.errors.sum()):,}件")
+    print(f"   推定書き込み: タプル {int(tuples.sum()):,} / インデックスエントリ {int(index_entries.sum()):,} / "
+          f"{int(size.sum()) / 1024 ** 2:,.1f}MB")
+
+    busy = np.flatnonzero(histogram.generated)
+    if len(busy):
+        print(f"\n📈 生成件数の多い実行（上位{top}回）")
+        for i in busy[np.argsort(-histogram.generated[busy], kind='stable')][:top]:
+            print(f"   {_local(histogram.tick_time(i), offset):%Y-%m-%d %H:%M} {histogram.generated[i]:>10,}件  "
+                  f"{size[i] / 1024:>10,.1f}KB  推定 {histogram.generated[i] / rows_per_second:>8.2f}秒")
+
+        print("\n🕘 時刻別の生成件数（全日の合計）")
+        hours = ((histogram.start + np.arange(len(histogram)) * histogram.interval + offset) % DAY) // 3600
+        by_hour = np.bincount(hours, weights=histogram.generated, minlength=24)
+        scale = by_hour.max() or 1
+        for hour, count in enumerate(by_hour):
+            if count:
+                print(f"   {hour:02d}時 {int(count):>12,} {'█' * max(1, round(40 * count / scale))}")
+
+    if histogram.repeating_rows:
+        print(f"\n⚠️  月末（-1）の定期TODO {histogram.repeating_rows:,}件が、生成時刻から当日の終わりまで毎回生成されます"
+              f"（合計 {int(histogram.repeated.sum()):,}件）")
+        print("   calculate_next_generation が当月末を返すため。翌月末を返すように修正が必要です")
+    if histogram.error_rows:
+        print(f"\n⚠️  曜日・日付の指定がない定期TODO {histogram.error_rows:,}件が毎回 error_logs に書き込みます")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='定期TODOの生成スケジュールのシミュレーター')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--csv', help='recurring_todos のCSVエクスポート（ヘッダーつき）')
+    source.add_argument('--dataset', help='tool/generate_dataset.py の出力先')
+    source.add_argument('--synthetic', type=parse_count, help='合成する定期TODOの件数（1e6 のように指定可）')
+    parser.add_argument('--assignments-csv', help='recurring_todo_assignments のCSV（--csv のときの担当者数）')
+    parser.add_argument('--assignees', type=int, default=1, help='担当者数が分からないときの1件あたりの担当者数')
+    parser.add_argument('--start', help='開始時刻（既定: --dataset は基準時刻、--synthetic は '
+                                        f'{DEFAULT_NOW}、--csv は現在時刻）')
+    parser.add_argument('--days', type=float, default=14, help='シミュレーションする日数')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help='cron の実行間隔（分）')
+    parser.add_argument('--timezone', choices=sorted(TIMEZONE_OFFSETS), default='Asia/Tokyo',
+                        help='generation_time の解釈（UTC は JST対応前の関数の動作）')
+    parser.add_argument('--peak-time', default='09:00', help='--synthetic の生成時刻が集中する時刻')
+    parser.add_argument('--peak-share', type=float, default=0.6, help='--synthetic の --peak-time の割合')
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='--synthetic の乱数のシード')
+    throughput = parser.add_mutually_exclusive_group()
+    throughput.add_argument('--rows-per-second', type=float, default=DEFAULT_ROWS_PER_SECOND,
+                            help='1秒に処理できる件数の仮定')
+    throughput.add_argument('--benchmark', help='tool/benchmark_recurring_todos.py の --json の結果から処理速度を使う')
+    parser.add_argument('--top', type=int, default=10, help='表示する実行回数')
+    parser.add_argument('--csv-out', help='実行ごとのヒストグラムをCSVで保存')
+    parser.add_argument('--json', help='集計をJSONで保存')
+    args = parser.parse_args(argv)
+    if args.interval < 1 or args.days <= 0:
+        parser.error('--interval は1以上、--days は0より大きくしてください')
+
+    offset = TIMEZONE_OFFSETS[args.timezone]
+    if args.dataset:
+        schedule, base = load_dataset(args.dataset)
+        start = parse_now(args.start) if args.start else base
+    elif args.csv:
+        schedule = load_csv(args.csv, args.assignments_csv, args.assignees)
+        start = parse_now(args.start) if args.start else datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    else:
+        start = parse_now(args.start or DEFAULT_NOW)
+        schedule = RecurringSchedule.synthetic(args.synthetic, int(start.timestamp()), args.peak_time,
+                                               args.peak_share, assignees=args.assignees, seed=args.seed,
+                                               offset=offset)
+    rows_per_second = rows_per_second_from_benchmark(args.benchmark) if args.benchmark else args.rows_per_second
+
+    print(f"🧪 定期TODO {len(schedule):,}件（有効 {int(schedule.active.sum()):,}件）を "
+          f"{start.isoformat()} から {args.days:g}日間シミュレーション")
+    histogram = simulate(schedule, int(start.timestamp()), args.days, args.interval, offset)
+    model = WriteModel.from_schema()
+    print_report(histogram, model, offset, rows_per_second, args.top)
+
+    result = plan(histogram, rows_per_second)
+    print(f"\n🛠  処理速度 {rows_per_second:,.0f}件/秒 の場合")
+    print(f"   ピーク {result['peak_generated']:,}件 → 推定 {result['peak_seconds']:.1f}秒"
+          f"（実行間隔 {args.interval}分）")
+    if result['overruns']:
+        print(f"   ⚠️  {result['overruns']:,}回の実行が間隔内に終わらず、次の実行と重なります")
+    print(f"   1回の上限の目安: {result['batch_size']:,}件（間隔の{TARGET_UTILIZATION:.0%}）→ "
+          f"ピークは {result['runs_at_peak']:,}回に分けて処理")
+
+    if args.csv_out:
+        write_csv(args.csv_out, histogram, model, offset)
+        print(f"💾 {args.csv_out}")
+    if args.json:
+        tuples, index_entries, size = histogram.writes(model)
+        report = {
+            'start': start.isoformat(), 'days': args.days, 'interval_minutes': args.interval,
+            'timezone': args.timezone, 'recurring_todos': len(schedule), 'active': int(schedule.active.sum()),
+            'generated': int(histogram.generated.sum()), 'assignments': int(histogram.assignments.sum()),
+            'errors': int(histogram.errors.sum()), 'repeating_rows': histogram.repeating_rows,
+            'error_rows': histogram.error_rows, 'tuples': int(tuples.sum()),
+            'index_entries': int(index_entries.sum()), 'bytes': int(size.sum()), 'plan': result,
+        }
+        Path(args.json).write_text(json.dumps(report, ensure_ascii=False, indent=2) + '\n', encoding='utf-8')
+        print(f"💾 {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    try:
+        sys.exit(main())
+    except (OSError, ValueError) as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)
@@ -0,0 +1,402 @@
+"""
+SQLのスキーマ定義の読み取り（advise_indexes.py・lint_migrations.py・generate_dataset.py などで共有）
+database/ddl と database/migrations のSQLを文に分け、順に適用したスキーマ（テーブル・カラム・制約・インデックス）を組み立てる
+
+- split_statements: コメントを除き、文字列・$$ブロックの中の ; では区切らずに文に分ける
+- Schema: CREATE / ALTER / DROP TABLE・INDEX を順に適用した結果（DO ブロックの中の文も含む）
+- closing / split_top: 文字列の中を数えない括弧の対応・トップレベルのカンマ区切り
+"""
+import re
+from pathlib import Path
+
+from codemod import PROJECT_ROOT
+
+DDL_DIR = PROJECT_ROOT / "database" / "ddl"
+MIGRATIONS_DIR = PROJECT_ROOT / "database" / "migrations"
+
+# Postgres の識別子の最大長
+MAX_IDENTIFIER_LENGTH = 63
+
+# SQLの字句（コメント・文字列・引用符付き識別子・$$ブロック・文の区切り）
+SQL_LEXEME = re.compile(
+    r"--[^\n]*|/\*.*?\*/|'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\$(\w*)\$.*?\$\1\$|;|[^-/'\"$;]+|.", re.S)
+SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+DOLLAR_BODY = re.compile(r"\$(\w*)\$(.*?)\$\1\$", re.S)
+
+NAME = r'(?:\w+\.)?"?(\w+)"?'
+CREATE_TABLE = re.compile(rf"CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(IF\s+NOT\s+EXISTS\s+)?{NAME}\s*\(", re.I)
+CREATE_INDEX = re.compile(
+    rf"CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(IF\s+NOT\s+EXISTS\s+)?(?:{NAME}\s+)?"
+    rf"ON\s+(?:ONLY\s+)?{NAME}\s*(?:USING\s+(\w+)\s*)?\(", re.I)
+DROP_INDEX = re.compile(r"DROP\s+INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+EXISTS\s+)?(.+?)(?:\s+(?:CASCADE|RESTRICT))?$",
+                        re.I | re.S)
+DROP_TABLE = re.compile(r"DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?(.+?)(?:\s+(?:CASCADE|RESTRICT))?$", re.I | re.S)
+ALTER_TABLE = re.compile(rf"ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?{NAME}\s+(.*)$", re.I | re.S)
+# DO ブロックの中の文のうちスキーマを変えるもの
+SCHEMA_STATEMENT = re.compile(r"\b(CREATE\s+(?:UNIQUE\s+)?INDEX|CREATE\s+(?:UNLOGGED\s+)?TABLE|DROP\s+INDEX|"
+                              r"DROP\s+TABLE|ALTER\s+TABLE)\b", re.I)
+
+# 列定義・表制約のキーワード
+TABLE_CONSTRAINT = re.compile(r"(?:CONSTRAINT\s+\"?(\w+)\"?\s+)?(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CHECK|EXCLUDE)\b",
+                              re.I)
+REFERENCES = re.compile(rf"REFERENCES\s+{NAME}\s*(?:\(\s*\"?(\w+)\"?\s*\))?", re.I)
+
+
+def _name(text):
+    """スキーマ修飾・引用符を外した小文字の識別子"""
+    return text.strip().split('.')[-1].strip('"').lower()
+
+
+def relative(path):
+    """プロジェクトルートからの相対パス（ルートの外ならそのまま）"""
+    try:
+        return str(Path(path).resolve().relative_to(PROJECT_ROOT.resolve()))
+    except ValueError:
+        return str(path)
+
+
+def closing(text, opener):
+    """text[opener] の ( に対応する ) の位置（文字列の中の括弧は数えない）"""
+    depth = 0
+    i = opener
+    while i < len(text):
+        char = text[i]
+        if char == "'":
+            i = text.index("'", i + 1) if "'" in text[i + 1:] else len(text)
+            while text[i + 1:i + 2] == "'":
+                i = text.index("'", i + 2)
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    raise ValueError(f"括弧が閉じていません: {text[opener:opener + 60]}")
+
+
+def split_top(text):
+    """括弧・文字列の外のカンマで分ける"""
+    parts = []
+    depth = 0
+    start = 0
+    for m in re.finditer(r"'(?:[^']|'')*'|[(),]", text):
+        token = m.group()
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif token == ',' and depth == 0:
+            parts.append(text[start:m.start()].strip())
+            start = m.end()
+    parts.append(text[start:].strip())
+    return [part for part in parts if part]
+
+
+def split_statements(text):
+    """SQLを文に分ける（コメントを除く。文字列・$$ブロックの中の ; では区切らない）→ [(文, 開始行), ...]"""
+    statements = []
+    parts = []
+    line = 1
+    start_line = None
+    for m in SQL_LEXEME.finditer(text):
+        token = m.group()
+        if token.startswith(('--', '/*')) and len(token) > 1:
+            parts.append(' ')
+        elif token == ';':
+            statement = ''.join(parts).strip()
+            if statement:
+                statements.append((statement, start_line))
+            parts, start_line = [], None
+        else:
+            if start_line is None and token.strip():
+                start_line = line + token[:len(token) - len(token.lstrip())].count('\n')
+            parts.append(token)
+        line += token.count('\n')
+    statement = ''.join(parts).strip()
+    if statement:
+        statements.append((statement, start_line))
+    return statements
+
+def normalize_predicate(text):
+    """部分インデックスの条件（空白・大文字小文字・外側の括弧を揃える）"""
+    text = ' '.join(text.split())
+    while text.startswith('(') and closing(text, 0) == len(text) - 1:
+        text = text[1:-1].strip()
+    text = re.sub(r"\b(AND|OR|IS|NOT|NULL)\b", lambda m: m.group().upper(), text, flags=re.I)
+    return re.sub(r"\b(TRUE|FALSE)\b", lambda m: m.group().lower(), text, flags=re.I)
+
+
+def predicate_terms(predicate):
+    """部分インデックスの条件を AND で分けた (列, 演算子, 値) のリスト（解釈できない項は None）"""
+    terms = []
+    for part in re.split(r"\s+AND\s+", predicate or '', flags=re.I):
+        m = re.fullmatch(r"\(?\s*\"?(\w+)\"?\s*(=|IS NOT|IS)\s*(.+?)\s*\)?", part.strip(), re.I)
+        if not m:
+            terms.append(None)
+            continue
+        value = m.group(3)
+        if value.upper() in ('NULL', 'TRUE', 'FALSE'):
+            value = {'NULL': None, 'TRUE': True, 'FALSE': False}[value.upper()]
+        elif value.startswith("'"):
+            value = value[1:-1].replace("''", "'")
+        elif re.fullmatch(r"-?\d+(\.\d+)?", value):
+            value = float(value) if '.' in value else int(value)
+        else:
+            terms.append(None)
+            continue
+        operator = m.group(2).upper()
+        terms.append((m.group(1).lower(), 'IS' if operator == '=' and value is None else operator, value))
+    return terms
+
+
+def sql_literal(value):
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+# ===================================
+# スキーマ
+# ===================================
+
+class Column:
+    def __init__(self, name, type_name, references=None):
+        self.name = name
+        self.type_name = type_name
+        # 外部キーの参照先 (テーブル, 列)
+        self.references = references
+
+
+class Index:
+    """
+    インデックス（PRIMARY KEY・UNIQUE 制約が作るものも含む）
+
+    Args:
+        columns: [(列名または式, 降順か), ...]
+        constraint: 制約が作ったインデックスなら 'PRIMARY KEY' / 'UNIQUE'
+        origin: 定義した場所（ファイル:行）
+    """
+
+    def __init__(self, name, table, columns, unique=False, where=None, method='btree', constraint=None, origin=None):
+        self.name = name
+        self.table = table
+        self.columns = columns
+        self.unique = unique
+        self.where = normalize_predicate(where) if where else None
+        self.method = method.lower()
+        self.constraint = constraint
+        self.origin = origin
+
+    @property
+    def column_names(self):
+        return [column for column, _ in self.columns]
+
+    def definition(self):
+        columns = ', '.join(f"{column} DESC" if descending else column for column, descending in self.columns)
+        if self.constraint:
+            return f"{self.constraint} ({columns})"
+        unique = 'UNIQUE ' if self.unique else ''
+        using = f" USING {self.method}" if self.method != 'btree' else ''
+        where = f" WHERE {self.where}" if self.where else ''
+        return f"{unique}INDEX {self.name} ON {self.table}{using}({columns}){where}"
+
+    def to_dict(self):
+        return {
+            'name': self.name, 'table': self.table, 'columns': self.column_names,
+            'descending': [descending for _, descending in self.columns], 'unique': self.unique,
+            'where': self.where, 'method': self.method, 'constraint': self.constraint, 'origin': self.origin,
+        }
+
+
+class Table:
+    def __init__(self, name, origin=None):
+        self.name = name
+        self.columns = {}
+        self.origin = origin
+
+
+class Schema:
+    """SQLファイルを順に適用したスキーマ（テーブル・インデックス、SQL関数・ポリシーの本文）"""
+
+    def __init__(self):
+        self.tables = {}
+        self.indexes = {}
+        # インデックスの利用の参考にするSQL（関数・ポリシー・ビューなど、スキーマ定義以外の文）
+        self.routines = []
+
+    @classmethod
+    def load(cls, paths):
+        schema = cls()
+        for path in paths:
+            path = Path(path)
+            schema.apply_text(path.read_text(encoding='utf-8'), path)
+        return schema
+
+    def apply_text(self, text, path):
+        for statement, line in split_statements(text):
+            self.apply(statement, f"{relative(path)}:{line}")
+
+    def apply(self, statement, origin):
+        if re.match(r"DO\b", statement, re.I):
+            body = DOLLAR_BODY.search(statement)
+            for inner, _ in split_statements(body.group(2) if body else ''):
+                m = SCHEMA_STATEMENT.search(inner)
+                if m:
+                    self.apply(inner[m.start():], origin)
+            return
+        for pattern, handler in ((CREATE_TABLE, self._create_table), (CREATE_INDEX, self._create_index),
+                                 (DROP_INDEX, self._drop_index), (DROP_TABLE, self._drop_table),
+                                 (ALTER_TABLE, self._alter_table)):
+            m = pattern.match(statement)
+            if m:
+                handler(m, statement, origin)
+                return
+        if re.match(r"(CREATE|ALTER)\b", statement, re.I):
+            self.routines.append((statement, origin))
+
+    def indexes_on(self, table):
+        return [index for index in self.indexes.values() if index.table == table]
+
+    def foreign_keys(self):
+        """[(テーブル, 列, 参照先テーブル), ...]"""
+        return [(table.name, column.name, column.references[0])
+                for table in self.tables.values() for column in table.columns.values() if column.references]
+
+    def _add_index(self, index, if_not_exists=False):
+        if if_not_exists and index.name in self.indexes:
+            return
+        self.indexes[index.name] = index
+
+    def _constraint_index(self, table, name, kind, columns, origin):
+        kind = ' '.join(kind.upper().split())
+        if not name:
+            name = f"{table}_pkey" if kind == 'PRIMARY KEY' else f"{table}_{'_'.join(columns)}_key"
+        self._add_index(Index(name[:MAX_IDENTIFIER_LENGTH], table, [(column, False) for column in columns],
+                              unique=True, constraint=kind, origin=origin))
+
+    def _create_table(self, m, statement, origin):
+        name = m.group(2).lower()
+        if m.group(1) and name in self.tables:
+            return
+        self._drop(name)
+        table = self.tables[name] = Table(name, origin)
+        opener = m.end() - 1
+        for item in split_top(statement[opener + 1:closing(statement, opener)]):
+            if re.match(r"LIKE\b", item, re.I):
+                continue
+            constraint = TABLE_CONSTRAINT.match(item)
+            if constraint:
+                self._table_constraint(name, constraint, item, origin)
+            else:
+                self._add_column(table, item, origin)
+
+    def _table_constraint(self, table, m, item, origin):
+        kind = m.group(2).upper()
+        if kind.startswith(('CHECK', 'EXCLUDE')):
+            return
+        columns_text = item[m.end():]
+        columns = [_name(column) for column in split_top(columns_text[columns_text.index('(') + 1:
+                                                                       closing(columns_text,
+                                                                                columns_text.index('('))])]
+        if kind.startswith('FOREIGN'):
+            reference = REFERENCES.search(item)
+            if reference and len(columns) == 1 and columns[0] in self.tables[table].columns:
+                self.tables[table].columns[columns[0]].references = (reference.group(1).lower(),
+                                                                     (reference.group(2) or 'id').lower())
+            return
+        self._constraint_index(table, m.group(1), kind, columns, origin)
+
+    def _add_column(self, table, definition, origin):
+        m = re.match(r"\"?(\w+)\"?\s+(.*)$", definition, re.S)
+        if not m:
+            return
+        column_name = m.group(1).lower()
+        rest = SQL_STRING.sub("''", m.group(2))
+        type_name = re.split(r"\s+(?:NOT|NULL|DEFAULT|PRIMARY|UNIQUE|REFERENCES|CHECK|CONSTRAINT|GENERATED|"
+                             r"COLLATE)\b", rest, maxsplit=1, flags=re.I)[0].strip()
+        reference = REFERENCES.search(rest)
+        table.columns[column_name] = Column(
+            column_name, type_name,
+            (reference.group(1).lower(), (reference.group(2) or 'id').lower()) if reference else None)
+        # 列制約の名前（CONSTRAINT name UNIQUE）
+        named = re.search(r"CONSTRAINT\s+\"?(\w+)\"?\s+(PRIMARY\s+KEY|UNIQUE)\b", rest, re.I)
+        if re.search(r"\bPRIMARY\s+KEY\b", rest, re.I):
+            self._constraint_index(table.name, named and named.group(1), 'PRIMARY KEY', [column_name], origin)
+        elif re.search(r"\bUNIQUE\b", rest, re.I):
+            self._constraint_index(table.name, named and named.group(1), 'UNIQUE', [column_name], origin)
+
+    def _create_index(self, m, statement, origin):
+        table = m.group(4).lower()
+        opener = m.end() - 1
+        close = closing(statement, opener)
+        columns = []
+        for item in split_top(statement[opener + 1:close]):
+            descending = bool(re.search(r"\bDESC\b", item, re.I))
+            item = re.sub(r"\s+(ASC|DESC|NULLS\s+(FIRST|LAST))\b", '', item, flags=re.I).strip()
+            simple = re.fullmatch(r"\"?(\w+)\"?(?:\s+\w+_ops)?", item)
+            columns.append((simple.group(1).lower() if simple else ' '.join(item.split()), descending))
+        where = re.search(r"\bWHERE\b(.*)$", statement[close + 1:], re.I | re.S)
+        default_name = '_'.join([table] + [re.sub(r'\W+', '_', column) for column, _ in columns] + ['idx'])
+        name = (m.group(3) or default_name).lower()
+        self._add_index(Index(name, table, columns, unique=bool(m.group(1)), where=where and where.group(1),
+                              method=m.group(5) or 'btree', origin=origin), if_not_exists=bool(m.group(2)))
+
+    def _drop_index(self, m, statement, origin):
+        for name in m.group(1).split(','):
+            self.indexes.pop(_name(name), None)
+
+    def _drop_table(self, m, statement, origin):
+        for name in m.group(1).split(','):
+            self._drop(_name(name))
+
+    def _drop(self, table):
+        self.tables.pop(table, None)
+        for index in self.indexes_on(table):
+            del self.indexes[index.name]
+
+    def _alter_table(self, m, statement, origin):
+        table = self.tables.get(m.group(1).lower())
+        if table is None:
+            return
+        for action in split_top(m.group(2)):
+            constraint = re.match(r"ADD\s+((?:CONSTRAINT\s+\"?\w+\"?\s+)?(?:PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|"
+                                  r"CHECK|EXCLUDE)\b.*)$", action, re.I | re.S)
+            if constraint:
+                inner = constraint.group(1)
+                self._table_constraint(table.name, TABLE_CONSTRAINT.match(inner), inner, origin)
+                continue
+            add = re.match(r"ADD\s+(?:COLUMN\s+)?(IF\s+NOT\s+EXISTS\s+)?(.*)$", action, re.I | re.S)
+            if add:
+                if not (add.group(1) and re.match(r"\"?(\w+)", add.group(2)).group(1).lower() in table.columns):
+                    self._add_column(table, add.group(2), origin)
+                continue
+            drop = re.match(r"DROP\s+(COLUMN|CONSTRAINT)\s+(?:IF\s+EXISTS\s+)?\"?(\w+)\"?", action, re.I)
+            if drop and drop.group(1).upper() == 'COLUMN':
+                column = drop.group(2).lower()
+                table.columns.pop(column, None)
+                # 列を含むインデックスも消える
+                for index in self.indexes_on(table.name):
+                    if column in index.column_names or re.search(rf"\b{column}\b", index.where or ''):
+                        del self.indexes[index.name]
+            elif drop:
+                index = self.indexes.get(drop.group(2).lower())
+                if index and index.constraint:
+                    del self.indexes[index.name]
+            rename = re.match(r"RENAME\s+(?:COLUMN\s+)?\"?(\w+)\"?\s+TO\s+\"?(\w+)\"?", action, re.I)
+            if rename and rename.group(1).lower() in table.columns:
+                old, new = rename.group(1).lower(), rename.group(2).lower()
+                table.columns[new] = table.columns.pop(old)
+                table.columns[new].name = new
+                for index in self.indexes_on(table.name):
+                    index.columns = [(new if column == old else column, descending)
+                                     for column, descending in index.columns]
+
+
+def schema_files(ddl_dir=DDL_DIR, migrations_dir=MIGRATIONS_DIR):
+    """適用順のSQLファイル（DDL → マイグレーション、それぞれファイル名順）"""
+    return sorted(Path(ddl_dir).glob('*.sql')) + sorted(Path(migrations_dir).glob('*.sql'))
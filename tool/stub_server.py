@@ -0,0 +1,141 @@
+"""
+ローカルテスト用のスタブサーバーの共通部分
+（tool/maintenance_stub_server.py・tool/edge_function_stub_server.py）
+
+- StubServer: 状態・リクエスト数の保持と、別スレッド／フォアグラウンドでの起動・停止
+- StubHandler: JSONの応答と、次の /__stub の操作用エンドポイント。それ以外のパスは endpoint に渡す
+    GET  /__stub/state    現在の状態
+    POST /__stub/state    状態の変更（state にある項目だけ）
+    GET  /__stub/stats    エンドポイントごとのリクエスト数
+    POST /__stub/reset    リクエスト数のリセット
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class StubServer:
+    """
+    スタブサーバーの基底クラス（handler_class に StubHandler のサブクラスを指定する）
+
+    Args:
+        state: /__stub/state で読み書きする状態の初期値
+        port: 待ち受けポート（0なら空いているポート）
+        host: 待ち受けアドレス
+    """
+
+    handler_class = None
+
+    def __init__(self, state, port, host='127.0.0.1'):
+        self.state = state
+        self.stats = {}
+        self.lock = threading.Lock()
+        self.server = _Server((host, port), self.handler_class)
+        self.server.stub = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def update(self, **changes):
+        unknown = set(changes) - set(self.state)
+        if unknown:
+            raise ValueError(f"不明な項目です: {', '.join(sorted(unknown))}")
+        with self.lock:
+            self.state.update(changes)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.state), dict(self.stats)
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def serve(self):
+        """Ctrl+C まで現在のスレッドで応答する（コマンドとして起動したとき）"""
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            print("\n終了しました")
+        finally:
+            self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # 同時接続が多くても接続待ちで落とさない（既定の5では負荷試験の接続の張り直しが1秒待たされる）
+    request_queue_size = 1024
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # 全ての応答に付けるヘッダー
+    extra_headers = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        for key, value in self.extra_headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_GET(self):
+        stub = self.server.stub
+        path = urlsplit(self.path).path
+        if path == '/__stub/state':
+            return self._send(200, stub.snapshot()[0])
+        if path == '/__stub/stats':
+            return self._send(200, stub.snapshot()[1])
+        return self.endpoint('GET', path, b'')
+
+    def do_POST(self):
+        stub = self.server.stub
+        path = urlsplit(self.path).path
+        # keep-alive で次のリクエストと混ざらないよう、本文は使わなくても読み切る
+        body = self._read_body()
+        if path == '/__stub/state':
+            try:
+                stub.update(**json.loads(body or b'{}'))
+            except (ValueError, TypeError) as e:
+                return self._send(400, {'message': str(e)})
+            return self._send(200, stub.snapshot()[0])
+        if path == '/__stub/reset':
+            stub.reset()
+            return self._send(200, {})
+        return self.endpoint('POST', path, body)
+
+    def endpoint(self, method, path, body):
+        """/__stub 以外のリクエストに応答する（サブクラスで実装する）"""
+        return self._send(404, {'message': f'Not found: {path}'})
@@ -0,0 +1,8 @@
+"""
+tool/ のスクリプトのテスト（python -m pytest tool/tests）
+スクリプトは tool/ からの相対importで互いを読むため、tool/ を import パスに入れる
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,36 @@
+"""analyze_error_logs.py のメッセージの正規化とシグネチャ"""
+import pytest
+
+from analyze_error_logs import normalize_message, signature_of
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('Timeout after 5020ms', 'Timeout after <n>ms'),
+    ('took 12.5ms', 'took <n>ms'),
+    ('size 1.5GB exceeds 80% of quota', 'size <n>GB exceeds <n>% of quota'),
+    ('retry 3 of 5', 'retry <n> of <n>'),
+    ('connect 10.0.0.12:5432 failed', 'connect <n>:<n> failed'),
+    ('Timeout at 2025-01-02T03:04:05Z', 'Timeout at <time>'),
+    # 識別子の一部の数字・単位より長い英字が続く数字はそのまま
+    ('user42 missing', 'user42 missing'),
+    ('HTTP 404NotFound', 'HTTP 404NotFound'),
+])
+def test_normalize_message(message, expected):
+    assert normalize_message(message) == expected
+
+
+@pytest.mark.parametrize('messages', [
+    ['Timeout after 5020ms', 'Timeout after 31ms', 'Timeout after 120000ms'],
+    ['took 12.5ms', 'took 3.25ms', 'took 7ms'],
+    ['connect 10.0.0.12:5432 failed', 'connect 192.168.1.5:6543 failed'],
+])
+def test_signature_ignores_numbers_with_units(messages):
+    stack = '#0      ApiClient.get (package:app/api_client.dart:12:5)'
+    signatures = {signature_of('TimeoutException', message, stack, 3)[0] for message in messages}
+    assert len(signatures) == 1
+
+
+def test_signature_keeps_different_units_apart():
+    first = signature_of('TimeoutException', 'Timeout after 5ms', '', 3)[0]
+    second = signature_of('TimeoutException', 'Timeout after 5s', '', 3)[0]
+    assert first != second
@@ -0,0 +1,176 @@
+"""codemod.py の CodemodManifest（前回の結果によるスキップ）と changed_functions（--changed-since）"""
+import os
+import subprocess
+
+import pytest
+
+from codemod import CodemodManifest, Rule, changed_functions, run_codemod
+
+PENDING = "const answer = 1\n"
+DONE = "const answer = 2\n"
+
+
+def bump_rule(name='bump'):
+    return Rule(name, "const answer = 1", "const answer = 2")
+
+
+def write_function(functions_dir, name, content):
+    path = functions_dir / name / 'index.ts'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+    return path
+
+
+def processed(results):
+    """マニフェストでスキップせずに開いたファイルのFunction名"""
+    return sorted(result.function_name for result in results if not result.skipped)
+
+
+@pytest.fixture
+def functions_dir(tmp_path):
+    functions_dir = tmp_path / 'functions'
+    write_function(functions_dir, 'alpha', PENDING)
+    write_function(functions_dir, 'beta', DONE)
+    return functions_dir
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    return CodemodManifest(tmp_path / 'manifest.json')
+
+
+# ===================================
+# CodemodManifest
+# ===================================
+
+def test_recorded_file_is_fresh_for_the_same_rules(functions_dir, manifest):
+    path = functions_dir / 'beta' / 'index.ts'
+    manifest.record(path, 'v1')
+
+    assert manifest.is_fresh(path, 'v1')
+    assert not manifest.is_fresh(path, 'v2')
+    assert not manifest.is_fresh(functions_dir / 'alpha' / 'index.ts', 'v1')
+
+
+def test_mtime_only_change_is_fresh_and_updates_the_entry(functions_dir, manifest):
+    path = functions_dir / 'beta' / 'index.ts'
+    manifest.record(path, 'v1')
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    assert manifest.is_fresh(path, 'v1')
+    # 次からは内容を読まずに更新時刻で判定できる
+    assert manifest.files[manifest._key(path)]['mtime_ns'] == os.stat(path).st_mtime_ns
+
+
+def test_content_change_with_the_same_size_is_stale(functions_dir, manifest):
+    path = functions_dir / 'beta' / 'index.ts'
+    manifest.record(path, 'v1')
+    stat = os.stat(path)
+    path.write_text(DONE.replace('2', '3'), encoding='utf-8')
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5_000_000_000))
+
+    # サイズが同じでも更新時刻が変われば内容のハッシュで比べる
+    assert os.stat(path).st_size == stat.st_size
+    assert not manifest.is_fresh(path, 'v1')
+
+
+def test_save_and_load(functions_dir, manifest, tmp_path):
+    path = functions_dir / 'beta' / 'index.ts'
+    manifest.record(path, 'v1')
+    manifest.save()
+
+    assert CodemodManifest(tmp_path / 'manifest.json').is_fresh(path, 'v1')
+
+
+def test_unknown_manifest_version_is_ignored(tmp_path):
+    path = tmp_path / 'manifest.json'
+    path.write_text('{"version": 0, "files": {"x": {}}}', encoding='utf-8')
+
+    assert CodemodManifest(path).files == {}
+
+
+# ===================================
+# run_codemod + CodemodManifest
+# ===================================
+
+def test_second_run_skips_unchanged_files(functions_dir, manifest):
+    first = run_codemod([bump_rule()], functions_dir, workers=1, manifest=manifest)
+    assert processed(first) == ['alpha', 'beta']
+    assert [result.function_name for result in first if result.changed] == ['alpha']
+    assert (functions_dir / 'alpha' / 'index.ts').read_text(encoding='utf-8') == DONE
+
+    second = run_codemod([bump_rule()], functions_dir, workers=1, manifest=manifest)
+    assert processed(second) == []
+
+
+def test_edited_file_is_processed_again(functions_dir, manifest):
+    run_codemod([bump_rule()], functions_dir, workers=1, manifest=manifest)
+    write_function(functions_dir, 'beta', "// 追記\n" + PENDING)
+
+    results = run_codemod([bump_rule()], functions_dir, workers=1, manifest=manifest)
+    assert processed(results) == ['beta']
+    assert [result.function_name for result in results if result.changed] == ['beta']
+
+
+def test_changed_rules_version_processes_every_file(functions_dir, manifest):
+    run_codemod([bump_rule()], functions_dir, workers=1, manifest=manifest)
+
+    results = run_codemod([bump_rule('renamed')], functions_dir, workers=1, manifest=manifest)
+    assert processed(results) == ['alpha', 'beta']
+
+
+def test_dry_run_does_not_record_pending_changes(functions_dir, manifest):
+    for _ in range(2):
+        results = run_codemod([bump_rule()], functions_dir, dry_run=True, workers=1, manifest=manifest)
+        # 変更が残っている alpha は毎回処理し、変更のない beta だけスキップする
+        assert [result.function_name for result in results if result.changed] == ['alpha']
+    assert processed(results) == ['alpha']
+    assert (functions_dir / 'alpha' / 'index.ts').read_text(encoding='utf-8') == PENDING
+    assert manifest._key(functions_dir / 'alpha' / 'index.ts') not in manifest.files
+
+
+# ===================================
+# changed_functions
+# ===================================
+
+def git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    for name in ('AUTHOR', 'COMMITTER'):
+        monkeypatch.setenv(f'GIT_{name}_NAME', 'test')
+        monkeypatch.setenv(f'GIT_{name}_EMAIL', 'test@example.com')
+    root = tmp_path / 'repo'
+    functions_dir = root / 'supabase' / 'functions'
+    for name in ('alpha', 'beta', 'gamma'):
+        write_function(functions_dir, name, PENDING)
+    (root / '.gitignore').write_text('*.log\n', encoding='utf-8')
+    git(root, 'init', '-q')
+    git(root, 'add', '.')
+    git(root, 'commit', '-q', '-m', 'base')
+    return root, functions_dir
+
+
+def test_changed_functions_includes_commits_edits_and_untracked_files(repository):
+    root, functions_dir = repository
+    write_function(functions_dir, 'alpha', DONE)
+    git(root, 'commit', '-q', '-am', 'alpha')
+    write_function(functions_dir, 'beta', DONE)
+    (functions_dir / 'delta').mkdir()
+    (functions_dir / 'delta' / 'helper.ts').write_text(PENDING, encoding='utf-8')
+    # 無視されるファイル・Functionの外のファイルは数えない
+    (functions_dir / 'gamma' / 'debug.log').write_text('', encoding='utf-8')
+    (functions_dir / 'README.md').write_text('', encoding='utf-8')
+
+    assert changed_functions('HEAD~1', functions_dir) == ['alpha', 'beta', 'delta']
+    assert changed_functions('HEAD', functions_dir) == ['beta', 'delta']
+
+
+def test_changed_functions_unknown_revision(repository):
+    _, functions_dir = repository
+
+    with pytest.raises(ValueError, match='git コマンドが失敗しました'):
+        changed_functions('no-such-revision', functions_dir)
@@ -0,0 +1,47 @@
+"""icon_cache.py の cached_call（入力・パラメータ・処理のソースが同じならスキップ）"""
+import importlib
+import sys
+
+import pytest
+
+from icon_cache import IconCache, cached_call
+
+STAGE = '''
+from pathlib import Path
+
+THRESHOLD = {threshold}
+
+
+def stage(input_path, output_path):
+    Path(output_path).write_bytes(Path(input_path).read_bytes() + bytes([THRESHOLD]))
+'''
+
+
+@pytest.fixture
+def load_stage(tmp_path, monkeypatch):
+    """tmp_path/cached_stage.py に THRESHOLD を変えた処理を書いて読み込む"""
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    def load(threshold):
+        (tmp_path / 'cached_stage.py').write_text(STAGE.format(threshold=threshold), encoding='utf-8')
+        sys.modules.pop('cached_stage', None)
+        importlib.invalidate_caches()
+        return importlib.import_module('cached_stage').stage
+
+    yield load
+    sys.modules.pop('cached_stage', None)
+
+
+def test_cached_call_skips_unchanged_and_reruns_after_editing_the_stage(tmp_path, load_stage):
+    cache = IconCache(tmp_path / 'store')
+    source = tmp_path / 'input.png'
+    source.write_bytes(b'icon')
+    output = tmp_path / 'output.png'
+
+    assert cached_call(load_stage(10), source, output, cache=cache)
+    assert not cached_call(load_stage(10), source, output, cache=cache)
+    assert output.read_bytes() == b'icon\x0a'
+
+    # STAGE_SOURCES に入っていないファイルでも、処理を変えれば実行し直す
+    assert cached_call(load_stage(50), source, output, cache=cache)
+    assert output.read_bytes() == b'icon\x32'
@@ -0,0 +1,32 @@
+"""load_test.py の compare_with_baseline（合計で判定し、Functionごとは件数が足りるときだけ比べる）"""
+from load_test import compare_with_baseline
+
+
+def stats(requests, p95_ms, throughput=100.0, error_rate=0.0):
+    return {'requests': requests, 'p95_ms': p95_ms, 'throughput': throughput, 'error_rate': error_rate}
+
+
+def report(total, **endpoints):
+    return {'summary': {'total': total, 'endpoints': endpoints}}
+
+
+def test_endpoint_regressions_are_informational_by_default():
+    baseline = report(stats(1000, 30.0), busy=stats(500, 30.0), rare=stats(10, 30.0))
+    current = report(stats(1000, 31.0), busy=stats(500, 40.0), rare=stats(10, 60.0))
+
+    assert compare_with_baseline(baseline, current, 10.0, 1.0) == []
+
+
+def test_per_endpoint_skips_endpoints_with_too_few_samples(capsys):
+    baseline = report(stats(1000, 30.0), busy=stats(500, 30.0), rare=stats(10, 30.0))
+    current = report(stats(1000, 31.0), busy=stats(500, 40.0), rare=stats(10, 60.0, error_rate=0.5))
+
+    assert compare_with_baseline(baseline, current, 10.0, 1.0, per_endpoint=True, min_samples=100) == ['busy p95']
+    assert 'rare: 件数不足' in capsys.readouterr().out
+
+
+def test_total_regressions_fail():
+    baseline = report(stats(1000, 30.0, throughput=400.0))
+    current = report(stats(800, 40.0, throughput=300.0, error_rate=0.05))
+
+    assert compare_with_baseline(baseline, current, 10.0, 1.0) == ['合計 p95', '合計 スループット', '合計 エラー率']
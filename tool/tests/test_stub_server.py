@@ -0,0 +1,64 @@
+"""stub_server.py の /__stub の操作用エンドポイントと、それを使う2つのスタブサーバー"""
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from edge_function_stub_server import EdgeFunctionStub
+from maintenance_stub_server import MaintenanceStub
+
+
+def request(url, body=None, method=None):
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data, method=method), timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.fixture(params=['maintenance', 'edge'])
+def stub(request):
+    if request.param == 'maintenance':
+        server = MaintenanceStub(port=0)
+    else:
+        server = EdgeFunctionStub(port=0, latency_ms=0, jitter=0)
+    with server:
+        yield server
+
+
+def test_state_can_be_read_and_updated(stub):
+    state = stub.snapshot()[0]
+    key = next(iter(state))
+
+    assert request(stub.url + '/__stub/state') == (200, state)
+    assert request(stub.url + '/__stub/state', {key: 1})[1][key] == 1
+    assert request(stub.url + '/__stub/state', {'unknown': 1}) == (400, {'message': '不明な項目です: unknown'})
+
+
+def test_unknown_path_is_not_found(stub):
+    assert request(stub.url + '/nowhere')[0] == 404
+    assert stub.snapshot()[1] == {}
+
+
+def test_maintenance_endpoints_are_counted_and_reset():
+    with MaintenanceStub(port=0, is_maintenance=True, end_time='2025-01-01T09:00:00Z') as stub:
+        assert request(stub.url + '/functions/v1/check-maintenance-mode', {}) == \
+            (200, {'status': 'maintenance', 'end_time': '2025-01-01T09:00:00Z'})
+        assert request(stub.url + '/rest/v1/maintenance_mode')[1][0]['is_maintenance'] is True
+        # テーブルは GET、Functionは POST だけ
+        assert request(stub.url + '/functions/v1/check-maintenance-mode')[0] == 404
+
+        assert request(stub.url + '/__stub/stats')[1] == {
+            '/functions/v1/check-maintenance-mode': 1, '/rest/v1/maintenance_mode': 1}
+        request(stub.url + '/__stub/reset', {})
+        assert request(stub.url + '/__stub/stats') == (200, {})
+
+
+def test_edge_function_stub_replays_recordings():
+    recordings = {'get-user-groups': {'status': 200, 'body': {'success': True, 'groups': []}, 'latency_ms': 0}}
+    with EdgeFunctionStub(recordings, port=0, latency_ms=0, jitter=0) as stub:
+        assert request(stub.functions_url + '/get-user-groups', {}) == (200, {'success': True, 'groups': []})
+        assert request(stub.functions_url + '/create-todo', {}) == (200, {'success': True})
+        assert request(stub.url + '/__stub/stats')[1] == {'get-user-groups': 1, 'create-todo': 1}
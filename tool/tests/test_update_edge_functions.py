@@ -0,0 +1,108 @@
+"""update_edge_functions.py の --watch（変わったファイルだけの再適用）と --changed-since"""
+import subprocess
+
+import pytest
+
+import update_edge_functions
+from codemod import CodemodManifest, Rule, changed_functions
+
+PENDING = "const answer = 1\n"
+DONE = "const answer = 2\n"
+
+
+def write_function(functions_dir, name, content):
+    path = functions_dir / name / 'index.ts'
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content, encoding='utf-8')
+    return path
+
+
+@pytest.fixture
+def functions_dir(tmp_path, monkeypatch):
+    functions_dir = tmp_path / 'functions'
+    write_function(functions_dir, 'alpha', PENDING)
+    write_function(functions_dir, 'beta', DONE)
+    monkeypatch.setattr(update_edge_functions, 'FUNCTIONS_DIR', functions_dir)
+    monkeypatch.setattr(update_edge_functions, 'CodemodManifest',
+                        lambda: CodemodManifest(tmp_path / 'manifest.json'))
+    return functions_dir
+
+
+def run_watch(monkeypatch, actions, dry_run=False):
+    """
+    watch を動かし、各回の待ち時間に actions を1つずつ実行する（尽きたら Ctrl+C）
+
+    Returns:
+        回ごとに開いたファイルのFunction名のリスト（対象が変わらず run_codemod を呼ばなかった回は含まない）
+    """
+    runs = []
+    run_codemod = update_edge_functions.run_codemod
+
+    def recording_run_codemod(*args):
+        results = run_codemod(*args)
+        runs.append(sorted(result.function_name for result in results if not result.skipped))
+        return results
+
+    def sleep(_):
+        if not actions:
+            raise KeyboardInterrupt
+        actions.pop(0)()
+
+    monkeypatch.setattr(update_edge_functions, 'run_codemod', recording_run_codemod)
+    monkeypatch.setattr(update_edge_functions.time, 'sleep', sleep)
+    rules = [Rule('bump', "const answer = 1", "const answer = 2")]
+    assert update_edge_functions.watch(rules, None, dry_run, 1, 0) == 0
+    return runs
+
+
+def test_watch_reapplies_only_edited_files(functions_dir, monkeypatch):
+    runs = run_watch(monkeypatch, [
+        lambda: None,
+        lambda: write_function(functions_dir, 'beta', "// 追記\n" + PENDING),
+        lambda: None,
+    ])
+
+    # 初回は全て、次は変更がないので呼ばない（自分で書き換えた alpha では再実行しない）、その次は beta だけ
+    assert runs == [['alpha', 'beta'], ['beta']]
+    assert (functions_dir / 'alpha' / 'index.ts').read_text(encoding='utf-8') == DONE
+    assert (functions_dir / 'beta' / 'index.ts').read_text(encoding='utf-8') == "// 追記\n" + DONE
+
+
+def test_watch_dry_run_keeps_reporting_pending_files(functions_dir, monkeypatch):
+    runs = run_watch(monkeypatch, [
+        lambda: write_function(functions_dir, 'gamma', DONE),
+    ], dry_run=True)
+
+    # 書き換えていない alpha はマニフェストに記録されず、追加した gamma と一緒にもう一度処理される
+    assert runs == [['alpha', 'beta'], ['alpha', 'gamma']]
+    assert (functions_dir / 'alpha' / 'index.ts').read_text(encoding='utf-8') == PENDING
+
+
+def git(cwd, *args):
+    subprocess.run(['git', *args], cwd=cwd, check=True, capture_output=True)
+
+
+def test_changed_since_includes_untracked_functions(functions_dir, monkeypatch, capsys):
+    for name in ('AUTHOR', 'COMMITTER'):
+        monkeypatch.setenv(f'GIT_{name}_NAME', 'test')
+        monkeypatch.setenv(f'GIT_{name}_EMAIL', 'test@example.com')
+    git(functions_dir, 'init', '-q')
+    git(functions_dir, 'add', '.')
+    git(functions_dir, 'commit', '-q', '-m', 'base')
+    write_function(functions_dir, 'gamma', PENDING)
+    monkeypatch.setattr(update_edge_functions, 'changed_functions',
+                        lambda rev: changed_functions(rev, functions_dir))
+
+    assert update_edge_functions.main(['--changed-since', 'HEAD', '--rule', 'cors', '--dry-run',
+                                       '--no-manifest', '--workers', '1']) == 0
+    assert '対象: 1ファイル' in capsys.readouterr().out
+
+    write_function(functions_dir, 'beta', DONE + "// 追記\n")
+    assert update_edge_functions.main(['--changed-since', 'HEAD', '--rule', 'cors', '--dry-run',
+                                       '--no-manifest', '--workers', '1', 'alpha', 'beta']) == 0
+    assert '対象: 1ファイル' in capsys.readouterr().out
+
+    git(functions_dir, 'add', '.')
+    git(functions_dir, 'commit', '-q', '-m', 'gamma')
+    assert update_edge_functions.main(['--changed-since', 'HEAD', '--dry-run', '--no-manifest']) == 0
+    assert 'HEAD 以降に変更されたEdge Functionはありません' in capsys.readouterr().out
@@ -0,0 +1,169 @@
+"""
+コードモッド用のマッチング層
+- KeywordSet: 複数のリテラル（アンカー文字列）をファイル全体から1回の走査で探す
+  （キーワードのトライを1つの正規表現に展開し、Aho-Corasick と同様に1パスで全キーワードの出現位置を得る）
+- TokenPattern: 空白の違いを無視したトークン列のマッチ
+  アンカーが見つかった位置の周辺だけをトークン列として比較する
+
+ファイルのトークン化は1回だけ行い、全ルールで共有する
+ルールが増えてもファイルの走査は1回なので、コストはほぼ候補の数だけで決まる
+"""
+import re
+from bisect import bisect_right
+from string import Template
+
+# TypeScript / JavaScript のトークン（正規表現リテラルは区別しない）
+TOKEN_PATTERN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)
+  | (?P<word>[^\W\d][\w$]*|\$[\w$]*|\d[\w.]*)
+  | (?P<punct>\?\?=?|\?\.|=>|===|!==|==|!=|<=|>=|&&|\|\||\.\.\.|\+\+|--|[^\s\w])
+  | (?P<space>\s+)
+""", re.DOTALL | re.VERBOSE)
+
+# パターン中の1トークンに一致するプレースホルダ（$NAME）
+HOLE_PATTERN = re.compile(r"\$[A-Z][A-Z0-9_]*")
+
+
+class TokenList:
+    """テキストのトークン列（空白は捨て、コメントは末尾の空白を除いて比較する）"""
+
+    def __init__(self, text):
+        self.texts = []
+        self.starts = []
+        self.ends = []
+        for m in TOKEN_PATTERN.finditer(text):
+            kind = m.lastgroup
+            if kind == 'space':
+                continue
+            token = m.group()
+            self.texts.append(token.rstrip() if kind == 'comment' else token)
+            self.starts.append(m.start())
+            self.ends.append(m.end())
+
+    def __len__(self):
+        return len(self.texts)
+
+    def index_at(self, position):
+        """文字位置 position を含むトークンの番号（なければ None）"""
+        i = bisect_right(self.starts, position) - 1
+        if i >= 0 and position < self.ends[i]:
+            return i
+        return None
+
+
+def _trie_regex(node):
+    """トライを正規表現に展開する（同じ位置で始まるキーワードは長いものを優先）"""
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch != '']
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        # ここで終わるキーワードもある
+        return '(?:' + body + ')?'
+    return body
+
+
+class KeywordSet:
+    """複数のリテラルの出現位置を1回の走査でまとめて探す"""
+
+    def __init__(self, keywords):
+        self.keywords = sorted(set(k for k in keywords if k))
+        trie = {}
+        for keyword in self.keywords:
+            node = trie
+            for ch in keyword:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+        # 各位置で最長のキーワードを先読みで調べる（重なり合う出現も全て拾う）
+        self.regex = re.compile('(?=(' + _trie_regex(trie) + '))') if self.keywords else None
+        # 最長一致したキーワードの接頭辞になっている短いキーワードも同じ位置に出現している
+        self.prefixes = {k: [p for p in self.keywords if k.startswith(p)] for k in self.keywords}
+
+    def find(self, text):
+        """{キーワード: [出現位置, ...]}（出現しないキーワードは含まない）"""
+        hits = {}
+        if self.regex is None:
+            return hits
+        for m in self.regex.finditer(text):
+            found = m.group(1)
+            if not found:
+                continue
+            for keyword in self.prefixes[found]:
+                hits.setdefault(keyword, []).append(m.start())
+        return hits
+
+
+class TokenPattern:
+    """
+    空白の違いを無視したトークン列のパターン
+
+    Args:
+        snippet: マッチさせるコード片。$NAME は任意の1トークンに一致し、置換文字列の $NAME で参照できる
+        anchor: 候補を探すためのリテラル（省略時はパターン中の最も長いトークン）
+    """
+
+    def __init__(self, snippet, anchor=None):
+        self.snippet = snippet
+        self.tokens = TokenList(snippet).texts
+        if not self.tokens:
+            raise ValueError("空のパターンです")
+        self.holes = {i for i, t in enumerate(self.tokens) if HOLE_PATTERN.fullmatch(t)}
+        literals = [(i, t) for i, t in enumerate(self.tokens) if i not in self.holes]
+        if not literals:
+            raise ValueError(f"リテラルのないパターンは使えません: {snippet!r}")
+        if anchor is None:
+            self.anchor_index, self.anchor = max(literals, key=lambda item: len(item[1]))
+        else:
+            matches = [i for i, t in literals if anchor in t]
+            if not matches:
+                raise ValueError(f"アンカー {anchor!r} がパターンに含まれていません")
+            self.anchor_index, self.anchor = matches[0], anchor
+        # アンカーがトークンの途中から始まる場合のずれ
+        self.anchor_offset = self.tokens[self.anchor_index].index(self.anchor)
+
+    def match_at(self, source, start):
+        """source（TokenList）の start 番目のトークンから一致すれば {プレースホルダ: トークン} を返す"""
+        if start < 0 or start + len(self.tokens) > len(source):
+            return None
+        captures = {}
+        for j, expected in enumerate(self.tokens):
+            actual = source.texts[start + j]
+            if j in self.holes:
+                if captures.setdefault(expected[1:], actual) != actual:
+                    return None
+            elif actual != expected:
+                return None
+        return captures
+
+    def find(self, source, positions):
+        """
+        アンカーの出現位置 positions を起点に一致する箇所を探す
+
+        Returns:
+            [(開始文字位置, 終了文字位置, {プレースホルダ: トークン}), ...]（重なりなし、位置順）
+        """
+        found = []
+        last_end = -1
+        for position in positions:
+            i = source.index_at(position)
+            if i is None or source.starts[i] + self.anchor_offset != position:
+                continue
+            start = i - self.anchor_index
+            captures = self.match_at(source, start)
+            if captures is None:
+                continue
+            begin, end = source.starts[start], source.ends[start + len(self.tokens) - 1]
+            if begin >= last_end:
+                found.append((begin, end, captures))
+                last_end = end
+        return found
+
+
+def expand(replacement, captures):
+    """置換文字列のプレースホルダ $NAME をマッチしたトークンで置き換える"""
+    if callable(replacement):
+        return replacement(captures)
+    if not captures:
+        return replacement
+    return Template(replacement).safe_substitute(captures)
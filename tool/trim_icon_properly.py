@@ -1,39 +1,28 @@
-from PIL import Image
+from icon_io import load_rgba, save_rgba, trim_box
 
 def trim_icon_properly(input_path, output_path):
     """アイコンを適切にトリミングする"""
-    img = Image.open(input_path).convert('RGBA')
+    arr = load_rgba(input_path)
+    height, width = arr.shape[:2]
 
-    # 完全に不透明なピクセル（アルファ値255）のバウンディングボックスを取得
-    pixels = img.load()
-    width, height = img.size
+    # アルファ値が10より大きい（ほぼ不透明）ピクセルのバウンディングボックスを取得
+    bbox = trim_box(arr, 10)
 
-    min_x, min_y = width, height
-    max_x, max_y = 0, 0
-
-    for x in range(width):
-        for y in range(height):
-            r, g, b, a = pixels[x, y]
-            # アルファ値が10以上（ほぼ不透明）のピクセルを検出
-            if a > 10:
-                min_x = min(min_x, x)
-                min_y = min(min_y, y)
-                max_x = max(max_x, x)
-                max_y = max(max_y, y)
-
-    if min_x < max_x and min_y < max_y:
+    if bbox:
         # バウンディングボックスでクロップ
-        cropped = img.crop((min_x, min_y, max_x + 1, max_y + 1))
-        cropped.save(output_path, 'PNG')
+        left, top, right, bottom = bbox
+        save_rgba(arr[top:bottom, left:right], output_path)
         print(f"✅ トリミング完了: {output_path}")
-        print(f"   元のサイズ: {img.size}")
-        print(f"   新しいサイズ: {cropped.size}")
-        print(f"   切り取られた領域: ({min_x}, {min_y}, {max_x + 1}, {max_y + 1})")
+        print(f"   元のサイズ: {(width, height)}")
+        print(f"   新しいサイズ: {(right - left, bottom - top)}")
+        print(f"   切り取られた領域: {bbox}")
     else:
         print("❌ 有効なピクセルが見つかりませんでした")
 
 if __name__ == '__main__':
-    trim_icon_properly(
+    from icon_cache import cached_call
+    cached_call(
+        trim_icon_properly,
         'assets/icons/app_icon.png',
         'assets/icons/app_icon.png'
     )
@@ -19,7 +19,9 @@ def trim_transparent(input_path, output_path):
         print("❌ 透過でないピクセルが見つかりませんでした")
 
 if __name__ == '__main__':
-    trim_transparent(
+    from icon_cache import cached_call
+    cached_call(
+        trim_transparent,
         'assets/icons/app_icon.png',
         'assets/icons/app_icon.png'
     )
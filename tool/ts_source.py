@@ -0,0 +1,316 @@
+"""
+Edge Functions の TypeScript の構文情報（detect_sequential_awaits.py・advise_indexes.py・detect_overfetch.py で共有）
+token_match.TokenList のトークン列からコメントを除き、括弧の対応・関数の本体・文の範囲を求める
+
+構文木は作らず、括弧の対応と行の継続（行末・行頭のトークン）だけで文とブロックを切り出す
+"""
+import re
+from bisect import bisect_right
+
+from token_match import TokenList
+
+OPENERS = {'(': ')', '[': ']', '{': '}'}
+CLOSERS = {')', ']', '}'}
+
+# 行末がこのトークンなら文は次の行に続く
+CONTINUE_AFTER = {
+    '=', '+=', '-=', '*=', '/=', '??=', '||=', '&&=', ',', '.', '?.', '=>', '?', ':', '&&', '||', '??',
+    '+', '-', '*', '/', '%', '<', '>', '<=', '>=', '==', '===', '!=', '!==', '!', '|', '&',
+    'await', 'new', 'const', 'let', 'var', 'typeof', 'in', 'of', 'instanceof', 'as', 'else', 'async',
+}
+# 行頭がこのトークンなら前の行の続き
+CONTINUE_BEFORE = {
+    '.', '?.', '=>', '?', ':', '&&', '||', '??', '+', '*', '/', '%', '=', '==', '===', '!=', '!==',
+    '<=', '>=', 'as', 'in', 'instanceof', 'else', 'catch', 'finally',
+}
+# 直後の括弧が制御構文の条件部になるキーワード
+CONTROL_KEYWORDS = {'if', 'for', 'while', 'catch', 'switch'}
+# 直後の { が文のブロックになるトークン
+BLOCK_PREFIXES = {')', '=>', 'else', 'try', 'finally', 'do', '>'}
+
+KEYWORDS = {
+    'as', 'async', 'await', 'break', 'case', 'catch', 'const', 'continue', 'default', 'delete', 'do',
+    'else', 'export', 'false', 'finally', 'for', 'from', 'function', 'if', 'import', 'in', 'instanceof',
+    'let', 'new', 'null', 'of', 'return', 'switch', 'this', 'throw', 'true', 'try', 'typeof', 'undefined',
+    'var', 'void', 'while',
+}
+IDENTIFIER = re.compile(r'[A-Za-z_$][\w$]*$')
+
+
+def is_identifier(token):
+    return bool(IDENTIFIER.match(token)) and token not in KEYWORDS
+
+
+class Source:
+    """1ファイルの構文情報（コメントを除いたトークン列・括弧の対応・関数とブロックの範囲）"""
+
+    def __init__(self, text):
+        self.text = text
+        tokens = TokenList(text)
+        code = [i for i, t in enumerate(tokens.texts) if not t.startswith(('//', '/*'))]
+        self.texts = [tokens.texts[i] for i in code]
+        self.starts = [tokens.starts[i] for i in code]
+        self.ends = [tokens.ends[i] for i in code]
+        self.line_starts = [0] + [m.end() for m in re.finditer('\n', text)]
+        self.match, self.parent = self._match_brackets()
+        # 文字列リテラルの範囲（複数行のテンプレート文字列の中はインデントを変えない）
+        self.strings = [(s, e) for t, s, e in zip(self.texts, self.starts, self.ends) if t[:1] in ('"', "'", '`')]
+        self.functions = self._function_bodies()
+        self.statements = self._statements()
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _match_brackets(self):
+        """括弧の対応（開き⇔閉じ）と、各トークンを囲む最も内側の開き括弧"""
+        match = {}
+        parent = []
+        stack = []
+        for i, token in enumerate(self.texts):
+            if token in CLOSERS and stack and OPENERS[self.texts[stack[-1]]] == token:
+                j = stack.pop()
+                match[i], match[j] = j, i
+            parent.append(stack[-1] if stack else None)
+            if token in OPENERS:
+                stack.append(i)
+        # 対応しない閉じ括弧（正規表現リテラル中など）は無視する
+        return match, parent
+
+    def limit(self, i):
+        """トークン i を囲む括弧の閉じ括弧（最上位ならトークン数）"""
+        opener = self.parent[i]
+        return self.match.get(opener, len(self)) if opener is not None else len(self)
+
+    def newline_between(self, i, j):
+        return '\n' in self.text[self.ends[i]:self.starts[j]]
+
+    def line(self, i):
+        return bisect_right(self.line_starts, self.starts[i])
+
+    def column(self, i):
+        return self.starts[i] - self.line_starts[self.line(i) - 1] + 1
+
+    def line_start(self, i):
+        """トークン i の行の先頭の文字位置"""
+        return self.line_starts[self.line(i) - 1]
+
+    def indent(self, i):
+        line = self.text[self.line_start(i):self.starts[i]]
+        return line[:len(line) - len(line.lstrip())]
+
+    def source(self, start, end):
+        """トークン start〜end（両端を含む）のソース"""
+        return self.text[self.starts[start]:self.ends[end]]
+
+    def in_string(self, position):
+        i = bisect_right(self.strings, (position, float('inf'))) - 1
+        return i >= 0 and self.strings[i][0] <= position < self.strings[i][1]
+
+    def reindent(self, begin, end, delta):
+        """文字位置 begin〜end の2行目以降のインデントを delta 文字増減する編集（文字列の中は除く）"""
+        edits = []
+        for m in re.finditer(r'\n( *)', self.text[begin:end]):
+            position = begin + m.start() + 1
+            if self.in_string(position - 1):
+                continue
+            if delta > 0:
+                edits.append((position, position, ' ' * delta))
+            elif delta < 0:
+                edits.append((position, position + min(len(m.group(1)), -delta), ''))
+        return edits
+
+    def _is_header(self, j):
+        """トークン j の ( が制御構文の条件部か（do ... while (...) の条件は除く）"""
+        if j == 0:
+            return False
+        keyword = self.texts[j - 1]
+        if keyword == 'await' and j >= 2 and self.texts[j - 2] == 'for':
+            return True
+        if keyword not in CONTROL_KEYWORDS:
+            return False
+        if keyword == 'while' and j >= 2 and self.texts[j - 2] == '}':
+            opener = self.match.get(j - 2)
+            return not (opener and self.texts[opener - 1] == 'do')
+        return True
+
+    def statement_end(self, i, limit):
+        """トークン i から始まる文の最後のトークン（セミコロンを省略した文は改行で区切る）"""
+        j = i
+        while True:
+            token = self.texts[j]
+            if token == ';':
+                return j
+            if token in OPENERS and j in self.match:
+                header = token == '(' and self._is_header(j)
+                j = self.match[j]
+                if header and j + 1 < limit:
+                    # 条件部の後には本体が続く
+                    j += 1
+                    continue
+            k = j + 1
+            if k >= limit or self.texts[k] in CLOSERS:
+                return j
+            if (self.newline_between(j, k) and self.texts[j] not in CONTINUE_AFTER
+                    and self.texts[k] not in CONTINUE_BEFORE):
+                return j
+            j = k
+
+    def expression_end(self, i, limit=None):
+        """トークン i から始まる式の最後のトークン"""
+        limit = self.limit(i) if limit is None else limit
+        j = i
+        while True:
+            if self.texts[j] in OPENERS and j in self.match:
+                j = self.match[j]
+            k = j + 1
+            if k >= limit or self.texts[k] in CLOSERS or self.texts[k] in (',', ';'):
+                return j
+            if (self.newline_between(j, k) and self.texts[j] not in CONTINUE_AFTER
+                    and self.texts[k] not in CONTINUE_BEFORE):
+                return j
+            j = k
+
+    def _function_bodies(self):
+        """関数本体の範囲 (開始, 終了)（アロー関数の式の本体も含む）"""
+        bodies = []
+        for i, token in enumerate(self.texts):
+            if token == '=>' and i + 1 < len(self):
+                k = i + 1
+                if self.texts[k] == '{' and k in self.match:
+                    bodies.append((k, self.match[k]))
+                else:
+                    bodies.append((k, self.expression_end(k)))
+            elif token == 'function':
+                k = i + 1
+                while k < len(self) and self.texts[k] != '(':
+                    k += 1
+                if k not in self.match:
+                    continue
+                k = self._skip_return_type(self.match[k] + 1)
+                if k is not None:
+                    bodies.append((k, self.match[k]))
+        return sorted(bodies)
+
+    def _skip_return_type(self, k):
+        """引数リストの後の戻り値の型を飛ばし、関数本体の { の位置を返す"""
+        depth = 0
+        while k < len(self):
+            token = self.texts[k]
+            if token == '{' and depth == 0:
+                return k if k in self.match else None
+            if token == '<':
+                depth += 1
+            elif token == '>':
+                depth -= 1
+            elif token in OPENERS and k in self.match:
+                k = self.match[k]
+            elif token in CLOSERS or token == ';':
+                return None
+            k += 1
+        return None
+
+    def function_at(self, i):
+        """トークン i を含む最も内側の関数本体（最上位なら None）"""
+        found = None
+        for body in self.functions:
+            if body[0] > i:
+                break
+            if body[0] <= i <= body[1]:
+                found = body
+        return found
+
+    def block_statements(self, opener):
+        """{ ... }（opener が None ならファイル全体）の直下の文 [(開始, 終了), ...]"""
+        if opener is None:
+            i, close = 0, len(self)
+        else:
+            i, close = opener + 1, self.match[opener]
+        statements = []
+        while i < close:
+            end = self.statement_end(i, close)
+            statements.append((i, end))
+            i = end + 1
+        return statements
+
+    def _statements(self):
+        """ブロックごとの直下の文 {開き括弧（最上位は None）: [(開始, 終了), ...]}"""
+        blocks = {None: self.block_statements(None)}
+        for i, token in enumerate(self.texts):
+            if token == '{' and i in self.match and i > 0 and self.texts[i - 1] in BLOCK_PREFIXES:
+                blocks[i] = self.block_statements(i)
+        return blocks
+
+    def statement_at(self, i):
+        """トークン i を含む最も内側の文"""
+        found = None
+        for statements in self.statements.values():
+            for start, end in statements:
+                if start <= i <= end and (found is None or end - start < found[1] - found[0]):
+                    found = (start, end)
+        return found
+
+    def references(self, start, end):
+        """範囲内で参照している識別子（プロパティ名は除く）"""
+        names = set()
+        for j in range(start, end + 1):
+            token = self.texts[j]
+            if is_identifier(token) and (j == 0 or self.texts[j - 1] not in ('.', '?.')):
+                names.add(token)
+        return names
+
+    def pattern_names(self, start, end):
+        """宣言の左辺（識別子・分割代入）で束縛する名前"""
+        if start == end or (self.texts[start + 1] == ':' and is_identifier(self.texts[start])):
+            return [self.texts[start]] if is_identifier(self.texts[start]) else []
+        names = []
+        for j in range(start, end + 1):
+            token = self.texts[j]
+            if is_identifier(token) and self.texts[j + 1] != ':' and self.texts[j - 1] not in ('.', '?.'):
+                names.append(token)
+        return names
+
+    def declared_names(self, start, end):
+        """範囲内の const / let / var で宣言される名前"""
+        names = set()
+        for j in range(start, end + 1):
+            if self.texts[j] not in ('const', 'let', 'var'):
+                continue
+            k = j + 1
+            while k <= end and self.texts[k] not in ('=', 'of', 'in', ';'):
+                k = self.match[k] if self.texts[k] in OPENERS and k in self.match else k
+                k += 1
+            names.update(self.pattern_names(j + 1, k - 1))
+        return names
+
+    def call_arguments(self, opener):
+        """呼び出しの ( の位置から、引数ごとの (開始, 終了) を返す"""
+        close = self.match[opener]
+        arguments = []
+        start = opener + 1
+        j = start
+        while j < close:
+            if self.texts[j] in OPENERS and j in self.match:
+                j = self.match[j]
+            elif self.texts[j] == ',':
+                arguments.append((start, j - 1))
+                start = j + 1
+            j += 1
+        if start < close:
+            arguments.append((start, close - 1))
+        return arguments
+
+    def chain_start(self, j):
+        """トークン j で終わるメンバーアクセス・呼び出しの連鎖の先頭"""
+        k = j
+        while True:
+            if self.texts[k] in (')', ']') and k in self.match:
+                k = self.match[k]
+                if self.texts[k] == '(' and not (k > 0 and is_identifier(self.texts[k - 1])):
+                    return k
+                k -= 1
+            elif not is_identifier(self.texts[k]):
+                return k
+            if k >= 2 and self.texts[k - 1] in ('.', '?.'):
+                k -= 2
+                continue
+            return k
@@ -3,110 +3,575 @@
 Edge Functions一括修正スクリプト
 - CORSヘッダー定義を共通モジュールimportに置換
 - メンテナンスチェックコードを共通関数呼び出しに置換
+- メンテナンスチェックを isolate 内でキャッシュする getMaintenanceStatus / getMaintenanceState に移行
+  （_shared/maintenance.ts の check-maintenance-mode へのHTTP呼び出しもキャッシュ付きの実装に置き換える）
+- Server-Timing 計測の挿入（server-timing）と除去（server-timing-remove）
+  （OPTIONAL_RULES のルールは --rule で名前を指定したときだけ適用する）
+
+書き換えは codemod.py の Rule として RULES に宣言し、全Functionに1回のパスで適用する
+（パターンはコード片で書き、空白の違いを無視したトークン列として比較する）
+
+使い方:
+    python tool/update_edge_functions.py                 # 全ルールを全Functionに適用
+    python tool/update_edge_functions.py --dry-run       # 書き換えずに差分を表示（変更があれば終了コード1）
+    python tool/update_edge_functions.py --rule cors get-user-groups create-todo
+    python tool/update_edge_functions.py --rule maintenance-shared --rule maintenance-cache \
+        --rule maintenance-cache-import --rule maintenance-state --dry-run
+    python tool/update_edge_functions.py --list-rules
+
+    # Server-Timing 計測の挿入・除去（何度適用しても同じ結果。集計は tool/aggregate_server_timing.py）
+    python tool/update_edge_functions.py --rule server-timing --dry-run
+    python tool/update_edge_functions.py --rule server-timing-remove
+
+    # 前回から変わっていないファイルは開かずにスキップする（supabase/.codemod_manifest.json。--no-manifest で無効）
+    python tool/update_edge_functions.py --changed-since origin/main --dry-run   # pre-commit / CI 向け
+    python tool/update_edge_functions.py --watch                                # 変更を監視して適用
+
+終了コード: 0 = 完了（--dry-run では変更なし）/ 1 = --dry-run で変更あり / 2 = エラーあり
 """
 
+import argparse
 import os
 import re
-from pathlib import Path
+import sys
+import time
 
-# プロジェクトルート
-PROJECT_ROOT = Path(__file__).parent.parent
-FUNCTIONS_DIR = PROJECT_ROOT / "supabase" / "functions"
+from codemod import (FUNCTIONS_DIR, CodemodManifest, Rule, Scope, changed_functions, collect_targets,
+                     run_codemod)
+from token_match import TokenList
+
+# 修正済みのため対象外のFunction
+ALREADY_UPDATED = ["create-group"]
 
 # メンテナンスチェックを行わないFunction
 SKIP_MAINTENANCE_CHECK = ["check-app-status", "check-maintenance-mode"]
 
-# CORSヘッダー定義のパターン
-CORS_PATTERN = re.compile(
-    r"const corsHeaders = \{\s*'Access-Control-Allow-Origin': '\*',\s*'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',\s*\}",
-    re.DOTALL
-)
+CORS_IMPORT = "import { corsHeaders } from '../_shared/cors.ts'"
+MAINTENANCE_IMPORT = "import { getMaintenanceStatus } from '../_shared/maintenance.ts'"
+LEGACY_MAINTENANCE_IMPORT = "import { checkMaintenanceMode } from '../_shared/maintenance.ts'"
+MAINTENANCE_STATE_IMPORT = "import { getMaintenanceState } from '../_shared/maintenance.ts'"
+
+# メンテナンス状態を返すFunction自体はキャッシュせずにテーブルを読む
+MAINTENANCE_SOURCE = ["check-maintenance-mode"]
+
+# CORSヘッダー定義のパターン（空白・改行の違いは無視してトークン列で比較する）
+CORS_PATTERN = """
+const corsHeaders = {
+  'Access-Control-Allow-Origin': '*',
+  'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
+}
+"""
 
 # メンテナンスチェックコードのパターン
-MAINTENANCE_PATTERN = re.compile(
-    r"// メンテナンスモードチェック\s*const supabaseUrl = Deno\.env\.get\('SUPABASE_URL'\) \?\? ''\s*const supabaseAnonKey = Deno\.env\.get\('SUPABASE_ANON_KEY'\) \?\? ''\s*const checkResponse = await fetch\(`\$\{supabaseUrl\}/functions/v1/check-maintenance-mode`, \{\s*method: 'POST',\s*headers: \{\s*'Content-Type': 'application/json',\s*'Authorization': `Bearer \$\{supabaseAnonKey\}`,\s*\},\s*\}\)\s*const checkResult = await checkResponse\.json\(\)",
-    re.DOTALL
-)
+MAINTENANCE_PATTERN = """
+// メンテナンスモードチェック
+const supabaseUrl = Deno.env.get('SUPABASE_URL') ?? ''
+const supabaseAnonKey = Deno.env.get('SUPABASE_ANON_KEY') ?? ''
+const checkResponse = await fetch(`${supabaseUrl}/functions/v1/check-maintenance-mode`, {
+  method: 'POST',
+  headers: {
+    'Content-Type': 'application/json',
+    'Authorization': `Bearer ${supabaseAnonKey}`,
+  },
+})
+const checkResult = await checkResponse.json()
+"""
 
-# 修正後のメンテナンスチェック
-MAINTENANCE_REPLACEMENT = "// メンテナンスモードチェック\n    const checkResult = await checkMaintenanceMode()"
+# 修正後のメンテナンスチェック（_shared/maintenance.ts は管理者スキップ判定のため req を受け取る）
+MAINTENANCE_REPLACEMENT = "// メンテナンスモードチェック\n    const checkResult = await getMaintenanceStatus(req)"
 
+# 毎回 check-maintenance-mode を呼ぶ共通関数の呼び出し
+MAINTENANCE_CALL_PATTERN = "const $RESULT = await checkMaintenanceMode($REQ)"
+MAINTENANCE_CALL_REPLACEMENT = "const $RESULT = await getMaintenanceStatus($REQ)"
 
-def update_function(function_name):
-    """Edge Functionを修正"""
-    index_path = FUNCTIONS_DIR / function_name / "index.ts"
+# maintenance_mode テーブルを直接読んでいる箇所（同じ { data, error } の形を返す getMaintenanceState に置換）
+MAINTENANCE_STATE_PATTERN = """
+const { data: $DATA, error: $ERROR } = await $CLIENT
+  .from('maintenance_mode')
+  .select('is_maintenance, end_time')
+  .single()
+"""
+MAINTENANCE_STATE_REPLACEMENT = "const { data: $DATA, error: $ERROR } = await getMaintenanceState()"
 
-    if not index_path.exists():
-        print(f"  ⚠️  {function_name}: index.ts not found")
-        return False
+# _shared/maintenance.ts の毎回HTTPで問い合わせる実装
+MAINTENANCE_SHARED_PATTERN = """
+/**
+ * メンテナンスモードをチェック
+ * @param req リクエストオブジェクト（ヘッダーから管理者スキップフラグを取得）
+ * @returns メンテナンスモードの状態
+ */
+export async function checkMaintenanceMode(req: Request): Promise<MaintenanceCheckResult> {
+  // 管理者スキップヘッダーがある場合はメンテナンスチェックをスキップ
+  const skipMaintenance = req.headers.get('x-admin-skip-maintenance')
+  if (skipMaintenance === 'true') {
+    return { status: 'active' }
+  }
 
-    # ファイル読み込み
-    content = index_path.read_text(encoding='utf-8')
-    original_content = content
-    modified = False
-
-    # 1. CORSヘッダー定義を削除
-    if CORS_PATTERN.search(content):
-        content = CORS_PATTERN.sub("", content)
-        modified = True
-
-    # 2. import文の追加・修正
-    # 既にimportがある場合とない場合で処理を分ける
-    if "import { corsHeaders } from '../_shared/cors.ts'" not in content:
-        # import文を探す
-        import_match = re.search(r"(import .+ from .+\n)+", content)
-        if import_match:
-            # 最後のimport文の後に追加
-            last_import_end = import_match.end()
-
-            # メンテナンスチェックが必要かどうか
-            if function_name not in SKIP_MAINTENANCE_CHECK:
-                new_imports = "import { corsHeaders } from '../_shared/cors.ts'\nimport { checkMaintenanceMode } from '../_shared/maintenance.ts'\n"
-            else:
-                new_imports = "import { corsHeaders } from '../_shared/cors.ts'\n"
-
-            content = content[:last_import_end] + new_imports + content[last_import_end:]
-            modified = True
-
-    # 3. メンテナンスチェックコードを関数呼び出しに置換
-    if function_name not in SKIP_MAINTENANCE_CHECK:
-        if MAINTENANCE_PATTERN.search(content):
-            content = MAINTENANCE_PATTERN.sub(MAINTENANCE_REPLACEMENT, content)
-            modified = True
-
-    # 4. 変更があればファイルに書き込み
-    if modified and content != original_content:
-        index_path.write_text(content, encoding='utf-8')
-        return True
-
-    return False
-
-
-def main():
-    """メイン処理"""
-    print("Edge Functions一括修正を開始します...\n")
+  const supabaseUrl = Deno.env.get('SUPABASE_URL') ?? ''
+  const supabaseAnonKey = Deno.env.get('SUPABASE_ANON_KEY') ?? ''
+
+  const checkResponse = await fetch(`${supabaseUrl}/functions/v1/check-maintenance-mode`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+      'Authorization': `Bearer ${supabaseAnonKey}`,
+    },
+  })
+
+  return await checkResponse.json()
+}
+"""
+
+# isolate 内で共有するキャッシュ付きの実装
+# （TTL内はキャッシュ、TTL切れから MAX_STALE までは古い値を返しつつバックグラウンドで更新、
+#   取得できなければ MAINTENANCE_FAIL_POLICY に従う）
+MAINTENANCE_SHARED_REPLACEMENT = """// メンテナンス状態のキャッシュ設定（isolate内で共有。環境変数で調整可能）
+// TTL内はキャッシュを返し、TTL切れから MAX_STALE までは古い値を返しつつバックグラウンドで更新する
+const CACHE_TTL_MS = Number(Deno.env.get('MAINTENANCE_CACHE_TTL_MS') ?? '10000')
+const CACHE_MAX_STALE_MS = Number(Deno.env.get('MAINTENANCE_CACHE_MAX_STALE_MS') ?? '60000')
+const FETCH_TIMEOUT_MS = Number(Deno.env.get('MAINTENANCE_FETCH_TIMEOUT_MS') ?? '2000')
+// 状態を取得できないときの扱い（closed: エラーとして弾く / open: 稼働中として通す）
+const FAIL_POLICY: 'open' | 'closed' = Deno.env.get('MAINTENANCE_FAIL_POLICY') === 'open' ? 'open' : 'closed'
+
+interface MaintenanceState {
+  is_maintenance: boolean
+  end_time: string | null
+}
+
+let cachedState: { state: MaintenanceState; fetchedAt: number } | null = null
+let pendingRefresh: Promise<MaintenanceState> | null = null
+
+/**
+ * maintenance_mode テーブルを取得（check-maintenance-mode Functionを経由せずPostgRESTを直接読む）
+ */
+async function fetchMaintenanceState(): Promise<MaintenanceState> {
+  const supabaseUrl = Deno.env.get('SUPABASE_URL') ?? ''
+  const serviceRoleKey = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY') ?? ''
+
+  const response = await fetch(`${supabaseUrl}/rest/v1/maintenance_mode?select=is_maintenance,end_time`, {
+    headers: {
+      'apikey': serviceRoleKey,
+      'Authorization': `Bearer ${serviceRoleKey}`,
+      // .single() と同じく1行でなければエラーにする
+      'Accept': 'application/vnd.pgrst.object+json',
+    },
+    signal: AbortSignal.timeout(FETCH_TIMEOUT_MS),
+  })
+  if (!response.ok) {
+    throw new Error(`Failed to fetch maintenance_mode: ${response.status} ${await response.text()}`)
+  }
+
+  const row = await response.json()
+  return { is_maintenance: row.is_maintenance === true, end_time: row.end_time ?? null }
+}
+
+/**
+ * キャッシュを更新（同時に来たリクエストの取得は1回にまとめる）
+ */
+function refreshMaintenanceState(): Promise<MaintenanceState> {
+  if (!pendingRefresh) {
+    pendingRefresh = fetchMaintenanceState()
+      .then((state) => {
+        cachedState = { state, fetchedAt: Date.now() }
+        return state
+      })
+      .finally(() => {
+        pendingRefresh = null
+      })
+  }
+  return pendingRefresh
+}
+
+/**
+ * メンテナンス状態を取得（isolate内でキャッシュ）
+ * supabaseClient.from('maintenance_mode').select('is_maintenance, end_time').single() と同じ形で返す
+ * @returns data: メンテナンス状態、error: 取得できず FAIL_POLICY が closed の場合のエラー
+ */
+export async function getMaintenanceState(): Promise<{ data: MaintenanceState | null; error: Error | null }> {
+  if (cachedState) {
+    const age = Date.now() - cachedState.fetchedAt
+    if (age < CACHE_TTL_MS) {
+      return { data: cachedState.state, error: null }
+    }
+    if (age < CACHE_TTL_MS + CACHE_MAX_STALE_MS) {
+      // 古い値を返し、次のリクエストまでに更新しておく
+      refreshMaintenanceState().catch((error) => {
+        console.error('[Maintenance] ⚠️ メンテナンス状態の更新エラー:', error)
+      })
+      return { data: cachedState.state, error: null }
+    }
+  }
+
+  try {
+    return { data: await refreshMaintenanceState(), error: null }
+  } catch (error) {
+    console.error('[Maintenance] ❌ メンテナンス状態の取得エラー:', error)
+    if (FAIL_POLICY === 'open') {
+      return { data: { is_maintenance: false, end_time: null }, error: null }
+    }
+    return { data: null, error: error instanceof Error ? error : new Error(String(error)) }
+  }
+}
+
+/**
+ * メンテナンスモードをチェック（isolate内でキャッシュ）
+ * @param req リクエストオブジェクト（ヘッダーから管理者スキップフラグを取得）
+ * @returns メンテナンスモードの状態
+ */
+export async function getMaintenanceStatus(req: Request): Promise<MaintenanceCheckResult> {
+  // 管理者スキップヘッダーがある場合はメンテナンスチェックをスキップ
+  const skipMaintenance = req.headers.get('x-admin-skip-maintenance')
+  if (skipMaintenance === 'true') {
+    return { status: 'active' }
+  }
+
+  const { data: maintenanceState, error } = await getMaintenanceState()
+  if (error || !maintenanceState) {
+    return { status: 'error', message: 'システムエラーが発生しました。しばらくお待ちください' }
+  }
+  if (maintenanceState.is_maintenance) {
+    return { status: 'maintenance', end_time: maintenanceState.end_time || undefined }
+  }
+  return { status: 'active' }
+}
+"""
+
+SERVER_TIMING_IMPORT = "import { withServerTiming } from '../_shared/server_timing.ts'"
+
+# ハンドラーに渡す計測オブジェクトの変数名
+SERVER_TIMING_VAR = 'serverTiming'
+
+# serve(async (req) => { ... }) のハンドラー全体（ファイル末尾の }) まで）
+SERVER_TIMING_HANDLER_PATTERN = re.compile(
+    r"^serve\(async \((?P<params>[^)]*)\) => \{\n(?P<body>.*)^\}\)", re.MULTILINE | re.DOTALL)
+
+# 計測を挿入済みのファイル（追加したimport文からハンドラーの終わりまで）
+SERVER_TIMING_INSTRUMENTED_PATTERN = re.compile(
+    r"^" + re.escape(SERVER_TIMING_IMPORT) + r"\n(?P<middle>.*?)"
+    r"^serve\(withServerTiming\(async \((?P<params>[^)]*), " + SERVER_TIMING_VAR + r"\) => \{\n"
+    r"(?P<body>.*)^\}\)\)", re.MULTILINE | re.DOTALL)
+
+# 計測する await の呼び出し先（先頭の識別子 → フェーズ名）
+# Supabaseクライアントは db.<テーブル> / rpc.<関数> / storage.<バケット> / auth に分ける
+AWAIT_PHASES = {
+    'getMaintenanceStatus': 'maintenance',
+    'getMaintenanceState': 'maintenance',
+    'req': 'json',
+    'checkGroupMembership': 'permission',
+    'checkAssigneesAreMembers': 'permission',
+    'batchSignedUrls': 'storage.sign',
+    'query': 'db',
+}
+SUPABASE_CLIENT_NAMES = ('supabaseClient', 'supabase', 'supabaseAdmin')
 
-    # 全Edge Functionを取得
-    functions = [d.name for d in FUNCTIONS_DIR.iterdir() if d.is_dir() and d.name != "_shared"]
-    functions.sort()
+WORD_PATTERN = re.compile(r"[^\W\d][\w$]*")
+OPENING = {'(': ')', '[': ']', '{': '}'}
 
-    # 修正済みを除外
-    functions = [f for f in functions if f != "create-group"]
 
-    print(f"対象: {len(functions)}個のEdge Functions\n")
+def _closing_index(tokens, i):
+    """i 番目の開き括弧に対応する閉じ括弧の番号"""
+    depth = 0
+    for k in range(i, len(tokens)):
+        text = tokens.texts[k]
+        if text in OPENING:
+            depth += 1
+        elif text in (')', ']', '}'):
+            depth -= 1
+            if depth == 0:
+                return k
+    raise ValueError(f"括弧が閉じていません: {tokens.texts[i]!r}（{tokens.starts[i]}文字目）")
 
-    updated_count = 0
 
-    for function_name in functions:
-        print(f"修正中: {function_name}...")
-        if update_function(function_name):
-            print(f"  ✅ 修正完了")
-            updated_count += 1
+def _call_chain_end(tokens, i):
+    """i 番目の識別子から始まるメンバーアクセス・呼び出しの連なり（a.b(c).d[e]）の終わりの次の番号"""
+    k = i + 1
+    while k < len(tokens):
+        text = tokens.texts[k]
+        if text in ('.', '?.') and k + 1 < len(tokens) and WORD_PATTERN.fullmatch(tokens.texts[k + 1]):
+            k += 2
+        elif text in ('(', '['):
+            k = _closing_index(tokens, k) + 1
         else:
-            print(f"  ⏭️  スキップ（変更なし）")
+            break
+    return k
+
+
+def _phase_name(tokens, start, end):
+    """await する式（start〜end 番目のトークン）のフェーズ名（計測しない式は None）"""
+    texts = tokens.texts[start:end]
+    root = texts[0]
+    if root in SUPABASE_CLIENT_NAMES:
+        members = [texts[k + 1] for k in range(len(texts) - 1) if texts[k] in ('.', '?.')]
+        kind = {'from': 'db', 'rpc': 'rpc', 'storage': 'storage', 'auth': 'auth'}.get(members[0] if members else '')
+        if kind is None:
+            return 'db'
+        if kind == 'auth':
+            return kind
+        # 最初の .from('...') / .rpc('...') の引数の文字列リテラル
+        for k in range(len(texts) - 3):
+            if texts[k + 1] in ('from', 'rpc') and texts[k] == '.' and texts[k + 2] == '(' \
+                    and texts[k + 3][:1] in ("'", '"'):
+                return kind + '.' + re.sub(r"[^\w.-]", '_', texts[k + 3][1:-1])
+        return kind
+    if root == 'req':
+        return 'json' if texts[1:4] == ['.', 'json', '('] else None
+    return AWAIT_PHASES.get(root)
+
+
+def instrument_awaits(body):
+    """
+    ハンドラー本体の await <式> を await serverTiming.measure('<フェーズ>', () => <式>) に書き換える
+    （式の中に await があるもの（非同期でない関数に包めない）と、AWAIT_PHASES にない呼び出しは書き換えない）
+    """
+    tokens = TokenList(body)
+    insertions = []
+    for i, text in enumerate(tokens.texts[:-1]):
+        if text != 'await' or not WORD_PATTERN.fullmatch(tokens.texts[i + 1]):
+            continue
+        start = i + 1
+        end = _call_chain_end(tokens, start)
+        if 'await' in tokens.texts[start:end]:
+            continue
+        phase = _phase_name(tokens, start, end)
+        if phase is None:
+            continue
+        insertions.append((tokens.starts[start], f"{SERVER_TIMING_VAR}.measure('{phase}', () => "))
+        insertions.append((tokens.ends[end - 1], ')'))
+    pieces = []
+    position = 0
+    for offset, text in sorted(insertions, key=lambda item: item[0]):
+        pieces.append(body[position:offset])
+        pieces.append(text)
+        position = offset
+    pieces.append(body[position:])
+    return ''.join(pieces)
+
+
+def strip_awaits(body):
+    """instrument_awaits の書き換えを元に戻す"""
+    tokens = TokenList(body)
+    prefix = [SERVER_TIMING_VAR, '.', 'measure', '(', None, ',', '(', ')', '=>']
+    deletions = []
+    for i in range(len(tokens) - len(prefix)):
+        texts = tokens.texts[i:i + len(prefix)]
+        if any(expected is not None and text != expected for text, expected in zip(texts, prefix)):
+            continue
+        closing = _closing_index(tokens, i + 3)
+        deletions.append((tokens.starts[i], tokens.starts[i + len(prefix)]))
+        deletions.append((tokens.starts[closing], tokens.ends[closing]))
+    pieces = []
+    position = 0
+    for start, end in sorted(deletions):
+        pieces.append(body[position:start])
+        position = end
+    pieces.append(body[position:])
+    return ''.join(pieces)
+
+
+def add_server_timing(m):
+    """serve(async (req) => {...}) を serve(withServerTiming(async (req, serverTiming) => {...})) にする"""
+    return (f"serve(withServerTiming(async ({m.group('params')}, {SERVER_TIMING_VAR}) => {{\n"
+            + instrument_awaits(m.group('body')) + "}))")
+
+
+def remove_server_timing(m):
+    """add_server_timing と追加したimport文を元に戻す"""
+    return (m.group('middle') + f"serve(async ({m.group('params')}) => {{\n"
+            + strip_awaits(m.group('body')) + "})")
+
+
+RULES = [
+    Rule(
+        'cors',
+        CORS_PATTERN,
+        '',
+        imports=[CORS_IMPORT],
+        scope=Scope(exclude=ALREADY_UPDATED),
+        description='CORSヘッダー定義を _shared/cors.ts のimportに置換',
+    ),
+    Rule(
+        'maintenance',
+        MAINTENANCE_PATTERN,
+        MAINTENANCE_REPLACEMENT,
+        imports=[MAINTENANCE_IMPORT],
+        scope=Scope(exclude=ALREADY_UPDATED + SKIP_MAINTENANCE_CHECK),
+        description='メンテナンスチェックを _shared/maintenance.ts の getMaintenanceStatus 呼び出しに置換',
+    ),
+    Rule(
+        'maintenance-shared',
+        MAINTENANCE_SHARED_PATTERN,
+        MAINTENANCE_SHARED_REPLACEMENT,
+        scope=Scope(functions=['_shared'], files=['maintenance.ts']),
+        description='_shared/maintenance.ts の毎回HTTPで問い合わせる実装をキャッシュ付きの実装に置換',
+    ),
+    Rule(
+        'maintenance-cache',
+        MAINTENANCE_CALL_PATTERN,
+        MAINTENANCE_CALL_REPLACEMENT,
+        imports=[MAINTENANCE_IMPORT],
+        scope=Scope(exclude=SKIP_MAINTENANCE_CHECK),
+        description='checkMaintenanceMode の呼び出しをキャッシュ付きの getMaintenanceStatus に置換',
+    ),
+    Rule(
+        'maintenance-cache-import',
+        LEGACY_MAINTENANCE_IMPORT,
+        MAINTENANCE_IMPORT,
+        scope=Scope(exclude=SKIP_MAINTENANCE_CHECK),
+        description='checkMaintenanceMode のimportを getMaintenanceStatus に置換（maintenance-cache と一緒に適用する）',
+    ),
+    Rule(
+        'maintenance-state',
+        MAINTENANCE_STATE_PATTERN,
+        MAINTENANCE_STATE_REPLACEMENT,
+        imports=[MAINTENANCE_STATE_IMPORT],
+        scope=Scope(exclude=MAINTENANCE_SOURCE),
+        description='maintenance_mode テーブルの直接の取得をキャッシュ付きの getMaintenanceState に置換',
+    ),
+]
+
+# --rule で名前を指定したときだけ適用するルール（互いに打ち消し合うため既定の「全ルール」には含めない）
+OPTIONAL_RULES = [
+    Rule(
+        'server-timing',
+        SERVER_TIMING_HANDLER_PATTERN,
+        add_server_timing,
+        imports=[SERVER_TIMING_IMPORT],
+        anchors=['serve(async'],
+        description='ハンドラーと await（メンテナンスチェック・req.json()・DBクエリ・署名付きURL生成など）に'
+                    'Server-Timing 計測を挿入（_shared/server_timing.ts）',
+    ),
+    Rule(
+        'server-timing-remove',
+        SERVER_TIMING_INSTRUMENTED_PATTERN,
+        remove_server_timing,
+        anchors=['withServerTiming'],
+        description='server-timing ルールで挿入した計測を除去',
+    ),
+]
+
+
+def select_rules(names=None):
+    """ルール名で RULES / OPTIONAL_RULES を絞り込む（省略時は RULES の全て）"""
+    if not names:
+        return list(RULES)
+    by_name = {rule.name: rule for rule in RULES + OPTIONAL_RULES}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"不明なルールです: {', '.join(unknown)}（{', '.join(by_name)}）")
+    return [by_name[name] for name in names]
+
+
+def update_function(function_name, rules=None, dry_run=False):
+    """Edge Functionを修正（変更があれば True）"""
+    results = run_codemod(rules or RULES, FUNCTIONS_DIR, [function_name], dry_run, workers=1)
+    if not results:
+        print(f"  ⚠️  {function_name}: 対象ファイルがありません")
+        return False
+    return any(result.changed for result in results)
+
+
+def report(results, dry_run):
+    """結果を表示して終了コードを返す"""
+    changed = [result for result in results if result.changed]
+    errors = [result for result in results if result.error]
+    skipped = [result for result in results if result.skipped]
+    for result in results:
+        if result.error:
+            print(f"  ❌ {result.function_name}: {result.error}")
+        elif result.changed:
+            detail = ', '.join(f"{name}×{count}" for name, count in result.applied.items())
+            print(f"  {'📝' if dry_run else '✅'} {result.function_name}: {detail}")
+            if dry_run:
+                print(result.diff())
+
+    verb = '修正対象' if dry_run else '修正完了'
+    print(f"\n{verb}: {len(changed)}/{len(results)}個のファイル"
+          + (f"（前回から変更なしでスキップ {len(skipped)}件）" if skipped else "")
+          + (f"（エラー {len(errors)}件）" if errors else ""))
+
+    if errors:
+        return 2
+    if dry_run and changed:
+        return 1
+    return 0
+
+
+def _target_state(rules, functions):
+    """監視対象ファイルの (更新時刻, サイズ)"""
+    state = {}
+    for _, path in collect_targets(rules, FUNCTIONS_DIR, functions):
+        stat = os.stat(path)
+        state[path] = (stat.st_mtime_ns, stat.st_size)
+    return state
+
+
+def watch(rules, functions, dry_run, workers, interval):
+    """対象ファイルの変更を監視し、変わるたびに（変わったファイルだけ）ルールを適用する"""
+    manifest = CodemodManifest()
+    print(f"👀 監視中（{interval}秒ごと。Ctrl+C で終了）...")
+    previous = None
+    try:
+        while True:
+            state = _target_state(rules, functions)
+            if state != previous:
+                results = run_codemod(rules, FUNCTIONS_DIR, functions, dry_run, workers, manifest)
+                manifest.save()
+                if any(not result.skipped for result in results):
+                    print(f"\n🕒 {time.strftime('%H:%M:%S')}")
+                    report([result for result in results if not result.skipped], dry_run)
+                # 自分で書き換えたファイルで再実行しないよう、処理後の状態を基準にする
+                previous = _target_state(rules, functions)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("\n監視を終了しました")
+    return 0
+
+
+def main(argv=None):
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='Edge Functions一括修正')
+    parser.add_argument('functions', nargs='*', help='対象のFunction名（省略時は全て）')
+    parser.add_argument('--rule', action='append', help='適用するルール名（複数指定可。省略時は全て）')
+    parser.add_argument('--dry-run', action='store_true', help='書き換えずに unified diff を表示する')
+    parser.add_argument('--workers', type=int, help='プロセス数（省略時はCPUコア数）')
+    parser.add_argument('--list-rules', action='store_true', help='ルールの一覧を表示する')
+    parser.add_argument('--changed-since', metavar='REV', help='git の REV 以降に変更されたFunctionだけを対象にする')
+    parser.add_argument('--no-manifest', action='store_true', help='前回の結果を使わず全ファイルを処理する')
+    parser.add_argument('--watch', action='store_true', help='ファイルの変更を監視して繰り返し適用する')
+    parser.add_argument('--interval', type=float, default=1.0, help='--watch の確認間隔（秒）')
+    args = parser.parse_args(argv)
+
+    if args.list_rules:
+        for rule in RULES:
+            print(f"{rule.name}: {rule.description}")
+        for rule in OPTIONAL_RULES:
+            print(f"{rule.name}: {rule.description}（--rule で指定したときだけ適用）")
+        return 0
+
+    rules = select_rules(args.rule)
+    functions = args.functions or None
+    if args.changed_since:
+        touched = changed_functions(args.changed_since)
+        functions = [f for f in functions if f in touched] if functions else touched
+        if not functions:
+            print(f"{args.changed_since} 以降に変更されたEdge Functionはありません")
+            return 0
+
+    if args.watch:
+        return watch(rules, functions, args.dry_run, args.workers, args.interval)
 
-    print(f"\n修正完了: {updated_count}/{len(functions)}個のEdge Functionsを修正しました")
+    print(f"Edge Functions一括修正を開始します...（ルール: {', '.join(rule.name for rule in rules)}）\n")
+    manifest = None if args.no_manifest else CodemodManifest()
+    results = run_codemod(rules, FUNCTIONS_DIR, functions, args.dry_run, args.workers, manifest)
+    if manifest is not None:
+        manifest.save()
+    print(f"対象: {len(results)}ファイル\n")
+    return report(results, args.dry_run)
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        sys.exit(main())
+    except ValueError as e:
+        print(f'❌ エラー: {e}', file=sys.stderr)
+        sys.exit(2)